@@ -0,0 +1,256 @@
+# -*- coding:utf-8 -*-
+
+"""
+Kline aggregator.
+
+Build klines of multiple timeframes incrementally from trades or 1 minute klines, and publish every kline on close
+through `MarketSubscribe`, so the aggregated klines can be subscribed like the klines from exchanges. Bulk functions
+rebuild klines from historical data with NumPy.
+
+Author: HuangTao
+Date:   2020/03/21
+Email:  huangtao@ifclover.com
+"""
+
+import datetime
+
+from aioquant import const
+from aioquant.utils import tools
+from aioquant.tasks import LoopRunTask
+from aioquant.history import KLINE_INTERVALS
+from aioquant.market import Trade, Kline, MarketSubscribe, market_center
+
+__all__ = ("KlineAggregator", "kline_start", "kline_end", "kline_starts", "aggregate_klines", "aggregate_trades", )
+
+
+# All kline types can be aggregated from 1 minute klines.
+KLINE_TYPES = (
+    const.MARKET_TYPE_KLINE_3M,
+    const.MARKET_TYPE_KLINE_5M,
+    const.MARKET_TYPE_KLINE_15M,
+    const.MARKET_TYPE_KLINE_30M,
+    const.MARKET_TYPE_KLINE_1H,
+    const.MARKET_TYPE_KLINE_3H,
+    const.MARKET_TYPE_KLINE_6H,
+    const.MARKET_TYPE_KLINE_12H,
+    const.MARKET_TYPE_KLINE_1D,
+    const.MARKET_TYPE_KLINE_3D,
+    const.MARKET_TYPE_KLINE_1W,
+    const.MARKET_TYPE_KLINE_15D,
+    const.MARKET_TYPE_KLINE_1MON,
+    const.MARKET_TYPE_KLINE_1Y
+)
+
+# 1970-01-01 is Thursday, weekly klines start from Monday.
+WEEK_OFFSET = 4 * 24 * 60 * 60 * 1000
+
+
+def kline_start(ts, kline_type):
+    """Open time of the kline that the timestamp belongs to, monthly and yearly klines start from the UTC calendar.
+
+    Args:
+        ts: Timestamp(millisecond).
+        kline_type: Kline type, e.g. `kline_5m` / `kline_1mon`.
+
+    Returns:
+        start: Open timestamp(millisecond) of the kline.
+    """
+    if kline_type in (const.MARKET_TYPE_KLINE_1MON, const.MARKET_TYPE_KLINE_1Y):
+        dt = datetime.datetime.utcfromtimestamp(ts // 1000)
+        month = dt.month if kline_type == const.MARKET_TYPE_KLINE_1MON else 1
+        dt = datetime.datetime(dt.year, month, 1, tzinfo=datetime.timezone.utc)
+        return int(dt.timestamp()) * 1000
+    offset = WEEK_OFFSET if kline_type == const.MARKET_TYPE_KLINE_1W else 0
+    return ts - (ts - offset) % KLINE_INTERVALS[kline_type]
+
+
+def kline_end(start, kline_type):
+    """Close time(excluded) of the kline, that is the open time of the next kline.
+
+    Args:
+        start: Open timestamp(millisecond) of the kline.
+        kline_type: Kline type, e.g. `kline_5m` / `kline_1mon`.
+
+    Returns:
+        end: Close timestamp(millisecond) of the kline.
+    """
+    if kline_type == const.MARKET_TYPE_KLINE_1MON:
+        dt = datetime.datetime.utcfromtimestamp(start // 1000)
+        year, month = (dt.year + 1, 1) if dt.month == 12 else (dt.year, dt.month + 1)
+        return int(datetime.datetime(year, month, 1, tzinfo=datetime.timezone.utc).timestamp()) * 1000
+    if kline_type == const.MARKET_TYPE_KLINE_1Y:
+        dt = datetime.datetime.utcfromtimestamp(start // 1000)
+        return int(datetime.datetime(dt.year + 1, 1, 1, tzinfo=datetime.timezone.utc).timestamp()) * 1000
+    return start + KLINE_INTERVALS[kline_type]
+
+
+class KlineAggregator:
+    """Kline aggregator, every update costs O(1) for each kline type.
+
+    Attributes:
+        platform: Exchange platform name, e.g. `binance` / `okex` / `huobi`.
+        symbol: Trade pair name, e.g. `ETH/BTC`.
+        kline_types: Kline types to be aggregated, default is all kline types from `kline_3m` to `kline_1y`, `kline`
+            can be aggregated from trades too.
+        source: Aggregate from `trade` or `kline`(1 minute klines), default is `kline`.
+        delay: Delay(seconds) to close a kline after its close time when aggregating from trades, so that the late
+            trades can be included, default is 1.
+
+    Usage:
+        KlineAggregator(const.BINANCE, "ETH/BTC", [const.MARKET_TYPE_KLINE_5M, const.MARKET_TYPE_KLINE_1H])
+        MarketSubscribe(const.MARKET_TYPE_KLINE_5M, const.BINANCE, "ETH/BTC", self.on_event_kline_5m_update)
+
+    NOTE:
+        Aggregating from 1 minute klines, a kline is published as soon as the last 1 minute kline closed. Aggregating
+        from trades, a kline is published when a trade of the next kline arrived, or the close time passed by
+        `delay` seconds, klines without any trade are skipped.
+    """
+
+    def __init__(self, platform, symbol, kline_types=None, source=const.MARKET_TYPE_KLINE, delay=1):
+        """Initialize."""
+        self._platform = platform
+        self._symbol = symbol
+        self._kline_types = kline_types or KLINE_TYPES
+        self._delay = delay * 1000
+        self._bars = {}  # Current klines. `{kline_type: [start, end, open, high, low, close, volume]}`
+        self._closed = {}  # Close time of the last published klines. `{kline_type: end}`
+
+        for kline_type in self._kline_types:
+            if kline_type not in KLINE_TYPES and not (kline_type == const.MARKET_TYPE_KLINE and
+                                                      source == const.MARKET_TYPE_TRADE):
+                raise ValueError("kline type not supported: {}".format(kline_type))
+            market_center.provide(kline_type, self._platform, self._symbol)
+        if source == const.MARKET_TYPE_TRADE:
+            MarketSubscribe(const.MARKET_TYPE_TRADE, self._platform, self._symbol, self.on_event_trade_update)
+            LoopRunTask.register(self._check_close, 1)
+        elif source == const.MARKET_TYPE_KLINE:
+            MarketSubscribe(const.MARKET_TYPE_KLINE, self._platform, self._symbol, self.on_event_kline_update)
+        else:
+            raise ValueError("source not supported: {}".format(source))
+
+    async def on_event_trade_update(self, trade: Trade):
+        price = float(trade.price)
+        self.update(trade.timestamp, price, price, price, price, float(trade.quantity))
+
+    async def on_event_kline_update(self, kline: Kline):
+        self.update(kline.timestamp, float(kline.open), float(kline.high), float(kline.low), float(kline.close),
+                    float(kline.volume))
+        self.close_until(kline.timestamp + KLINE_INTERVALS[const.MARKET_TYPE_KLINE])
+
+    async def _check_close(self, *args, **kwargs):
+        self.close_until(tools.get_cur_timestamp_ms() - self._delay)
+
+    def update(self, ts, open, high, low, close, volume):
+        """Update all klines with a trade or a 1 minute kline.
+
+        Args:
+            ts: Timestamp(millisecond) of the trade, or open time of the 1 minute kline.
+            open: Open price, for a trade it's the trade price, same as high / low / close.
+            high: Highest price.
+            low: Lowest price.
+            close: Close price.
+            volume: Trade volume.
+        """
+        for kline_type in self._kline_types:
+            bar = self._bars.get(kline_type)
+            if bar and ts >= bar[1]:
+                self._publish(kline_type, bar)
+                bar = None
+            if not bar:
+                if ts < self._closed.get(kline_type, 0):
+                    continue  # The kline was published already.
+                start = kline_start(ts, kline_type)
+                self._bars[kline_type] = [start, kline_end(start, kline_type), open, high, low, close, volume]
+                continue
+            if high > bar[3]:
+                bar[3] = high
+            if low < bar[4]:
+                bar[4] = low
+            bar[5] = close
+            bar[6] += volume
+
+    def close_until(self, ts):
+        """Publish all klines that close time is not later than the timestamp(millisecond)."""
+        for kline_type in self._kline_types:
+            bar = self._bars.get(kline_type)
+            if bar and bar[1] <= ts:
+                self._publish(kline_type, bar)
+
+    def _publish(self, kline_type, bar):
+        start, end, open, high, low, close, volume = bar
+        self._bars[kline_type] = None
+        self._closed[kline_type] = end
+        kline = Kline(self._platform, self._symbol, tools.float_to_str(open), tools.float_to_str(high),
+                      tools.float_to_str(low), tools.float_to_str(close), tools.float_to_str(volume), start,
+                      kline_type)
+        market_center.publish(kline_type, kline)
+
+
+def kline_starts(timestamps, kline_type):
+    """Open time of the klines that the timestamps belong to, vectorized version of `kline_start`.
+
+    Args:
+        timestamps: Timestamps(millisecond), `numpy.ndarray` or list.
+        kline_type: Kline type, e.g. `kline_5m` / `kline_1mon`.
+
+    Returns:
+        starts: Open timestamps(millisecond), `numpy.ndarray` of int64.
+    """
+    import numpy as np
+
+    ts = np.asarray(timestamps, dtype="int64")
+    if kline_type == const.MARKET_TYPE_KLINE_1MON:
+        return ts.astype("M8[ms]").astype("M8[M]").astype("M8[ms]").astype("int64")
+    if kline_type == const.MARKET_TYPE_KLINE_1Y:
+        return ts.astype("M8[ms]").astype("M8[Y]").astype("M8[ms]").astype("int64")
+    offset = WEEK_OFFSET if kline_type == const.MARKET_TYPE_KLINE_1W else 0
+    return ts - (ts - offset) % KLINE_INTERVALS[kline_type]
+
+
+def aggregate_klines(timestamps, open, high, low, close, volume, kline_type):
+    """Rebuild klines in bulk from smaller klines, e.g. 1 minute klines loaded by `read_columns`.
+
+    Args:
+        timestamps: Open timestamps(millisecond) ordered by time.
+        open: Open prices.
+        high: Highest prices.
+        low: Lowest prices.
+        close: Close prices.
+        volume: Trade volumes.
+        kline_type: Kline type to be rebuilt, e.g. `kline_5m` / `kline_1mon`.
+
+    Returns:
+        klines: `{"timestamp": ..., "open": ..., "high": ..., "low": ..., "close": ..., "volume": ...}`, all values
+            are `numpy.ndarray`, same as `KLINE_COLUMNS`.
+    """
+    import numpy as np
+
+    starts = kline_starts(timestamps, kline_type)
+    open, high, low, close, volume = [np.asarray(v, dtype="float64") for v in (open, high, low, close, volume)]
+    if len(starts) == 0:
+        return {"timestamp": starts, "open": open, "high": high, "low": low, "close": close, "volume": volume}
+    first = np.concatenate(([0], np.flatnonzero(np.diff(starts)) + 1))
+    last = np.concatenate((first[1:], [len(starts)])) - 1
+    return {
+        "timestamp": starts[first],
+        "open": open[first],
+        "high": np.maximum.reduceat(high, first),
+        "low": np.minimum.reduceat(low, first),
+        "close": close[last],
+        "volume": np.add.reduceat(volume, first)
+    }
+
+
+def aggregate_trades(timestamps, prices, quantities, kline_type):
+    """Rebuild klines in bulk from trades, e.g. trades loaded by `read_blocks`.
+
+    Args:
+        timestamps: Trade timestamps(millisecond) ordered by time.
+        prices: Trade prices.
+        quantities: Trade quantities.
+        kline_type: Kline type to be rebuilt, e.g. `kline` / `kline_5m` / `kline_1mon`.
+
+    Returns:
+        klines: Same as `aggregate_klines`.
+    """
+    return aggregate_klines(timestamps, prices, prices, prices, prices, quantities, kline_type)
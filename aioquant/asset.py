@@ -0,0 +1,250 @@
+# -*- coding:utf-8 -*-
+
+"""
+Asset module.
+
+Author: HuangTao
+Date:   2020/03/28
+Email:  huangtao@ifclover.com
+"""
+
+import json
+
+from aioquant.utils import tools
+from aioquant.utils import logger
+from aioquant.tasks import LoopRunTask, SingleTask
+from aioquant.order import FillTracker, ORDER_ACTION_BUY, ORDER_TYPE_LIMIT
+
+__all__ = ("Asset", "AssetSubscribe", "AssetTracker", "asset_center", )
+
+
+class Asset:
+    """Asset object.
+
+    Args:
+        platform: Exchange platform name, e.g. `binance` / `bitmex`.
+        account: Trade account name, e.g. `demo@gmail.com`.
+        assets: Asset information, e.g. `{"BTC": {"free": "1.1", "locked": "2.2", "total": "3.3"}, ... }`.
+        timestamp: Update time, millisecond.
+        update: If any update in this publish.
+    """
+
+    def __init__(self, platform=None, account=None, assets=None, timestamp=None, update=False):
+        """Initialize."""
+        self.platform = platform
+        self.account = account
+        self.assets = assets
+        self.timestamp = timestamp
+        self.update = update
+
+    @property
+    def data(self):
+        d = {
+            "platform": self.platform,
+            "account": self.account,
+            "assets": self.assets,
+            "timestamp": self.timestamp,
+            "update": self.update
+        }
+        return d
+
+    def __str__(self):
+        info = json.dumps(self.data)
+        return info
+
+    def __repr__(self):
+        return str(self)
+
+
+class AssetCenter:
+    """Asset center, dispatch asset updates in process to all the callback functions that subscribed the same
+    platform and account."""
+
+    def __init__(self):
+        self._callbacks = {}  # Subscribers. `{(platform, account): [callback, ...]}`
+
+    def subscribe(self, platform, account, callback):
+        """Subscribe asset updates.
+
+        Args:
+            platform: Exchange platform name, e.g. `binance` / `okex` / `huobi`.
+            account: Trade account name, e.g. `demo@gmail.com`.
+            callback: Asynchronous callback function, e.g. `async def on_event_asset_update(asset: Asset): pass`.
+        """
+        self._callbacks.setdefault((platform, account), []).append(callback)
+
+    def publish(self, asset):
+        """Publish asset to all subscribers."""
+        for callback in self._callbacks.get((asset.platform, asset.account), []):
+            SingleTask.run(callback, asset)
+
+
+asset_center = AssetCenter()
+
+
+class AssetSubscribe:
+    """Subscribe asset updates.
+
+    Args:
+        platform: Exchange platform name, e.g. `binance` / `okex` / `huobi`.
+        account: Trade account name, e.g. `demo@gmail.com`.
+        callback: Asynchronous callback function for asset update, e.g.
+            `async def on_event_asset_update(asset: Asset): pass`.
+    """
+
+    def __init__(self, platform, account, callback):
+        """Initialize."""
+        asset_center.subscribe(platform, account, callback)
+
+
+class AssetTracker:
+    """Asset tracker, update the assets of an account incrementally from order updates, and reconcile them against
+    REST snapshots at a low frequency. Every platform should inherit this class and implement `fetch_assets`.
+
+    Attributes:
+        account: Trade account name, e.g. `demo@gmail.com`.
+        rest_api: REST API client of the account.
+        reconcile_interval: Interval(seconds) to reconcile the assets against a REST snapshot, default is 300.
+
+    NOTE:
+        A limit order locks its funds when it's first seen, a BUY order locks `price * quantity` of quote currency and
+        a SELL order locks `quantity` of base currency. A fill moves the filled amount from the locked funds of one
+        currency to the free funds of the other, the difference between the order price and the fill price of a BUY
+        order is released to free, and the fee is paid by the received currency. The remaining lock is released when
+        the order is canceled or failed. Market orders lock nothing, their fills are moved from free funds.
+
+        The snapshot replaces the local assets, the orders created before the snapshot are considered included in it.
+        Only the changed currencies are published with `update` flag set.
+    """
+
+    PLATFORM = None  # Platform name.
+
+    trackers = {}  # Trackers of every platform and account. `{(platform, account): tracker}`
+
+    @classmethod
+    def instance(cls, account, rest_api, **kwargs):
+        """Get the tracker of an account, create it if not exists."""
+        key = (cls.PLATFORM, account)
+        if key not in cls.trackers:
+            cls.trackers[key] = cls(account, rest_api, **kwargs)
+        return cls.trackers[key]
+
+    def __init__(self, account, rest_api, reconcile_interval=300):
+        """Initialize."""
+        self._account = account
+        self._rest_api = rest_api
+        self._free = {}  # Free amount of every currency. `{currency: float}`
+        self._locked = {}  # Locked amount of every currency. `{currency: float}`
+        self._orders = {}  # Locked amount of tracked orders. `{order_id: locked}`
+        self._fills = FillTracker()  # Filled state of tracked orders.
+        self._snapshot_time = 0  # Last snapshot time, millisecond.
+        self._changed = set()
+
+        SingleTask.run(self.reconcile)
+        LoopRunTask.register(self.reconcile, reconcile_interval)
+
+    @property
+    def assets(self):
+        """All assets, `{currency: {"free": ..., "locked": ..., "total": ...}}`."""
+        return {currency: self._asset(currency) for currency in set(self._free) | set(self._locked)}
+
+    def _asset(self, currency):
+        free = self._free.get(currency, 0)
+        locked = self._locked.get(currency, 0)
+        return {
+            "free": tools.float_to_str(round(free, 12) + 0.0),
+            "locked": tools.float_to_str(round(locked, 12) + 0.0),
+            "total": tools.float_to_str(round(free + locked, 12) + 0.0)
+        }
+
+    def _move(self, currency, free=0, locked=0):
+        if free:
+            self._free[currency] = self._free.get(currency, 0) + free
+        if locked:
+            self._locked[currency] = self._locked.get(currency, 0) + locked
+        if free or locked:
+            self._changed.add(currency)
+
+    async def on_order_update(self, order):
+        """Update assets by an order update.
+
+        Args:
+            order: Order object.
+        """
+        if not order.order_id:
+            return
+        base, quote = order.symbol.split("/")
+        buy = order.action == ORDER_ACTION_BUY
+        limit = order.order_type == ORDER_TYPE_LIMIT
+        price = float(order.price or 0)
+
+        if order.order_id not in self._orders:
+            quantity = float(order.quantity)
+            remain = float(order.remain)
+            if order.is_final and remain >= quantity:
+                return
+            if order.ctime <= self._snapshot_time:  # The order is included in the snapshot.
+                self._fills.skip(order)
+            else:
+                remain = quantity
+            locked = (remain * price if buy else remain) if limit else 0
+            if order.ctime > self._snapshot_time:
+                self._move(quote if buy else base, -locked, locked)
+            self._orders[order.order_id] = locked
+
+        delta = self._fills.delta(order)
+        if delta:
+            dq, avg_price, df = delta
+            if buy:
+                release = min(self._orders[order.order_id], dq * price)
+                self._move(quote, release - dq * avg_price, -release)
+                self._move(base, dq - df)
+            else:
+                release = min(self._orders[order.order_id], dq)
+                self._move(base, release - dq, -release)
+                self._move(quote, dq * avg_price - df)
+            self._orders[order.order_id] -= release
+
+        if order.is_final:
+            locked = self._orders.pop(order.order_id)
+            self._move(quote if buy else base, locked, -locked)
+        self._publish()
+
+    async def reconcile(self, *args, **kwargs):
+        """Replace the local assets by a REST snapshot, and publish the changed currencies."""
+        snapshot_time = tools.get_cur_timestamp_ms()
+        assets, error = await self.fetch_assets()
+        if error:
+            logger.error("fetch assets error! platform:", self.PLATFORM, "account:", self._account, "error:", error,
+                         caller=self)
+            return
+        for currency in set(self._free) | set(self._locked) | set(assets):
+            free, locked = assets.get(currency, (0, 0))
+            local_free, local_locked = self._free.get(currency, 0), self._locked.get(currency, 0)
+            if abs(free - local_free) > 1e-12 or abs(locked - local_locked) > 1e-12:
+                if self._snapshot_time:
+                    logger.warn("asset reconciled. platform:", self.PLATFORM, "account:", self._account,
+                                "currency:", currency, "local:", local_free, local_locked, "exchange:", free, locked,
+                                caller=self)
+                self._free[currency] = free
+                self._locked[currency] = locked
+                self._changed.add(currency)
+        self._snapshot_time = snapshot_time
+        self._publish()
+
+    def _publish(self):
+        if not self._changed:
+            return
+        assets = {currency: self._asset(currency) for currency in self._changed}
+        self._changed = set()
+        asset = Asset(self.PLATFORM, self._account, assets, tools.get_cur_timestamp_ms(), True)
+        asset_center.publish(asset)
+
+    async def fetch_assets(self):
+        """Fetch the assets snapshot.
+
+        Returns:
+            assets: `{currency: (free, locked)}`, the amounts are float and the currencies are upper case.
+            error: Error information, otherwise it's None.
+        """
+        raise NotImplementedError
@@ -0,0 +1,535 @@
+# -*- coding:utf-8 -*-
+
+"""
+Backtest module.
+
+Replay recorded market data through `MarketSubscribe` callbacks on a virtual clock, and match the orders created by
+`Trade` module in a simulated exchange, so the same strategy code can run both live and in backtest.
+
+Author: HuangTao
+Date:   2020/03/18
+Email:  huangtao@ifclover.com
+"""
+
+import copy
+import json
+import time
+import heapq
+import asyncio
+import selectors
+
+from aioquant import const
+from aioquant.error import Error
+from aioquant.utils import tools
+from aioquant.utils import logger
+from aioquant.tasks import SingleTask
+from aioquant.configure import config
+from aioquant.history import KLINE_INTERVALS
+from aioquant.market import Orderbook, Trade, Kline, market_center
+from aioquant.order import Order
+from aioquant.order import ORDER_ACTION_BUY
+from aioquant.order import ORDER_TYPE_LIMIT, ORDER_TYPE_MARKET
+from aioquant.order import ORDER_STATUS_SUBMITTED, ORDER_STATUS_PARTIAL_FILLED, ORDER_STATUS_FILLED, \
+    ORDER_STATUS_CANCELED
+
+__all__ = ("VirtualClock", "BacktestEventLoop", "SimulatedExchange", "BacktestTrade", "Backtest", "backtest",
+           "read_market_data", )
+
+
+class VirtualClock:
+    """Virtual clock, the time never moves by itself, it's moved forward by the backtest event loop.
+
+    Attributes:
+        ts: Initialize timestamp(second), default is 0.
+    """
+
+    def __init__(self, ts=0):
+        """Initialize."""
+        self._now = ts
+
+    def time(self):
+        """Current virtual timestamp(second) in float."""
+        return self._now
+
+    def advance_to(self, ts):
+        """Move the clock forward to the timestamp(second), the clock never goes back."""
+        if ts > self._now:
+            self._now = ts
+
+
+class _VirtualSelector:
+    """Selector never blocks, instead of sleeping until the next timer, it moves the virtual clock forward."""
+
+    def __init__(self, selector, clock):
+        self._selector = selector
+        self._clock = clock
+
+    def select(self, timeout=None):
+        if timeout:
+            self._clock.advance_to(self._clock.time() + timeout)
+        return self._selector.select(0)
+
+    def __getattr__(self, name):
+        return getattr(self._selector, name)
+
+
+class BacktestEventLoop(asyncio.SelectorEventLoop):
+    """Event loop runs on a virtual clock, all the timers, e.g. `call_later` / `asyncio.sleep` / heartbeat, are fired
+    in virtual time, and the loop jumps to the next timer immediately when there is nothing ready to run.
+
+    Attributes:
+        clock: Virtual clock.
+    """
+
+    def __init__(self, clock):
+        """Initialize."""
+        self._clock = clock
+        super(BacktestEventLoop, self).__init__(_VirtualSelector(selectors.DefaultSelector(), clock))
+        # Timestamps in second are large floats, use a tolerance bigger than the float precision.
+        self._clock_resolution = 1e-6
+
+    def time(self):
+        return self._clock.time()
+
+
+def read_market_data(filename, start=None, end=None):
+    """Read recorded market data file, every line is a json like `{"type": market type, "data": market data}`, and
+    market data is the same as `Orderbook.data` / `Trade.data` / `Kline.data`, ordered by timestamp.
+
+    Args:
+        filename: Market data file path.
+        start: Start timestamp(millisecond), included, default is the beginning of file.
+        end: End timestamp(millisecond), excluded, default is the end of file.
+
+    Yields:
+        (event time, market type, market data object). A kline's event time is its close time, so that no future
+        price is seen in backtest.
+    """
+    with open(filename) as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            item = json.loads(line)
+            market_type, data = item["type"], item["data"]
+            if start and data["timestamp"] < start:
+                continue
+            if end and data["timestamp"] >= end:
+                break
+            if market_type == const.MARKET_TYPE_ORDERBOOK:
+                yield data["timestamp"], market_type, Orderbook(**data)
+            elif market_type == const.MARKET_TYPE_TRADE:
+                yield data["timestamp"], market_type, Trade(**data)
+            elif market_type.startswith(const.MARKET_TYPE_KLINE):
+                yield data["timestamp"] + KLINE_INTERVALS.get(market_type, 0), market_type, Kline(**data)
+            else:
+                logger.warn("unknown market type:", market_type, "file:", filename)
+
+
+class SimulatedExchange:
+    """Simulated exchange, match orders against the replayed market data.
+
+    Attributes:
+        fee: Fee rate of the filled value, default is 0.
+        latency: One-way delay(seconds) between strategy and exchange, default is 0.
+
+    NOTE:
+        A new order crossing the latest orderbook will be filled by the opposite levels as a taker, the rest quantity
+        of a limit order will be resting and filled at its own price, when:
+            1. the opposite levels of a new orderbook cross the order price, at most the levels quantity;
+            2. an opposite side trade happens at or through the order price, at most the trade quantity;
+            3. a kline's low(BUY) / high(SELL) price goes through the order price.
+        Queue position is not simulated.
+    """
+
+    def __init__(self, fee=0, latency=0):
+        """Initialize."""
+        self._fee = fee
+        self._latency = latency
+        self._order_id = 0  # The last order id.
+        self._orderbooks = {}  # Latest orderbooks. `{(platform, symbol): orderbook}`
+        self._prices = {}  # Latest prices to value the position. `{(platform, symbol): price}`
+        self._orders = {}  # Resting orders. `{(platform, symbol): {order_id: (order, callback)}}`
+        self._results = {}  # Trading results. `{(platform, symbol): {"trades": ..., "volume": ..., ...}}`
+        self._create_times = {}  # Virtual time(millisecond) of orders created. `{order_id: ts}`
+        self._fill_latencies = {}  # Time(millisecond) from order created to first filled. `{(platform, symbol): []}`
+
+    @property
+    def latency(self):
+        return self._latency
+
+    @property
+    def report(self):
+        """Trading results of every platform and symbol, the pnl is valued in quote currency by the latest price, and
+        fill latency is the virtual time(millisecond) from order created to first filled."""
+        results = []
+        for (platform, symbol), result in self._results.items():
+            item = {
+                "platform": platform,
+                "symbol": symbol,
+                "pnl": result["cash"] + result["position"] * self._prices.get((platform, symbol), 0)
+            }
+            item.update(result)
+            latencies = sorted(self._fill_latencies.get((platform, symbol), []))
+            if latencies:
+                item["fill_latency"] = {
+                    "avg": sum(latencies) / len(latencies),
+                    "p50": latencies[len(latencies) // 2],
+                    "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+                    "max": latencies[-1]
+                }
+            results.append(item)
+        return results
+
+    def on_market(self, market_type, data):
+        """Update market data and match the resting orders.
+
+        Args:
+            market_type: Market data type.
+            data: Market data object, `Orderbook` / `Trade` / `Kline`.
+        """
+        key = (data.platform, data.symbol)
+        if market_type == const.MARKET_TYPE_ORDERBOOK:
+            self._orderbooks[key] = data
+            if data.mid_price is not None:
+                self._prices[key] = data.mid_price
+        elif market_type == const.MARKET_TYPE_TRADE:
+            self._prices[key] = float(data.price)
+        else:
+            self._prices[key] = float(data.close)
+
+        orders = self._orders.get(key)
+        if not orders:
+            return
+        for order, callback in list(orders.values()):
+            is_buy = order.action == ORDER_ACTION_BUY
+            price = float(order.price)
+            if market_type == const.MARKET_TYPE_ORDERBOOK:
+                fills = self._match_levels(order, data.asks if is_buy else data.bids, False)
+            elif market_type == const.MARKET_TYPE_TRADE:
+                trade_price = float(data.price)
+                if data.action == order.action:
+                    continue
+                if (is_buy and trade_price > price) or (not is_buy and trade_price < price):
+                    continue
+                fills = [(price, float(data.quantity))]
+            else:
+                if (is_buy and float(data.low) >= price) or (not is_buy and float(data.high) <= price):
+                    continue
+                fills = [(price, float(order.remain))]
+            self._fill(order, callback, fills)
+
+    async def create_order(self, order, callback):
+        """Create an order.
+
+        Args:
+            order: Order object, `order_id` will be set by the exchange.
+            callback: Function will be called with the order object, every time the order updated.
+
+        Returns:
+            order_id: Order id if created successfully, otherwise it's None.
+            error: Error information, otherwise it's None.
+        """
+        await asyncio.sleep(self._latency)
+        key = (order.platform, order.symbol)
+        if float(order.quantity) <= 0:
+            await asyncio.sleep(self._latency)
+            return None, Error("quantity error: {}".format(order.quantity))
+        orderbook = self._orderbooks.get(key)
+        if order.order_type == ORDER_TYPE_MARKET and not orderbook:
+            await asyncio.sleep(self._latency)
+            return None, Error("no orderbook for market order.")
+
+        self._order_id += 1
+        order.order_id = str(self._order_id)
+        self._create_times[order.order_id] = tools.get_cur_timestamp_ms()
+        order.update(ORDER_STATUS_SUBMITTED)
+        callback(order)
+        if orderbook:
+            is_buy = order.action == ORDER_ACTION_BUY
+            self._fill(order, callback, self._match_levels(order, orderbook.asks if is_buy else orderbook.bids, True))
+        if not order.is_final:
+            if order.order_type == ORDER_TYPE_MARKET:
+                self._create_times.pop(order.order_id, None)
+                if order.update(ORDER_STATUS_CANCELED):
+                    callback(order)
+            else:
+                self._orders.setdefault(key, {})[order.order_id] = (order, callback)
+        await asyncio.sleep(self._latency)
+        return order.order_id, None
+
+    async def revoke_order(self, platform, symbol, order_id):
+        """Revoke an order.
+
+        Returns:
+            error: Error information if the order is not open, otherwise it's None.
+        """
+        await asyncio.sleep(self._latency)
+        item = self._orders.get((platform, symbol), {}).pop(order_id, None)
+        if item:
+            order, callback = item
+            self._create_times.pop(order_id, None)
+            if order.update(ORDER_STATUS_CANCELED):
+                callback(order)
+        await asyncio.sleep(self._latency)
+        if not item:
+            return Error("order not found. order_id: {}".format(order_id))
+        return None
+
+    def _match_levels(self, order, levels, taker):
+        """Match an order with the opposite levels, return the fills `[(price, quantity), ...]`. Taker fills at the
+        level price, maker fills at its own price."""
+        fills = []
+        is_buy = order.action == ORDER_ACTION_BUY
+        is_market = order.order_type == ORDER_TYPE_MARKET
+        price = float(order.price) if not is_market else 0
+        for level_price, level_quantity in levels:
+            level_price = float(level_price)
+            if not is_market and ((is_buy and level_price > price) or (not is_buy and level_price < price)):
+                break
+            fills.append((level_price if taker else price, float(level_quantity)))
+        return fills
+
+    def _fill(self, order, callback, fills):
+        """Fill an order, update the order and trading results."""
+        quantity = float(order.quantity)
+        remain = float(order.remain)
+        filled_value = float(order.avg_price) * (quantity - remain)
+        fee = float(order.fee)
+        result = self._results.setdefault((order.platform, order.symbol),
+                                          {"trades": 0, "volume": 0, "fee": 0, "position": 0, "cash": 0})
+        sign = 1 if order.action == ORDER_ACTION_BUY else -1
+        for price, qty in fills:
+            qty = min(qty, remain)
+            if qty <= 0:
+                break
+            value = price * qty
+            remain -= qty
+            filled_value += value
+            fee += value * self._fee
+            result["trades"] += 1
+            result["volume"] += value
+            result["fee"] += value * self._fee
+            result["position"] += sign * qty
+            result["cash"] -= sign * value + value * self._fee
+        if remain == float(order.remain):
+            return
+        create_time = self._create_times.pop(order.order_id, None)
+        if create_time is not None:
+            self._fill_latencies.setdefault((order.platform, order.symbol), []).append(
+                tools.get_cur_timestamp_ms() - create_time)
+        status = ORDER_STATUS_FILLED if remain <= quantity * 1e-9 else ORDER_STATUS_PARTIAL_FILLED
+        if status == ORDER_STATUS_FILLED:
+            remain = 0
+        if order.update(status, remain, filled_value / (quantity - remain), fee):
+            callback(order)
+        if order.is_final:
+            self._orders.get((order.platform, order.symbol), {}).pop(order.order_id, None)
+
+
+class BacktestTrade:
+    """Backtest Trade module, with the same interface as platform Trade modules, orders are matched by the simulated
+    exchange of backtest. You can initialize trade object with some attributes in kwargs.
+
+    Attributes:
+        account: Account name for this trade exchange.
+        strategy: What's name would you want to created for your strategy.
+        platform: Exchange platform name.
+        symbol: Symbol name for your trade.
+        order_update_callback: Asynchronous callback function will be executed when some order state updated.
+        init_success_callback: Asynchronous callback function will be executed after Trade module object initialized.
+    """
+
+    def __init__(self, **kwargs):
+        """Initialize Trade module."""
+        self._account = kwargs.get("account")
+        self._strategy = kwargs.get("strategy")
+        self._platform = kwargs.get("platform")
+        self._symbol = kwargs.get("symbol")
+        self._order_update_callback = kwargs["order_update_callback"]
+        self._init_success_callback = kwargs["init_success_callback"]
+
+        self._orders = {}  # Order data. e.g. {order_id: order, ... }
+        self._exchange = backtest.exchange
+
+        SingleTask.run(self._init_success_callback, True, None)
+
+    @property
+    def orders(self):
+        return self._orders
+
+    @property
+    def rest_api(self):
+        return None
+
+    async def create_order(self, action, price, quantity, *args, **kwargs):
+        """Create an order.
+
+        Args:
+            action: Trade direction, `BUY` or `SELL`.
+            price: Price of each order.
+            quantity: The buying or selling quantity.
+            kwargs:
+                order_type: Order type, `LIMIT` or `MARKET`, default is `LIMIT`.
+                client_order_id: Client order id, default is generated automatically.
+
+        Returns:
+            order_id: Order id if created successfully, otherwise it's None.
+            error: Error information, otherwise it's None.
+        """
+        info = {
+            "platform": self._platform,
+            "account": self._account,
+            "strategy": self._strategy,
+            "client_order_id": kwargs.get("client_order_id") or tools.get_uuid1().replace("-", ""),
+            "action": action,
+            "order_type": kwargs.get("order_type", ORDER_TYPE_LIMIT),
+            "symbol": self._symbol,
+            "price": tools.float_to_str(price),
+            "quantity": tools.float_to_str(quantity)
+        }
+        order_id, error = await self._exchange.create_order(Order(**info), self._update_order)
+        return order_id, error
+
+    async def revoke_order(self, *order_ids):
+        """Revoke (an) order(s).
+
+        Args:
+            order_ids: Order id list, you can set this param to 0 or multiple items. If you set 0 param, you can cancel
+                all orders for this symbol(initialized in Trade object). If you set 1 param, you can cancel an order.
+                If you set multiple param, you can cancel multiple orders.
+
+        Returns:
+            Success or error, same as platform Trade modules.
+        """
+        if len(order_ids) == 1:
+            error = await self._exchange.revoke_order(self._platform, self._symbol, order_ids[0])
+            return order_ids[0], error
+        ids = order_ids or list(self._orders.keys())
+        errors = await asyncio.gather(*[self._exchange.revoke_order(self._platform, self._symbol, order_id)
+                                        for order_id in ids])
+        success = [order_id for order_id, error in zip(ids, errors) if not error]
+        errors = [(order_id, error) for order_id, error in zip(ids, errors) if error]
+        if len(order_ids) == 0:
+            if errors:
+                return False, errors
+            return True, None
+        return success, errors or None
+
+    async def get_open_order_ids(self):
+        """Get open order id list."""
+        return list(self._orders.keys()), None
+
+    def _update_order(self, order):
+        """Order updated by the simulated exchange."""
+        if order.is_final:
+            self._orders.pop(order.order_id, None)
+        else:
+            self._orders[order.order_id] = order
+        SingleTask.run(self._order_update_callback, copy.copy(order))
+
+
+class Backtest:
+    """Backtest driver, replay recorded market data on a virtual clock.
+
+    Backtest is enabled by the config `BACKTEST`, e.g.
+        {
+            "BACKTEST": {
+                "data": ["data/binance_eth_btc.json"],
+                "start": 1584489600000,
+                "end": 1584576000000,
+                "fee": 0.001,
+                "latency": 0.05
+            }
+        }
+        data: Recorded market data files, see `read_market_data`, data from all files will be merged by time.
+        start: Replay start timestamp(millisecond), optional.
+        end: Replay end timestamp(millisecond), optional.
+        fee: Fee rate of the filled value, default is 0.
+        latency: One-way delay(seconds) between strategy and exchange, default is 0.
+    """
+
+    def __init__(self):
+        """Initialize."""
+        self._clock = VirtualClock()
+        self._loop = None
+        self._exchange = None
+        self._events = None  # Market data iterator.
+        self._next_event = None  # Next market data to be replayed.
+        self._count = 0  # How many market data have been replayed.
+        self._start_time = None  # Wall time that replay started.
+
+    @property
+    def clock(self):
+        return self._clock
+
+    @property
+    def exchange(self):
+        return self._exchange
+
+    @property
+    def count(self):
+        return self._count
+
+    def create_event_loop(self):
+        """Create the event loop running on the virtual clock, the clock starts from the first market data."""
+        files = config.backtest.get("data", [])
+        if isinstance(files, str):
+            files = [files]
+        start = config.backtest.get("start")
+        end = config.backtest.get("end")
+        self._exchange = SimulatedExchange(config.backtest.get("fee", 0), config.backtest.get("latency", 0))
+        sources = []
+        for f in files:
+            if isinstance(f, dict):
+                from aioquant.recorder import read_recorded
+                sources.append(read_recorded(f["path"], f["platform"], f["symbol"], f["type"], start, end))
+            else:
+                sources.append(read_market_data(f, start, end))
+        self._events = heapq.merge(*sources, key=lambda e: e[0])
+        self._next_event = next(self._events, None)
+        if self._next_event:
+            self._clock.advance_to(self._next_event[0] / 1000)
+        tools.set_time_func(self._time)
+        self._loop = BacktestEventLoop(self._clock)
+        return self._loop
+
+    def _time(self):
+        # Compensate the float error, so that millisecond timestamps of market data are exact.
+        return self._clock.time() + 1e-6
+
+    def start(self):
+        """Start replaying market data."""
+        logger.info("backtest start ...", caller=self)
+        self._start_time = time.time()
+        if not self._next_event:
+            logger.warn("no market data to replay!", caller=self)
+            self._loop.call_soon(self._finish)
+            return
+        self._loop.call_at(self._next_event[0] / 1000, self._replay)
+
+    def _replay(self):
+        """Replay all market data in the same millisecond, and schedule the next one on the virtual clock."""
+        ts = self._next_event[0]
+        while self._next_event and self._next_event[0] == ts:
+            _, market_type, data = self._next_event
+            self._exchange.on_market(market_type, data)
+            market_center.publish(market_type, data)
+            self._count += 1
+            self._next_event = next(self._events, None)
+        if self._next_event:
+            self._loop.call_at(self._next_event[0] / 1000, self._replay)
+        else:
+            # Leave some time for the pending order requests.
+            self._loop.call_later(max(1, self._exchange.latency * 2), self._finish)
+
+    def _finish(self):
+        """All market data replayed, print the report and stop the event loop."""
+        logger.info("backtest finished. market data:", self._count, "virtual time:", tools.get_datetime_str(),
+                    "wall time(s):", round(time.time() - self._start_time, 3), caller=self)
+        for result in self._exchange.report:
+            logger.info("result:", result, caller=self)
+        self._loop.stop()
+
+
+backtest = Backtest()
@@ -22,9 +22,12 @@ class Configure:
             LOG: Logger print config.
             RABBITMQ: RabbitMQ config, default is None.
             ACCOUNTS: Trading Exchanges config list, default is [].
-            MARKETS: Market Server config list, default is {}.
+            MARKETS: Market data feed config of every platform, default is {}.
             HEARTBEAT: Server heartbeat config, default is {}.
+            RISK: Pre-trade risk limits of every platform, default is {}.
             PROXY: HTTP proxy config, default is None.
+            BACKTEST: Backtest config, if set, the strategy will run on recorded market data, default is None.
+            SYMBOLS: Symbol metadata config, e.g. cache directory, default is {}.
     """
 
     def __init__(self):
@@ -34,16 +37,21 @@ class Configure:
         self.accounts = []
         self.markets = {}
         self.heartbeat = {}
+        self.risk = {}
         self.proxy = None
+        self.backtest = None
+        self.symbols = {}
 
     def loads(self, config_file=None) -> None:
         """Load config file.
 
         Args:
-            config_file: config json file.
+            config_file: config json file, or a dict of config content.
         """
         configures = {}
-        if config_file:
+        if isinstance(config_file, dict):
+            configures = config_file
+        elif config_file:
             try:
                 with open(config_file) as f:
                     data = f.read()
@@ -66,9 +74,12 @@ class Configure:
         self.log = update_fields.get("LOG", {})
         self.rabbitmq = update_fields.get("RABBITMQ", None)
         self.accounts = update_fields.get("ACCOUNTS", [])
-        self.markets = update_fields.get("MARKETS", [])
+        self.markets = update_fields.get("MARKETS", {})
         self.heartbeat = update_fields.get("HEARTBEAT", {})
+        self.risk = update_fields.get("RISK", {})
         self.proxy = update_fields.get("PROXY", None)
+        self.backtest = update_fields.get("BACKTEST", None)
+        self.symbols = update_fields.get("SYMBOLS", {})
 
         for k, v in update_fields.items():
             setattr(self, k, v)
@@ -0,0 +1,161 @@
+# -*- coding:utf-8 -*-
+
+"""
+Consolidated orderbook of multiple exchanges.
+
+Author: HuangTao
+Date:   2020/03/23
+Email:  huangtao@ifclover.com
+"""
+
+import heapq
+import itertools
+
+from aioquant import const
+from aioquant.utils import tools
+from aioquant.utils import logger
+from aioquant.tasks import LoopRunTask, SingleTask
+from aioquant.market import Orderbook, MarketSubscribe, market_center
+
+__all__ = ("ConsolidatedOrderbook", )
+
+
+class ConsolidatedOrderbook:
+    """Consolidated orderbook, merge the orderbooks of the same symbol from multiple exchanges, every level is tagged
+    with its platform.
+
+    Attributes:
+        symbol: Unified trade pair name, e.g. `ETH/BTC`.
+        platforms: Exchange platform names, default is `[binance, huobi, okex]`.
+        length: Levels of each side of the merged orderbook, default is 10.
+        stale: An orderbook not updated in `stale` seconds is stale and excluded, default is 5.
+        callback: Asynchronous callback function for every update, e.g.
+            `async def on_event_consolidated_update(book: ConsolidatedOrderbook): pass`.
+
+    Usage:
+        book = ConsolidatedOrderbook("ETH/BTC", callback=self.on_event_consolidated_update)
+        bid_price, bid_quantity, bid_platform = book.best_bid
+        ask_price, ask_quantity, ask_platform = book.best_ask
+
+    NOTE:
+        The best bid and ask are updated with every orderbook, the merged levels are computed on the first access
+        after an update. The merged orderbook is also published as `Orderbook` of platform `consolidated`, levels are
+        `[price, quantity, platform]`, so it can be subscribed by `MarketSubscribe`.
+    """
+
+    def __init__(self, symbol, platforms=None, length=10, stale=5, callback=None):
+        """Initialize."""
+        self._symbol = symbol
+        self._platforms = platforms or [const.BINANCE, const.HUOBI, const.OKEX]
+        self._length = length
+        self._stale = stale * 1000
+        self._callback = callback
+        self._books = {}  # Orderbook of every platform. `{platform: (bids, asks, update time)}`
+        self._stale_platforms = set()
+        self._best_bid = None  # `(price, quantity, platform)`
+        self._best_ask = None  # `(price, quantity, platform)`
+        self._merged = None  # Merged levels, `(bids, asks)`, None if it's not computed after the last update.
+        self._timestamp = None  # Last update time, millisecond.
+
+        for platform in self._platforms:
+            MarketSubscribe(const.MARKET_TYPE_ORDERBOOK, platform, self._symbol, self.on_event_orderbook_update)
+        market_center.provide(const.MARKET_TYPE_ORDERBOOK, const.CONSOLIDATED, self._symbol)
+        LoopRunTask.register(self._check_stale, 1)
+
+    @property
+    def symbol(self):
+        return self._symbol
+
+    @property
+    def timestamp(self):
+        return self._timestamp
+
+    @property
+    def best_bid(self):
+        """Best bid of all platforms, `(price, quantity, platform)`, None if no bid."""
+        return self._best_bid
+
+    @property
+    def best_ask(self):
+        """Best ask of all platforms, `(price, quantity, platform)`, None if no ask."""
+        return self._best_ask
+
+    @property
+    def bids(self):
+        """Merged bids, `[(price, quantity, platform), ...]`."""
+        return self._merge()[0]
+
+    @property
+    def asks(self):
+        """Merged asks, `[(price, quantity, platform), ...]`."""
+        return self._merge()[1]
+
+    @property
+    def stale_platforms(self):
+        return set(self._stale_platforms)
+
+    def orderbook(self, platform):
+        """Latest levels of a platform, `(bids, asks)` with float prices and quantities, None if no orderbook."""
+        book = self._books.get(platform)
+        return (book[0], book[1]) if book else None
+
+    async def on_event_orderbook_update(self, orderbook: Orderbook):
+        length = self._length
+        bids = [(float(level[0]), float(level[1])) for level in orderbook.bids[:length]]
+        asks = [(float(level[0]), float(level[1])) for level in orderbook.asks[:length]]
+        self._books[orderbook.platform] = (bids, asks, tools.get_cur_timestamp_ms())
+        if orderbook.platform in self._stale_platforms:
+            self._stale_platforms.discard(orderbook.platform)
+            logger.info("orderbook recovered. platform:", orderbook.platform, "symbol:", self._symbol, caller=self)
+        self._update()
+
+    def _update(self):
+        """Update the best bid and ask of all fresh platforms."""
+        now = tools.get_cur_timestamp_ms()
+        self._mark_stale(now)
+        best_bid = best_ask = None
+        for platform, (bids, asks, _) in self._books.items():
+            if platform in self._stale_platforms:
+                continue
+            if bids and (not best_bid or bids[0][0] > best_bid[0]):
+                best_bid = (bids[0][0], bids[0][1], platform)
+            if asks and (not best_ask or asks[0][0] < best_ask[0]):
+                best_ask = (asks[0][0], asks[0][1], platform)
+        self._best_bid, self._best_ask = best_bid, best_ask
+        self._merged = None
+        self._timestamp = now
+
+        if self._callback:
+            SingleTask.run(self._callback, self)
+        if market_center.subscribed(const.MARKET_TYPE_ORDERBOOK, const.CONSOLIDATED, self._symbol):
+            bids, asks = self._merge()
+            orderbook = Orderbook(const.CONSOLIDATED, self._symbol, [list(level) for level in asks],
+                                  [list(level) for level in bids], self._timestamp)
+            market_center.publish(const.MARKET_TYPE_ORDERBOOK, orderbook)
+
+    def _merge(self):
+        if self._merged is None:
+            bids, asks = [], []
+            for platform, (b, a, _) in self._books.items():
+                if platform in self._stale_platforms:
+                    continue
+                bids.append([(price, quantity, platform) for price, quantity in b])
+                asks.append([(price, quantity, platform) for price, quantity in a])
+            bids = list(itertools.islice(heapq.merge(*bids, key=lambda level: -level[0]), self._length))
+            asks = list(itertools.islice(heapq.merge(*asks, key=lambda level: level[0]), self._length))
+            self._merged = (bids, asks)
+        return self._merged
+
+    def _mark_stale(self, now):
+        """Exclude the platforms that orderbook is not updated in time, return True if any platform becomes stale."""
+        changed = False
+        for platform, (_, _, ts) in self._books.items():
+            if platform not in self._stale_platforms and now - ts > self._stale:
+                self._stale_platforms.add(platform)
+                changed = True
+                logger.warn("orderbook stale. platform:", platform, "symbol:", self._symbol, caller=self)
+        return changed
+
+    async def _check_stale(self, *args, **kwargs):
+        if self._mark_stale(tools.get_cur_timestamp_ms()):
+            self._update()
@@ -0,0 +1,284 @@
+# -*- coding:utf-8 -*-
+
+"""
+Local orderbook maintained by incremental depth updates.
+
+Author: HuangTao
+Date:   2020/03/27
+Email:  huangtao@ifclover.com
+"""
+
+import time
+import bisect
+import asyncio
+
+from aioquant import const
+from aioquant.utils import tools
+from aioquant.utils import logger
+from aioquant.tasks import SingleTask
+from aioquant.market import Orderbook, market_center
+
+__all__ = ("DepthBook", )
+
+
+class _Side:
+    """One side of a local orderbook, levels are kept in price order with the original price and quantity strings."""
+
+    def __init__(self, reverse):
+        self._reverse = reverse  # True for bids, the keys are negative prices.
+        self._keys = []  # Sorted keys.
+        self._levels = {}  # `{key: (price, quantity)}`
+
+    def __len__(self):
+        return len(self._keys)
+
+    def clear(self):
+        self._keys = []
+        self._levels = {}
+
+    def update(self, levels):
+        for level in levels:
+            price, quantity = level[0], level[1]
+            key = -float(price) if self._reverse else float(price)
+            if float(quantity) == 0:
+                if self._levels.pop(key, None) is not None:
+                    del self._keys[bisect.bisect_left(self._keys, key)]
+            else:
+                if key not in self._levels:
+                    bisect.insort(self._keys, key)
+                self._levels[key] = (price, quantity)
+
+    def top(self, n):
+        """Top `n` levels, `[(price, quantity), ...]`."""
+        return [self._levels[key] for key in self._keys[:n]]
+
+
+class DepthBook:
+    """Local orderbook maintained by incremental depth updates, verify the sequence continuity and checksum on every
+    update, and resync from a snapshot when the verification fails.
+
+    Attributes:
+        platform: Exchange platform name, e.g. `binance` / `okex`.
+        symbol: Trade pair name, e.g. `ETH/BTC`.
+        snapshot: Asynchronous function to fetch a snapshot, e.g.
+            `async def snapshot(): return (sequence, timestamp, asks, bids), error`.
+        length: The length of orderbook levels to be published, default is 10.
+        checksum: Function to compute the checksum of the top levels, e.g. `def checksum(bids, asks): return crc`,
+            None if the platform provides no checksum.
+        checksum_levels: Levels of each side used by the checksum, default is 25.
+        max_buffer: Maximum updates buffered while resyncing, default is 1000.
+
+    Usage:
+        book = DepthBook(const.BINANCE, "ETH/BTC", snapshot)
+        book.update(first - 1, last, asks, bids, timestamp=ts)
+
+    NOTE:
+        An update carries the sequence `seq` of its last change and the sequence `prev` it follows, it's applied only
+        if `prev` equals the sequence of the book, and the first update after a snapshot may overlap the snapshot;
+        updates not newer than the book are dropped. If `prev` is None, the sequence continuity is not checked, e.g.
+        OKEx provides checksums only, then the updates older than the snapshot timestamp are dropped when resyncing.
+
+        When a gap or a checksum mismatch is found, the book stops publishing, the updates are buffered, and a
+        snapshot is fetched in a separate task, so other symbols are not blocked. The buffered updates are replayed
+        on the snapshot, if the replay fails too, another snapshot is fetched. The published orderbook is the same as
+        the snapshot feeds, `Orderbook` of the top `length` levels.
+    """
+
+    RETRY_INTERVAL = 1  # Seconds to wait before fetching another snapshot.
+
+    books = {}  # All depth books. `{(platform, symbol): book}`
+
+    def __init__(self, platform, symbol, snapshot, length=10, checksum=None, checksum_levels=25, max_buffer=1000):
+        """Initialize."""
+        self._platform = platform
+        self._symbol = symbol
+        self._snapshot = snapshot
+        self._length = length
+        self._checksum = checksum
+        self._checksum_levels = checksum_levels
+        self._max_buffer = max_buffer
+
+        self._asks = _Side(False)
+        self._bids = _Side(True)
+        self._seq = None  # Sequence of the last applied update.
+        self._first = True  # If no update is applied since the last snapshot.
+        self._synced = False
+        self._resyncing = False
+        self._buffer = []  # Updates received while resyncing.
+
+        self._updates = 0
+        self._dropped = 0
+        self._desyncs = 0
+        self._resyncs = 0
+        self._resync_times = []  # Resync time(millisecond) of every resync.
+
+        self.books[(platform, symbol)] = self
+
+    @property
+    def synced(self):
+        return self._synced
+
+    @property
+    def seq(self):
+        return self._seq
+
+    @property
+    def asks(self):
+        return self._asks.top(self._length)
+
+    @property
+    def bids(self):
+        return self._bids.top(self._length)
+
+    @property
+    def stats(self):
+        """Statistics, `{"synced": ..., "updates": ..., "dropped": ..., "desyncs": ..., "resyncs": ...,
+        "resync_time": {"last": ..., "avg": ..., "max": ...}}`, resync time is millisecond."""
+        times = self._resync_times
+        return {
+            "synced": self._synced,
+            "updates": self._updates,
+            "dropped": self._dropped,
+            "desyncs": self._desyncs,
+            "resyncs": self._resyncs,
+            "resync_time": {
+                "last": times[-1] if times else None,
+                "avg": sum(times) / len(times) if times else None,
+                "max": max(times) if times else None
+            }
+        }
+
+    def reset(self, seq, asks, bids, checksum=None, timestamp=None):
+        """Reset the book by a snapshot pushed from Websocket, e.g. OKEx `partial` depth.
+
+        Args:
+            seq: Sequence of the snapshot, None if not provided.
+            asks: Ask levels, `[[price, quantity], ...]`.
+            bids: Bid levels, `[[price, quantity], ...]`.
+            checksum: Checksum of the snapshot, None if not provided.
+            timestamp: Snapshot time, millisecond.
+        """
+        self._load(seq, asks, bids)
+        if not self._verify(checksum):
+            self._desync("checksum error")
+            return
+        self._synced = True
+        self._buffer = []
+        self._publish(timestamp)
+
+    def update(self, prev, seq, asks, bids, checksum=None, timestamp=None):
+        """Apply an incremental depth update, a level with quantity 0 is removed.
+
+        Args:
+            prev: Sequence this update follows, None if the continuity is not checked.
+            seq: Sequence of the last change in this update, None if not provided.
+            asks: Changed ask levels, `[[price, quantity], ...]`.
+            bids: Changed bid levels, `[[price, quantity], ...]`.
+            checksum: Checksum of the book after this update, None if not provided.
+            timestamp: Update time, millisecond.
+        """
+        self._updates += 1
+        if not self._synced:
+            if len(self._buffer) >= self._max_buffer:
+                self._buffer.pop(0)
+            self._buffer.append((prev, seq, asks, bids, checksum, timestamp))
+            if not self._resyncing:
+                self._start_resync()
+            return
+        result = self._apply(prev, seq, asks, bids, checksum)
+        if result is None:
+            self._dropped += 1
+        elif not result:
+            self._desync("sequence gap" if checksum is None else "sequence gap or checksum error")
+        else:
+            self._publish(timestamp)
+
+    def _load(self, seq, asks, bids):
+        self._asks.clear()
+        self._bids.clear()
+        self._asks.update(asks)
+        self._bids.update(bids)
+        self._seq = seq
+        self._first = True
+
+    def _apply(self, prev, seq, asks, bids, checksum):
+        """Apply an update, return None if it's stale, False if the verification failed, otherwise True."""
+        if seq is not None and self._seq is not None and seq <= self._seq:
+            return None
+        if prev is not None and self._seq is not None:
+            if prev > self._seq or (not self._first and prev != self._seq):
+                return False
+        self._asks.update(asks)
+        self._bids.update(bids)
+        if seq is not None:
+            self._seq = seq
+        self._first = False
+        return self._verify(checksum)
+
+    def _verify(self, checksum):
+        if checksum is None or not self._checksum:
+            return True
+        n = self._checksum_levels
+        return self._checksum(self._bids.top(n), self._asks.top(n)) == checksum
+
+    def _desync(self, reason):
+        self._synced = False
+        self._desyncs += 1
+        self._buffer = []
+        logger.warn("orderbook desync! platform:", self._platform, "symbol:", self._symbol, "reason:", reason,
+                    caller=self)
+        if not self._resyncing:
+            self._start_resync()
+
+    def _start_resync(self):
+        self._resyncing = True
+        SingleTask.run(self._resync)
+
+    async def _resync(self):
+        """Fetch a snapshot and replay the buffered updates, until the book is synced."""
+        start = time.time()
+        try:
+            while True:
+                result, error = await self._snapshot()
+                if error:
+                    logger.error("fetch orderbook snapshot error! platform:", self._platform, "symbol:",
+                                 self._symbol, "error:", error, caller=self)
+                    await asyncio.sleep(self.RETRY_INTERVAL)
+                    continue
+                if self._synced:  # Reset by a snapshot from Websocket while fetching.
+                    return
+                seq, ts, asks, bids = result
+                self._load(seq, asks, bids)
+                buffer, self._buffer = self._buffer, []
+                ok = True
+                for prev, s, a, b, checksum, timestamp in buffer:
+                    if prev is None and timestamp and ts and timestamp <= ts:
+                        continue
+                    if self._apply(prev, s, a, b, checksum) is False:
+                        ok = False
+                        break
+                if ok:
+                    break
+                logger.warn("orderbook snapshot not matched! platform:", self._platform, "symbol:", self._symbol,
+                            caller=self)
+                await asyncio.sleep(self.RETRY_INTERVAL)
+        finally:
+            self._resyncing = False
+        self._synced = True
+        self._resyncs += 1
+        self._resync_times.append((time.time() - start) * 1000)
+        if len(self._resync_times) > 1000:
+            self._resync_times = self._resync_times[-1000:]
+        logger.info("orderbook synced. platform:", self._platform, "symbol:", self._symbol, "seq:", self._seq,
+                    caller=self)
+        self._publish(None)
+
+    def _publish(self, timestamp):
+        info = {
+            "platform": self._platform,
+            "symbol": self._symbol,
+            "asks": [list(level) for level in self._asks.top(self._length)],
+            "bids": [list(level) for level in self._bids.top(self._length)],
+            "timestamp": timestamp or tools.get_cur_timestamp_ms()
+        }
+        market_center.publish(const.MARKET_TYPE_ORDERBOOK, Orderbook(**info))
@@ -0,0 +1,182 @@
+# -*- coding:utf-8 -*-
+
+"""
+Historical market data downloader.
+
+Author: HuangTao
+Date:   2020/03/16
+Email:  huangtao@ifclover.com
+"""
+
+import os
+import json
+import asyncio
+
+from aioquant import const
+from aioquant.utils import tools
+from aioquant.utils import logger
+from aioquant.error import Error
+from aioquant.utils.ratelimit import RateLimiter
+from aioquant.utils.columnar import ColumnWriter, KLINE_COLUMNS
+
+__all__ = ("KlineDownloader", "KLINE_INTERVALS", )
+
+
+# Kline interval(millisecond) for every kline type that has a fixed length.
+KLINE_INTERVALS = {
+    const.MARKET_TYPE_KLINE: 60 * 1000,
+    const.MARKET_TYPE_KLINE_3M: 3 * 60 * 1000,
+    const.MARKET_TYPE_KLINE_5M: 5 * 60 * 1000,
+    const.MARKET_TYPE_KLINE_15M: 15 * 60 * 1000,
+    const.MARKET_TYPE_KLINE_30M: 30 * 60 * 1000,
+    const.MARKET_TYPE_KLINE_1H: 60 * 60 * 1000,
+    const.MARKET_TYPE_KLINE_3H: 3 * 60 * 60 * 1000,
+    const.MARKET_TYPE_KLINE_6H: 6 * 60 * 60 * 1000,
+    const.MARKET_TYPE_KLINE_12H: 12 * 60 * 60 * 1000,
+    const.MARKET_TYPE_KLINE_1D: 24 * 60 * 60 * 1000,
+    const.MARKET_TYPE_KLINE_3D: 3 * 24 * 60 * 60 * 1000,
+    const.MARKET_TYPE_KLINE_1W: 7 * 24 * 60 * 60 * 1000,
+    const.MARKET_TYPE_KLINE_15D: 15 * 24 * 60 * 60 * 1000
+}
+
+
+class KlineDownloader:
+    """Historical kline downloader, split a time range into pages and fetch pages concurrently, every platform should
+    inherit this class and implement `fetch_page`.
+
+    Attributes:
+        symbol: Symbol name, e.g. `ETH/BTC`.
+        kline_type: Kline type, e.g. `kline` / `kline_5m` ..., default is `kline`.
+        start: Start timestamp(millisecond), included, it can be None only if `checkpoint` is set, and then the
+            download resumes from the checkpoint, it's failed if no checkpoint saved.
+        end: End timestamp(millisecond), excluded, default is current timestamp.
+        concurrency: How many pages will be fetched concurrently, default is 5.
+        checkpoint: Checkpoint file path, if set, the download will resume from the last downloaded kline.
+        store_path: Columnar store directory, if set, all downloaded klines will be saved. When resuming, the rows
+            saved after the last checkpoint are dropped, so the store never holds duplicated klines.
+        retry: Retry times if fetch a page failed, default is 3.
+
+    Usage:
+        downloader = BinanceKlineDownloader("ETH/BTC", start=start, end=end, checkpoint="eth_btc.ckpt")
+        async for kline in downloader.download():
+            print(kline)
+    """
+
+    PLATFORM = None  # Platform name.
+    PAGE_LIMIT = None  # Maximum klines per request.
+    RATE = 10  # Maximum requests per second.
+    INTERVALS = {}  # Native kline interval of every kline type supported, `{kline_type: interval}`.
+
+    def __init__(self, symbol, kline_type=const.MARKET_TYPE_KLINE, start=None, end=None, concurrency=5,
+                 checkpoint=None, store_path=None, retry=3):
+        """Initialize."""
+        if kline_type not in self.INTERVALS:
+            raise ValueError("kline type not supported: {}".format(kline_type))
+        if start is None and not checkpoint:
+            raise ValueError("start timestamp is required if no checkpoint")
+        self._symbol = symbol
+        self._kline_type = kline_type
+        self._interval = KLINE_INTERVALS[kline_type]
+        self._start = start
+        self._end = end
+        self._concurrency = concurrency
+        self._checkpoint = checkpoint
+        self._store_path = store_path
+        self._retry = retry
+        self._limiter = RateLimiter(self.RATE)
+        self._error = None
+
+    @property
+    def error(self):
+        """Error information if download stopped by error, otherwise it's None."""
+        return self._error
+
+    async def fetch_page(self, start, end):
+        """Fetch klines in the time range.
+
+        Args:
+            start: Start timestamp(millisecond), included.
+            end: End timestamp(millisecond), excluded.
+
+        Returns:
+            klines: Kline object list, ordered by timestamp, otherwise it's None.
+            error: Error information, otherwise it's None.
+        """
+        raise NotImplementedError
+
+    def _load_checkpoint(self):
+        """Load the checkpoint, return the next timestamp to download and the rows saved in store."""
+        if not self._checkpoint or not os.path.isfile(self._checkpoint):
+            return None, None
+        with open(self._checkpoint) as f:
+            data = json.load(f)
+        return data.get("next"), data.get("rows")
+
+    def _save_checkpoint(self, next_ts, rows):
+        if not self._checkpoint:
+            return
+        tmp = self._checkpoint + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"symbol": self._symbol, "kline_type": self._kline_type, "next": next_ts, "rows": rows}, f)
+        os.replace(tmp, self._checkpoint)
+
+    async def _fetch_page_with_retry(self, start, end):
+        error = None
+        for _ in range(self._retry + 1):
+            await self._limiter.acquire()
+            klines, error = await self.fetch_page(start, end)
+            if not error:
+                return [k for k in klines if start <= k.timestamp < end], None
+            logger.warn("fetch kline page failed, retry. start:", start, "end:", end, "error:", error, caller=self)
+        return None, error
+
+    async def download(self):
+        """Download klines, this is an asynchronous generator yields Kline objects ordered by timestamp.
+        """
+        next_ts, rows = self._load_checkpoint()
+        start = next_ts or self._start
+        if start is None:
+            self._error = Error("no checkpoint saved and start timestamp is not set")
+            logger.error("download kline failed! checkpoint:", self._checkpoint, "error:", self._error, caller=self)
+            return
+        end = self._end or tools.get_cur_timestamp_ms()
+        start = start // self._interval * self._interval
+        page_length = self.PAGE_LIMIT * self._interval
+        pages = [(s, min(s + page_length, end)) for s in range(start, end, page_length)]
+
+        writer = ColumnWriter(self._store_path, KLINE_COLUMNS) if self._store_path else None
+        if writer:
+            if rows is not None and writer.count > rows:
+                # Crashed after the klines saved and before the checkpoint saved, drop them.
+                logger.warn("drop klines saved after checkpoint. store:", self._store_path, "rows:",
+                            writer.count - rows, caller=self)
+                writer.truncate(rows)
+            if next_ts is None:
+                self._save_checkpoint(start, writer.count)
+        tasks = {}
+        launched = 0
+        try:
+            for index, (_, page_end) in enumerate(pages):
+                while launched < len(pages) and launched - index < self._concurrency:
+                    tasks[launched] = asyncio.ensure_future(self._fetch_page_with_retry(*pages[launched]))
+                    launched += 1
+                klines, error = await tasks.pop(index)
+                if error:
+                    self._error = error
+                    logger.error("download kline failed! page:", pages[index], "error:", error, caller=self)
+                    return
+                # Save the whole page and the checkpoint first, so the store never holds duplicated klines after
+                # resuming.
+                if writer:
+                    for kline in klines:
+                        writer.append((kline.timestamp, float(kline.open), float(kline.high), float(kline.low),
+                                       float(kline.close), float(kline.volume)))
+                    writer.flush()
+                self._save_checkpoint(page_end, writer.count if writer else None)
+                for kline in klines:
+                    yield kline
+        finally:
+            for task in tasks.values():
+                task.cancel()
+            if writer:
+                writer.close()
@@ -0,0 +1,480 @@
+# -*- coding:utf-8 -*-
+
+"""
+Technical indicators.
+
+Streaming indicators are updated with every kline / trade / orderbook, every update costs O(1) on preallocated ring
+buffers. Batch functions compute the same values over NumPy arrays for backtests and research, the values are NaN
+where a streaming indicator is not ready.
+
+Author: HuangTao
+Date:   2020/03/22
+Email:  huangtao@ifclover.com
+"""
+
+import math
+
+from aioquant.utils.ringbuffer import RingBuffer
+from aioquant.market import Orderbook, Trade, Kline, MarketSubscribe
+
+__all__ = ("Indicator", "SMA", "EMA", "Variance", "RSI", "ATR", "VWAP", "OFI",
+           "sma", "ema", "variance", "rsi", "atr", "vwap", "ofi", )
+
+
+class Indicator:
+    """Indicator base class, every indicator should inherit this class and implement `update`, and override the
+    market data handlers it supports.
+
+    Usage:
+        self.ema = EMA(20).subscribe(const.MARKET_TYPE_KLINE, const.BINANCE, "ETH/BTC")
+        ...
+        if self.ema.ready:
+            print(self.ema.value)
+
+    NOTE:
+        Subscribe indicators before the strategy callbacks of the same market data, so that the indicators have been
+        updated when the strategy callbacks are called.
+    """
+
+    def __init__(self):
+        """Initialize."""
+        self._value = None
+
+    @property
+    def value(self):
+        """Current value, None if the indicator is not ready."""
+        return self._value
+
+    @property
+    def ready(self):
+        return self._value is not None
+
+    def update(self, *args):
+        raise NotImplementedError
+
+    def subscribe(self, market_type, platform, symbol):
+        """Update the indicator with the subscribed market data.
+
+        Args:
+            market_type: Market data type, e.g. `orderbook` / `trade` / `kline` / `kline_5m`.
+            platform: Exchange platform name, e.g. `binance` / `okex` / `huobi`.
+            symbol: Trade pair name, e.g. `ETH/BTC`.
+
+        Returns:
+            self: The indicator itself.
+        """
+        MarketSubscribe(market_type, platform, symbol, self._on_market)
+        return self
+
+    async def _on_market(self, data):
+        if isinstance(data, Kline):
+            self.on_kline(data)
+        elif isinstance(data, Trade):
+            self.on_trade(data)
+        elif isinstance(data, Orderbook):
+            self.on_orderbook(data)
+
+    def on_kline(self, kline: Kline):
+        """Update with a kline, the close price is used by default."""
+        return self.update(float(kline.close))
+
+    def on_trade(self, trade: Trade):
+        """Update with a trade, the trade price is used by default."""
+        return self.update(float(trade.price))
+
+    def on_orderbook(self, orderbook: Orderbook):
+        raise TypeError("{} can not be updated by orderbook.".format(self.__class__.__name__))
+
+
+class SMA(Indicator):
+    """Simple moving average.
+
+    Attributes:
+        period: Window length.
+    """
+
+    def __init__(self, period):
+        """Initialize."""
+        super(SMA, self).__init__()
+        self._period = period
+        self._buffer = RingBuffer(period)
+        self._sum = 0.0
+
+    def update(self, value):
+        evicted = self._buffer.append(value)
+        self._sum += value if evicted is None else value - evicted
+        if self._buffer.full:
+            self._value = self._sum / self._period
+        return self._value
+
+
+class EMA(Indicator):
+    """Exponential moving average, `alpha = 2 / (period + 1)`, the first value is the simple average of the first
+    `period` values.
+
+    Attributes:
+        period: Window length.
+    """
+
+    def __init__(self, period):
+        """Initialize."""
+        super(EMA, self).__init__()
+        self._period = period
+        self._alpha = 2 / (period + 1)
+        self._count = 0
+        self._sum = 0.0
+
+    def update(self, value):
+        if self._value is None:
+            self._count += 1
+            self._sum += value
+            if self._count == self._period:
+                self._value = self._sum / self._period
+        else:
+            self._value += self._alpha * (value - self._value)
+        return self._value
+
+
+class Variance(Indicator):
+    """Rolling variance, updated by Welford's algorithm so that the value is stable for large prices, and the
+    rounding errors are cleared by recomputing the window every `period` updates, amortized O(1).
+
+    Attributes:
+        period: Window length.
+        ddof: Delta degrees of freedom, the divisor is `period - ddof`, default is 0.
+    """
+
+    def __init__(self, period, ddof=0):
+        """Initialize."""
+        super(Variance, self).__init__()
+        self._period = period
+        self._ddof = ddof
+        self._buffer = RingBuffer(period)
+        self._mean = 0.0
+        self._m2 = 0.0  # Sum of squares of differences from the mean.
+        self._updates = 0  # Updates since the last recomputing.
+
+    @property
+    def std(self):
+        """Rolling standard deviation, None if not ready."""
+        return math.sqrt(self._value) if self._value is not None else None
+
+    def update(self, value):
+        evicted = self._buffer.append(value)
+        if evicted is None:
+            delta = value - self._mean
+            self._mean += delta / len(self._buffer)
+            self._m2 += delta * (value - self._mean)
+        else:
+            self._updates += 1
+            if self._updates == self._period:
+                self._updates = 0
+                values = self._buffer.values()
+                self._mean = math.fsum(values) / self._period
+                self._m2 = math.fsum([(v - self._mean) ** 2 for v in values])
+            else:
+                mean = self._mean
+                self._mean += (value - evicted) / self._period
+                self._m2 += (value - evicted) * (value - self._mean + evicted - mean)
+        if self._buffer.full:
+            self._value = max(self._m2, 0.0) / (self._period - self._ddof)
+        return self._value
+
+
+class RSI(Indicator):
+    """Relative strength index with Wilder's smoothing, it's ready after `period + 1` values.
+
+    Attributes:
+        period: Window length, default is 14.
+    """
+
+    def __init__(self, period=14):
+        """Initialize."""
+        super(RSI, self).__init__()
+        self._period = period
+        self._prev = None
+        self._count = 0
+        self._gain = 0.0  # Average gain.
+        self._loss = 0.0  # Average loss.
+
+    def update(self, value):
+        if self._prev is None:
+            self._prev = value
+            return self._value
+        change, self._prev = value - self._prev, value
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        if self._count < self._period:
+            self._count += 1
+            self._gain += gain / self._period
+            self._loss += loss / self._period
+            if self._count < self._period:
+                return self._value
+        else:
+            self._gain = (self._gain * (self._period - 1) + gain) / self._period
+            self._loss = (self._loss * (self._period - 1) + loss) / self._period
+        self._value = _rsi(self._gain, self._loss)
+        return self._value
+
+
+def _rsi(gain, loss):
+    if gain + loss == 0:
+        return 50.0
+    return 100.0 * gain / (gain + loss)
+
+
+class ATR(Indicator):
+    """Average true range with Wilder's smoothing, updated by klines.
+
+    Attributes:
+        period: Window length, default is 14.
+    """
+
+    def __init__(self, period=14):
+        """Initialize."""
+        super(ATR, self).__init__()
+        self._period = period
+        self._prev_close = None
+        self._count = 0
+        self._sum = 0.0
+
+    def update(self, high, low, close):
+        tr = high - low
+        if self._prev_close is not None:
+            tr = max(tr, abs(high - self._prev_close), abs(low - self._prev_close))
+        self._prev_close = close
+        if self._value is None:
+            self._count += 1
+            self._sum += tr
+            if self._count == self._period:
+                self._value = self._sum / self._period
+        else:
+            self._value = (self._value * (self._period - 1) + tr) / self._period
+        return self._value
+
+    def on_kline(self, kline: Kline):
+        return self.update(float(kline.high), float(kline.low), float(kline.close))
+
+    def on_trade(self, trade: Trade):
+        raise TypeError("ATR can not be updated by trade.")
+
+
+class VWAP(Indicator):
+    """Volume weighted average price, updated by trades, or klines with the typical price `(high + low + close) / 3`.
+
+    Attributes:
+        period: Window length, default is None to average all values.
+    """
+
+    def __init__(self, period=None):
+        """Initialize."""
+        super(VWAP, self).__init__()
+        self._period = period
+        self._values = RingBuffer(period) if period else None  # Price * volume.
+        self._volumes = RingBuffer(period) if period else None
+        self._value_sum = 0.0
+        self._volume_sum = 0.0
+
+    def update(self, price, volume):
+        value = price * volume
+        self._value_sum += value
+        self._volume_sum += volume
+        if self._period:
+            evicted = self._values.append(value)
+            if evicted is not None:
+                self._value_sum -= evicted
+                self._volume_sum -= self._volumes.append(volume)
+            else:
+                self._volumes.append(volume)
+            if not self._values.full:
+                return self._value
+        if self._volume_sum > 0:
+            self._value = self._value_sum / self._volume_sum
+        return self._value
+
+    def on_kline(self, kline: Kline):
+        price = (float(kline.high) + float(kline.low) + float(kline.close)) / 3
+        return self.update(price, float(kline.volume))
+
+    def on_trade(self, trade: Trade):
+        return self.update(float(trade.price), float(trade.quantity))
+
+
+class OFI(Indicator):
+    """Order flow imbalance of the best bid and ask, summed over the last `period` orderbook updates. An update adds
+    the bid quantity if the best bid price rises or stays, subtracts the previous bid quantity if it falls or stays,
+    and the opposite for the ask side.
+
+    Attributes:
+        period: Window length, default is 10.
+    """
+
+    def __init__(self, period=10):
+        """Initialize."""
+        super(OFI, self).__init__()
+        self._period = period
+        self._buffer = RingBuffer(period)
+        self._prev = None  # Previous best levels, `(bid price, bid quantity, ask price, ask quantity)`.
+        self._sum = 0.0
+
+    def update(self, bid_price, bid_quantity, ask_price, ask_quantity):
+        prev, self._prev = self._prev, (bid_price, bid_quantity, ask_price, ask_quantity)
+        if prev is None:
+            return self._value
+        e = 0.0
+        if bid_price >= prev[0]:
+            e += bid_quantity
+        if bid_price <= prev[0]:
+            e -= prev[1]
+        if ask_price <= prev[2]:
+            e -= ask_quantity
+        if ask_price >= prev[2]:
+            e += prev[3]
+        evicted = self._buffer.append(e)
+        self._sum += e if evicted is None else e - evicted
+        if self._buffer.full:
+            self._value = self._sum
+        return self._value
+
+    def on_orderbook(self, orderbook: Orderbook):
+        if not orderbook.best:
+            return self._value
+        return self.update(*orderbook.best)
+
+    def on_kline(self, kline: Kline):
+        raise TypeError("OFI can not be updated by kline.")
+
+    def on_trade(self, trade: Trade):
+        raise TypeError("OFI can not be updated by trade.")
+
+
+def _rolling(values, period):
+    """Sliding windows view of the values, `[len(values) - period + 1, period]`."""
+    import numpy as np
+    return np.lib.stride_tricks.sliding_window_view(values, period)
+
+
+def _empty(n):
+    import numpy as np
+    return np.full(n, np.nan)
+
+
+def sma(values, period):
+    """Simple moving average of the values, see `SMA`."""
+    import numpy as np
+
+    values = np.asarray(values, dtype="float64")
+    out = _empty(len(values))
+    if len(values) >= period:
+        out[period - 1:] = _rolling(values, period).mean(axis=1)
+    return out
+
+
+def ema(values, period):
+    """Exponential moving average of the values, see `EMA`. The recursion runs in a loop over the array."""
+    import numpy as np
+
+    values = np.asarray(values, dtype="float64")
+    out = _empty(len(values))
+    if len(values) < period:
+        return out
+    alpha = 2 / (period + 1)
+    value = values[:period].sum() / period
+    result = [value]
+    for x in values[period:].tolist():
+        value += alpha * (x - value)
+        result.append(value)
+    out[period - 1:] = result
+    return out
+
+
+def variance(values, period, ddof=0):
+    """Rolling variance of the values, see `Variance`."""
+    import numpy as np
+
+    values = np.asarray(values, dtype="float64")
+    out = _empty(len(values))
+    if len(values) >= period:
+        out[period - 1:] = _rolling(values, period).var(axis=1, ddof=ddof)
+    return out
+
+
+def rsi(values, period=14):
+    """Relative strength index of the values, see `RSI`."""
+    import numpy as np
+
+    values = np.asarray(values, dtype="float64")
+    out = _empty(len(values))
+    if len(values) <= period:
+        return out
+    changes = np.diff(values)
+    gains, losses = np.maximum(changes, 0), np.maximum(-changes, 0)
+    gain = (gains[:period] / period).sum()
+    loss = (losses[:period] / period).sum()
+    result = [_rsi(gain, loss)]
+    for g, l in zip(gains[period:].tolist(), losses[period:].tolist()):
+        gain = (gain * (period - 1) + g) / period
+        loss = (loss * (period - 1) + l) / period
+        result.append(_rsi(gain, loss))
+    out[period:] = result
+    return out
+
+
+def atr(high, low, close, period=14):
+    """Average true range of the klines, see `ATR`."""
+    import numpy as np
+
+    high, low, close = [np.asarray(v, dtype="float64") for v in (high, low, close)]
+    out = _empty(len(close))
+    if len(close) < period:
+        return out
+    tr = high - low
+    tr[1:] = np.maximum.reduce([tr[1:], np.abs(high[1:] - close[:-1]), np.abs(low[1:] - close[:-1])])
+    value = tr[:period].sum() / period
+    result = [value]
+    for x in tr[period:].tolist():
+        value = (value * (period - 1) + x) / period
+        result.append(value)
+    out[period - 1:] = result
+    return out
+
+
+def vwap(prices, volumes, period=None):
+    """Volume weighted average price, see `VWAP`, use the typical prices of klines as prices."""
+    import numpy as np
+
+    prices, volumes = np.asarray(prices, dtype="float64"), np.asarray(volumes, dtype="float64")
+    values = prices * volumes
+    if not period:
+        value_sums, volume_sums = np.cumsum(values), np.cumsum(volumes)
+        out = _empty(len(prices))
+        mask = volume_sums > 0
+        out[mask] = value_sums[mask] / volume_sums[mask]
+        # Keep the last value when the volume is 0, same as the streaming one.
+        index = np.where(mask, np.arange(len(out)), -1)
+        index = np.maximum.accumulate(index)
+        out = np.where(index >= 0, out[np.maximum(index, 0)], np.nan)
+        return out
+    out = _empty(len(prices))
+    if len(prices) >= period:
+        value_sums = _rolling(values, period).sum(axis=1)
+        volume_sums = _rolling(volumes, period).sum(axis=1)
+        window = _empty(len(value_sums))
+        mask = volume_sums > 0
+        window[mask] = value_sums[mask] / volume_sums[mask]
+        index = np.maximum.accumulate(np.where(mask, np.arange(len(window)), -1))
+        out[period - 1:] = np.where(index >= 0, window[np.maximum(index, 0)], np.nan)
+    return out
+
+
+def ofi(bid_prices, bid_quantities, ask_prices, ask_quantities, period=10):
+    """Order flow imbalance of the best bid and ask, see `OFI`."""
+    import numpy as np
+
+    bp, bq, ap, aq = [np.asarray(v, dtype="float64") for v in (bid_prices, bid_quantities, ask_prices, ask_quantities)]
+    out = _empty(len(bp))
+    if len(bp) <= period:
+        return out
+    e = (np.where(bp[1:] >= bp[:-1], bq[1:], 0) - np.where(bp[1:] <= bp[:-1], bq[:-1], 0) -
+         np.where(ap[1:] <= ap[:-1], aq[1:], 0) + np.where(ap[1:] >= ap[:-1], aq[:-1], 0))
+    out[period:] = _rolling(e, period).sum(axis=1)
+    return out
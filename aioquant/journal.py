@@ -0,0 +1,350 @@
+# -*- coding:utf-8 -*-
+
+"""
+Write-ahead order journal.
+
+Order intents and state transitions are appended to a journal file in a compact binary format, and synced to disk in
+batches. The non-terminal orders are saved to a snapshot file periodically and the journal is truncated, so the open
+and in flight orders can be rebuilt in milliseconds after a crash or restart.
+
+Record format:
+    header: crc32(4 bytes) + payload length(2 bytes) + record type(1 byte), little endian, crc32 of the record type and
+        payload.
+    intent: key + client order id + action, order type, trade type, create time + price + quantity.
+    update: key + order id + status, remain, average price, fee, update time.
+    forget: key.
+    The strings are saved as 1 byte length and UTF-8 bytes, the key is client order id, or order id if no client
+    order id.
+
+Author: HuangTao
+Date:   2020/04/03
+Email:  huangtao@ifclover.com
+"""
+
+import os
+import copy
+import zlib
+import struct
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from aioquant.utils import logger
+from aioquant.order import Order, ORDER_ACTION_BUY, ORDER_ACTION_SELL, ORDER_TYPE_LIMIT, ORDER_TYPE_MARKET, \
+    ORDER_STATUS_NONE, ORDER_STATUS_SUBMITTED, ORDER_STATUS_PARTIAL_FILLED, ORDER_STATUS_FILLED, \
+    ORDER_STATUS_CANCELED, ORDER_STATUS_FAILED, ORDER_STATUS_FINAL
+
+__all__ = ("OrderJournal", )
+
+
+RECORD_INTENT = 1
+RECORD_UPDATE = 2
+RECORD_FORGET = 3
+
+_HEADER = struct.Struct("<IHB")
+_INTENT = struct.Struct("<BBBq")
+_UPDATE = struct.Struct("<Bdddq")
+
+_ACTIONS = (ORDER_ACTION_BUY, ORDER_ACTION_SELL)
+_ORDER_TYPES = (ORDER_TYPE_LIMIT, ORDER_TYPE_MARKET)
+_STATUSES = (ORDER_STATUS_NONE, ORDER_STATUS_SUBMITTED, ORDER_STATUS_PARTIAL_FILLED, ORDER_STATUS_FILLED,
+             ORDER_STATUS_CANCELED, ORDER_STATUS_FAILED)
+
+
+def _pack_str(s):
+    b = str(s or "").encode("utf-8")
+    return bytes((len(b), )) + b
+
+
+def _unpack_str(buf, pos):
+    end = pos + 1 + buf[pos]
+    return bytes(buf[pos + 1: end]).decode("utf-8"), end
+
+
+def _record(record_type, payload):
+    body = bytes((record_type, )) + payload
+    return _HEADER.pack(zlib.crc32(body), len(payload), record_type) + payload
+
+
+class OrderJournal:
+    """Write-ahead order journal of a Trade object.
+
+    Attributes:
+        path: Root directory of journals, the journal is saved in `{path}/{platform}/{account}/{strategy}/{symbol}/`.
+        platform: Exchange platform name, e.g. `binance` / `okex` / `huobi`.
+        account: Trade account name, e.g. `demo@gmail.com`.
+        strategy: Strategy name, e.g. `my_strategy`.
+        symbol: Trade pair name, e.g. `ETH/BTC`.
+        sync_interval: Interval(seconds) to sync the state transitions to disk, default is 0.01.
+        snapshot_records: Take a snapshot and truncate the journal after so many records, default is 10000.
+
+    NOTE:
+        The journal is replayed when it's created, `orders` are the non-terminal orders rebuilt. The records are
+        buffered and written by a background task, `commit` waits until all the records appended are synced, the
+        concurrent commits share one `fsync`. A torn record at the end of the journal, e.g. the process was killed
+        while writing, is discarded.
+    """
+
+    journals = []  # All the journals not closed.
+
+    @classmethod
+    async def close_all(cls):
+        """Close all the journals."""
+        for journal in list(cls.journals):
+            await journal.close()
+
+    def __init__(self, path, platform, account, strategy, symbol, sync_interval=0.01, snapshot_records=10000):
+        """Initialize."""
+        self._platform = platform
+        self._account = account
+        self._strategy = strategy
+        self._symbol = symbol
+        self._sync_interval = sync_interval
+        self._snapshot_records = snapshot_records
+
+        self._path = os.path.join(path, platform, account, strategy, symbol.replace("/", "_"))
+        self._journal_file = os.path.join(self._path, "journal")
+        self._snapshot_file = os.path.join(self._path, "snapshot")
+
+        self._orders = {}  # Non-terminal orders. `{key: Order}`
+        self._buffer = bytearray()  # Records not written.
+        self._waiters = []  # Futures waiting for the records to be synced.
+        self._records = 0  # Records since last snapshot.
+        self._executor = ThreadPoolExecutor(max_workers=1)
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._flushing = False  # If some records are being written.
+        self._closed = False
+
+        self._syncs = 0
+        self._snapshots = 0
+
+        os.makedirs(self._path, exist_ok=True)
+        self._replay()
+        self._file = open(self._journal_file, "ab")
+        OrderJournal.journals.append(self)
+
+    @property
+    def orders(self):
+        """Non-terminal orders, `[Order, ...]`, the orders without order id were not acknowledged by Exchange."""
+        return [copy.copy(order) for order in self._orders.values()]
+
+    @property
+    def stats(self):
+        """Statistics, `{"orders": ..., "records": ..., "syncs": ..., "snapshots": ...}`."""
+        return {
+            "orders": len(self._orders),
+            "records": self._records,
+            "syncs": self._syncs,
+            "snapshots": self._snapshots
+        }
+
+    def _replay(self):
+        if os.path.exists(self._snapshot_file):
+            with open(self._snapshot_file, "rb") as f:
+                self._read(f.read())
+        if os.path.exists(self._journal_file):
+            with open(self._journal_file, "rb") as f:
+                data = f.read()
+            offset, self._records = self._read(data)
+            if offset < len(data):
+                logger.warn("torn journal record discarded. file:", self._journal_file, "offset:", offset,
+                            "size:", len(data), caller=self)
+                with open(self._journal_file, "r+b") as f:
+                    f.truncate(offset)
+        logger.info("journal replayed. path:", self._path, "orders:", len(self._orders), caller=self)
+
+    def _read(self, data):
+        """Apply the records in data, return the end offset of the last valid record and the count of records."""
+        buf = memoryview(data)
+        offset = 0
+        count = 0
+        while offset + _HEADER.size <= len(buf):
+            crc, length, record_type = _HEADER.unpack_from(buf, offset)
+            end = offset + _HEADER.size + length
+            if end > len(buf) or zlib.crc32(buf[offset + _HEADER.size - 1: end]) != crc:
+                break
+            self._apply(record_type, buf[offset + _HEADER.size: end])
+            count += 1
+            offset = end
+        return offset, count
+
+    def _apply(self, record_type, payload):
+        if record_type == RECORD_INTENT:
+            key, pos = _unpack_str(payload, 0)
+            if key in self._orders:
+                return
+            client_order_id, pos = _unpack_str(payload, pos)
+            action, order_type, trade_type, ctime = _INTENT.unpack_from(payload, pos)
+            price, pos = _unpack_str(payload, pos + _INTENT.size)
+            quantity, pos = _unpack_str(payload, pos)
+            self._orders[key] = Order(self._platform, self._account, self._strategy,
+                                      client_order_id=client_order_id or None,
+                                      symbol=self._symbol, action=_ACTIONS[action], price=price, quantity=quantity,
+                                      remain=quantity, order_type=_ORDER_TYPES[order_type], trade_type=trade_type,
+                                      ctime=ctime)
+        elif record_type == RECORD_UPDATE:
+            key, pos = _unpack_str(payload, 0)
+            order_id, pos = _unpack_str(payload, pos)
+            status, remain, avg_price, fee, utime = _UPDATE.unpack_from(payload, pos)
+            order = self._orders.get(key)
+            if not order:
+                return
+            status = _STATUSES[status]
+            if status in ORDER_STATUS_FINAL:
+                del self._orders[key]
+                return
+            order.order_id = order_id or None
+            order.status = status
+            order.remain = remain
+            order.avg_price = avg_price
+            order.fee = fee
+            order.utime = utime
+        elif record_type == RECORD_FORGET:
+            key, _ = _unpack_str(payload, 0)
+            self._orders.pop(key, None)
+
+    def _intent_record(self, key, order):
+        payload = _pack_str(key) + _pack_str(order.client_order_id) + \
+            _INTENT.pack(_ACTIONS.index(order.action), _ORDER_TYPES.index(order.order_type), order.trade_type or 0,
+                         order.ctime or 0) + _pack_str(order.price) + _pack_str(order.quantity)
+        return _record(RECORD_INTENT, payload)
+
+    def _update_record(self, key, order):
+        payload = _pack_str(key) + _pack_str(order.order_id) + _UPDATE.pack(
+            _STATUSES.index(order.status), float(order.remain or 0), float(order.avg_price or 0),
+            float(order.fee or 0), order.utime or 0)
+        return _record(RECORD_UPDATE, payload)
+
+    def _append(self, record):
+        self._buffer += record
+        self._records += 1
+        if not self._task and not self._closed:
+            self._task = asyncio.get_event_loop().create_task(self._run())
+
+    def intent(self, order):
+        """Append an order intent, before the order is sent to Exchange.
+
+        Args:
+            order: Order object with client order id.
+        """
+        key = order.client_order_id
+        self._orders[key] = copy.copy(order)
+        self._append(self._intent_record(key, order))
+
+    def update(self, order):
+        """Append an order state transition.
+
+        Args:
+            order: Order object.
+        """
+        key = order.client_order_id or order.order_id
+        if not key:
+            return
+        if key not in self._orders:
+            if order.is_final:
+                return
+            # The order is not created by this process, e.g. it's found on Exchange.
+            self._orders[key] = copy.copy(order)
+            self._append(self._intent_record(key, order))
+        elif order.is_final:
+            del self._orders[key]
+        else:
+            self._orders[key] = copy.copy(order)
+        self._append(self._update_record(key, order))
+
+    def forget(self, key):
+        """Forget an order, e.g. the intent was never acknowledged by Exchange.
+
+        Args:
+            key: Client order id, or order id if no client order id.
+        """
+        if self._orders.pop(key, None):
+            self._append(_record(RECORD_FORGET, _pack_str(key)))
+
+    async def commit(self):
+        """Wait until all the records appended are synced to disk."""
+        if not self._buffer and not self._flushing:
+            return
+        future = asyncio.get_event_loop().create_future()
+        self._waiters.append(future)
+        self._wakeup.set()
+        await future
+
+    async def _run(self):
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self._sync_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self._flush()
+
+    async def _flush(self):
+        data, self._buffer = bytes(self._buffer), bytearray()
+        waiters, self._waiters = self._waiters, []
+        loop = asyncio.get_event_loop()
+        self._flushing = True
+        try:
+            if data:
+                await loop.run_in_executor(self._executor, self._write, data)
+        except Exception as e:
+            logger.error("write journal error! path:", self._path, "error:", e, caller=self)
+            for future in waiters:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        finally:
+            self._flushing = False
+        if not data:
+            for future in waiters:
+                if not future.done():
+                    future.set_result(None)
+            return
+        self._syncs += 1
+        for future in waiters:
+            if not future.done():
+                future.set_result(None)
+        if self._records >= self._snapshot_records:
+            self._records = 0
+            self._snapshots += 1
+            snapshot = b"".join(self._intent_record(key, order) + self._update_record(key, order)
+                                for key, order in self._orders.items())
+            try:
+                await loop.run_in_executor(self._executor, self._snapshot, snapshot)
+            except Exception as e:
+                logger.error("snapshot journal error! path:", self._path, "error:", e, caller=self)
+
+    def _write(self, data):
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _snapshot(self, data):
+        """Save the snapshot and truncate the journal, the records written after the snapshot data taken are applied
+        again after the snapshot when replaying, that's safe as the updates are idempotent."""
+        filename = self._snapshot_file + ".tmp"
+        with open(filename, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(filename, self._snapshot_file)
+        fd = os.open(self._path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+        self._file.truncate(0)
+        os.fsync(self._file.fileno())
+
+    async def close(self):
+        """Sync all the records and close the journal."""
+        if self._closed:
+            return
+        self._closed = True
+        OrderJournal.journals.remove(self)
+        self._wakeup.set()
+        if self._task:
+            await self._task
+        await self._flush()
+        self._file.close()
+        self._executor.shutdown()
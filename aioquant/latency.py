@@ -0,0 +1,292 @@
+# -*- coding:utf-8 -*-
+
+"""
+Tick-to-trade latency tracing.
+
+A market event is traced from the Websocket frame received to the market data dispatched to the subscribers, and an
+order is traced from the strategy decision to the request acknowledged by Exchange. The traces are passed along by
+context variables, the tasks created by `SingleTask.run` inherit them, so the order created in a market data callback
+is linked to the market event that triggered it.
+
+Author: HuangTao
+Date:   2020/04/01
+Email:  huangtao@ifclover.com
+"""
+
+import math
+import time
+import contextvars
+
+__all__ = ("MarketTrace", "OrderTrace", "LatencyHistogram", "LatencyCollector", "latency_collector", )
+
+
+_receive_ns = contextvars.ContextVar("receive_ns", default=None)  # Receive time of the Websocket frame.
+_market_trace = contextvars.ContextVar("market_trace", default=None)  # Trace of the market event being processed.
+_order_trace = contextvars.ContextVar("order_trace", default=None)  # Trace of the order being created.
+_order_request = contextvars.ContextVar("order_request", default=False)  # If the order request is being sent.
+
+
+class MarketTrace:
+    """Trace of a market event, the `*_ns` times are `time.perf_counter_ns()`.
+
+    Attributes:
+        exchange_ts: Event time of Exchange, millisecond, None if not provided.
+        local_ts: Local time when the event is decoded, millisecond.
+        receive_ns: Time the Websocket frame received.
+        decode_ns: Time the frame decoded.
+        dispatch_ns: Time the market data dispatched to the subscribers.
+    """
+
+    __slots__ = ("exchange_ts", "local_ts", "receive_ns", "decode_ns", "dispatch_ns", )
+
+    def __init__(self, exchange_ts=None, local_ts=None, receive_ns=None, decode_ns=None):
+        """Initialize."""
+        self.exchange_ts = exchange_ts
+        self.local_ts = local_ts
+        self.receive_ns = receive_ns
+        self.decode_ns = decode_ns
+        self.dispatch_ns = None
+
+    @property
+    def data(self):
+        return {key: getattr(self, key) for key in self.__slots__}
+
+
+class OrderTrace:
+    """Trace of an order, the `*_ns` times are `time.perf_counter_ns()`.
+
+    Attributes:
+        market: Trace of the market event that triggered the order, None if not created in a market data callback.
+        decision_ns: Time the strategy decided to create the order.
+        sent_ns: Time the request sent.
+        ack_ns: Time the response received.
+    """
+
+    __slots__ = ("market", "decision_ns", "sent_ns", "ack_ns", )
+
+    def __init__(self, market=None, decision_ns=None):
+        """Initialize."""
+        self.market = market
+        self.decision_ns = decision_ns
+        self.sent_ns = None
+        self.ack_ns = None
+
+    @property
+    def data(self):
+        return {
+            "market": self.market.data if self.market else None,
+            "decision_ns": self.decision_ns,
+            "sent_ns": self.sent_ns,
+            "ack_ns": self.ack_ns
+        }
+
+
+class LatencyHistogram:
+    """Log scale latency histogram, every power of 2 nanoseconds is split into `SUB_BUCKETS` buckets, so recording
+    costs O(1) and the percentiles are accurate to about 19%.
+    """
+
+    SUB_BUCKETS = 4
+
+    def __init__(self):
+        """Initialize."""
+        self._buckets = [0] * (64 * self.SUB_BUCKETS)
+        self._count = 0
+        self._sum = 0
+        self._min = None
+        self._max = None
+
+    @property
+    def count(self):
+        return self._count
+
+    def record(self, ns):
+        """Record a latency in nanoseconds."""
+        if ns < 1:
+            ns = 1
+        self._buckets[int(math.log2(ns) * self.SUB_BUCKETS)] += 1
+        self._count += 1
+        self._sum += ns
+        if self._min is None or ns < self._min:
+            self._min = ns
+        if self._max is None or ns > self._max:
+            self._max = ns
+
+    def percentile(self, p):
+        """Upper bound of the bucket at percentile `p`(0~100), in nanoseconds, None if empty."""
+        if not self._count:
+            return None
+        rank = self._count * p / 100
+        total = 0
+        for index, n in enumerate(self._buckets):
+            total += n
+            if n and total >= rank:
+                return min(2 ** ((index + 1) / self.SUB_BUCKETS), self._max)
+        return self._max
+
+    @property
+    def data(self):
+        """Statistics in microseconds, `{"count": ..., "min": ..., "avg": ..., "p50": ..., "p90": ..., "p99": ...,
+        "max": ...}`."""
+        if not self._count:
+            return {"count": 0}
+        return {
+            "count": self._count,
+            "min": round(self._min / 1000, 3),
+            "avg": round(self._sum / self._count / 1000, 3),
+            "p50": round(self.percentile(50) / 1000, 3),
+            "p90": round(self.percentile(90) / 1000, 3),
+            "p99": round(self.percentile(99) / 1000, 3),
+            "max": round(self._max / 1000, 3)
+        }
+
+
+class LatencyCollector:
+    """Latency collector, build the latency breakdown histograms of every strategy from the order traces.
+
+    Segments:
+        exchange: Exchange event time to local decode time, by wall clock, including the clock offset.
+        decode: Frame received to decoded, including the queueing in event loop and decode workers.
+        dispatch: Frame decoded to market data dispatched, including the feed processing, e.g. orderbook verification.
+        strategy: Market data dispatched to strategy decision, including the callback scheduling.
+        send: Strategy decision to request sent, including the local checks, the rate limiter wait and signing.
+        ack: Request sent to response received.
+        tick_to_trade: Frame received to request sent.
+
+    Usage:
+        latency_collector.enable()
+        ...
+        print(latency_collector.report())
+
+    NOTE:
+        Tracing is disabled by default, the traces are not created until `enable` is called, it should be called before
+        the market data subscribed. Tracing requires Python 3.7 or later.
+    """
+
+    SEGMENTS = ("exchange", "decode", "dispatch", "strategy", "send", "ack", "tick_to_trade", )
+
+    def __init__(self):
+        self.enabled = False
+        self._histograms = {}  # Histograms of every strategy. `{strategy: {segment: LatencyHistogram}}`
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def mark_receive(self):
+        """Mark the receive time of a Websocket frame in current context, the tasks created later inherit it."""
+        if self.enabled:
+            _receive_ns.set(time.perf_counter_ns())
+
+    def receive_ns(self):
+        """Receive time of the Websocket frame in current context."""
+        return _receive_ns.get()
+
+    def set_receive_ns(self, ns):
+        _receive_ns.set(ns)
+
+    def begin_market(self, exchange_ts, local_ts):
+        """Begin to trace a decoded market event in current context.
+
+        Args:
+            exchange_ts: Event time of Exchange, millisecond, None if not provided.
+            local_ts: Local time, millisecond.
+        """
+        if self.enabled:
+            _market_trace.set(MarketTrace(exchange_ts, local_ts, _receive_ns.get(), time.perf_counter_ns()))
+
+    def dispatch(self, data):
+        """Attach the market trace in current context to a market data object being dispatched."""
+        trace = _market_trace.get()
+        if trace:
+            if trace.dispatch_ns is None:
+                trace.dispatch_ns = time.perf_counter_ns()
+            data.trace = trace
+
+    def begin_order(self):
+        """Begin to trace an order in current context, the order is linked to the market event of current context.
+
+        Returns:
+            trace: Order trace, None if tracing is disabled.
+            token: Token to reset the context by `end_order`.
+        """
+        if not self.enabled:
+            return None, None
+        trace = OrderTrace(_market_trace.get(), time.perf_counter_ns())
+        return trace, _order_trace.set(trace)
+
+    def end_order(self, token):
+        _order_trace.reset(token)
+
+    def begin_request(self):
+        """Begin to send the request of the order being created in current context, it should be called right before
+        the order request, after the rate limiter waited, so the other requests, e.g. an account id lookup, are not
+        traced as the order request.
+
+        Returns:
+            token: Token to reset the context by `end_request`, None if no order is being traced.
+        """
+        if not _order_trace.get():
+            return None
+        return _order_request.set(True)
+
+    def end_request(self, token):
+        if token:
+            _order_request.reset(token)
+
+    def mark_sent(self):
+        """Mark the request sent time of the order being created in current context, only for the order request."""
+        trace = _order_trace.get()
+        if trace and _order_request.get():
+            trace.sent_ns = time.perf_counter_ns()
+
+    def mark_ack(self):
+        """Mark the response received time of the order being created in current context, only for the order
+        request."""
+        trace = _order_trace.get()
+        if trace and _order_request.get():
+            trace.ack_ns = time.perf_counter_ns()
+
+    def record(self, strategy, trace):
+        """Record the latency breakdown of an order trace.
+
+        Args:
+            strategy: Strategy name.
+            trace: Order trace.
+        """
+        histograms = self._histograms.get(strategy)
+        if not histograms:
+            histograms = self._histograms[strategy] = {segment: LatencyHistogram() for segment in self.SEGMENTS}
+        market = trace.market
+        if market:
+            if market.exchange_ts and market.local_ts:
+                histograms["exchange"].record((market.local_ts - market.exchange_ts) * 1000000)
+            if market.receive_ns:
+                histograms["decode"].record(market.decode_ns - market.receive_ns)
+            if market.dispatch_ns:
+                histograms["dispatch"].record(market.dispatch_ns - market.decode_ns)
+                histograms["strategy"].record(trace.decision_ns - market.dispatch_ns)
+            if market.receive_ns and trace.sent_ns:
+                histograms["tick_to_trade"].record(trace.sent_ns - market.receive_ns)
+        if trace.sent_ns:
+            histograms["send"].record(trace.sent_ns - trace.decision_ns)
+            if trace.ack_ns:
+                histograms["ack"].record(trace.ack_ns - trace.sent_ns)
+
+    def histograms(self, strategy):
+        """Histograms of a strategy, `{segment: LatencyHistogram}`."""
+        return self._histograms.get(strategy, {})
+
+    def report(self, strategy=None):
+        """Latency breakdown in microseconds, `{strategy: {segment: histogram data}}`.
+
+        Args:
+            strategy: Strategy name, default is all the strategies.
+        """
+        strategies = [strategy] if strategy else list(self._histograms)
+        return {s: {segment: h.data for segment, h in self.histograms(s).items()} for s in strategies}
+
+
+latency_collector = LatencyCollector()
@@ -0,0 +1,389 @@
+# -*- coding:utf-8 -*-
+
+"""
+Market module.
+
+Author: HuangTao
+Date:   2019/02/16
+Email:  huangtao@ifclover.com
+"""
+
+import json
+
+from aioquant import const
+from aioquant.utils import logger
+from aioquant.tasks import SingleTask
+from aioquant.configure import config
+from aioquant.latency import latency_collector
+
+__all__ = ("Orderbook", "Trade", "Kline", "MarketSubscribe", "market_center", )
+
+
+class Orderbook:
+    """Orderbook object.
+
+    Args:
+        platform: Exchange platform name, e.g. `binance` / `bitmex`.
+        symbol: Trade pair name, e.g. `ETH/BTC`.
+        asks: Asks list, e.g. `[[price, quantity], [...], ...]`
+        bids: Bids list, e.g. `[[price, quantity], [...], ...]`
+        timestamp: Update time, millisecond.
+
+    NOTE:
+        Derived metrics, e.g. `mid_price` / `spread` / `microprice` / `imbalance` / `depth_price` and the metrics
+        registered by `register_metric`, are computed on the first access and cached on the object, the same object is
+        shared by all subscribers, so every metric is computed at most once per update. Do not modify asks or bids
+        after the object is published. Metrics are None if any side of the orderbook is empty.
+    """
+
+    METRICS = {}  # Registered metrics. `{name: func(orderbook)}`
+
+    def __init__(self, platform=None, symbol=None, asks=None, bids=None, timestamp=None):
+        """Initialize."""
+        self.platform = platform
+        self.symbol = symbol
+        self.asks = asks
+        self.bids = bids
+        self.timestamp = timestamp
+        self.trace = None  # Latency trace, `MarketTrace`, None if tracing is disabled.
+        self._cache = {}  # Computed metrics. `{key: value}`
+
+    @classmethod
+    def register_metric(cls, name, func):
+        """Register a derived metric, it can be read by `orderbook.metric(name)`.
+
+        Args:
+            name: Metric name.
+            func: Function to compute the metric, e.g. `lambda orderbook: orderbook.ask_array[:5, 1].sum()`.
+        """
+        cls.METRICS[name] = func
+
+    def metric(self, name):
+        """Value of a registered metric."""
+        if name not in self._cache:
+            self._cache[name] = self.METRICS[name](self)
+        return self._cache[name]
+
+    @property
+    def ask_array(self):
+        """Asks as a `numpy.ndarray` of float64, shape is `[levels, 2]`, columns are price and quantity."""
+        if "ask_array" not in self._cache:
+            self._cache["ask_array"] = _levels_array(self.asks)
+        return self._cache["ask_array"]
+
+    @property
+    def bid_array(self):
+        """Bids as a `numpy.ndarray` of float64, shape is `[levels, 2]`, columns are price and quantity."""
+        if "bid_array" not in self._cache:
+            self._cache["bid_array"] = _levels_array(self.bids)
+        return self._cache["bid_array"]
+
+    @property
+    def best(self):
+        """Best levels in float, `(bid price, bid quantity, ask price, ask quantity)`, None if any side is empty."""
+        if "best" not in self._cache:
+            if self.asks and self.bids:
+                self._cache["best"] = (float(self.bids[0][0]), float(self.bids[0][1]), float(self.asks[0][0]),
+                                       float(self.asks[0][1]))
+            else:
+                self._cache["best"] = None
+        return self._cache["best"]
+
+    @property
+    def mid_price(self):
+        """Average of the best bid and ask price."""
+        if "mid_price" not in self._cache:
+            best = self.best
+            self._cache["mid_price"] = (best[0] + best[2]) / 2 if best else None
+        return self._cache["mid_price"]
+
+    @property
+    def spread(self):
+        """Best ask price minus best bid price."""
+        if "spread" not in self._cache:
+            best = self.best
+            self._cache["spread"] = best[2] - best[0] if best else None
+        return self._cache["spread"]
+
+    @property
+    def microprice(self):
+        """Best prices weighted by the quantity of the opposite side, moves toward the side with less quantity."""
+        if "microprice" not in self._cache:
+            best = self.best
+            if best and best[1] + best[3] > 0:
+                self._cache["microprice"] = (best[0] * best[3] + best[2] * best[1]) / (best[1] + best[3])
+            else:
+                self._cache["microprice"] = self.mid_price
+        return self._cache["microprice"]
+
+    @property
+    def imbalance(self):
+        """Best level quantity imbalance, `(bid quantity - ask quantity) / (bid quantity + ask quantity)`."""
+        if "imbalance" not in self._cache:
+            best = self.best
+            if best:
+                total = best[1] + best[3]
+                self._cache["imbalance"] = (best[1] - best[3]) / total if total > 0 else 0.0
+            else:
+                self._cache["imbalance"] = None
+        return self._cache["imbalance"]
+
+    def depth_imbalance(self, levels=5):
+        """Quantity imbalance of the top levels, `(bid quantity - ask quantity) / (bid quantity + ask quantity)`, in
+        range [-1, 1]."""
+        key = ("depth_imbalance", levels)
+        if key not in self._cache:
+            if self.asks and self.bids:
+                bid_quantity = self.bid_array[:levels, 1].sum()
+                ask_quantity = self.ask_array[:levels, 1].sum()
+                total = bid_quantity + ask_quantity
+                self._cache[key] = float((bid_quantity - ask_quantity) / total) if total > 0 else 0.0
+            else:
+                self._cache[key] = None
+        return self._cache[key]
+
+    def depth_price(self, levels=5):
+        """Quantity weighted average prices of the top levels.
+
+        Returns:
+            (bid price, ask price)
+        """
+        key = ("depth_price", levels)
+        if key not in self._cache:
+            if self.asks and self.bids:
+                prices = []
+                for array in (self.bid_array[:levels], self.ask_array[:levels]):
+                    quantity = array[:, 1].sum()
+                    prices.append(float(array[:, 0] @ array[:, 1] / quantity) if quantity > 0 else
+                                  float(array[0, 0]))
+                self._cache[key] = tuple(prices)
+            else:
+                self._cache[key] = None
+        return self._cache[key]
+
+    @property
+    def data(self):
+        d = {
+            "platform": self.platform,
+            "symbol": self.symbol,
+            "asks": self.asks,
+            "bids": self.bids,
+            "timestamp": self.timestamp
+        }
+        return d
+
+    def __str__(self):
+        info = json.dumps(self.data)
+        return info
+
+    def __repr__(self):
+        return str(self)
+
+
+def _levels_array(levels):
+    import numpy as np
+    if not levels:
+        return np.empty((0, 2))
+    # Consolidated levels are `[price, quantity, platform]`, only price and quantity are converted.
+    return np.array([level[:2] for level in levels], dtype="float64")
+
+
+class Trade:
+    """Trade object.
+
+    Args:
+        platform: Exchange platform name, e.g. `binance` / `bitmex`.
+        symbol: Trade pair name, e.g. `ETH/BTC`.
+        action: Trade action, `BUY` / `SELL`.
+        price: Order place price.
+        quantity: Order place quantity.
+        timestamp: Update time, millisecond.
+    """
+
+    def __init__(self, platform=None, symbol=None, action=None, price=None, quantity=None, timestamp=None):
+        """Initialize."""
+        self.platform = platform
+        self.symbol = symbol
+        self.action = action
+        self.price = price
+        self.quantity = quantity
+        self.timestamp = timestamp
+        self.trace = None  # Latency trace, `MarketTrace`, None if tracing is disabled.
+
+    @property
+    def data(self):
+        d = {
+            "platform": self.platform,
+            "symbol": self.symbol,
+            "action": self.action,
+            "price": self.price,
+            "quantity": self.quantity,
+            "timestamp": self.timestamp
+        }
+        return d
+
+    def __str__(self):
+        info = json.dumps(self.data)
+        return info
+
+    def __repr__(self):
+        return str(self)
+
+
+class Kline:
+    """Kline object.
+
+    Args:
+        platform: Exchange platform name, e.g. `binance` / `bitmex`.
+        symbol: Trade pair name, e.g. `ETH/BTC`.
+        open: Open price.
+        high: Highest price.
+        low: Lowest price.
+        close: Close price.
+        volume: Total trade volume.
+        timestamp: Update time, millisecond.
+        kline_type: Kline type name, `kline`, `kline_5m`, `kline_15m` ... and so on.
+    """
+
+    def __init__(self, platform=None, symbol=None, open=None, high=None, low=None, close=None, volume=None,
+                 timestamp=None, kline_type=const.MARKET_TYPE_KLINE):
+        """Initialize."""
+        self.platform = platform
+        self.symbol = symbol
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.timestamp = timestamp
+        self.kline_type = kline_type
+        self.trace = None  # Latency trace, `MarketTrace`, None if tracing is disabled.
+
+    @property
+    def data(self):
+        d = {
+            "platform": self.platform,
+            "symbol": self.symbol,
+            "open": self.open,
+            "high": self.high,
+            "low": self.low,
+            "close": self.close,
+            "volume": self.volume,
+            "timestamp": self.timestamp,
+            "kline_type": self.kline_type
+        }
+        return d
+
+    def __str__(self):
+        info = json.dumps(self.data)
+        return info
+
+    def __repr__(self):
+        return str(self)
+
+
+class MarketCenter:
+    """Market data center, dispatch market data in process to all the callback functions that subscribed the same
+    market type, platform and symbol.
+
+    NOTE:
+        The live market feed of a platform and symbol is created on the first subscription, the channels of all the
+        feeds of a platform are multiplexed into a few Websocket connections by the stream pool of the platform, see
+        `aioquant.stream.StreamPool`. In backtest mode, market data is published by the backtest replay instead.
+    """
+
+    def __init__(self):
+        self._callbacks = {}  # Subscribers. `{(market_type, platform, symbol): [callback, ...]}`
+        self._feeds = {}  # Live market feeds. `{(platform, symbol): feed}`
+        self._provided = set()  # Market data produced in process. `{(market_type, platform, symbol)}`
+
+    def subscribe(self, market_type, platform, symbol, callback):
+        """Subscribe market data.
+
+        Args:
+            market_type: Market data type, e.g. `orderbook` / `trade` / `kline`.
+            platform: Exchange platform name, e.g. `binance` / `okex` / `huobi`.
+            symbol: Trade pair name, e.g. `ETH/BTC`.
+            callback: Asynchronous callback function, e.g. `async def on_event_orderbook_update(orderbook): pass`.
+        """
+        key = (market_type, platform, symbol)
+        if key not in self._callbacks:
+            self._callbacks[key] = []
+            if not config.backtest and key not in self._provided:
+                self._subscribe_feed(market_type, platform, symbol)
+        self._callbacks[key].append(callback)
+
+    def provide(self, market_type, platform, symbol):
+        """Declare a market data is produced in process, e.g. aggregated klines, so the subscriptions will not create
+        a live market feed for it.
+
+        Args:
+            market_type: Market data type, e.g. `kline_5m`.
+            platform: Exchange platform name, e.g. `binance` / `okex` / `huobi`.
+            symbol: Trade pair name, e.g. `ETH/BTC`.
+
+        NOTE:
+            It must be called before the market data subscribed, the live market feed opened by an earlier
+            subscription is not closed, and the market data will be published by both.
+        """
+        key = (market_type, platform, symbol)
+        if key in self._provided:
+            return
+        self._provided.add(key)
+        if key in self._callbacks and (platform, symbol) in self._feeds:
+            logger.warn("market data provided after subscribed, the live feed is still open. market_type:",
+                        market_type, "platform:", platform, "symbol:", symbol, caller=self)
+
+    def subscribed(self, market_type, platform, symbol):
+        """If there is any subscriber of the market data."""
+        return bool(self._callbacks.get((market_type, platform, symbol)))
+
+    def publish(self, market_type, data):
+        """Publish market data to all subscribers.
+
+        Args:
+            market_type: Market data type, e.g. `orderbook` / `trade` / `kline`.
+            data: Market data object, `Orderbook` / `Trade` / `Kline`.
+        """
+        callbacks = self._callbacks.get((market_type, data.platform, data.symbol))
+        if not callbacks:
+            return
+        if latency_collector.enabled:
+            latency_collector.dispatch(data)
+        for callback in callbacks:
+            SingleTask.run(callback, data)
+
+    def _subscribe_feed(self, market_type, platform, symbol):
+        feed = self._feeds.get((platform, symbol))
+        if not feed:
+            if platform == const.BINANCE:
+                from aioquant.platform.binance import BinanceMarket as M
+            elif platform == const.HUOBI:
+                from aioquant.platform.huobi import HuobiMarket as M
+            elif platform == const.OKEX:
+                from aioquant.platform.okex import OKExMarket as M
+            else:
+                logger.error("platform error:", platform, caller=self)
+                return
+            feed = M(symbol)
+            self._feeds[(platform, symbol)] = feed
+        feed.subscribe(market_type)
+
+
+market_center = MarketCenter()
+
+
+class MarketSubscribe:
+    """Subscribe market data.
+
+    Args:
+        market_type: Market data type, e.g. `orderbook` / `trade` / `kline`.
+        platform: Exchange platform name, e.g. `binance` / `okex` / `huobi`.
+        symbol: Trade pair name, e.g. `ETH/BTC`.
+        callback: Asynchronous callback function for market data update, e.g.
+            `async def on_event_orderbook_update(orderbook: Orderbook): pass`.
+    """
+
+    def __init__(self, market_type, platform, symbol, callback):
+        """Initialize."""
+        market_center.subscribe(market_type, platform, symbol, callback)
@@ -29,6 +29,18 @@ ORDER_STATUS_FILLED = "FILLED"  # The order that filled fully.
 ORDER_STATUS_CANCELED = "CANCELED"  # The order that canceled.
 ORDER_STATUS_FAILED = "FAILED"  # The order that failed.
 
+# Order status state machine, the status that every status can be changed to.
+# NONE -> SUBMITTED -> PARTIAL-FILLED -> FILLED / CANCELED / FAILED
+ORDER_STATUS_FINAL = (ORDER_STATUS_FILLED, ORDER_STATUS_CANCELED, ORDER_STATUS_FAILED)
+ORDER_STATUS_TRANSITIONS = {
+    ORDER_STATUS_NONE: (ORDER_STATUS_SUBMITTED, ORDER_STATUS_PARTIAL_FILLED) + ORDER_STATUS_FINAL,
+    ORDER_STATUS_SUBMITTED: (ORDER_STATUS_PARTIAL_FILLED, ) + ORDER_STATUS_FINAL,
+    ORDER_STATUS_PARTIAL_FILLED: (ORDER_STATUS_PARTIAL_FILLED, ) + ORDER_STATUS_FINAL,
+    ORDER_STATUS_FILLED: (),
+    ORDER_STATUS_CANCELED: (),
+    ORDER_STATUS_FAILED: ()
+}
+
 # Future order trade type.
 TRADE_TYPE_NONE = 0  # Unknown type, some Exchange's order information couldn't known the type of trade.
 TRADE_TYPE_BUY_OPEN = 1  # Buy open, action = BUY & quantity > 0.
@@ -80,6 +92,41 @@ class Order:
         self.fee = fee
         self.ctime = ctime if ctime else tools.get_cur_timestamp_ms()
         self.utime = utime if utime else tools.get_cur_timestamp_ms()
+        self.trace = None  # Latency trace of the order created by Trade, `OrderTrace`.
+
+    @property
+    def is_final(self):
+        """If the order is in a final status, FILLED / CANCELED / FAILED."""
+        return self.status in ORDER_STATUS_FINAL
+
+    def update(self, status, remain=None, avg_price=None, fee=None, utime=None):
+        """Update order by the order state machine, stale or out of order updates will be dropped.
+
+        Args:
+            status: New order status.
+            remain: Remain quantity that not filled.
+            avg_price: Average price that filled.
+            fee: Trading fee.
+            utime: Order update time, millisecond.
+
+        Returns:
+            True if the order has been changed, otherwise False.
+        """
+        if status != self.status and status not in ORDER_STATUS_TRANSITIONS[self.status]:
+            return False
+        if status == self.status:
+            # Only a partial filled order can be updated in the same status, and the remain must decrease.
+            if status != ORDER_STATUS_PARTIAL_FILLED or remain is None or float(remain) >= float(self.remain):
+                return False
+        self.status = status
+        if remain is not None:
+            self.remain = remain
+        if avg_price is not None:
+            self.avg_price = avg_price
+        if fee is not None:
+            self.fee = fee
+        self.utime = utime if utime else tools.get_cur_timestamp_ms()
+        return True
 
     @property
     def data(self):
@@ -110,3 +157,47 @@ class Order:
 
     def __repr__(self):
         return str(self)
+
+
+class FillTracker:
+    """Track the filled state of open orders, to get the new fill of every order update.
+
+    NOTE:
+        An order update carries the cumulative filled quantity, average price and fee, so the new fill is the
+        difference from the last update of the order, and its average price is the difference of the cumulative filled
+        value divided by the difference of the filled quantity. The order is forgotten after it's final.
+    """
+
+    def __init__(self):
+        self._orders = {}  # Filled state of open orders. `{(platform, order_id): [filled, value, fee]}`
+
+    def skip(self, order):
+        """Skip the fills of an order so far, e.g. they are included in a snapshot already."""
+        filled = abs(float(order.quantity)) - abs(float(order.remain))
+        self._orders[(order.platform, order.order_id)] = [filled, filled * float(order.avg_price or 0),
+                                                          float(order.fee or 0)]
+
+    def delta(self, order):
+        """Get the new fill of an order update.
+
+        Args:
+            order: Order object.
+
+        Returns:
+            fill: `(quantity, price, fee)` of the new fill, None if nothing filled since the last update.
+        """
+        key = (order.platform, order.order_id)
+        state = self._orders.get(key)
+        if not state:
+            state = self._orders[key] = [0, 0, 0]
+        filled = abs(float(order.quantity)) - abs(float(order.remain))
+        fill = None
+        if filled > state[0]:
+            value = filled * float(order.avg_price or 0)
+            fee = float(order.fee or 0)
+            quantity = filled - state[0]
+            fill = (quantity, (value - state[1]) / quantity, fee - state[2])
+            state[0], state[1], state[2] = filled, value, fee
+        if order.is_final:
+            del self._orders[key]
+        return fill
@@ -9,14 +9,39 @@ Date:   2018/08/09
 Email:  huangtao@ifclover.com
 """
 
+import copy
+import json
+import asyncio
 import hashlib
 import hmac
 from urllib.parse import urljoin
 
+from aioquant.error import Error
 from aioquant.utils import tools
-from aioquant.utils.web import AsyncHttpRequests
+from aioquant.utils import logger
+from aioquant.order import Order
+from aioquant import const
+from aioquant.const import BINANCE
+from aioquant.market import Orderbook, Trade, Kline, market_center
+from aioquant.history import KlineDownloader
+from aioquant.polling import PollingMarket
+from aioquant.stream import StreamPool
+from aioquant.depth import DepthBook
+from aioquant.asset import AssetTracker
+from aioquant.reconcile import OrderReconciler
+from aioquant.configure import config
+from aioquant.latency import latency_collector
+from aioquant.tasks import SingleTask, LoopRunTask
+from aioquant.utils.ratelimit import RateLimiter
+from aioquant.utils.decorator import async_method_locker
+from aioquant.utils.web import Websocket, AsyncHttpRequests
+from aioquant.order import ORDER_ACTION_BUY, ORDER_ACTION_SELL
+from aioquant.order import ORDER_TYPE_LIMIT, ORDER_TYPE_MARKET
+from aioquant.order import ORDER_STATUS_SUBMITTED, ORDER_STATUS_PARTIAL_FILLED, ORDER_STATUS_FILLED, \
+    ORDER_STATUS_CANCELED, ORDER_STATUS_FAILED
 
-__all__ = ("BinanceRestAPI", )
+__all__ = ("BinanceRestAPI", "BinanceTrade", "BinanceKlineDownloader", "BinancePollingMarket", "BinanceStreamPool",
+           "BinanceMarket", "BinanceAssetTracker", "BinanceOrderReconciler", )
 
 
 class BinanceRestAPI:
@@ -26,13 +51,16 @@ class BinanceRestAPI:
         access_key: Account's ACCESS KEY.
         secret_key: Account's SECRET KEY.
         host: HTTP request host, default `https://api.binance.com`.
+        order_rate: Maximum order requests (create / revoke) per second, default is 10. The limiter is shared by all
+            the REST API clients of the same ACCESS KEY.
     """
 
-    def __init__(self, access_key, secret_key, host=None):
+    def __init__(self, access_key, secret_key, host=None, order_rate=10):
         """Initialize REST API client."""
         self._host = host or "https://api.binance.com"
         self._access_key = access_key
         self._secret_key = secret_key
+        self._order_limiter = RateLimiter.instance((BINANCE, access_key), order_rate)
 
     async def ping(self):
         """Test connectivity.
@@ -193,7 +221,38 @@ class BinanceRestAPI:
         }
         if client_order_id:
             data["newClientOrderId"] = client_order_id
-        success, error = await self.request("POST", uri, body=data, auth=True)
+        await self._order_limiter.acquire()
+        token = latency_collector.begin_request()
+        try:
+            success, error = await self.request("POST", uri, body=data, auth=True)
+        finally:
+            latency_collector.end_request(token)
+        return success, error
+
+    async def batch_create_orders(self, symbol, orders):
+        """Create multiple orders. Binance has no batch order endpoint, so every order is sent concurrently under the
+            order rate limit.
+
+        Args:
+            symbol: Symbol name, e.g. `BTCUSDT`.
+            orders: Order list, e.g. `[{"action": "BUY", "price": "1.1", "quantity": "2", "client_order_id": "abc"}]`,
+                `client_order_id` is optional and will be generated if not given.
+
+        Returns:
+            success: Created orders, `{client_order_id: order_id, ... }`.
+            error: Failed orders, `[(client_order_id, error), ... ]`.
+        """
+        for order in orders:
+            if not order.get("client_order_id"):
+                order["client_order_id"] = tools.get_uuid1().replace("-", "")
+        results = await asyncio.gather(*[self.create_order(o["action"], symbol, o["price"], o["quantity"],
+                                                           o["client_order_id"]) for o in orders])
+        success, error = {}, []
+        for order, (result, e) in zip(orders, results):
+            if e:
+                error.append((order["client_order_id"], e))
+            else:
+                success[order["client_order_id"]] = str(result["orderId"])
         return success, error
 
     async def revoke_order(self, symbol, order_id, client_order_id=None):
@@ -215,9 +274,31 @@ class BinanceRestAPI:
         }
         if client_order_id:
             params["origClientOrderId"] = client_order_id
+        await self._order_limiter.acquire()
         success, error = await self.request("DELETE", uri, params=params, auth=True)
         return success, error
 
+    async def batch_revoke_orders(self, symbol, order_ids):
+        """Cancelling multiple unfilled orders. Binance has no batch cancel endpoint, so every order is cancelled
+            concurrently under the order rate limit.
+
+        Args:
+            symbol: Symbol name, e.g. `BTCUSDT`.
+            order_ids: Order id list.
+
+        Returns:
+            success: Cancelled order id list.
+            error: Failed orders, `[(order_id, error), ... ]`.
+        """
+        results = await asyncio.gather(*[self.revoke_order(symbol, order_id) for order_id in order_ids])
+        success, error = [], []
+        for order_id, (_, e) in zip(order_ids, results):
+            if e:
+                error.append((order_id, e))
+            else:
+                success.append(order_id)
+        return success, error
+
     async def get_order_status(self, symbol, order_id, client_order_id):
         """Get order details by order id.
 
@@ -233,10 +314,12 @@ class BinanceRestAPI:
         uri = "/api/v3/order"
         params = {
             "symbol": symbol,
-            "orderId": str(order_id),
-            "origClientOrderId": client_order_id,
             "timestamp": tools.get_cur_timestamp_ms()
         }
+        if order_id:
+            params["orderId"] = str(order_id)
+        if client_order_id:
+            params["origClientOrderId"] = client_order_id
         success, error = await self.request("GET", uri, params=params, auth=True)
         return success, error
 
@@ -356,3 +439,642 @@ class BinanceRestAPI:
         headers["X-MBX-APIKEY"] = self._access_key
         _, success, error = await AsyncHttpRequests.fetch(method, url, headers=headers, timeout=10, verify_ssl=False)
         return success, error
+
+
+class BinanceTrade:
+    """Binance Trade module. You can initialize trade object with some attributes in kwargs.
+
+    Attributes:
+        account: Account name for this trade exchange.
+        strategy: What's name would you want to created for your strategy.
+        symbol: Symbol name for your trade.
+        host: HTTP request host. (default "https://api.binance.com")
+        wss: Websocket address. (default "wss://stream.binance.com:9443")
+        access_key: Account's ACCESS KEY.
+        secret_key Account's SECRET KEY.
+        order_update_callback: You can use this param to specify a async callback function when you initializing Trade
+            object. `order_update_callback` is like `async def on_order_update_callback(order: Order): pass` and this
+            callback function will be executed asynchronous when some order state updated.
+        init_success_callback: You can use this param to specify a async callback function when you initializing Trade
+            object. `init_success_callback` is like `async def on_init_success_callback(success: bool, error: Error):
+            pass` and this callback function will be executed asynchronous after Trade module object initialized done.
+
+    Notes:
+        Order updates are pushed by Binance user data stream, so the local order state machine is driven by Websocket
+        messages, we never poll `get_order_status` per order. The listen key will be expired after 60 minutes, so we
+        keepalive it every 30 minutes.
+    """
+
+    def __init__(self, **kwargs):
+        """Initialize Trade module."""
+        e = None
+        if not kwargs.get("account"):
+            e = Error("param account miss")
+        if not kwargs.get("strategy"):
+            e = Error("param strategy miss")
+        if not kwargs.get("symbol"):
+            e = Error("param symbol miss")
+        if not kwargs.get("host"):
+            kwargs["host"] = "https://api.binance.com"
+        if not kwargs.get("wss"):
+            kwargs["wss"] = "wss://stream.binance.com:9443"
+        if not kwargs.get("access_key"):
+            e = Error("param access_key miss")
+        if not kwargs.get("secret_key"):
+            e = Error("param secret_key miss")
+        if e:
+            logger.error(e, caller=self)
+            SingleTask.run(kwargs["init_success_callback"], False, e)
+            return
+
+        self._account = kwargs["account"]
+        self._strategy = kwargs["strategy"]
+        self._platform = BINANCE
+        self._symbol = kwargs["symbol"]
+        self._host = kwargs["host"]
+        self._wss = kwargs["wss"]
+        self._access_key = kwargs["access_key"]
+        self._secret_key = kwargs["secret_key"]
+        self._order_update_callback = kwargs["order_update_callback"]
+        self._init_success_callback = kwargs["init_success_callback"]
+
+        self._raw_symbol = self._symbol.replace("/", "")  # Row symbol name, same as Binance Exchange.
+
+        self._listen_key = None  # User data stream listen key.
+        self._orders = kwargs.get("orders") or {}  # Order data. e.g. {order_id: order, ... }
+        # Orders created but not acknowledged yet. e.g. {client_order_id: order, ... }
+        self._pending_orders = kwargs.get("pending_orders") or {}
+        # If the orders are restored from the order journal, they're reconciled by Trade, so the open orders are not
+        # pulled back after the first connection.
+        self._restored = kwargs.get("orders") is not None
+        self._ws = None  # User data stream Websocket connection.
+
+        # Initialize our REST API client.
+        self._rest_api = BinanceRestAPI(self._access_key, self._secret_key, self._host)
+
+        # Create a loop run task to reset listen key every 30 minutes.
+        LoopRunTask.register(self._reset_listen_key, 60 * 30)
+
+        # Create a coroutine to initialize Websocket connection.
+        SingleTask.run(self._init_websocket)
+
+    @property
+    def orders(self):
+        return self._orders
+
+    @property
+    def pending_orders(self):
+        return self._pending_orders
+
+    @property
+    def raw_symbol(self):
+        return self._raw_symbol
+
+    @property
+    def rest_api(self):
+        return self._rest_api
+
+    async def _init_websocket(self):
+        """Initialize Websocket connection."""
+        # Get listen key first.
+        success, error = await self._rest_api.get_listen_key()
+        if error:
+            e = Error("get listen key failed: {}".format(error))
+            logger.error(e, caller=self)
+            SingleTask.run(self._init_success_callback, False, e)
+            return
+        self._listen_key = success["listenKey"]
+        uri = "/ws/" + self._listen_key
+        url = urljoin(self._wss, uri)
+        self._ws = Websocket(url, self.connected_callback, process_callback=self.process)
+        self._ws.initialize()
+
+    async def _reset_listen_key(self, *args, **kwargs):
+        """Reset listen key."""
+        if not self._listen_key:
+            logger.error("listen key not initialized!", caller=self)
+            return
+        _, error = await self._rest_api.put_listen_key(self._listen_key)
+        if error:
+            logger.error("reset listen key failed:", error, caller=self)
+            return
+        logger.info("reset listen key success!", caller=self)
+
+    async def connected_callback(self):
+        """After websocket connection created successfully, pull back all open order information."""
+        logger.info("Websocket connection authorized successfully.", caller=self)
+        if self._restored:
+            self._restored = False
+            SingleTask.run(self._init_success_callback, True, None)
+            return
+        order_infos, error = await self._rest_api.get_open_orders(self._raw_symbol)
+        if error:
+            e = Error("get open orders error: {}".format(error))
+            SingleTask.run(self._init_success_callback, False, e)
+            return
+        for order_info in order_infos:
+            self.update_order(order_info["orderId"], order_info["clientOrderId"], order_info["side"],
+                              order_info["type"], order_info["price"], order_info["origQty"],
+                              order_info["executedQty"], order_info["cummulativeQuoteQty"], None,
+                              order_info["status"], order_info["time"], order_info["updateTime"])
+        SingleTask.run(self._init_success_callback, True, None)
+
+    async def create_order(self, action, price, quantity, *args, **kwargs):
+        """Create an order.
+
+        Args:
+            action: Trade direction, `BUY` or `SELL`.
+            price: Price of each order.
+            quantity: The buying or selling quantity.
+            kwargs:
+                order_type: Order type, only `LIMIT` supported.
+                client_order_id: Client order id, default is generated automatically.
+
+        Returns:
+            order_id: Order id if created successfully, otherwise it's None.
+            error: Error information, otherwise it's None.
+        """
+        order_type = kwargs.get("order_type", ORDER_TYPE_LIMIT)
+        if order_type != ORDER_TYPE_LIMIT:
+            return None, Error("order type error! only LIMIT order supported.")
+        client_order_id = kwargs.get("client_order_id") or tools.get_uuid1().replace("-", "")
+        price = tools.float_to_str(price)
+        quantity = tools.float_to_str(quantity)
+
+        # Track the order locally before sending, the user data stream may push it back before REST response.
+        info = {
+            "platform": self._platform,
+            "account": self._account,
+            "strategy": self._strategy,
+            "client_order_id": client_order_id,
+            "action": action,
+            "order_type": order_type,
+            "symbol": self._symbol,
+            "price": price,
+            "quantity": quantity
+        }
+        self._pending_orders[client_order_id] = Order(**info)
+
+        result, error = await self._rest_api.create_order(action, self._raw_symbol, price, quantity, client_order_id)
+        if error:
+            order = self._pending_orders.pop(client_order_id, None)
+            if order and order.update(ORDER_STATUS_FAILED):
+                SingleTask.run(self._order_update_callback, copy.copy(order))
+            return None, error
+        order_id = str(result["orderId"])
+        # The order may be finished by the Websocket before REST response, then it's not tracked any more.
+        if client_order_id in self._pending_orders or order_id in self._orders:
+            self.update_order(order_id, client_order_id, action, order_type, price, quantity, result["executedQty"],
+                              result["cummulativeQuoteQty"], None, result["status"], result["transactTime"],
+                              result["transactTime"])
+        return order_id, None
+
+    async def revoke_order(self, *order_ids):
+        """Revoke (an) order(s).
+
+        Args:
+            order_ids: Order id list, you can set this param to 0 or multiple items. If you set 0 param, you can cancel
+                all orders for this symbol(initialized in Trade object). If you set 1 param, you can cancel an order.
+                If you set multiple param, you can cancel multiple orders. Do not set param length more than 100.
+
+        Returns:
+            Success or error, see bellow.
+        """
+        # If len(order_ids) == 0, you will cancel all orders for this symbol(initialized in Trade object).
+        if len(order_ids) == 0:
+            order_infos, error = await self._rest_api.get_open_orders(self._raw_symbol)
+            if error:
+                return False, error
+            order_ids = [order_info["orderId"] for order_info in order_infos]
+            _, errors = await self._rest_api.batch_revoke_orders(self._raw_symbol, order_ids)
+            if errors:
+                return False, errors
+            return True, None
+
+        # If len(order_ids) == 1, you will cancel an order.
+        if len(order_ids) == 1:
+            success, error = await self._rest_api.revoke_order(self._raw_symbol, order_ids[0])
+            if error:
+                return order_ids[0], error
+            else:
+                return order_ids[0], None
+
+        # If len(order_ids) > 1, you will cancel multiple orders.
+        if len(order_ids) > 1:
+            success, error = await self._rest_api.batch_revoke_orders(self._raw_symbol, list(order_ids))
+            return success, error
+
+    async def get_open_order_ids(self):
+        """Get open order id list.
+        """
+        success, error = await self._rest_api.get_open_orders(self._raw_symbol)
+        if error:
+            return None, error
+        else:
+            order_ids = []
+            for order_info in success:
+                order_id = str(order_info["orderId"])
+                order_ids.append(order_id)
+            return order_ids, None
+
+    @async_method_locker("BinanceTrade.process.locker")
+    async def process(self, msg):
+        """Process message that received from Websocket connection.
+
+        Args:
+            msg: message received from Websocket connection.
+        """
+        logger.debug("msg:", msg, caller=self)
+        e = msg.get("e")
+        if e == "executionReport":  # Order update.
+            if msg["s"] != self._raw_symbol:
+                return
+            # A canceled order report carries the canceled client order id in `C`.
+            client_order_id = msg["C"] or msg["c"]
+            self.update_order(msg["i"], client_order_id, msg["S"], msg["o"], msg["p"], msg["q"], msg["z"], msg["Z"],
+                              msg["n"], msg["X"], msg["O"], msg["T"])
+
+    def update_order(self, order_id, client_order_id, action, order_type, price, quantity, filled_qty, filled_quote,
+                     fee, state, ctime, utime):
+        """Update order object by the local order state machine.
+
+        Args:
+            order_id: Order id.
+            client_order_id: Client order id.
+            action: Trade direction, `BUY` or `SELL`.
+            order_type: Binance order type, `LIMIT` / `MARKET` ...
+            price: Order price.
+            quantity: Order quantity.
+            filled_qty: Cumulative filled quantity.
+            filled_quote: Cumulative filled quote quantity.
+            fee: Trading fee of last filled, maybe None.
+            state: Binance order status.
+            ctime: Order create time, millisecond.
+            utime: Order update time, millisecond.
+        """
+        order_id = str(order_id)
+        if state == "NEW":
+            status = ORDER_STATUS_SUBMITTED
+        elif state == "PARTIALLY_FILLED":
+            status = ORDER_STATUS_PARTIAL_FILLED
+        elif state == "FILLED":
+            status = ORDER_STATUS_FILLED
+        elif state == "CANCELED":
+            status = ORDER_STATUS_CANCELED
+        elif state in ("REJECTED", "EXPIRED"):
+            status = ORDER_STATUS_FAILED
+        else:
+            logger.warn("unknown status:", state, "order_id:", order_id, caller=self)
+            return
+
+        order = self._orders.get(order_id)
+        if not order:
+            order = self._pending_orders.pop(client_order_id, None)
+            if not order:
+                info = {
+                    "platform": self._platform,
+                    "account": self._account,
+                    "strategy": self._strategy,
+                    "client_order_id": client_order_id,
+                    "action": ORDER_ACTION_BUY if action == "BUY" else ORDER_ACTION_SELL,
+                    "order_type": ORDER_TYPE_MARKET if order_type == "MARKET" else ORDER_TYPE_LIMIT,
+                    "symbol": self._symbol,
+                    "price": price,
+                    "quantity": quantity,
+                    "ctime": ctime
+                }
+                order = Order(**info)
+            order.order_id = order_id
+            self._orders[order_id] = order
+
+        filled_qty = float(filled_qty)
+        avg_price = float(filled_quote) / filled_qty if filled_qty > 0 else 0
+        fee = float(order.fee) + float(fee) if fee else None
+        if order.update(status, float(quantity) - filled_qty, avg_price, fee, utime):
+            SingleTask.run(self._order_update_callback, copy.copy(order))
+        if order.is_final:
+            self._orders.pop(order_id, None)
+
+
+class BinanceKlineDownloader(KlineDownloader):
+    """Binance historical kline downloader.
+
+    Attributes:
+        symbol: Symbol name, e.g. `ETH/BTC`.
+        host: HTTP request host, default `https://api.binance.com`.
+        kwargs: Same as `KlineDownloader`.
+    """
+
+    PLATFORM = BINANCE
+    PAGE_LIMIT = 1000
+    RATE = 10
+    INTERVALS = {
+        const.MARKET_TYPE_KLINE: "1m",
+        const.MARKET_TYPE_KLINE_3M: "3m",
+        const.MARKET_TYPE_KLINE_5M: "5m",
+        const.MARKET_TYPE_KLINE_15M: "15m",
+        const.MARKET_TYPE_KLINE_30M: "30m",
+        const.MARKET_TYPE_KLINE_1H: "1h",
+        const.MARKET_TYPE_KLINE_6H: "6h",
+        const.MARKET_TYPE_KLINE_12H: "12h",
+        const.MARKET_TYPE_KLINE_1D: "1d",
+        const.MARKET_TYPE_KLINE_3D: "3d",
+        const.MARKET_TYPE_KLINE_1W: "1w"
+    }
+
+    def __init__(self, symbol, host=None, **kwargs):
+        """Initialize."""
+        super(BinanceKlineDownloader, self).__init__(symbol, **kwargs)
+        self._raw_symbol = symbol.replace("/", "")
+        self._rest_api = BinanceRestAPI("", "", host)
+
+    async def fetch_page(self, start, end):
+        interval = self.INTERVALS[self._kline_type]
+        result, error = await self._rest_api.get_kline(self._raw_symbol, interval, start, end - 1, self.PAGE_LIMIT)
+        if error:
+            return None, error
+        klines = []
+        for item in result:
+            info = {
+                "platform": self.PLATFORM,
+                "symbol": self._symbol,
+                "open": item[1],
+                "high": item[2],
+                "low": item[3],
+                "close": item[4],
+                "volume": item[5],
+                "timestamp": item[0],
+                "kline_type": self._kline_type
+            }
+            klines.append(Kline(**info))
+        return klines, None
+
+
+class BinancePollingMarket(PollingMarket):
+    """Binance REST polling market data feed.
+
+    Attributes:
+        host: HTTP request host, default `https://api.binance.com`.
+        kwargs: Same as `PollingMarket`.
+    """
+
+    PLATFORM = BINANCE
+    RATE = 20  # 1200 request weight per minute.
+    WEIGHTS = {
+        const.MARKET_TYPE_ORDERBOOK: 1,
+        const.MARKET_TYPE_TRADE: 1
+    }
+
+    def __init__(self, host=None, **kwargs):
+        """Initialize."""
+        super(BinancePollingMarket, self).__init__(**kwargs)
+        self._rest_api = BinanceRestAPI("", "", host)
+
+    async def fetch_orderbook(self, symbol):
+        result, error = await self._rest_api.get_orderbook(symbol.replace("/", ""), self._orderbook_length)
+        if error:
+            return None, error
+        info = {
+            "platform": self.PLATFORM,
+            "symbol": symbol,
+            "asks": result["asks"][:self._orderbook_length],
+            "bids": result["bids"][:self._orderbook_length],
+            "timestamp": tools.get_cur_timestamp_ms()
+        }
+        return Orderbook(**info), None
+
+    async def fetch_trades(self, symbol):
+        result, error = await self._rest_api.get_trade(symbol.replace("/", ""), 100)
+        if error:
+            return None, error
+        trades = []
+        for item in result:
+            info = {
+                "platform": self.PLATFORM,
+                "symbol": symbol,
+                "action": ORDER_ACTION_SELL if item["isBuyerMaker"] else ORDER_ACTION_BUY,
+                "price": item["price"],
+                "quantity": item["qty"],
+                "timestamp": item["time"]
+            }
+            trades.append((item["id"], Trade(**info)))
+        return trades, None
+
+
+class BinanceStreamPool(StreamPool):
+    """Binance Websocket stream pool, channels are Binance combined streams."""
+
+    PLATFORM = BINANCE
+    MAX_CHANNELS = 200  # Binance allows 1024 streams of a connection.
+
+    @classmethod
+    def build_url(cls, wss):
+        return wss + "/stream"
+
+    def subscribe_messages(self, channels):
+        data = {
+            "method": "SUBSCRIBE",
+            "params": channels,
+            "id": tools.get_cur_timestamp_ms()
+        }
+        return [data]
+
+    def unsubscribe_messages(self, channels):
+        data = {
+            "method": "UNSUBSCRIBE",
+            "params": channels,
+            "id": tools.get_cur_timestamp_ms()
+        }
+        return [data]
+
+    @staticmethod
+    def decode(raw):
+        return json.loads(raw)
+
+    def control(self, msg):
+        if "stream" in msg:
+            return None
+        if msg.get("error"):
+            logger.error("subscribe error:", msg, caller=self)
+        return True
+
+    def route(self, msg):
+        return msg.get("stream")
+
+    def timestamp(self, msg):
+        return msg["data"].get("E")
+
+
+class BinanceMarket:
+    """Binance market data feed, receive market data from Binance public Websocket streams and publish them to market
+    center.
+
+    Attributes:
+        symbol: Symbol name, e.g. `ETH/BTC`.
+        wss: Websocket address, default `wss://stream.binance.com:9443`.
+        orderbook_length: The length of orderbook levels to be published, default is 10.
+
+    NOTE:
+        The streams of all symbols are multiplexed into a few combined stream connections by `BinanceStreamPool`,
+        streams are subscribed by `SUBSCRIBE` message, so subscribing a new market type doesn't need to reconnect.
+
+        If `depth` of `binance` in `MARKETS` config is `incremental`, the orderbook is maintained by the diff depth
+        stream with `DepthBook`, the update ids are verified on every update, and it's resynced from a REST snapshot
+        when there is a gap.
+    """
+
+    CHANNELS = {
+        const.MARKET_TYPE_ORDERBOOK: "{symbol}@depth20@100ms",
+        const.MARKET_TYPE_TRADE: "{symbol}@trade",
+        const.MARKET_TYPE_KLINE: "{symbol}@kline_1m"
+    }
+    DEPTH_CHANNEL = "{symbol}@depth@100ms"  # Diff depth stream.
+    SNAPSHOT_LIMIT = 1000
+
+    def __init__(self, symbol, wss=None, orderbook_length=10):
+        """Initialize."""
+        self._platform = BINANCE
+        self._symbol = symbol
+        self._wss = wss or "wss://stream.binance.com:9443"
+        self._orderbook_length = orderbook_length
+        self._raw_symbol = symbol.replace("/", "").lower()
+
+        self._streams = {}  # Subscribed streams. e.g. {stream name: market type, ... }
+        self._pool = BinanceStreamPool.instance(self._wss)
+
+        self._book = None  # Local orderbook maintained by diff depth stream.
+        if config.markets.get(BINANCE, {}).get("depth") == "incremental":
+            self._rest_api = BinanceRestAPI("", "")
+            self._book = DepthBook(BINANCE, symbol, self._fetch_snapshot, orderbook_length)
+
+    def subscribe(self, market_type):
+        """Subscribe a market type.
+
+        Args:
+            market_type: Market data type, e.g. `orderbook` / `trade` / `kline`.
+        """
+        if market_type not in self.CHANNELS:
+            logger.error("market type not supported:", market_type, caller=self)
+            return
+        if market_type == const.MARKET_TYPE_ORDERBOOK and self._book:
+            stream = self.DEPTH_CHANNEL.format(symbol=self._raw_symbol)
+        else:
+            stream = self.CHANNELS[market_type].format(symbol=self._raw_symbol)
+        self._streams[stream] = market_type
+        self._pool.subscribe(stream, self)
+
+    async def _fetch_snapshot(self):
+        result, error = await self._rest_api.get_orderbook(self._raw_symbol.upper(), self.SNAPSHOT_LIMIT)
+        if error:
+            return None, error
+        return (result["lastUpdateId"], None, result["asks"], result["bids"]), None
+
+    async def process(self, msg):
+        """Process message that received from Websocket connection.
+
+        Args:
+            msg: message received from Websocket connection.
+        """
+        market_type = self._streams.get(msg.get("stream"))
+        if not market_type:
+            return
+        data = msg["data"]
+        if market_type == const.MARKET_TYPE_ORDERBOOK and self._book:
+            self._book.update(data["U"] - 1, data["u"], data["a"], data["b"], timestamp=data["E"])
+        elif market_type == const.MARKET_TYPE_ORDERBOOK:
+            info = {
+                "platform": self._platform,
+                "symbol": self._symbol,
+                "asks": data["asks"][:self._orderbook_length],
+                "bids": data["bids"][:self._orderbook_length],
+                "timestamp": tools.get_cur_timestamp_ms()
+            }
+            market_center.publish(market_type, Orderbook(**info))
+        elif market_type == const.MARKET_TYPE_TRADE:
+            info = {
+                "platform": self._platform,
+                "symbol": self._symbol,
+                "action": ORDER_ACTION_SELL if data["m"] else ORDER_ACTION_BUY,
+                "price": data["p"],
+                "quantity": data["q"],
+                "timestamp": data["T"]
+            }
+            market_center.publish(market_type, Trade(**info))
+        elif market_type == const.MARKET_TYPE_KLINE:
+            k = data["k"]
+            if not k["x"]:  # Only publish closed kline.
+                return
+            info = {
+                "platform": self._platform,
+                "symbol": self._symbol,
+                "open": k["o"],
+                "high": k["h"],
+                "low": k["l"],
+                "close": k["c"],
+                "volume": k["v"],
+                "timestamp": k["t"],
+                "kline_type": market_type
+            }
+            market_center.publish(market_type, Kline(**info))
+
+
+class BinanceAssetTracker(AssetTracker):
+    """Binance asset tracker.
+
+    Attributes:
+        account: Trade account name, e.g. `demo@gmail.com`.
+        rest_api: `BinanceRestAPI` client of the account.
+        kwargs: Same as `AssetTracker`.
+    """
+
+    PLATFORM = BINANCE
+
+    async def fetch_assets(self):
+        result, error = await self._rest_api.get_user_account()
+        if error:
+            return None, error
+        assets = {}
+        for item in result["balances"]:
+            free, locked = float(item["free"]), float(item["locked"])
+            if free or locked:
+                assets[item["asset"].upper()] = (free, locked)
+        return assets, None
+
+
+class BinanceOrderReconciler(OrderReconciler):
+    """Binance open order reconciler.
+
+    Attributes:
+        account: Trade account name, e.g. `demo@gmail.com`.
+        kwargs: Same as `OrderReconciler`.
+    """
+
+    PLATFORM = BINANCE
+    RATE = 10
+
+    STATUS = {
+        "NEW": ORDER_STATUS_SUBMITTED,
+        "PARTIALLY_FILLED": ORDER_STATUS_PARTIAL_FILLED,
+        "FILLED": ORDER_STATUS_FILLED,
+        "CANCELED": ORDER_STATUS_CANCELED,
+        "REJECTED": ORDER_STATUS_FAILED,
+        "EXPIRED": ORDER_STATUS_FAILED
+    }
+
+    async def fetch_open_orders(self, trade):
+        result, error = await trade.rest_api.get_open_orders(trade.raw_symbol)
+        return result, error
+
+    async def fetch_order(self, trade, order):
+        result, error = await trade.rest_api.get_order_status(trade.raw_symbol, order.order_id,
+                                                              order.client_order_id)
+        return result, error
+
+    def parse(self, info):
+        remain = float(info["origQty"]) - float(info["executedQty"])
+        return str(info["orderId"]), self.STATUS.get(info["status"]), remain
+
+    def apply(self, trade, info):
+        trade.update_order(info["orderId"], info["clientOrderId"], info["side"], info["type"], info["price"],
+                           info["origQty"], info["executedQty"], info["cummulativeQuoteQty"], None, info["status"],
+                           info["time"], info["updateTime"])
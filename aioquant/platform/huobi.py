@@ -9,7 +9,10 @@ Date:   2018/08/30
 Email:  huangtao@ifclover.com
 """
 
+import copy
+import gzip
 import base64
+import asyncio
 import datetime
 import hashlib
 import hmac
@@ -18,9 +21,30 @@ import urllib
 from urllib import parse
 from urllib.parse import urljoin
 
-from aioquant.utils.web import AsyncHttpRequests
+from aioquant.error import Error
+from aioquant.utils import tools
+from aioquant.utils import logger
+from aioquant.order import Order
+from aioquant import const
+from aioquant.const import HUOBI
+from aioquant.market import Orderbook, Trade, Kline, market_center
+from aioquant.history import KlineDownloader
+from aioquant.polling import PollingMarket
+from aioquant.stream import StreamPool
+from aioquant.asset import AssetTracker
+from aioquant.reconcile import OrderReconciler
+from aioquant.tasks import SingleTask
+from aioquant.latency import latency_collector
+from aioquant.utils.ratelimit import RateLimiter
+from aioquant.utils.decorator import async_method_locker
+from aioquant.utils.web import Websocket, AsyncHttpRequests
+from aioquant.order import ORDER_ACTION_BUY, ORDER_ACTION_SELL
+from aioquant.order import ORDER_TYPE_LIMIT, ORDER_TYPE_MARKET
+from aioquant.order import ORDER_STATUS_SUBMITTED, ORDER_STATUS_PARTIAL_FILLED, ORDER_STATUS_FILLED, \
+    ORDER_STATUS_CANCELED, ORDER_STATUS_FAILED
 
-__all__ = ("HuobiRestAPI", )
+__all__ = ("HuobiRestAPI", "HuobiTrade", "HuobiKlineDownloader", "HuobiPollingMarket", "HuobiStreamPool",
+           "HuobiMarket", "HuobiAssetTracker", "HuobiOrderReconciler", )
 
 
 class HuobiRestAPI:
@@ -30,14 +54,21 @@ class HuobiRestAPI:
         access_key: Account's ACCESS KEY.
         secret_key: Account's SECRET KEY.
         host: HTTP request host, default `https://api.huobi.pro`.
+        order_rate: Maximum order requests (create / revoke) per second, default is 10. The limiter is shared by all
+            the REST API clients of the same ACCESS KEY.
     """
 
-    def __init__(self, access_key, secret_key, host=None):
+    # Maximum orders per batch request.
+    BATCH_CREATE_LIMIT = 10
+    BATCH_REVOKE_LIMIT = 50
+
+    def __init__(self, access_key, secret_key, host=None, order_rate=10):
         """Initialize REST API client."""
         self._host = host or "https://api.huobi.pro"
         self._access_key = access_key
         self._secret_key = secret_key
         self._account_id = None
+        self._order_limiter = RateLimiter.instance((HUOBI, access_key), order_rate)
 
     async def get_server_time(self):
         """This endpoint returns the current system time in milliseconds adjusted to Singapore time zone.
@@ -199,7 +230,75 @@ class HuobiRestAPI:
             info["price"] = price
         if client_order_id:
             info["client-order-id"] = client_order_id
-        success, error = await self.request("POST", uri, body=info, auth=True)
+        await self._order_limiter.acquire()
+        token = latency_collector.begin_request()
+        try:
+            success, error = await self.request("POST", uri, body=info, auth=True)
+        finally:
+            latency_collector.end_request(token)
+        return success, error
+
+    async def create_orders(self, orders):
+        """Create multiple orders in one request, maximum 10 orders.
+
+        Args:
+            orders: Order list, e.g. `[{"symbol": "ethusdt", "price": "1.1", "quantity": "2",
+                "order_type": "buy-limit", "client_order_id": "abc"}]`.
+
+        Returns:
+            success: Success results, otherwise it's None.
+            error: Error information, otherwise it's None.
+        """
+        if len(orders) > self.BATCH_CREATE_LIMIT:
+            return None, "only create {} orders per request, use `batch_create_orders` instead!".format(
+                self.BATCH_CREATE_LIMIT)
+        uri = "/v1/order/batch-orders"
+        account_id = await self._get_account_id()
+        body = []
+        for order in orders:
+            info = {
+                "account-id": account_id,
+                "amount": order["quantity"],
+                "source": "api",
+                "symbol": order["symbol"],
+                "type": order["order_type"]
+            }
+            if order["order_type"] in ("buy-limit", "sell-limit"):
+                info["price"] = order["price"]
+            if order.get("client_order_id"):
+                info["client-order-id"] = order["client_order_id"]
+            body.append(info)
+        await self._order_limiter.acquire()
+        success, error = await self.request("POST", uri, body=body, auth=True)
+        return success, error
+
+    async def batch_create_orders(self, orders):
+        """Create any number of orders, orders will be split into chunks (10 orders per chunk) and all chunks will be
+            sent concurrently under the order rate limit.
+
+        Args:
+            orders: Order list, same as `create_orders`, `client_order_id` is optional and will be generated if not
+                given.
+
+        Returns:
+            success: Created orders, `{client_order_id: order_id, ... }`.
+            error: Failed orders, `[(client_order_id, error), ... ]`.
+        """
+        for order in orders:
+            if not order.get("client_order_id"):
+                order["client_order_id"] = tools.get_uuid1().replace("-", "")
+        parts = tools.chunks(orders, self.BATCH_CREATE_LIMIT)
+        results = await asyncio.gather(*[self.create_orders(part) for part in parts])
+        success, error = {}, []
+        for part, (result, e) in zip(parts, results):
+            if e:
+                error.extend([(order["client_order_id"], e) for order in part])
+                continue
+            for item in result["data"]:
+                if item.get("order-id"):
+                    success[item["client-order-id"]] = str(item["order-id"])
+                else:
+                    error.append((item["client-order-id"], item.get("err-msg")))
         return success, error
 
     async def revoke_order(self, order_id):
@@ -212,11 +311,12 @@ class HuobiRestAPI:
             error: Error information, otherwise it's None.
         """
         uri = "/v1/order/orders/{order_id}/submitcancel".format(order_id=order_id)
+        await self._order_limiter.acquire()
         success, error = await self.request("POST", uri, auth=True)
         return success, error
 
     async def revoke_orders(self, order_ids):
-        """Cancelling unfilled orders.
+        """Cancelling unfilled orders in one request, maximum 50 orders.
         Args:
             order_ids: Order id list.
 
@@ -224,13 +324,39 @@ class HuobiRestAPI:
             success: Success results, otherwise it's None.
             error: Error information, otherwise it's None.
         """
+        if len(order_ids) > self.BATCH_REVOKE_LIMIT:
+            return None, "only revoke {} orders per request, use `batch_revoke_orders` instead!".format(
+                self.BATCH_REVOKE_LIMIT)
         uri = "/v1/order/orders/batchcancel"
         body = {
             "order-ids": order_ids
         }
+        await self._order_limiter.acquire()
         success, error = await self.request("POST", uri, body=body, auth=True)
         return success, error
 
+    async def batch_revoke_orders(self, order_ids):
+        """Cancelling any number of unfilled orders, order ids will be split into chunks (50 orders per chunk) and all
+            chunks will be sent concurrently under the order rate limit.
+
+        Args:
+            order_ids: Order id list.
+
+        Returns:
+            success: Cancelled order id list.
+            error: Failed orders, `[(order_id, error), ... ]`.
+        """
+        parts = tools.chunks([str(order_id) for order_id in order_ids], self.BATCH_REVOKE_LIMIT)
+        results = await asyncio.gather(*[self.revoke_orders(part) for part in parts])
+        success, error = [], []
+        for part, (result, e) in zip(parts, results):
+            if e:
+                error.extend([(order_id, e) for order_id in part])
+                continue
+            success.extend([str(order_id) for order_id in result["data"]["success"]])
+            error.extend([(str(item["order-id"]), item["err-msg"]) for item in result["data"]["failed"]])
+        return success, error
+
     async def get_open_orders(self, symbol, limit=500):
         """Get all open order information.
 
@@ -266,6 +392,23 @@ class HuobiRestAPI:
         success, error = await self.request("GET", uri, auth=True)
         return success, error
 
+    async def get_order_by_client_order_id(self, client_order_id):
+        """Get order details by client order id.
+
+        Args:
+            client_order_id: Client order id.
+
+        Returns:
+            success: Success results, otherwise it's None.
+            error: Error information, otherwise it's None.
+        """
+        uri = "/v1/order/orders/getClientOrder"
+        params = {
+            "clientOrderId": client_order_id
+        }
+        success, error = await self.request("GET", uri, params=params, auth=True)
+        return success, error
+
     async def request(self, method, uri, params=None, body=None, auth=False):
         """Do HTTP request.
 
@@ -323,3 +466,680 @@ class HuobiRestAPI:
         signature = base64.b64encode(digest)
         signature = signature.decode()
         return signature
+
+
+class HuobiTrade:
+    """Huobi Trade module. You can initialize trade object with some attributes in kwargs.
+
+    Attributes:
+        account: Account name for this trade exchange.
+        strategy: What's name would you want to created for your strategy.
+        symbol: Symbol name for your trade.
+        host: HTTP request host. (default "https://api.huobi.pro")
+        wss: Websocket address. (default "wss://api.huobi.pro")
+        access_key: Account's ACCESS KEY.
+        secret_key Account's SECRET KEY.
+        order_update_callback: You can use this param to specify a async callback function when you initializing Trade
+            object. `order_update_callback` is like `async def on_order_update_callback(order: Order): pass` and this
+            callback function will be executed asynchronous when some order state updated.
+        init_success_callback: You can use this param to specify a async callback function when you initializing Trade
+            object. `init_success_callback` is like `async def on_init_success_callback(success: bool, error: Error):
+            pass` and this callback function will be executed asynchronous after Trade module object initialized done.
+
+    Notes:
+        Order updates are pushed by Huobi v2 private Websocket channel `orders#${symbol}`.
+    """
+
+    def __init__(self, **kwargs):
+        """Initialize Trade module."""
+        e = None
+        if not kwargs.get("account"):
+            e = Error("param account miss")
+        if not kwargs.get("strategy"):
+            e = Error("param strategy miss")
+        if not kwargs.get("symbol"):
+            e = Error("param symbol miss")
+        if not kwargs.get("host"):
+            kwargs["host"] = "https://api.huobi.pro"
+        if not kwargs.get("wss"):
+            kwargs["wss"] = "wss://api.huobi.pro"
+        if not kwargs.get("access_key"):
+            e = Error("param access_key miss")
+        if not kwargs.get("secret_key"):
+            e = Error("param secret_key miss")
+        if e:
+            logger.error(e, caller=self)
+            SingleTask.run(kwargs["init_success_callback"], False, e)
+            return
+
+        self._account = kwargs["account"]
+        self._strategy = kwargs["strategy"]
+        self._platform = HUOBI
+        self._symbol = kwargs["symbol"]
+        self._host = kwargs["host"]
+        self._wss = kwargs["wss"]
+        self._access_key = kwargs["access_key"]
+        self._secret_key = kwargs["secret_key"]
+        self._order_update_callback = kwargs["order_update_callback"]
+        self._init_success_callback = kwargs["init_success_callback"]
+
+        self._raw_symbol = self._symbol.replace("/", "").lower()  # Raw symbol name, same as Huobi Exchange.
+        self._order_channel = "orders#{symbol}".format(symbol=self._raw_symbol)
+
+        self._orders = kwargs.get("orders") or {}  # Order data. e.g. {order_id: order, ... }
+        # Orders created but not acknowledged yet. e.g. {client_order_id: order, ... }
+        self._pending_orders = kwargs.get("pending_orders") or {}
+        # If the orders are restored from the order journal, they're reconciled by Trade, so the open orders are not
+        # pulled back after the first connection.
+        self._restored = kwargs.get("orders") is not None
+
+        # Initialize our REST API client.
+        self._rest_api = HuobiRestAPI(self._access_key, self._secret_key, self._host)
+
+        url = self._wss + "/ws/v2"
+        self._ws = Websocket(url, self.connected_callback, process_callback=self.process)
+        self._ws.initialize()
+
+    @property
+    def orders(self):
+        return self._orders
+
+    @property
+    def pending_orders(self):
+        return self._pending_orders
+
+    @property
+    def raw_symbol(self):
+        return self._raw_symbol
+
+    @property
+    def rest_api(self):
+        return self._rest_api
+
+    async def connected_callback(self):
+        """After websocket connection created successfully, we will send a message to server for authentication."""
+        timestamp = datetime.datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S")
+        params = {
+            "accessKey": self._access_key,
+            "signatureMethod": "HmacSHA256",
+            "signatureVersion": "2.1",
+            "timestamp": timestamp
+        }
+        host_name = urllib.parse.urlparse(self._wss).hostname.lower()
+        params["signature"] = self._rest_api.generate_signature("GET", params, host_name, "/ws/v2")
+        params["authType"] = "api"
+        data = {
+            "action": "req",
+            "ch": "auth",
+            "params": params
+        }
+        await self._ws.send(data)
+
+    async def _auth_success_callback(self):
+        """Authentication success, subscribe order channel and pull back all open order information."""
+        data = {
+            "action": "sub",
+            "ch": self._order_channel
+        }
+        await self._ws.send(data)
+
+        if self._restored:
+            self._restored = False
+            SingleTask.run(self._init_success_callback, True, None)
+            return
+        success, error = await self._rest_api.get_open_orders(self._raw_symbol)
+        if error:
+            e = Error("get open orders error: {}".format(error))
+            SingleTask.run(self._init_success_callback, False, e)
+            return
+        for order_info in success["data"]:
+            filled = float(order_info["filled-amount"])
+            avg_price = float(order_info["filled-cash-amount"]) / filled if filled > 0 else 0
+            self.update_order(order_info["id"], order_info.get("client-order-id"), order_info["type"],
+                              order_info["price"], order_info["amount"], float(order_info["amount"]) - filled,
+                              avg_price, order_info["filled-fees"], order_info["state"], order_info["created-at"],
+                              order_info["created-at"])
+        SingleTask.run(self._init_success_callback, True, None)
+
+    async def create_order(self, action, price, quantity, *args, **kwargs):
+        """Create an order.
+
+        Args:
+            action: Trade direction, `BUY` or `SELL`.
+            price: Price of each order.
+            quantity: The buying or selling quantity.
+            kwargs:
+                order_type: Order type, `LIMIT` or `MARKET`, default is `LIMIT`.
+                client_order_id: Client order id, default is generated automatically.
+
+        Returns:
+            order_id: Order id if created successfully, otherwise it's None.
+            error: Error information, otherwise it's None.
+        """
+        order_type = kwargs.get("order_type", ORDER_TYPE_LIMIT)
+        client_order_id = kwargs.get("client_order_id") or tools.get_uuid1().replace("-", "")
+        price = tools.float_to_str(price)
+        quantity = tools.float_to_str(quantity)
+        if action == ORDER_ACTION_BUY:
+            t = "buy-market" if order_type == ORDER_TYPE_MARKET else "buy-limit"
+        elif action == ORDER_ACTION_SELL:
+            t = "sell-market" if order_type == ORDER_TYPE_MARKET else "sell-limit"
+        else:
+            return None, Error("action error! action: {}".format(action))
+
+        # Track the order locally before sending, the Websocket may push it back before REST response.
+        info = {
+            "platform": self._platform,
+            "account": self._account,
+            "strategy": self._strategy,
+            "client_order_id": client_order_id,
+            "action": action,
+            "order_type": order_type,
+            "symbol": self._symbol,
+            "price": price,
+            "quantity": quantity
+        }
+        self._pending_orders[client_order_id] = Order(**info)
+
+        result, error = await self._rest_api.create_order(self._raw_symbol, price, quantity, t, client_order_id)
+        if error:
+            order = self._pending_orders.pop(client_order_id, None)
+            if order and order.update(ORDER_STATUS_FAILED):
+                SingleTask.run(self._order_update_callback, copy.copy(order))
+            return None, error
+        order_id = str(result["data"])
+        # The order may be finished by the Websocket before REST response, then it's not tracked any more.
+        if client_order_id in self._pending_orders or order_id in self._orders:
+            self.update_order(order_id, client_order_id, t, price, quantity, quantity, 0, None, "submitted",
+                              None, None)
+        return order_id, None
+
+    async def revoke_order(self, *order_ids):
+        """Revoke (an) order(s).
+
+        Args:
+            order_ids: Order id list, you can set this param to 0 or multiple items. If you set 0 param, you can cancel
+                all orders for this symbol(initialized in Trade object). If you set 1 param, you can cancel an order.
+                If you set multiple param, you can cancel multiple orders. Do not set param length more than 100.
+
+        Returns:
+            Success or error, see bellow.
+        """
+        # If len(order_ids) == 0, you will cancel all orders for this symbol(initialized in Trade object).
+        if len(order_ids) == 0:
+            order_infos, error = await self._rest_api.get_open_orders(self._raw_symbol)
+            if error:
+                return False, error
+            order_ids = [str(order_info["id"]) for order_info in order_infos["data"]]
+            _, errors = await self._rest_api.batch_revoke_orders(order_ids)
+            if errors:
+                return False, errors
+            return True, None
+
+        # If len(order_ids) == 1, you will cancel an order.
+        if len(order_ids) == 1:
+            success, error = await self._rest_api.revoke_order(order_ids[0])
+            if error:
+                return order_ids[0], error
+            else:
+                return order_ids[0], None
+
+        # If len(order_ids) > 1, you will cancel multiple orders.
+        if len(order_ids) > 1:
+            success, error = await self._rest_api.batch_revoke_orders(order_ids)
+            return success, error
+
+    async def get_open_order_ids(self):
+        """Get open order id list.
+        """
+        success, error = await self._rest_api.get_open_orders(self._raw_symbol)
+        if error:
+            return None, error
+        else:
+            order_ids = []
+            for order_info in success["data"]:
+                order_id = str(order_info["id"])
+                order_ids.append(order_id)
+            return order_ids, None
+
+    @async_method_locker("HuobiTrade.process.locker")
+    async def process(self, msg):
+        """Process message that received from Websocket connection.
+
+        Args:
+            msg: message received from Websocket connection.
+        """
+        logger.debug("msg:", msg, caller=self)
+        action = msg.get("action")
+        if action == "ping":
+            data = {
+                "action": "pong",
+                "data": msg["data"]
+            }
+            await self._ws.send(data)
+            return
+
+        ch = msg.get("ch")
+        if action == "req" and ch == "auth":
+            if msg.get("code") != 200:
+                e = Error("Websocket connection authorized failed: {}".format(msg))
+                logger.error(e, caller=self)
+                SingleTask.run(self._init_success_callback, False, e)
+                return
+            logger.info("Websocket connection authorized successfully.", caller=self)
+            SingleTask.run(self._auth_success_callback)
+            return
+
+        if action == "sub":
+            if msg.get("code") != 200:
+                e = Error("subscribe order channel failed: {}".format(msg))
+                logger.error(e, caller=self)
+                SingleTask.run(self._init_success_callback, False, e)
+            return
+
+        if action == "push" and ch == self._order_channel:
+            data = msg["data"]
+            order_id = str(data["orderId"])
+            order = self._orders.get(order_id) or self._pending_orders.get(data.get("clientOrderId"))
+            quantity = data.get("orderSize") or (order.quantity if order else 0)
+            remain = data.get("remainAmt")
+            avg_price = None
+            if data["eventType"] == "trade" and order:
+                filled = float(order.quantity) - float(order.remain)
+                trade_volume = float(data["tradeVolume"])
+                avg_price = (float(order.avg_price) * filled + float(data["tradePrice"]) * trade_volume) / \
+                    (filled + trade_volume)
+            utime = data.get("tradeTime") or data.get("lastActTime") or data.get("orderCreateTime")
+            self.update_order(order_id, data.get("clientOrderId"), data.get("type"), data.get("orderPrice"),
+                              quantity, remain, avg_price, None, data["orderStatus"], data.get("orderCreateTime"),
+                              utime)
+
+    def update_order(self, order_id, client_order_id, order_type, price, quantity, remain, avg_price, fee, state,
+                     ctime, utime):
+        """Update order object by the local order state machine.
+
+        Args:
+            order_id: Order id.
+            client_order_id: Client order id.
+            order_type: Huobi order type, `buy-limit` / `sell-limit` / `buy-market` / `sell-market` ...
+            price: Order price.
+            quantity: Order quantity.
+            remain: Remain quantity that not filled, maybe None.
+            avg_price: Average price that filled, maybe None.
+            fee: Trading fee, maybe None.
+            state: Huobi order status.
+            ctime: Order create time, millisecond.
+            utime: Order update time, millisecond.
+        """
+        order_id = str(order_id)
+        if state in ("created", "submitted"):
+            status = ORDER_STATUS_SUBMITTED
+        elif state == "partial-filled":
+            status = ORDER_STATUS_PARTIAL_FILLED
+        elif state == "filled":
+            status = ORDER_STATUS_FILLED
+        elif state in ("canceled", "partial-canceled"):
+            status = ORDER_STATUS_CANCELED
+        elif state == "rejected":
+            status = ORDER_STATUS_FAILED
+        else:
+            logger.warn("unknown status:", state, "order_id:", order_id, caller=self)
+            return
+
+        order = self._orders.get(order_id)
+        if not order:
+            order = self._pending_orders.pop(client_order_id, None)
+            if not order:
+                order_type = order_type or ""
+                info = {
+                    "platform": self._platform,
+                    "account": self._account,
+                    "strategy": self._strategy,
+                    "client_order_id": client_order_id,
+                    "action": ORDER_ACTION_BUY if order_type.startswith("buy") else ORDER_ACTION_SELL,
+                    "order_type": ORDER_TYPE_MARKET if "market" in order_type else ORDER_TYPE_LIMIT,
+                    "symbol": self._symbol,
+                    "price": price,
+                    "quantity": quantity,
+                    "ctime": ctime
+                }
+                order = Order(**info)
+            order.order_id = order_id
+            self._orders[order_id] = order
+
+        if order.update(status, remain, avg_price, fee, utime):
+            SingleTask.run(self._order_update_callback, copy.copy(order))
+        if order.is_final:
+            self._orders.pop(order_id, None)
+
+
+class HuobiKlineDownloader(KlineDownloader):
+    """Huobi historical kline downloader.
+
+    Attributes:
+        symbol: Symbol name, e.g. `ETH/BTC`.
+        host: HTTP request host, default `https://api.huobi.pro`.
+        kwargs: Same as `KlineDownloader`.
+
+    NOTE:
+        Huobi REST API has no time range params, only the most recent 2000 klines can be downloaded, klines older than
+        that will be skipped.
+    """
+
+    PLATFORM = HUOBI
+    PAGE_LIMIT = 2000
+    RATE = 10
+    INTERVALS = {
+        const.MARKET_TYPE_KLINE: "1min",
+        const.MARKET_TYPE_KLINE_5M: "5min",
+        const.MARKET_TYPE_KLINE_15M: "15min",
+        const.MARKET_TYPE_KLINE_30M: "30min",
+        const.MARKET_TYPE_KLINE_1H: "60min",
+        const.MARKET_TYPE_KLINE_1D: "1day",
+        const.MARKET_TYPE_KLINE_1W: "1week"
+    }
+
+    def __init__(self, symbol, host=None, **kwargs):
+        """Initialize."""
+        super(HuobiKlineDownloader, self).__init__(symbol, **kwargs)
+        self._raw_symbol = symbol.replace("/", "").lower()
+        self._rest_api = HuobiRestAPI("", "", host)
+
+    async def fetch_page(self, start, end):
+        # Klines before the most recent 2000 are not available, skip the request.
+        if end <= tools.get_cur_timestamp_ms() - self.PAGE_LIMIT * self._interval:
+            return [], None
+        interval = self.INTERVALS[self._kline_type]
+        result, error = await self._rest_api.get_kline(self._raw_symbol, interval, self.PAGE_LIMIT)
+        if error:
+            return None, error
+        klines = []
+        for item in reversed(result["data"]):
+            info = {
+                "platform": self.PLATFORM,
+                "symbol": self._symbol,
+                "open": item["open"],
+                "high": item["high"],
+                "low": item["low"],
+                "close": item["close"],
+                "volume": item["amount"],
+                "timestamp": item["id"] * 1000,
+                "kline_type": self._kline_type
+            }
+            klines.append(Kline(**info))
+        return klines, None
+
+
+class HuobiPollingMarket(PollingMarket):
+    """Huobi REST polling market data feed.
+
+    Attributes:
+        host: HTTP request host, default `https://api.huobi.pro`.
+        kwargs: Same as `PollingMarket`.
+
+    NOTE:
+        Huobi REST API returns only the latest trade, the trades between two polls may be missed when the market is
+        active.
+    """
+
+    PLATFORM = HUOBI
+    RATE = 10
+    WEIGHTS = {
+        const.MARKET_TYPE_ORDERBOOK: 1,
+        const.MARKET_TYPE_TRADE: 1
+    }
+
+    def __init__(self, host=None, **kwargs):
+        """Initialize."""
+        super(HuobiPollingMarket, self).__init__(**kwargs)
+        self._rest_api = HuobiRestAPI("", "", host)
+
+    async def fetch_orderbook(self, symbol):
+        depth = min([d for d in (5, 10, 20) if d >= self._orderbook_length] or [20])
+        result, error = await self._rest_api.get_orderbook(symbol.replace("/", "").lower(), depth)
+        if error:
+            return None, error
+        tick = result["tick"]
+        info = {
+            "platform": self.PLATFORM,
+            "symbol": symbol,
+            "asks": [[tools.float_to_str(p), tools.float_to_str(q)] for p, q in tick["asks"][:self._orderbook_length]],
+            "bids": [[tools.float_to_str(p), tools.float_to_str(q)] for p, q in tick["bids"][:self._orderbook_length]],
+            "timestamp": tick.get("ts") or result["ts"]
+        }
+        return Orderbook(**info), None
+
+    async def fetch_trades(self, symbol):
+        result, error = await self._rest_api.get_trade(symbol.replace("/", "").lower())
+        if error:
+            return None, error
+        trades = []
+        for item in result["tick"]["data"]:
+            info = {
+                "platform": self.PLATFORM,
+                "symbol": symbol,
+                "action": ORDER_ACTION_BUY if item["direction"] == "buy" else ORDER_ACTION_SELL,
+                "price": tools.float_to_str(item["price"]),
+                "quantity": tools.float_to_str(item["amount"]),
+                "timestamp": item["ts"]
+            }
+            trades.append((int(item.get("trade-id") or item["id"]), Trade(**info)))
+        trades.sort(key=lambda t: t[0])
+        return trades, None
+
+
+class HuobiStreamPool(StreamPool):
+    """Huobi Websocket stream pool, all messages from server are compressed with gzip."""
+
+    PLATFORM = HUOBI
+    MAX_CHANNELS = 100
+
+    @classmethod
+    def build_url(cls, wss):
+        return wss + "/ws"
+
+    def subscribe_messages(self, channels):
+        return [{"sub": channel, "id": tools.get_uuid1()} for channel in channels]
+
+    def unsubscribe_messages(self, channels):
+        return [{"unsub": channel, "id": tools.get_uuid1()} for channel in channels]
+
+    @staticmethod
+    def decode(raw):
+        return json.loads(gzip.decompress(raw).decode())
+
+    def control(self, msg):
+        if "ping" in msg:
+            return {"pong": msg["ping"]}
+        if "ch" in msg:
+            return None
+        if msg.get("status") == "error":
+            logger.error("subscribe error:", msg, caller=self)
+        return True
+
+    def route(self, msg):
+        return msg.get("ch")
+
+    def timestamp(self, msg):
+        return msg.get("ts")
+
+
+class HuobiMarket:
+    """Huobi market data feed, receive market data from Huobi public Websocket and publish them to market center.
+
+    Attributes:
+        symbol: Symbol name, e.g. `ETH/BTC`.
+        wss: Websocket address, default `wss://api.huobi.pro`.
+        orderbook_length: The length of orderbook levels to be published, default is 10.
+
+    NOTE:
+        The channels of all symbols are multiplexed into a few connections by `HuobiStreamPool`. Huobi pushes kline
+        updates continually, a kline will be published after it's closed, that's when the next kline comes.
+    """
+
+    CHANNELS = {
+        const.MARKET_TYPE_ORDERBOOK: "market.{symbol}.depth.step0",
+        const.MARKET_TYPE_TRADE: "market.{symbol}.trade.detail",
+        const.MARKET_TYPE_KLINE: "market.{symbol}.kline.1min"
+    }
+
+    def __init__(self, symbol, wss=None, orderbook_length=10):
+        """Initialize."""
+        self._platform = HUOBI
+        self._symbol = symbol
+        self._wss = wss or "wss://api.huobi.pro"
+        self._orderbook_length = orderbook_length
+        self._raw_symbol = symbol.replace("/", "").lower()
+
+        self._channels = {}  # Subscribed channels. e.g. {channel name: market type, ... }
+        self._last_kline = None  # Last kline tick that not closed.
+        self._pool = HuobiStreamPool.instance(self._wss)
+
+    def subscribe(self, market_type):
+        """Subscribe a market type.
+
+        Args:
+            market_type: Market data type, e.g. `orderbook` / `trade` / `kline`.
+        """
+        if market_type not in self.CHANNELS:
+            logger.error("market type not supported:", market_type, caller=self)
+            return
+        channel = self.CHANNELS[market_type].format(symbol=self._raw_symbol)
+        self._channels[channel] = market_type
+        self._pool.subscribe(channel, self)
+
+    async def process(self, msg):
+        """Process message that received from Websocket connection.
+
+        Args:
+            msg: message received from Websocket connection.
+        """
+        market_type = self._channels.get(msg.get("ch"))
+        if not market_type:
+            return
+        tick = msg["tick"]
+        if market_type == const.MARKET_TYPE_ORDERBOOK:
+            info = {
+                "platform": self._platform,
+                "symbol": self._symbol,
+                "asks": [[tools.float_to_str(p), tools.float_to_str(q)]
+                         for p, q in tick["asks"][:self._orderbook_length]],
+                "bids": [[tools.float_to_str(p), tools.float_to_str(q)]
+                         for p, q in tick["bids"][:self._orderbook_length]],
+                "timestamp": tick.get("ts") or msg["ts"]
+            }
+            market_center.publish(market_type, Orderbook(**info))
+        elif market_type == const.MARKET_TYPE_TRADE:
+            for item in tick["data"]:
+                info = {
+                    "platform": self._platform,
+                    "symbol": self._symbol,
+                    "action": ORDER_ACTION_BUY if item["direction"] == "buy" else ORDER_ACTION_SELL,
+                    "price": tools.float_to_str(item["price"]),
+                    "quantity": tools.float_to_str(item["amount"]),
+                    "timestamp": item["ts"]
+                }
+                market_center.publish(market_type, Trade(**info))
+        elif market_type == const.MARKET_TYPE_KLINE:
+            last, self._last_kline = self._last_kline, tick
+            if not last or last["id"] == tick["id"]:
+                return
+            info = {
+                "platform": self._platform,
+                "symbol": self._symbol,
+                "open": tools.float_to_str(last["open"]),
+                "high": tools.float_to_str(last["high"]),
+                "low": tools.float_to_str(last["low"]),
+                "close": tools.float_to_str(last["close"]),
+                "volume": tools.float_to_str(last["amount"]),
+                "timestamp": last["id"] * 1000,
+                "kline_type": market_type
+            }
+            market_center.publish(market_type, Kline(**info))
+
+
+class HuobiAssetTracker(AssetTracker):
+    """Huobi asset tracker.
+
+    Attributes:
+        account: Trade account name, e.g. `demo@gmail.com`.
+        rest_api: `HuobiRestAPI` client of the account.
+        kwargs: Same as `AssetTracker`.
+    """
+
+    PLATFORM = HUOBI
+
+    async def fetch_assets(self):
+        result, error = await self._rest_api.get_account_balance()
+        if error:
+            return None, error
+        assets = {}
+        for item in result["data"]["list"]:
+            amount = float(item["balance"])
+            if not amount:
+                continue
+            free, locked = assets.get(item["currency"].upper(), (0, 0))
+            if item["type"] == "trade":
+                free += amount
+            else:
+                locked += amount
+            assets[item["currency"].upper()] = (free, locked)
+        return assets, None
+
+
+class HuobiOrderReconciler(OrderReconciler):
+    """Huobi open order reconciler.
+
+    Attributes:
+        account: Trade account name, e.g. `demo@gmail.com`.
+        kwargs: Same as `OrderReconciler`.
+
+    NOTE:
+        The filled fields are `filled-*` in open orders and `field-*` in order details.
+    """
+
+    PLATFORM = HUOBI
+    RATE = 10
+
+    STATUS = {
+        "created": ORDER_STATUS_SUBMITTED,
+        "submitted": ORDER_STATUS_SUBMITTED,
+        "partial-filled": ORDER_STATUS_PARTIAL_FILLED,
+        "filled": ORDER_STATUS_FILLED,
+        "canceled": ORDER_STATUS_CANCELED,
+        "partial-canceled": ORDER_STATUS_CANCELED,
+        "rejected": ORDER_STATUS_FAILED
+    }
+
+    async def fetch_open_orders(self, trade):
+        result, error = await trade.rest_api.get_open_orders(trade.raw_symbol)
+        if error:
+            return None, error
+        return result["data"], None
+
+    async def fetch_order(self, trade, order):
+        if order.order_id:
+            result, error = await trade.rest_api.get_order_status(order.order_id)
+        else:
+            result, error = await trade.rest_api.get_order_by_client_order_id(order.client_order_id)
+        if error:
+            return None, error
+        return result["data"], None
+
+    def _filled(self, info):
+        filled = float(info.get("filled-amount", info.get("field-amount", 0)))
+        value = float(info.get("filled-cash-amount", info.get("field-cash-amount", 0)))
+        fee = info.get("filled-fees", info.get("field-fees"))
+        return filled, value, fee
+
+    def parse(self, info):
+        filled, _, _ = self._filled(info)
+        return str(info["id"]), self.STATUS.get(info["state"]), float(info["amount"]) - filled
+
+    def apply(self, trade, info):
+        filled, value, fee = self._filled(info)
+        avg_price = value / filled if filled > 0 else 0
+        utime = info.get("finished-at") or info.get("canceled-at") or info.get("created-at")
+        trade.update_order(info["id"], info.get("client-order-id"), info["type"], info["price"], info["amount"],
+                           float(info["amount"]) - filled, avg_price, fee, info["state"], info.get("created-at"),
+                           utime)
@@ -9,18 +9,41 @@ Date:   2019/01/19
 Email:  huangtao@ifclover.com
 """
 
+import copy
 import base64
+import asyncio
 import hmac
 import json
 import time
+import zlib
 from urllib.parse import urljoin
 
-from aioquant.order import ORDER_ACTION_BUY
-from aioquant.order import ORDER_TYPE_LIMIT, ORDER_TYPE_MARKET
+from aioquant.error import Error
+from aioquant.utils import tools
 from aioquant.utils import logger
-from aioquant.utils.web import AsyncHttpRequests
+from aioquant.order import Order
+from aioquant import const
+from aioquant.const import OKEX
+from aioquant.market import Orderbook, Trade, Kline, market_center
+from aioquant.history import KlineDownloader
+from aioquant.polling import PollingMarket
+from aioquant.stream import StreamPool
+from aioquant.depth import DepthBook
+from aioquant.asset import AssetTracker
+from aioquant.reconcile import OrderReconciler
+from aioquant.configure import config
+from aioquant.tasks import SingleTask, LoopRunTask
+from aioquant.latency import latency_collector
+from aioquant.utils.ratelimit import RateLimiter
+from aioquant.utils.decorator import async_method_locker
+from aioquant.utils.web import Websocket, AsyncHttpRequests
+from aioquant.order import ORDER_ACTION_BUY, ORDER_ACTION_SELL
+from aioquant.order import ORDER_TYPE_LIMIT, ORDER_TYPE_MARKET
+from aioquant.order import ORDER_STATUS_SUBMITTED, ORDER_STATUS_PARTIAL_FILLED, ORDER_STATUS_FILLED, \
+    ORDER_STATUS_CANCELED, ORDER_STATUS_FAILED
 
-__all__ = ("OKExRestAPI", )
+__all__ = ("OKExRestAPI", "OKExTrade", "OKExKlineDownloader", "OKExPollingMarket", "OKExStreamPool", "OKExMarket",
+           "OKExAssetTracker", "OKExOrderReconciler", )
 
 
 class OKExRestAPI:
@@ -31,14 +54,31 @@ class OKExRestAPI:
         secret_key: Account's SECRET KEY.
         passphrase: API KEY Passphrase.
         host: HTTP request host, default `https://www.okex.com`
+        order_rate: Maximum order requests (create / revoke) per second, default is 20. The limiter is shared by all
+            the REST API clients of the same ACCESS KEY.
     """
 
-    def __init__(self, access_key, secret_key, passphrase, host=None):
+    # Maximum orders per batch request for each trading pair.
+    BATCH_LIMIT = 10
+
+    def __init__(self, access_key, secret_key, passphrase, host=None, order_rate=20):
         """Initialize."""
         self._host = host or "https://www.okex.com"
         self._access_key = access_key
         self._secret_key = secret_key
         self._passphrase = passphrase
+        self._order_limiter = RateLimiter.instance((OKEX, access_key), order_rate)
+
+    async def get_exchange_info(self):
+        """Get exchange information, all trading pairs and the minimum trading amount / price tick size.
+
+        Returns:
+            success: Success results, otherwise it's None.
+            error: Error information, otherwise it's None.
+        """
+        uri = "/api/spot/v3/instruments"
+        success, error = await self.request("GET", uri)
+        return success, error
 
     async def get_orderbook(self, symbol, depth=None, limit=10):
         """Get latest orderbook information.
@@ -152,9 +192,75 @@ class OKExRestAPI:
             return None, "order type error!"
         if client_oid:
             data["client_oid"] = client_oid
-        result, error = await self.request("POST", uri, body=data, auth=True)
+        await self._order_limiter.acquire()
+        token = latency_collector.begin_request()
+        try:
+            result, error = await self.request("POST", uri, body=data, auth=True)
+        finally:
+            latency_collector.end_request(token)
+        return result, error
+
+    async def create_orders(self, symbol, orders):
+        """Create multiple limit orders in one request, maximum 10 orders for each trading pair.
+
+        Args:
+            symbol: Trading pair, e.g. `BTC-USDT`.
+            orders: Order list, e.g. `[{"action": "BUY", "price": "1.1", "quantity": "2", "client_oid": "abc"}]`.
+
+        Returns:
+            success: Success results, otherwise it's None.
+            error: Error information, otherwise it's None.
+        """
+        if len(orders) > self.BATCH_LIMIT:
+            return None, "only create {} orders per request, use `batch_create_orders` instead!".format(
+                self.BATCH_LIMIT)
+        uri = "/api/spot/v3/batch_orders"
+        body = []
+        for order in orders:
+            data = {
+                "side": "buy" if order["action"] == ORDER_ACTION_BUY else "sell",
+                "instrument_id": symbol,
+                "type": "limit",
+                "price": order["price"],
+                "size": order["quantity"],
+                "margin_trading": 1
+            }
+            if order.get("client_oid"):
+                data["client_oid"] = order["client_oid"]
+            body.append(data)
+        await self._order_limiter.acquire()
+        result, error = await self.request("POST", uri, body=body, auth=True)
         return result, error
 
+    async def batch_create_orders(self, symbol, orders):
+        """Create any number of limit orders, orders will be split into chunks (10 orders per chunk) and all chunks
+            will be sent concurrently under the order rate limit.
+
+        Args:
+            symbol: Trading pair, e.g. `BTC-USDT`.
+            orders: Order list, same as `create_orders`, `client_oid` is optional and will be generated if not given.
+
+        Returns:
+            success: Created orders, `{client_oid: order_id, ... }`.
+            error: Failed orders, `[(client_oid, error), ... ]`.
+        """
+        for order in orders:
+            if not order.get("client_oid"):
+                order["client_oid"] = "a" + tools.get_uuid1().replace("-", "")[:31]
+        parts = tools.chunks(orders, self.BATCH_LIMIT)
+        results = await asyncio.gather(*[self.create_orders(symbol, part) for part in parts])
+        success, error = {}, []
+        for part, (result, e) in zip(parts, results):
+            if e:
+                error.extend([(order["client_oid"], e) for order in part])
+                continue
+            for item in result.get(symbol.lower(), []):
+                if item.get("result"):
+                    success[item["client_oid"]] = str(item["order_id"])
+                else:
+                    error.append((item["client_oid"], item.get("error_message")))
+        return success, error
+
     async def revoke_order(self, symbol, order_id=None, client_oid=None):
         """Cancelling an unfilled order.
         Args:
@@ -178,6 +284,7 @@ class OKExRestAPI:
         data = {
             "instrument_id": symbol
         }
+        await self._order_limiter.acquire()
         result, error = await self.request("POST", uri, body=data, auth=True)
         if error:
             return order_id, error
@@ -202,29 +309,62 @@ class OKExRestAPI:
             `order_ids` and `order_oids` must exist one, using order_ids first.
         """
         uri = "/api/spot/v3/cancel_batch_orders"
+        if len(order_ids or client_oids or []) > self.BATCH_LIMIT:
+            return None, "only revoke {} orders per request, use `batch_revoke_orders` instead!".format(
+                self.BATCH_LIMIT)
         if order_ids:
-            if len(order_ids) > 10:
-                logger.warn("only revoke 10 orders per request!", caller=self)
             body = [
                 {
                     "instrument_id": symbol,
-                    "order_ids": order_ids[:10]
+                    "order_ids": order_ids
                 }
             ]
         elif client_oids:
-            if len(client_oids) > 10:
-                logger.warn("only revoke 10 orders per request!", caller=self)
             body = [
                 {
                     "instrument_id": symbol,
-                    "client_oids": client_oids[:10]
+                    "client_oids": client_oids
                 }
             ]
         else:
             return None, "order id list error!"
+        await self._order_limiter.acquire()
         result, error = await self.request("POST", uri, body=body, auth=True)
         return result, error
 
+    async def batch_revoke_orders(self, symbol, order_ids):
+        """Cancelling any number of open orders, order ids will be split into chunks (10 orders per chunk) and all
+            chunks will be sent concurrently under the order rate limit.
+
+        Args:
+            symbol: Trading pair, e.g. `BTC-USDT`.
+            order_ids: Order id list.
+
+        Returns:
+            success: Cancelled order id list.
+            error: Failed orders, `[(order_id, error), ... ]`.
+        """
+        parts = tools.chunks([str(order_id) for order_id in order_ids], self.BATCH_LIMIT)
+        results = await asyncio.gather(*[self.revoke_orders(symbol, part) for part in parts])
+        success, error = [], []
+        for part, (result, e) in zip(parts, results):
+            if e:
+                error.extend([(order_id, e) for order_id in part])
+                continue
+            items = result.get(symbol.lower(), [])
+            if isinstance(items, dict):  # Old response format, `{"result": true, "order_id": [...]}`.
+                if items.get("result"):
+                    success.extend(part)
+                else:
+                    error.extend([(order_id, items) for order_id in part])
+                continue
+            for item in items:
+                if item.get("result"):
+                    success.append(str(item["order_id"]))
+                else:
+                    error.append((str(item["order_id"]), item.get("error_message")))
+        return success, error
+
     async def get_open_orders(self, symbol, limit=100):
         """Get order details by order id.
 
@@ -311,3 +451,693 @@ class OKExRestAPI:
             headers["OK-ACCESS-PASSPHRASE"] = self._passphrase
         _, success, error = await AsyncHttpRequests.fetch(method, url, body=body, headers=headers, timeout=10)
         return success, error
+
+
+class OKExTrade:
+    """OKEx Trade module. You can initialize trade object with some attributes in kwargs.
+
+    Attributes:
+        account: Account name for this trade exchange.
+        strategy: What's name would you want to created for your strategy.
+        symbol: Symbol name for your trade.
+        host: HTTP request host. (default "https://www.okex.com")
+        wss: Websocket address. (default "wss://real.okex.com:8443")
+        access_key: Account's ACCESS KEY.
+        secret_key Account's SECRET KEY.
+        passphrase API KEY Passphrase.
+        order_update_callback: You can use this param to specify a async callback function when you initializing Trade
+            object. `order_update_callback` is like `async def on_order_update_callback(order: Order): pass` and this
+            callback function will be executed asynchronous when some order state updated.
+        init_success_callback: You can use this param to specify a async callback function when you initializing Trade
+            object. `init_success_callback` is like `async def on_init_success_callback(success: bool, error: Error):
+            pass` and this callback function will be executed asynchronous after Trade module object initialized done.
+
+    Notes:
+        Order updates are pushed by OKEx v3 private Websocket channel `spot/order:${instrument_id}`, all messages
+        from server are compressed with raw deflate.
+    """
+
+    def __init__(self, **kwargs):
+        """Initialize Trade module."""
+        e = None
+        if not kwargs.get("account"):
+            e = Error("param account miss")
+        if not kwargs.get("strategy"):
+            e = Error("param strategy miss")
+        if not kwargs.get("symbol"):
+            e = Error("param symbol miss")
+        if not kwargs.get("host"):
+            kwargs["host"] = "https://www.okex.com"
+        if not kwargs.get("wss"):
+            kwargs["wss"] = "wss://real.okex.com:8443"
+        if not kwargs.get("access_key"):
+            e = Error("param access_key miss")
+        if not kwargs.get("secret_key"):
+            e = Error("param secret_key miss")
+        if not kwargs.get("passphrase"):
+            e = Error("param passphrase miss")
+        if e:
+            logger.error(e, caller=self)
+            SingleTask.run(kwargs["init_success_callback"], False, e)
+            return
+
+        self._account = kwargs["account"]
+        self._strategy = kwargs["strategy"]
+        self._platform = OKEX
+        self._symbol = kwargs["symbol"]
+        self._host = kwargs["host"]
+        self._wss = kwargs["wss"]
+        self._access_key = kwargs["access_key"]
+        self._secret_key = kwargs["secret_key"]
+        self._passphrase = kwargs["passphrase"]
+        self._order_update_callback = kwargs["order_update_callback"]
+        self._init_success_callback = kwargs["init_success_callback"]
+
+        self._raw_symbol = self._symbol.replace("/", "-")  # Raw symbol name, same as OKEx Exchange.
+        self._order_channel = "spot/order:{symbol}".format(symbol=self._raw_symbol)
+
+        self._orders = kwargs.get("orders") or {}  # Order data. e.g. {order_id: order, ... }
+        # Orders created but not acknowledged yet. e.g. {client_order_id: order, ... }
+        self._pending_orders = kwargs.get("pending_orders") or {}
+        # If the orders are restored from the order journal, they're reconciled by Trade, so the open orders are not
+        # pulled back after the first connection.
+        self._restored = kwargs.get("orders") is not None
+
+        # Initialize our REST API client.
+        self._rest_api = OKExRestAPI(self._access_key, self._secret_key, self._passphrase, self._host)
+
+        # Create a loop run task to send ping message to server per 5 seconds.
+        LoopRunTask.register(self._send_heartbeat_msg, 5)
+
+        url = self._wss + "/ws/v3"
+        self._ws = Websocket(url, self.connected_callback, process_binary_callback=self.process_binary)
+        self._ws.initialize()
+
+    @property
+    def orders(self):
+        return self._orders
+
+    @property
+    def pending_orders(self):
+        return self._pending_orders
+
+    @property
+    def raw_symbol(self):
+        return self._raw_symbol
+
+    @property
+    def rest_api(self):
+        return self._rest_api
+
+    async def _send_heartbeat_msg(self, *args, **kwargs):
+        await self._ws.send("ping")
+
+    async def connected_callback(self):
+        """After websocket connection created successfully, we will send a message to server for authentication."""
+        timestamp = str(time.time()).split(".")[0] + "." + str(time.time()).split(".")[1][:3]
+        message = str(timestamp) + "GET" + "/users/self/verify"
+        mac = hmac.new(bytes(self._secret_key, encoding="utf8"), bytes(message, encoding="utf8"), digestmod="sha256")
+        d = mac.digest()
+        signature = base64.b64encode(d).decode()
+        data = {
+            "op": "login",
+            "args": [self._access_key, self._passphrase, timestamp, signature]
+        }
+        await self._ws.send(data)
+
+    async def _auth_success_callback(self):
+        """Authentication success, subscribe order channel and pull back all open order information."""
+        data = {
+            "op": "subscribe",
+            "args": [self._order_channel]
+        }
+        await self._ws.send(data)
+
+        if self._restored:
+            self._restored = False
+            SingleTask.run(self._init_success_callback, True, None)
+            return
+        order_infos, error = await self._rest_api.get_open_orders(self._raw_symbol)
+        if error:
+            e = Error("get open orders error: {}".format(error))
+            SingleTask.run(self._init_success_callback, False, e)
+            return
+        for order_info in order_infos:
+            self.update_order(order_info)
+        SingleTask.run(self._init_success_callback, True, None)
+
+    async def create_order(self, action, price, quantity, *args, **kwargs):
+        """Create an order.
+
+        Args:
+            action: Trade direction, `BUY` or `SELL`.
+            price: Price of each order.
+            quantity: The buying or selling quantity.
+            kwargs:
+                order_type: Order type, `LIMIT` or `MARKET`, default is `LIMIT`.
+                client_order_id: Client order id, default is generated automatically.
+
+        Returns:
+            order_id: Order id if created successfully, otherwise it's None.
+            error: Error information, otherwise it's None.
+        """
+        order_type = kwargs.get("order_type", ORDER_TYPE_LIMIT)
+        # OKEx client order id must start with a letter, and the length must be less than 32.
+        client_order_id = kwargs.get("client_order_id") or "a" + tools.get_uuid1().replace("-", "")[:31]
+        price = tools.float_to_str(price)
+        quantity = tools.float_to_str(quantity)
+
+        # Track the order locally before sending, the Websocket may push it back before REST response.
+        info = {
+            "platform": self._platform,
+            "account": self._account,
+            "strategy": self._strategy,
+            "client_order_id": client_order_id,
+            "action": action,
+            "order_type": order_type,
+            "symbol": self._symbol,
+            "price": price,
+            "quantity": quantity
+        }
+        self._pending_orders[client_order_id] = Order(**info)
+
+        result, error = await self._rest_api.create_order(action, self._raw_symbol, price, quantity, order_type,
+                                                          client_order_id)
+        if not error and not result.get("result"):
+            error = Error(result.get("error_message"))
+        if error:
+            order = self._pending_orders.pop(client_order_id, None)
+            if order and order.update(ORDER_STATUS_FAILED):
+                SingleTask.run(self._order_update_callback, copy.copy(order))
+            return None, error
+        order_id = str(result["order_id"])
+        # The order may be finished by the Websocket before REST response, then it's not tracked any more.
+        if client_order_id in self._pending_orders or order_id in self._orders:
+            order_info = {
+                "order_id": order_id,
+                "client_oid": client_order_id,
+                "state": "0"
+            }
+            self.update_order(order_info)
+        return order_id, None
+
+    async def revoke_order(self, *order_ids):
+        """Revoke (an) order(s).
+
+        Args:
+            order_ids: Order id list, you can set this param to 0 or multiple items. If you set 0 param, you can cancel
+                all orders for this symbol(initialized in Trade object). If you set 1 param, you can cancel an order.
+                If you set multiple param, you can cancel multiple orders. Do not set param length more than 100.
+
+        Returns:
+            Success or error, see bellow.
+        """
+        # If len(order_ids) == 0, you will cancel all orders for this symbol(initialized in Trade object).
+        if len(order_ids) == 0:
+            order_infos, error = await self._rest_api.get_open_orders(self._raw_symbol)
+            if error:
+                return False, error
+            order_ids = [order_info["order_id"] for order_info in order_infos]
+            _, errors = await self._rest_api.batch_revoke_orders(self._raw_symbol, order_ids)
+            if errors:
+                return False, errors
+            return True, None
+
+        # If len(order_ids) == 1, you will cancel an order.
+        if len(order_ids) == 1:
+            order_id, error = await self._rest_api.revoke_order(self._raw_symbol, order_ids[0])
+            if error:
+                return order_ids[0], error
+            else:
+                return order_ids[0], None
+
+        # If len(order_ids) > 1, you will cancel multiple orders.
+        if len(order_ids) > 1:
+            success, error = await self._rest_api.batch_revoke_orders(self._raw_symbol, list(order_ids))
+            return success, error
+
+    async def get_open_order_ids(self):
+        """Get open order id list.
+        """
+        success, error = await self._rest_api.get_open_orders(self._raw_symbol)
+        if error:
+            return None, error
+        else:
+            order_ids = []
+            for order_info in success:
+                order_id = str(order_info["order_id"])
+                order_ids.append(order_id)
+            return order_ids, None
+
+    async def process_binary(self, raw):
+        """Process binary message that received from Websocket connection.
+
+        Args:
+            raw: Binary message received from Websocket connection.
+        """
+        decompress = zlib.decompressobj(-zlib.MAX_WBITS)
+        msg = decompress.decompress(raw)
+        msg += decompress.flush()
+        msg = msg.decode()
+        if msg == "pong":
+            return
+        logger.debug("msg:", msg, caller=self)
+        msg = json.loads(msg)
+        await self.process(msg)
+
+    @async_method_locker("OKExTrade.process.locker")
+    async def process(self, msg):
+        """Process message that received from Websocket connection.
+
+        Args:
+            msg: message received from Websocket connection.
+        """
+        event = msg.get("event")
+        if event == "login":
+            if not msg.get("success"):
+                e = Error("Websocket connection authorized failed: {}".format(msg))
+                logger.error(e, caller=self)
+                SingleTask.run(self._init_success_callback, False, e)
+                return
+            logger.info("Websocket connection authorized successfully.", caller=self)
+            SingleTask.run(self._auth_success_callback)
+            return
+        if event == "error":
+            e = Error("Websocket error: {}".format(msg))
+            logger.error(e, caller=self)
+            SingleTask.run(self._init_success_callback, False, e)
+            return
+        if event == "subscribe":
+            return
+
+        if msg.get("table") == "spot/order":
+            for order_info in msg["data"]:
+                if order_info["instrument_id"] != self._raw_symbol:
+                    continue
+                self.update_order(order_info)
+
+    def update_order(self, order_info):
+        """Update order object by the local order state machine.
+
+        Args:
+            order_info: Order information from REST API or Websocket.
+        """
+        order_id = str(order_info["order_id"])
+        client_order_id = order_info.get("client_oid")
+        state = str(order_info["state"])
+        if state in ("0", "3"):
+            status = ORDER_STATUS_SUBMITTED
+        elif state == "1":
+            status = ORDER_STATUS_PARTIAL_FILLED
+        elif state == "4":  # Canceling, wait for the final status.
+            return
+        elif state == "2":
+            status = ORDER_STATUS_FILLED
+        elif state == "-1":
+            status = ORDER_STATUS_CANCELED
+        elif state == "-2":
+            status = ORDER_STATUS_FAILED
+        else:
+            logger.warn("unknown status:", state, "order_id:", order_id, caller=self)
+            return
+
+        order = self._orders.get(order_id)
+        if not order:
+            order = self._pending_orders.pop(client_order_id, None)
+            if not order:
+                info = {
+                    "platform": self._platform,
+                    "account": self._account,
+                    "strategy": self._strategy,
+                    "client_order_id": client_order_id,
+                    "action": ORDER_ACTION_BUY if order_info.get("side") == "buy" else ORDER_ACTION_SELL,
+                    "order_type": ORDER_TYPE_MARKET if order_info.get("type") == "market" else ORDER_TYPE_LIMIT,
+                    "symbol": self._symbol,
+                    "price": order_info.get("price", 0),
+                    "quantity": order_info.get("size", 0)
+                }
+                if order_info.get("created_at"):
+                    info["ctime"] = tools.utctime_str_to_ms(order_info["created_at"])
+                order = Order(**info)
+            order.order_id = order_id
+            self._orders[order_id] = order
+
+        remain, avg_price, utime = None, None, None
+        if "filled_size" in order_info:
+            filled_size = float(order_info["filled_size"])
+            remain = float(order.quantity) - filled_size
+            if filled_size > 0:
+                avg_price = float(order_info["filled_notional"]) / filled_size
+        if status == ORDER_STATUS_PARTIAL_FILLED and remain is None:
+            return
+        if order_info.get("timestamp"):
+            utime = tools.utctime_str_to_ms(order_info["timestamp"])
+        if order.update(status, remain, avg_price, None, utime):
+            SingleTask.run(self._order_update_callback, copy.copy(order))
+        if order.is_final:
+            self._orders.pop(order_id, None)
+
+
+class OKExKlineDownloader(KlineDownloader):
+    """OKEx historical kline downloader.
+
+    Attributes:
+        symbol: Symbol name, e.g. `ETH/BTC`.
+        host: HTTP request host, default `https://www.okex.com`.
+        kwargs: Same as `KlineDownloader`.
+    """
+
+    PLATFORM = OKEX
+    PAGE_LIMIT = 200
+    RATE = 10
+    INTERVALS = {
+        const.MARKET_TYPE_KLINE: "60",
+        const.MARKET_TYPE_KLINE_3M: "180",
+        const.MARKET_TYPE_KLINE_5M: "300",
+        const.MARKET_TYPE_KLINE_15M: "900",
+        const.MARKET_TYPE_KLINE_30M: "1800",
+        const.MARKET_TYPE_KLINE_1H: "3600",
+        const.MARKET_TYPE_KLINE_6H: "21600",
+        const.MARKET_TYPE_KLINE_12H: "43200",
+        const.MARKET_TYPE_KLINE_1D: "86400",
+        const.MARKET_TYPE_KLINE_1W: "604800"
+    }
+
+    def __init__(self, symbol, host=None, **kwargs):
+        """Initialize."""
+        super(OKExKlineDownloader, self).__init__(symbol, **kwargs)
+        self._raw_symbol = symbol.replace("/", "-")
+        self._rest_api = OKExRestAPI("", "", "", host)
+
+    async def fetch_page(self, start, end):
+        interval = self.INTERVALS[self._kline_type]
+        result, error = await self._rest_api.get_kline(self._raw_symbol, interval, tools.ts_to_utctime_str(start),
+                                                       tools.ts_to_utctime_str(end - 1))
+        if error:
+            return None, error
+        klines = []
+        for item in reversed(result):
+            info = {
+                "platform": self.PLATFORM,
+                "symbol": self._symbol,
+                "open": item[1],
+                "high": item[2],
+                "low": item[3],
+                "close": item[4],
+                "volume": item[5],
+                "timestamp": tools.utctime_str_to_ms(item[0]),
+                "kline_type": self._kline_type
+            }
+            klines.append(Kline(**info))
+        return klines, None
+
+
+class OKExPollingMarket(PollingMarket):
+    """OKEx REST polling market data feed.
+
+    Attributes:
+        host: HTTP request host, default `https://www.okex.com`.
+        kwargs: Same as `PollingMarket`.
+    """
+
+    PLATFORM = OKEX
+    RATE = 10  # 20 requests per 2 seconds.
+    WEIGHTS = {
+        const.MARKET_TYPE_ORDERBOOK: 1,
+        const.MARKET_TYPE_TRADE: 1
+    }
+
+    def __init__(self, host=None, **kwargs):
+        """Initialize."""
+        super(OKExPollingMarket, self).__init__(**kwargs)
+        self._rest_api = OKExRestAPI("", "", "", host)
+
+    async def fetch_orderbook(self, symbol):
+        result, error = await self._rest_api.get_orderbook(symbol.replace("/", "-"), limit=self._orderbook_length)
+        if error:
+            return None, error
+        info = {
+            "platform": self.PLATFORM,
+            "symbol": symbol,
+            "asks": [item[:2] for item in result["asks"][:self._orderbook_length]],
+            "bids": [item[:2] for item in result["bids"][:self._orderbook_length]],
+            "timestamp": tools.utctime_str_to_ms(result["timestamp"])
+        }
+        return Orderbook(**info), None
+
+    async def fetch_trades(self, symbol):
+        result, error = await self._rest_api.get_trade(symbol.replace("/", "-"), 60)
+        if error:
+            return None, error
+        trades = []
+        for item in reversed(result):
+            info = {
+                "platform": self.PLATFORM,
+                "symbol": symbol,
+                "action": ORDER_ACTION_BUY if item["side"] == "buy" else ORDER_ACTION_SELL,
+                "price": item["price"],
+                "quantity": item["size"],
+                "timestamp": tools.utctime_str_to_ms(item["timestamp"])
+            }
+            trades.append((int(item["trade_id"]), Trade(**info)))
+        return trades, None
+
+
+class OKExStreamPool(StreamPool):
+    """OKEx Websocket stream pool, all messages from server are compressed with raw deflate, channels are routed by
+    `table:instrument_id`."""
+
+    PLATFORM = OKEX
+    MAX_CHANNELS = 100
+    HEARTBEAT_INTERVAL = 5
+    HEARTBEAT_MESSAGE = "ping"
+
+    @classmethod
+    def build_url(cls, wss):
+        return wss + "/ws/v3"
+
+    def subscribe_messages(self, channels):
+        return [{"op": "subscribe", "args": channels}]
+
+    def unsubscribe_messages(self, channels):
+        return [{"op": "unsubscribe", "args": channels}]
+
+    @staticmethod
+    def decode(raw):
+        decompress = zlib.decompressobj(-zlib.MAX_WBITS)
+        msg = decompress.decompress(raw)
+        msg += decompress.flush()
+        msg = msg.decode()
+        if msg == "pong":
+            return None
+        return json.loads(msg)
+
+    def control(self, msg):
+        if "table" in msg:
+            return None
+        if msg.get("event") == "error":
+            logger.error("subscribe error:", msg, caller=self)
+        return True
+
+    def route(self, msg):
+        if not msg.get("data"):
+            return None
+        return msg["table"] + ":" + msg["data"][0]["instrument_id"]
+
+    def timestamp(self, msg):
+        if not msg.get("data") or "timestamp" not in msg["data"][0]:
+            return None
+        return tools.utctime_str_to_ms(msg["data"][0]["timestamp"])
+
+
+class OKExMarket:
+    """OKEx market data feed, receive market data from OKEx v3 public Websocket and publish them to market center.
+
+    Attributes:
+        symbol: Symbol name, e.g. `ETH/BTC`.
+        wss: Websocket address, default `wss://real.okex.com:8443`.
+        orderbook_length: The length of orderbook levels to be published in incremental depth mode, default is 10.
+
+    NOTE:
+        The channels of all symbols are multiplexed into a few connections by `OKExStreamPool`. OKEx pushes candle
+        updates continually, a kline will be published after it's closed, that's when the next candle comes.
+
+        If `depth` of `okex` in `MARKETS` config is `incremental`, the orderbook is maintained by the 400 levels
+        incremental depth channel with `DepthBook`, the CRC32 checksum is verified on every update, and it's resynced
+        from a REST snapshot when the checksum is not matched.
+    """
+
+    CHANNELS = {
+        const.MARKET_TYPE_ORDERBOOK: "spot/depth5:{symbol}",
+        const.MARKET_TYPE_TRADE: "spot/trade:{symbol}",
+        const.MARKET_TYPE_KLINE: "spot/candle60s:{symbol}"
+    }
+    DEPTH_CHANNEL = "spot/depth:{symbol}"  # Incremental depth channel.
+    SNAPSHOT_LIMIT = 200
+
+    def __init__(self, symbol, wss=None, orderbook_length=10):
+        """Initialize."""
+        self._platform = OKEX
+        self._symbol = symbol
+        self._wss = wss or "wss://real.okex.com:8443"
+        self._raw_symbol = symbol.replace("/", "-")
+
+        self._channels = {}  # Subscribed channels. e.g. {table name: market type, ... }
+        self._last_candle = None  # Last candle that not closed.
+        self._pool = OKExStreamPool.instance(self._wss)
+
+        self._book = None  # Local orderbook maintained by incremental depth channel.
+        if config.markets.get(OKEX, {}).get("depth") == "incremental":
+            self._rest_api = OKExRestAPI("", "", "")
+            self._book = DepthBook(OKEX, symbol, self._fetch_snapshot, orderbook_length, self.checksum)
+
+    @staticmethod
+    def checksum(bids, asks):
+        """CRC32 checksum of the top 25 levels, `bid price:bid size:ask price:ask size:...`, as a signed int."""
+        items = []
+        for i in range(max(len(bids), len(asks))):
+            if i < len(bids):
+                items.extend(bids[i])
+            if i < len(asks):
+                items.extend(asks[i])
+        crc = zlib.crc32(":".join(items).encode())
+        return crc - (1 << 32) if crc >= (1 << 31) else crc
+
+    def subscribe(self, market_type):
+        """Subscribe a market type.
+
+        Args:
+            market_type: Market data type, e.g. `orderbook` / `trade` / `kline`.
+        """
+        if market_type not in self.CHANNELS:
+            logger.error("market type not supported:", market_type, caller=self)
+            return
+        if market_type == const.MARKET_TYPE_ORDERBOOK and self._book:
+            channel = self.DEPTH_CHANNEL.format(symbol=self._raw_symbol)
+        else:
+            channel = self.CHANNELS[market_type].format(symbol=self._raw_symbol)
+        self._channels[channel.split(":")[0]] = market_type
+        self._pool.subscribe(channel, self)
+
+    async def _fetch_snapshot(self):
+        result, error = await self._rest_api.get_orderbook(self._raw_symbol, limit=self.SNAPSHOT_LIMIT)
+        if error:
+            return None, error
+        asks = [item[:2] for item in result["asks"]]
+        bids = [item[:2] for item in result["bids"]]
+        return (None, tools.utctime_str_to_ms(result["timestamp"]), asks, bids), None
+
+    async def process(self, msg):
+        """Process message that received from Websocket connection.
+
+        Args:
+            msg: message received from Websocket connection.
+        """
+        market_type = self._channels.get(msg.get("table"))
+        if not market_type:
+            return
+        for data in msg["data"]:
+            if data["instrument_id"] != self._raw_symbol:
+                continue
+            if market_type == const.MARKET_TYPE_ORDERBOOK and self._book:
+                asks = [item[:2] for item in data["asks"]]
+                bids = [item[:2] for item in data["bids"]]
+                timestamp = tools.utctime_str_to_ms(data["timestamp"])
+                if msg.get("action") == "partial":
+                    self._book.reset(None, asks, bids, data.get("checksum"), timestamp)
+                else:
+                    self._book.update(None, None, asks, bids, data.get("checksum"), timestamp)
+            elif market_type == const.MARKET_TYPE_ORDERBOOK:
+                info = {
+                    "platform": self._platform,
+                    "symbol": self._symbol,
+                    "asks": [item[:2] for item in data["asks"]],
+                    "bids": [item[:2] for item in data["bids"]],
+                    "timestamp": tools.utctime_str_to_ms(data["timestamp"])
+                }
+                market_center.publish(market_type, Orderbook(**info))
+            elif market_type == const.MARKET_TYPE_TRADE:
+                info = {
+                    "platform": self._platform,
+                    "symbol": self._symbol,
+                    "action": ORDER_ACTION_BUY if data["side"] == "buy" else ORDER_ACTION_SELL,
+                    "price": data["price"],
+                    "quantity": data["size"],
+                    "timestamp": tools.utctime_str_to_ms(data["timestamp"])
+                }
+                market_center.publish(market_type, Trade(**info))
+            elif market_type == const.MARKET_TYPE_KLINE:
+                last, self._last_candle = self._last_candle, data["candle"]
+                if not last or last[0] == data["candle"][0]:
+                    continue
+                info = {
+                    "platform": self._platform,
+                    "symbol": self._symbol,
+                    "open": last[1],
+                    "high": last[2],
+                    "low": last[3],
+                    "close": last[4],
+                    "volume": last[5],
+                    "timestamp": tools.utctime_str_to_ms(last[0]),
+                    "kline_type": market_type
+                }
+                market_center.publish(market_type, Kline(**info))
+
+
+class OKExAssetTracker(AssetTracker):
+    """OKEx asset tracker.
+
+    Attributes:
+        account: Trade account name, e.g. `demo@gmail.com`.
+        rest_api: `OKExRestAPI` client of the account.
+        kwargs: Same as `AssetTracker`.
+    """
+
+    PLATFORM = OKEX
+
+    async def fetch_assets(self):
+        result, error = await self._rest_api.get_user_account()
+        if error:
+            return None, error
+        assets = {}
+        for item in result:
+            free, locked = float(item["available"]), float(item["hold"])
+            if free or locked:
+                assets[item["currency"].upper()] = (free, locked)
+        return assets, None
+
+
+class OKExOrderReconciler(OrderReconciler):
+    """OKEx open order reconciler.
+
+    Attributes:
+        account: Trade account name, e.g. `demo@gmail.com`.
+        kwargs: Same as `OrderReconciler`.
+    """
+
+    PLATFORM = OKEX
+    RATE = 10
+
+    STATUS = {
+        "0": ORDER_STATUS_SUBMITTED,
+        "3": ORDER_STATUS_SUBMITTED,
+        "1": ORDER_STATUS_PARTIAL_FILLED,
+        "2": ORDER_STATUS_FILLED,
+        "-1": ORDER_STATUS_CANCELED,
+        "-2": ORDER_STATUS_FAILED
+    }
+
+    async def fetch_open_orders(self, trade):
+        result, error = await trade.rest_api.get_open_orders(trade.raw_symbol)
+        return result, error
+
+    async def fetch_order(self, trade, order):
+        result, error = await trade.rest_api.get_order_status(trade.raw_symbol, order.order_id, order.client_order_id)
+        return result, error
+
+    def parse(self, info):
+        remain = float(info["size"]) - float(info["filled_size"])
+        return str(info["order_id"]), self.STATUS.get(str(info["state"])), remain
+
+    def apply(self, trade, info):
+        trade.update_order(info)
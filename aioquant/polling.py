@@ -0,0 +1,243 @@
+# -*- coding:utf-8 -*-
+
+"""
+REST polling market data feed.
+
+For the symbols without Websocket market data, or as a fallback during Websocket outages, poll orderbooks and trades
+through REST API, and publish them through `MarketSubscribe` like the Websocket feeds.
+
+Author: HuangTao
+Date:   2020/03/25
+Email:  huangtao@ifclover.com
+"""
+
+import heapq
+import asyncio
+import itertools
+
+from aioquant import const
+from aioquant.utils import logger
+from aioquant.tasks import SingleTask
+from aioquant.market import market_center
+from aioquant.utils.ratelimit import RateLimiter
+
+__all__ = ("PollingMarket", )
+
+
+class PollingMarket:
+    """REST polling market data feed, every platform should inherit this class and implement `fetch_orderbook` and
+    `fetch_trades`.
+
+    Attributes:
+        budget: Share of the platform's public API rate used by this feed, default is 0.5, leave the rest for other
+            requests from the same IP.
+        min_interval: Minimum poll interval(seconds) of a symbol, default is 0.5.
+        max_interval: Maximum poll interval(seconds) of a symbol, default is 30.
+        concurrency: Maximum requests in flight, default is 10.
+        orderbook_length: The length of orderbook levels to be published, default is 10.
+        provide: If True, the polled market data will not open Websocket feeds when subscribed, set it to False when
+            polling is a fallback of Websocket feeds, default is True. Add the symbols before subscribing their market
+            data, a Websocket feed opened by an earlier subscription is not closed.
+
+    Usage:
+        market = BinancePollingMarket()
+        market.add("ETH/BTC", const.MARKET_TYPE_ORDERBOOK, priority=2)
+        market.add("ETH/BTC", const.MARKET_TYPE_TRADE)
+        MarketSubscribe(const.MARKET_TYPE_ORDERBOOK, const.BINANCE, "ETH/BTC", self.on_event_orderbook_update)
+
+    NOTE:
+        Polls are scheduled by the next due time of every symbol and market type. The poll interval is halved when
+        the data changed, and grows by 1.5 times when the data is not changed or the request failed, the interval is
+        divided by the priority. All requests acquire tokens from one rate limiter with the request weight, so the
+        feed never exceeds the budget, and when there are too many symbols, the polls are delayed in the order of
+        due time. An orderbook is published only if it's changed, and the first poll of trades only marks the latest
+        trade, only the new trades after it are published.
+    """
+
+    PLATFORM = None  # Platform name.
+    RATE = 10  # Public API request weight per second of the platform.
+    WEIGHTS = {  # Request weight of every market type.
+        const.MARKET_TYPE_ORDERBOOK: 1,
+        const.MARKET_TYPE_TRADE: 1
+    }
+
+    def __init__(self, budget=0.5, min_interval=0.5, max_interval=30, concurrency=10, orderbook_length=10,
+                 provide=True):
+        """Initialize."""
+        self._min_interval = min_interval
+        self._max_interval = max_interval
+        self._orderbook_length = orderbook_length
+        self._provide = provide
+        self._limiter = RateLimiter(self.RATE * budget)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks = {}  # Polling tasks. `{(symbol, market_type): {"priority": ..., "interval": ..., ...}}`
+        # Due time heap, the entries of a removed task are skipped by the generation of the task.
+        # `[(due time, sequence, (symbol, market_type), generation), ...]`
+        self._queue = []
+        self._sequence = itertools.count()
+        self._generations = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._running = False
+
+    @property
+    def stats(self):
+        """Polling statistics, `{(symbol, market_type): {"interval": ..., "polls": ..., "changes": ...,
+        "errors": ...}}`."""
+        return {key: {"interval": max(self._min_interval, task["interval"] / task["priority"]), "polls": task["polls"],
+                      "changes": task["changes"], "errors": task["errors"]} for key, task in self._tasks.items()}
+
+    def add(self, symbol, market_type, priority=1):
+        """Add a symbol and market type to poll, the polling starts automatically.
+
+        Args:
+            symbol: Symbol name, e.g. `ETH/BTC`.
+            market_type: Market data type, `orderbook` or `trade`.
+            priority: Higher priority polls more frequently, the interval is divided by the priority, default is 1.
+        """
+        if market_type not in self.WEIGHTS:
+            raise ValueError("market type not supported: {}".format(market_type))
+        key = (symbol, market_type)
+        if key not in self._tasks:
+            self._tasks[key] = {
+                "generation": next(self._generations),  # Distinguish the task from a removed one of the same key.
+                "priority": priority,
+                "interval": self._min_interval,
+                "last": None,  # Last orderbook levels or the last trade id.
+                "polls": 0,
+                "changes": 0,
+                "errors": 0
+            }
+            self._schedule(key, 0)
+        self._tasks[key]["priority"] = priority
+        if self._provide:
+            market_center.provide(market_type, self.PLATFORM, symbol)
+        if not self._running:
+            self._running = True
+            SingleTask.run(self._run)
+
+    def remove(self, symbol, market_type):
+        """Stop polling a symbol and market type."""
+        self._tasks.pop((symbol, market_type), None)
+
+    def stop(self):
+        """Stop polling all symbols."""
+        self._running = False
+        self._wakeup.set()
+
+    def _schedule(self, key, delay):
+        loop = asyncio.get_event_loop()
+        heapq.heappush(self._queue, (loop.time() + delay, next(self._sequence), key, self._tasks[key]["generation"]))
+        self._wakeup.set()
+
+    def _current(self, key, generation):
+        """The task of the key, None if it's removed, or removed and added again after the generation."""
+        task = self._tasks.get(key)
+        if not task or task["generation"] != generation:
+            return None
+        return task
+
+    async def _run(self):
+        """Schedule polls in the order of due time."""
+        loop = asyncio.get_event_loop()
+        while self._running:
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            due, _, key, generation = self._queue[0]
+            now = loop.time()
+            if due > now:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), due - now)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            heapq.heappop(self._queue)
+            if not self._current(key, generation):
+                continue
+            await self._semaphore.acquire()
+            await self._limiter.acquire(self.WEIGHTS[key[1]])
+            SingleTask.run(self._poll, key, generation)
+
+    async def _poll(self, key, generation):
+        symbol, market_type = key
+        changed, error = False, None
+        try:
+            if market_type == const.MARKET_TYPE_ORDERBOOK:
+                changed, error = await self._poll_orderbook(symbol)
+            else:
+                changed, error = await self._poll_trades(symbol)
+        except Exception as e:
+            error = e
+        finally:
+            self._semaphore.release()
+        task = self._current(key, generation)
+        if not task:
+            return
+        task["polls"] += 1
+        if error:
+            task["errors"] += 1
+            logger.warn("poll error! symbol:", symbol, "market type:", market_type, "error:", error, caller=self)
+        if changed:
+            task["changes"] += 1
+            task["interval"] = max(self._min_interval, task["interval"] / 2)
+        else:
+            task["interval"] = min(self._max_interval, task["interval"] * 1.5)
+        self._schedule(key, max(self._min_interval, task["interval"] / task["priority"]))
+
+    async def _poll_orderbook(self, symbol):
+        orderbook, error = await self.fetch_orderbook(symbol)
+        if error:
+            return False, error
+        task = self._tasks.get((symbol, const.MARKET_TYPE_ORDERBOOK))
+        if not task:
+            return False, None
+        levels = (orderbook.asks, orderbook.bids)
+        if levels == task["last"]:
+            return False, None
+        task["last"] = levels
+        market_center.publish(const.MARKET_TYPE_ORDERBOOK, orderbook)
+        return True, None
+
+    async def _poll_trades(self, symbol):
+        trades, error = await self.fetch_trades(symbol)
+        if error:
+            return False, error
+        task = self._tasks.get((symbol, const.MARKET_TYPE_TRADE))
+        if not task or not trades:
+            return False, None
+        last = task["last"]
+        task["last"] = max(task["last"] or trades[-1][0], trades[-1][0])
+        if last is None:
+            return False, None
+        changed = False
+        for trade_id, trade in trades:
+            if trade_id > last:
+                market_center.publish(const.MARKET_TYPE_TRADE, trade)
+                changed = True
+        return changed, None
+
+    async def fetch_orderbook(self, symbol):
+        """Fetch the latest orderbook.
+
+        Args:
+            symbol: Symbol name, e.g. `ETH/BTC`.
+
+        Returns:
+            orderbook: Orderbook object.
+            error: Error information, otherwise it's None.
+        """
+        raise NotImplementedError
+
+    async def fetch_trades(self, symbol):
+        """Fetch the latest trades.
+
+        Args:
+            symbol: Symbol name, e.g. `ETH/BTC`.
+
+        Returns:
+            trades: Trades ordered by trade id, `[(trade id, Trade object), ...]`, trade id is int.
+            error: Error information, otherwise it's None.
+        """
+        raise NotImplementedError
@@ -0,0 +1,270 @@
+# -*- coding:utf-8 -*-
+
+"""
+Position module.
+
+Positions and PnL of every strategy and symbol are updated incrementally by the fills of order updates, and marked to
+the mid price of the live orderbook.
+
+Author: HuangTao
+Date:   2020/03/30
+Email:  huangtao@ifclover.com
+"""
+
+import copy
+import json
+
+from aioquant import const
+from aioquant.utils import tools
+from aioquant.tasks import SingleTask
+from aioquant.market import MarketSubscribe
+from aioquant.order import FillTracker, ORDER_ACTION_BUY, TRADE_TYPE_BUY_OPEN, TRADE_TYPE_SELL_OPEN, \
+    TRADE_TYPE_SELL_CLOSE, TRADE_TYPE_BUY_CLOSE
+
+__all__ = ("Position", "PositionEngine", "position_engine", )
+
+
+class _Mark:
+    """Mark price of a symbol, shared by the positions of all strategies."""
+
+    __slots__ = ("price", )
+
+    def __init__(self):
+        self.price = None
+
+
+class Position:
+    """Position object.
+
+    Attributes:
+        platform: Exchange platform name, e.g. `binance` / `bitmex`.
+        account: Trade account name, e.g. `demo@gmail.com`.
+        strategy: Strategy name, e.g. `my_strategy`.
+        symbol: Trade pair name, e.g. `ETH/BTC`.
+        short_quantity: Short position quantity.
+        short_avg_price: Short position average price.
+        long_quantity: Long position quantity.
+        long_avg_price: Long position average price.
+        liquid_price: Estimated liquidation price, None if unknown.
+        realized_pnl: Realized PnL, in quote currency.
+        fee: Total fee of the fills.
+        utime: Update timestamp(millisecond).
+
+    NOTE:
+        The quantities, prices and PnL are float. `unrealized_pnl` is computed by the mark price, the mid price of the
+        latest orderbook, it's None before the first orderbook.
+    """
+
+    def __init__(self, platform=None, account=None, strategy=None, symbol=None, mark=None):
+        """Initialize."""
+        self.platform = platform
+        self.account = account
+        self.strategy = strategy
+        self.symbol = symbol
+        self.short_quantity = 0
+        self.short_avg_price = 0
+        self.long_quantity = 0
+        self.long_avg_price = 0
+        self.liquid_price = None
+        self.realized_pnl = 0
+        self.fee = 0
+        self.utime = None
+        self._mark = mark or _Mark()
+
+    @property
+    def mark_price(self):
+        return self._mark.price
+
+    @property
+    def unrealized_pnl(self):
+        price = self._mark.price
+        if price is None:
+            return None
+        return self.long_quantity * (price - self.long_avg_price) + \
+            self.short_quantity * (self.short_avg_price - price)
+
+    def fill(self, action, trade_type, quantity, price):
+        """Apply a fill.
+
+        Args:
+            action: Trade direction, `BUY` or `SELL`.
+            trade_type: Trade type, if it's `TRADE_TYPE_NONE`, a fill closes the opposite position first, and the
+                rest opens the position of its direction.
+            quantity: Filled quantity, positive.
+            price: Filled price.
+        """
+        if trade_type == TRADE_TYPE_BUY_OPEN:
+            self._open_long(quantity, price)
+        elif trade_type == TRADE_TYPE_SELL_CLOSE:
+            self._close_long(quantity, price)
+        elif trade_type == TRADE_TYPE_SELL_OPEN:
+            self._open_short(quantity, price)
+        elif trade_type == TRADE_TYPE_BUY_CLOSE:
+            self._close_short(quantity, price)
+        elif action == ORDER_ACTION_BUY:
+            quantity -= self._close_short(quantity, price)
+            if quantity > 0:
+                self._open_long(quantity, price)
+        else:
+            quantity -= self._close_long(quantity, price)
+            if quantity > 0:
+                self._open_short(quantity, price)
+
+    def _open_long(self, quantity, price):
+        total = self.long_quantity + quantity
+        self.long_avg_price = (self.long_avg_price * self.long_quantity + price * quantity) / total
+        self.long_quantity = total
+
+    def _open_short(self, quantity, price):
+        total = self.short_quantity + quantity
+        self.short_avg_price = (self.short_avg_price * self.short_quantity + price * quantity) / total
+        self.short_quantity = total
+
+    def _close_long(self, quantity, price):
+        quantity = min(quantity, self.long_quantity)
+        self.realized_pnl += (price - self.long_avg_price) * quantity
+        self.long_quantity -= quantity
+        if self.long_quantity <= 1e-12:
+            self.long_quantity = self.long_avg_price = 0
+        return quantity
+
+    def _close_short(self, quantity, price):
+        quantity = min(quantity, self.short_quantity)
+        self.realized_pnl += (self.short_avg_price - price) * quantity
+        self.short_quantity -= quantity
+        if self.short_quantity <= 1e-12:
+            self.short_quantity = self.short_avg_price = 0
+        return quantity
+
+    @property
+    def data(self):
+        d = {
+            "platform": self.platform,
+            "account": self.account,
+            "strategy": self.strategy,
+            "symbol": self.symbol,
+            "short_quantity": self.short_quantity,
+            "short_avg_price": self.short_avg_price,
+            "long_quantity": self.long_quantity,
+            "long_avg_price": self.long_avg_price,
+            "liquid_price": self.liquid_price,
+            "realized_pnl": self.realized_pnl,
+            "unrealized_pnl": self.unrealized_pnl,
+            "mark_price": self.mark_price,
+            "fee": self.fee,
+            "utime": self.utime
+        }
+        return d
+
+    def __str__(self):
+        info = json.dumps(self.data)
+        return info
+
+    def __repr__(self):
+        return str(self)
+
+
+class PositionEngine:
+    """Position engine, update the positions of every strategy and symbol by order updates.
+
+    NOTE:
+        Every order update is applied in O(1), the new fill since the last update of the order is got by `FillTracker`.
+        The positions are the fills since the process started.
+
+        The mark prices are updated by the orderbooks of the symbols subscribed by `watch`, they are shared by all the
+        strategies, so a orderbook update costs O(1) too.
+    """
+
+    def __init__(self):
+        self._positions = {}  # Positions. `{(strategy, platform, account, symbol): Position}`
+        self._strategies = {}  # Positions of every strategy. `{strategy: [Position, ...]}`
+        self._fills = FillTracker()  # Filled state of open orders.
+        self._marks = {}  # Mark prices. `{(platform, symbol): _Mark}`
+        self._watched = set()  # Symbols subscribed orderbook. `{(platform, symbol)}`
+        self._callbacks = {}  # Subscribers. `{(strategy, platform, account, symbol): [callback, ...]}`
+
+    def get(self, strategy, platform, account, symbol):
+        """Get the position of a strategy and symbol, create it if not exists.
+
+        Args:
+            strategy: Strategy name, e.g. `my_strategy`.
+            platform: Exchange platform name, e.g. `binance` / `okex` / `huobi`.
+            account: Trade account name, e.g. `demo@gmail.com`.
+            symbol: Trade pair name, e.g. `ETH/BTC`.
+
+        Returns:
+            position: Position object.
+        """
+        key = (strategy, platform, account, symbol)
+        position = self._positions.get(key)
+        if not position:
+            mark = self._marks.setdefault((platform, symbol), _Mark())
+            position = self._positions[key] = Position(platform, account, strategy, symbol, mark)
+            self._strategies.setdefault(strategy, []).append(position)
+        return position
+
+    def subscribe(self, strategy, platform, account, symbol, callback):
+        """Subscribe position updates.
+
+        Args:
+            strategy: Strategy name, e.g. `my_strategy`.
+            platform: Exchange platform name, e.g. `binance` / `okex` / `huobi`.
+            account: Trade account name, e.g. `demo@gmail.com`.
+            symbol: Trade pair name, e.g. `ETH/BTC`.
+            callback: Asynchronous callback function, e.g. `async def on_event_position_update(position): pass`.
+        """
+        self._callbacks.setdefault((strategy, platform, account, symbol), []).append(callback)
+
+    def watch(self, platform, symbol):
+        """Subscribe the orderbook of a symbol to update the mark price."""
+        if (platform, symbol) in self._watched:
+            return
+        self._watched.add((platform, symbol))
+        self._marks.setdefault((platform, symbol), _Mark())
+        MarketSubscribe(const.MARKET_TYPE_ORDERBOOK, platform, symbol, self.on_orderbook)
+
+    async def on_orderbook(self, orderbook):
+        mark = self._marks.get((orderbook.platform, orderbook.symbol))
+        if mark:
+            mark.price = orderbook.mid_price
+
+    async def on_order_update(self, order):
+        """Update the position by an order update.
+
+        Args:
+            order: Order object.
+        """
+        if not order.order_id:
+            return
+        delta = self._fills.delta(order)
+        if delta:
+            quantity, price, fee = delta
+            position = self.get(order.strategy, order.platform, order.account, order.symbol)
+            position.fill(order.action, order.trade_type, quantity, price)
+            position.fee += fee
+            position.utime = order.utime or tools.get_cur_timestamp_ms()
+            self._publish(position)
+
+    def _publish(self, position):
+        callbacks = self._callbacks.get((position.strategy, position.platform, position.account, position.symbol))
+        if not callbacks:
+            return
+        for callback in callbacks:
+            SingleTask.run(callback, copy.copy(position))
+
+    def snapshot(self, strategies=None):
+        """Snapshot the positions of many strategies.
+
+        Args:
+            strategies: Strategy name list, default is all the strategies.
+
+        Returns:
+            positions: `{strategy: [position data, ...]}`, see `Position.data`.
+        """
+        if strategies is None:
+            strategies = list(self._strategies)
+        return {strategy: [position.data for position in self._strategies.get(strategy, [])]
+                for strategy in strategies}
+
+
+position_engine = PositionEngine()
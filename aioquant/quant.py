@@ -14,6 +14,9 @@ import inspect
 
 from aioquant.utils import logger
 from aioquant.configure import config
+from aioquant.storage import StorageWriter
+from aioquant.journal import OrderJournal
+from aioquant.recorder import PartitionWriter
 
 
 class AIOQuant:
@@ -26,8 +29,8 @@ class AIOQuant:
 
     def _initialize(self, config_file):
         """Initialize."""
-        self._get_event_loop()
         self._load_settings(config_file)
+        self._get_event_loop()
         self._init_logger()
         self._do_heartbeat()
         return self
@@ -45,20 +48,49 @@ class AIOQuant:
                 self.loop.create_task(entrance_func())
             else:
                 entrance_func()
+        if config.backtest:
+            from aioquant.backtest import backtest
+            backtest.start()
 
         logger.info("start io loop ...", caller=self)
         self.loop.run_forever()
 
     def stop(self) -> None:
-        """Stop the event loop."""
+        """Stop the event loop, the market data recorders, storage writers and order journals are flushed and closed
+        before that."""
         logger.info("stop io loop.", caller=self)
         # TODO: clean up running coroutine
+        try:
+            PartitionWriter.close_all()
+        except Exception as e:
+            logger.error("close recorder error:", e, caller=self)
+        if (StorageWriter.writers or OrderJournal.journals) and self.loop.is_running():
+            self.loop.create_task(self._close_storage())
+        else:
+            self.loop.stop()
+
+    async def _close_storage(self) -> None:
+        """Flush and close all storage writers and order journals, then stop the event loop."""
+        try:
+            await StorageWriter.close_all()
+        except Exception as e:
+            logger.error("close storage error:", e, caller=self)
+        try:
+            await OrderJournal.close_all()
+        except Exception as e:
+            logger.error("close order journal error:", e, caller=self)
         self.loop.stop()
 
     def _get_event_loop(self) -> asyncio.events.get_event_loop():
         """Get a main io loop."""
         if not self.loop:
-            self.loop = asyncio.get_event_loop()
+            if config.backtest:
+                # Backtest runs on a virtual clock.
+                from aioquant.backtest import backtest
+                self.loop = backtest.create_event_loop()
+                asyncio.set_event_loop(self.loop)
+            else:
+                self.loop = asyncio.get_event_loop()
         return self.loop
 
     def _load_settings(self, config_module) -> None:
@@ -0,0 +1,223 @@
+# -*- coding:utf-8 -*-
+
+"""
+Open order reconciliation.
+
+Author: HuangTao
+Date:   2020/03/31
+Email:  huangtao@ifclover.com
+"""
+
+import asyncio
+
+from aioquant.utils import tools
+from aioquant.utils import logger
+from aioquant.tasks import LoopRunTask
+from aioquant.utils.ratelimit import RateLimiter
+
+__all__ = ("OrderReconciler", )
+
+
+class OrderReconciler:
+    """Open order reconciler of an account, diff the local open orders of every symbol against the open orders on
+    Exchange periodically, and correct the local orders through the order state machine of the platform Trade object,
+    so the corrected orders are pushed by the normal order update callbacks. Every platform should inherit this class
+    and implement `fetch_open_orders`, `fetch_order`, `parse` and `apply`.
+
+    Attributes:
+        account: Trade account name, e.g. `demo@gmail.com`.
+        interval: Interval(seconds) to reconcile, default is 60.
+        rate: Maximum query requests per second, default is `RATE` of the platform.
+        concurrency: Maximum concurrent requests, default is 5.
+
+    NOTE:
+        The open orders of all symbols are queried concurrently within the rate budget. An order is corrected only if
+        it's missing locally or its status or remain quantity differs. The details are queried only for the local open
+        orders that are not open on Exchange any more, the orders created after the query started are skipped, and
+        so are the orders finalized by order updates while querying, the response is stale for them.
+    """
+
+    PLATFORM = None  # Platform name.
+    RATE = 5  # Default query requests per second.
+
+    reconcilers = {}  # Reconcilers of every platform and account. `{(platform, account): reconciler}`
+
+    @classmethod
+    def instance(cls, account, **kwargs):
+        """Get the reconciler of an account, create it if not exists."""
+        key = (cls.PLATFORM, account)
+        if key not in cls.reconcilers:
+            cls.reconcilers[key] = cls(account, **kwargs)
+        return cls.reconcilers[key]
+
+    def __init__(self, account, interval=60, rate=None, concurrency=5):
+        """Initialize."""
+        self._account = account
+        self._limiter = RateLimiter(rate or self.RATE)
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._trades = {}  # Platform Trade objects of every symbol. `{symbol: [trade, ...]}`
+        self._running = False
+
+        self._rounds = 0
+        self._requests = 0
+        self._corrected = 0
+        self._last_time = None  # Last reconcile time cost, millisecond.
+
+        LoopRunTask.register(self.reconcile, interval)
+
+    @property
+    def stats(self):
+        """Statistics, `{"symbols": ..., "rounds": ..., "requests": ..., "corrected": ..., "last_time": ...}`."""
+        return {
+            "symbols": len(self._trades),
+            "rounds": self._rounds,
+            "requests": self._requests,
+            "corrected": self._corrected,
+            "last_time": self._last_time
+        }
+
+    def register(self, symbol, trade):
+        """Register a platform Trade object, its open orders will be reconciled.
+
+        Args:
+            symbol: Symbol name, e.g. `ETH/BTC`.
+            trade: Platform Trade object, e.g. `BinanceTrade`.
+        """
+        self._trades.setdefault(symbol, []).append(trade)
+
+    async def reconcile(self, *args, **kwargs):
+        """Reconcile the open orders of all symbols."""
+        if self._running:
+            return
+        self._running = True
+        start = tools.get_cur_timestamp_ms()
+        try:
+            await asyncio.gather(*[self._reconcile_symbol(symbol, trades)
+                                   for symbol, trades in list(self._trades.items())])
+        finally:
+            self._running = False
+        self._rounds += 1
+        self._last_time = tools.get_cur_timestamp_ms() - start
+
+    async def _request(self, func, *args):
+        async with self._semaphore:
+            await self._limiter.acquire()
+            self._requests += 1
+            return await func(*args)
+
+    async def _reconcile_symbol(self, symbol, trades):
+        start = tools.get_cur_timestamp_ms()
+        # Local open orders when the query started, the ones not open locally any more when the response received are
+        # finalized by order updates in the meantime, they must not be recreated by the stale response.
+        opened = [set(trade.orders) for trade in trades]
+        infos, error = await self._request(self.fetch_open_orders, trades[0])
+        if error:
+            logger.error("get open orders error! platform:", self.PLATFORM, "symbol:", symbol, "error:", error,
+                         caller=self)
+            return
+        remote = {}
+        for info in infos:
+            order_id, status, remain = self.parse(info)
+            remote[order_id] = (info, status, remain)
+
+        missing = {}  # Local open orders not open on Exchange. `{order_id: (order, [trade, ...])}`
+        for trade, before in zip(trades, opened):
+            local = dict(trade.orders)
+            for order_id, (info, status, remain) in remote.items():
+                if not status:
+                    continue
+                order = local.get(order_id)
+                if not order and order_id in before:
+                    continue
+                if not order or order.status != status or abs(float(order.remain) - remain) > 1e-12:
+                    self._correct(symbol, trade, info)
+            for order_id, order in local.items():
+                if order_id not in remote and (order.ctime or 0) < start:
+                    missing.setdefault(order_id, (order, []))[1].append(trade)
+
+        results = await asyncio.gather(*[self._request(self.fetch_order, trades[0], order)
+                                         for order, _ in missing.values()])
+        for (order, items), (info, error) in zip(missing.values(), results):
+            if error:
+                logger.error("get order status error! platform:", self.PLATFORM, "order_id:", order.order_id,
+                             "error:", error, caller=self)
+                continue
+            for trade in items:
+                # Skip the order finalized by order updates while querying.
+                if order.order_id in trade.orders:
+                    self._correct(symbol, trade, info)
+
+    async def reconcile_orders(self, symbol, trade, orders):
+        """Reconcile some local orders by their details, e.g. the non-terminal orders restored from the order journal.
+
+        Args:
+            symbol: Symbol name, e.g. `ETH/BTC`.
+            trade: Platform Trade object.
+            orders: Local Order object list.
+
+        Returns:
+            failed: Orders failed to query, e.g. the orders never acknowledged by Exchange.
+        """
+        results = await asyncio.gather(*[self._request(self.fetch_order, trade, order) for order in orders])
+        failed = []
+        for order, (info, error) in zip(orders, results):
+            if error:
+                logger.error("get order status error! platform:", self.PLATFORM, "order_id:", order.order_id,
+                             "client_order_id:", order.client_order_id, "error:", error, caller=self)
+                failed.append(order)
+                continue
+            # Skip the order finalized by order updates while querying.
+            if order.order_id:
+                still_open = order.order_id in trade.orders
+            else:
+                still_open = order.client_order_id in trade.pending_orders
+            if still_open:
+                self._correct(symbol, trade, info)
+        return failed
+
+    def _correct(self, symbol, trade, info):
+        logger.info("correct order. platform:", self.PLATFORM, "symbol:", symbol, "info:", info, caller=self)
+        self._corrected += 1
+        self.apply(trade, info)
+
+    async def fetch_open_orders(self, trade):
+        """Fetch the open orders of a symbol.
+
+        Args:
+            trade: Platform Trade object.
+
+        Returns:
+            infos: Open order information list from Exchange.
+            error: Error information, otherwise it's None.
+        """
+        raise NotImplementedError
+
+    async def fetch_order(self, trade, order):
+        """Fetch the details of an order.
+
+        Args:
+            trade: Platform Trade object.
+            order: Local Order object, the order id is None if it's not acknowledged, query it by client order id.
+
+        Returns:
+            info: Order information from Exchange.
+            error: Error information, otherwise it's None.
+        """
+        raise NotImplementedError
+
+    def parse(self, info):
+        """Parse order information.
+
+        Args:
+            info: Order information from Exchange.
+
+        Returns:
+            order_id: Order id, string.
+            status: Order status, e.g. `SUBMITTED`, None if the order should not be corrected, e.g. being canceled.
+            remain: Remain quantity, float.
+        """
+        raise NotImplementedError
+
+    def apply(self, trade, info):
+        """Update the order of a platform Trade object by order information from Exchange."""
+        raise NotImplementedError
@@ -0,0 +1,281 @@
+# -*- coding:utf-8 -*-
+
+"""
+Market data recorder.
+
+Subscribe market data and save them to append-only columnar block files, partitioned by platform, symbol, market
+type and UTC day, e.g. `{path}/binance/ETH_BTC/orderbook/20200318/`. Every partition can be read as NumPy arrays by
+`aioquant.utils.columnar.read_blocks`, or replayed in backtest.
+
+Author: HuangTao
+Date:   2020/03/19
+Email:  huangtao@ifclover.com
+"""
+
+import os
+import math
+import datetime
+
+from aioquant import const
+from aioquant.utils import logger
+from aioquant.tasks import LoopRunTask
+from aioquant.history import KLINE_INTERVALS
+from aioquant.market import Orderbook, Trade, Kline, MarketSubscribe
+from aioquant.order import ORDER_ACTION_BUY, ORDER_ACTION_SELL
+from aioquant.utils.columnar import BlockColumnWriter, read_blocks, KLINE_COLUMNS, TRADE_COLUMNS, orderbook_columns
+
+__all__ = ("Recorder", "PartitionWriter", "read_recorded", "partition_path", )
+
+
+DAY_MS = 24 * 60 * 60 * 1000
+READ_SLICE = 4096  # Rows converted to Python objects at a time when reading.
+
+
+def partition_path(path, platform, symbol, market_type, day=None):
+    """Directory of a partition.
+
+    Args:
+        path: Root directory of recorded data.
+        platform: Exchange platform name, e.g. `binance` / `okex` / `huobi`.
+        symbol: Trade pair name, e.g. `ETH/BTC`.
+        market_type: Market data type, e.g. `orderbook` / `trade` / `kline`.
+        day: UTC day, e.g. `20200318`, default is the market type directory that contains all the days.
+
+    Returns:
+        path: Partition directory.
+    """
+    path = os.path.join(path, platform, symbol.replace("/", "_"), market_type)
+    if day:
+        path = os.path.join(path, day)
+    return path
+
+
+def _day(ts):
+    """UTC day of the timestamp(millisecond), e.g. `20200318`."""
+    return datetime.datetime.utcfromtimestamp(ts // 1000).strftime("%Y%m%d")
+
+
+class PartitionWriter:
+    """Write market data to partitions, a new partition is opened when UTC day changed.
+
+    Attributes:
+        path: Root directory to save recorded data.
+        orderbook_length: Orderbook levels of each side to be saved, default is 10.
+        block_size: How many rows in a block, default is 4096.
+        compress: Compression of blocks, `zlib` or None, default is `zlib`.
+
+    NOTE:
+        All the writers with opened partitions are closed, that is the buffered rows are saved, when `AIOQuant`
+        stopped.
+    """
+
+    writers = []  # All the writers with opened partitions.
+
+    @classmethod
+    def close_all(cls):
+        """Close all the writers."""
+        for writer in list(cls.writers):
+            writer.close()
+
+    def __init__(self, path, orderbook_length=10, block_size=4096, compress="zlib"):
+        """Initialize."""
+        self._path = path
+        self._orderbook_length = orderbook_length
+        self._block_size = block_size
+        self._compress = compress
+        self._writers = {}  # Writers of the current partitions. `{(platform, symbol, market_type): (day, writer)}`
+        self._count = 0  # Total rows written.
+
+    @property
+    def count(self):
+        return self._count
+
+    @property
+    def partitions(self):
+        """Written partitions, `[(platform, symbol, market_type), ...]`."""
+        return list(self._writers.keys())
+
+    def write(self, market_type, data):
+        """Write market data.
+
+        Args:
+            market_type: Market data type, e.g. `orderbook` / `trade` / `kline`.
+            data: Market data object, `Orderbook` / `Trade` / `Kline`.
+        """
+        if market_type == const.MARKET_TYPE_ORDERBOOK:
+            length = self._orderbook_length
+            row = [data.timestamp]
+            for levels in (data.asks, data.bids):
+                levels = levels[:length]
+                pad = [math.nan] * (length - len(levels))
+                row.extend([float(level[0]) for level in levels] + pad)
+                row.extend([float(level[1]) for level in levels] + pad)
+            ts = data.timestamp
+        elif market_type == const.MARKET_TYPE_TRADE:
+            action = 1 if data.action == ORDER_ACTION_BUY else -1
+            row = [data.timestamp, action, float(data.price), float(data.quantity)]
+            ts = data.timestamp
+        else:
+            row = [data.timestamp, float(data.open), float(data.high), float(data.low), float(data.close),
+                   float(data.volume)]
+            ts = data.timestamp + KLINE_INTERVALS.get(market_type, 0)
+
+        key = (data.platform, data.symbol, market_type)
+        day = _day(ts)
+        current = self._writers.get(key)
+        if not current or current[0] != day:
+            if current:
+                current[1].close()
+            writer = BlockColumnWriter(partition_path(self._path, data.platform, data.symbol, market_type, day),
+                                       self._columns(market_type), self._block_size, self._compress)
+            current = self._writers[key] = (day, writer)
+            if self not in PartitionWriter.writers:
+                PartitionWriter.writers.append(self)
+            logger.info("write to:", writer.path, caller=self)
+        current[1].append(row)
+        self._count += 1
+
+    def _columns(self, market_type):
+        if market_type == const.MARKET_TYPE_ORDERBOOK:
+            return orderbook_columns(self._orderbook_length)
+        elif market_type == const.MARKET_TYPE_TRADE:
+            return TRADE_COLUMNS
+        else:
+            return KLINE_COLUMNS
+
+    def flush(self):
+        """Save buffered rows of all partitions."""
+        for _, writer in self._writers.values():
+            writer.flush()
+
+    def close(self):
+        """Save all buffered rows and close all partitions."""
+        for _, writer in self._writers.values():
+            writer.close()
+        self._writers = {}
+        if self in PartitionWriter.writers:
+            PartitionWriter.writers.remove(self)
+
+
+class Recorder:
+    """Market data recorder.
+
+    Attributes:
+        path: Root directory to save recorded data.
+        platform: Exchange platform name, e.g. `binance` / `okex` / `huobi`.
+        symbols: Symbol name list, e.g. `["ETH/BTC"]`.
+        market_types: Market data types to be recorded, default is `["orderbook", "trade", "kline"]`.
+        orderbook_length: Orderbook levels of each side to be saved, default is 10.
+        block_size: How many rows in a block, default is 4096.
+        compress: Compression of blocks, `zlib` or None, default is `zlib`.
+        flush_interval: Interval(seconds) to flush buffered rows to disk, default is 60.
+
+    Usage:
+        recorder = Recorder("data", const.BINANCE, ["ETH/BTC"])
+        ...
+        recorder.close()
+
+    NOTE:
+        Kline is saved in its close time partition, and Orderbook / Trade / Kline objects read back contain float
+        prices and quantities. The recorder is closed by `PartitionWriter.close_all` when `AIOQuant` stopped.
+    """
+
+    def __init__(self, path, platform, symbols, market_types=None, orderbook_length=10, block_size=4096,
+                 compress="zlib", flush_interval=60):
+        """Initialize."""
+        self._platform = platform
+        self._symbols = symbols
+        self._market_types = market_types or [const.MARKET_TYPE_ORDERBOOK, const.MARKET_TYPE_TRADE,
+                                              const.MARKET_TYPE_KLINE]
+        self._writer = PartitionWriter(path, orderbook_length, block_size, compress)
+
+        for symbol in self._symbols:
+            for market_type in self._market_types:
+                if market_type == const.MARKET_TYPE_ORDERBOOK:
+                    MarketSubscribe(market_type, self._platform, symbol, self.on_event_orderbook_update)
+                elif market_type == const.MARKET_TYPE_TRADE:
+                    MarketSubscribe(market_type, self._platform, symbol, self.on_event_trade_update)
+                elif market_type.startswith(const.MARKET_TYPE_KLINE):
+                    MarketSubscribe(market_type, self._platform, symbol, self.on_event_kline_update)
+                else:
+                    logger.error("market type error:", market_type, caller=self)
+        LoopRunTask.register(self._flush_all, flush_interval)
+
+    @property
+    def count(self):
+        return self._writer.count
+
+    async def on_event_orderbook_update(self, orderbook: Orderbook):
+        self._writer.write(const.MARKET_TYPE_ORDERBOOK, orderbook)
+
+    async def on_event_trade_update(self, trade: Trade):
+        self._writer.write(const.MARKET_TYPE_TRADE, trade)
+
+    async def on_event_kline_update(self, kline: Kline):
+        self._writer.write(kline.kline_type, kline)
+
+    async def _flush_all(self, *args, **kwargs):
+        self._writer.flush()
+
+    def close(self):
+        """Save all buffered rows and close all partitions."""
+        self._writer.close()
+
+
+def read_recorded(path, platform, symbol, market_type, start=None, end=None):
+    """Read recorded market data.
+
+    Args:
+        path: Root directory of recorded data.
+        platform: Exchange platform name, e.g. `binance` / `okex` / `huobi`.
+        symbol: Trade pair name, e.g. `ETH/BTC`.
+        market_type: Market data type, e.g. `orderbook` / `trade` / `kline`.
+        start: Start timestamp(millisecond), included, default is the beginning of data.
+        end: End timestamp(millisecond), excluded, default is the end of data.
+
+    Yields:
+        (event time, market type, market data object), same as `aioquant.backtest.read_market_data`.
+    """
+    root = partition_path(path, platform, symbol, market_type)
+    if not os.path.isdir(root):
+        logger.warn("no recorded data:", root)
+        return
+    interval = KLINE_INTERVALS.get(market_type, 0)
+    for day in sorted(os.listdir(root)):
+        day_start = int(datetime.datetime.strptime(day, "%Y%m%d").replace(
+            tzinfo=datetime.timezone.utc).timestamp() * 1000)
+        if start and day_start + DAY_MS + interval <= start:
+            continue
+        if end and day_start - interval >= end:
+            break
+        columns = read_blocks(os.path.join(root, day), start=start, end=end)
+        # Rows are converted to Python objects slice by slice, the column arrays of a day are memory-mapped, or
+        # decompressed, and not converted to lists as a whole.
+        count = len(columns["timestamp"])
+        for i in range(0, count, READ_SLICE):
+            chunk = {name: column[i: i + READ_SLICE].tolist() for name, column in columns.items()}
+            yield from _rows(platform, symbol, market_type, interval, chunk)
+
+
+def _rows(platform, symbol, market_type, interval, columns):
+    """Yield market data objects of a slice of rows, columns are lists."""
+    timestamps = columns["timestamp"]
+    if market_type == const.MARKET_TYPE_ORDERBOOK:
+        names = list(columns.keys())
+        length = (len(names) - 1) // 4
+        values = [columns[name] for name in names[1:]]
+        ask_prices, ask_quantities = values[:length], values[length: 2 * length]
+        bid_prices, bid_quantities = values[2 * length: 3 * length], values[3 * length:]
+        for i, ts in enumerate(timestamps):
+            asks = [[p[i], q[i]] for p, q in zip(ask_prices, ask_quantities) if not math.isnan(p[i])]
+            bids = [[p[i], q[i]] for p, q in zip(bid_prices, bid_quantities) if not math.isnan(p[i])]
+            yield ts, market_type, Orderbook(platform, symbol, asks, bids, ts)
+    elif market_type == const.MARKET_TYPE_TRADE:
+        rows = zip(timestamps, columns["action"], columns["price"], columns["quantity"])
+        for ts, action, price, quantity in rows:
+            action = ORDER_ACTION_BUY if action > 0 else ORDER_ACTION_SELL
+            yield ts, market_type, Trade(platform, symbol, action, price, quantity, ts)
+    else:
+        rows = zip(timestamps, *[columns[name] for name, _ in KLINE_COLUMNS[1:]])
+        for ts, o, h, l, c, v in rows:
+            yield ts + interval, market_type, Kline(platform, symbol, o, h, l, c, v, ts, market_type)
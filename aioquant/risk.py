@@ -0,0 +1,313 @@
+# -*- coding:utf-8 -*-
+
+"""
+Pre-trade risk check.
+
+Every order is checked in the order path before the request goes out, the limits are precomputed per symbol and the
+open orders, exposure and position counters are maintained incrementally by order updates, so a check costs a few
+float comparisons only.
+
+Author: HuangTao
+Date:   2020/03/29
+Email:  huangtao@ifclover.com
+"""
+
+import collections
+
+from aioquant import const
+from aioquant.error import Error
+from aioquant.utils import tools
+from aioquant.utils import logger
+from aioquant.configure import config
+from aioquant.market import MarketSubscribe
+from aioquant.order import ORDER_ACTION_BUY
+
+__all__ = ("RiskLimits", "RiskEngine", )
+
+
+class RiskLimits:
+    """Risk limits of a symbol, 0 means no limit.
+
+    Attributes:
+        max_notional: Maximum notional(price * quantity) of an order, in quote currency.
+        max_open_orders: Maximum open orders.
+        max_position: Maximum net position in base currency, long or short, including the open orders on the same side.
+        max_exposure: Maximum notional of all the open orders, in quote currency.
+        price_band: Maximum deviation ratio of order price from the mid price of the last orderbook, e.g. 0.05.
+    """
+
+    __slots__ = ("max_notional", "max_open_orders", "max_position", "max_exposure", "price_band", )
+
+    def __init__(self, max_notional=0, max_open_orders=0, max_position=0, max_exposure=0, price_band=0):
+        """Initialize."""
+        self.max_notional = float(max_notional)
+        self.max_open_orders = int(max_open_orders)
+        self.max_position = float(max_position)
+        self.max_exposure = float(max_exposure)
+        self.price_band = float(price_band)
+
+    @property
+    def data(self):
+        return {key: getattr(self, key) for key in self.__slots__}
+
+
+class _SymbolRisk:
+    """Risk state of a symbol."""
+
+    __slots__ = ("limits", "orders", "open_orders", "open_notional", "open_buy", "open_sell", "position", "mid", )
+
+    def __init__(self, limits):
+        self.limits = limits
+        self.orders = {}  # Open orders. `{order_id: [buy, price, remain, filled]}`
+        self.open_orders = 0  # Open orders, including the orders being created.
+        self.open_notional = 0  # Notional of open orders.
+        self.open_buy = 0  # Remain quantity of open BUY orders.
+        self.open_sell = 0  # Remain quantity of open SELL orders.
+        self.position = 0  # Net position filled in this process.
+        self.mid = None  # Mid price of the last orderbook.
+
+    def add(self, entry, sign):
+        """Add an open order entry to the counters, `sign` is 1 to add and -1 to remove."""
+        self.open_orders += sign
+        if not self.open_orders:  # Clear the float error.
+            self.open_notional = self.open_buy = self.open_sell = 0
+        elif entry[0]:
+            self.open_notional += sign * entry[1] * entry[2]
+            self.open_buy += sign * entry[2]
+        else:
+            self.open_notional += sign * entry[1] * entry[2]
+            self.open_sell += sign * entry[2]
+
+
+class RiskEngine:
+    """Pre-trade risk engine of an account.
+
+    Attributes:
+        platform: Exchange platform name, e.g. `binance` / `okex` / `huobi`.
+        account: Trade account name, e.g. `demo@gmail.com`.
+        max_order_rate: Maximum orders per second of the account, 0 means no limit.
+        limits: Default risk limits of every symbol, `dict` of `RiskLimits` params.
+        symbols: Risk limits of some symbols, override the default limits, e.g. `{"ETH/BTC": {"max_notional": 1}}`.
+        kill_switch: If reject all the orders from start, default is False.
+
+    Usage:
+        engine = RiskEngine.instance(const.BINANCE, "demo@gmail.com")
+        ticket, error = engine.check("ETH/BTC", ORDER_ACTION_BUY, price, quantity)
+        if not error:
+            order_id, error = await trader.create_order(...)
+            engine.confirm("ETH/BTC", ticket, order_id)
+
+    NOTE:
+        An order passed the check is counted as open immediately, until `confirm` is called with the created order id,
+        so concurrent orders can not exceed the limits. The open orders are tracked by order updates, the fills change
+        the position, it's the net position filled since the process started.
+
+        If the price band is set, the orderbook of the symbol should be subscribed by `watch`, orders are rejected
+        before the first orderbook received.
+    """
+
+    MAX_FINALS = 10000  # Number of final order ids kept to drop the late confirmations.
+
+    engines = {}  # Engines of every platform and account. `{(platform, account): engine}`
+
+    @classmethod
+    def instance(cls, platform, account):
+        """Get the risk engine of an account, create it by config `RISK.<platform>` if not exists."""
+        key = (platform, account)
+        if key not in cls.engines:
+            cls.engines[key] = cls(platform, account, **config.risk.get(platform, {}))
+        return cls.engines[key]
+
+    @classmethod
+    def kill_all(cls, reason):
+        """Turn on the kill switch of all the engines."""
+        for engine in cls.engines.values():
+            engine.kill(reason)
+
+    def __init__(self, platform, account, max_order_rate=0, symbols=None, kill_switch=False, **limits):
+        """Initialize."""
+        self._platform = platform
+        self._account = account
+        self._max_order_rate = float(max_order_rate)
+        self._default_limits = limits
+        self._symbol_limits = symbols or {}
+        self._killed = "kill switch in config" if kill_switch else None
+
+        self._tokens = self._max_order_rate  # Order rate token bucket, the capacity is one second of orders.
+        self._last = tools.get_cur_timestamp_ms()
+        self._symbols = {}  # Risk state of every symbol. `{symbol: _SymbolRisk}`
+        self._watched = set()
+        self._finals = collections.deque()  # Latest final order ids.
+        self._final_set = set()
+        self._rejects = 0
+
+    @property
+    def killed(self):
+        """Reason of the kill switch, None if it's off."""
+        return self._killed
+
+    @property
+    def rejects(self):
+        return self._rejects
+
+    def kill(self, reason):
+        """Turn on the kill switch, all the following orders will be rejected."""
+        self._killed = reason or "killed"
+        logger.warn("risk kill switch on! platform:", self._platform, "account:", self._account, "reason:", reason,
+                    caller=self)
+
+    def resume(self):
+        """Turn off the kill switch."""
+        self._killed = None
+        logger.info("risk kill switch off. platform:", self._platform, "account:", self._account, caller=self)
+
+    def limits(self, symbol):
+        """Risk limits of a symbol."""
+        return self._state(symbol).limits
+
+    def stats(self, symbol):
+        """Risk counters of a symbol, `{"open_orders": ..., "open_notional": ..., "open_buy": ..., "open_sell": ...,
+        "position": ..., "mid": ...}`."""
+        s = self._state(symbol)
+        return {
+            "open_orders": s.open_orders,
+            "open_notional": s.open_notional,
+            "open_buy": s.open_buy,
+            "open_sell": s.open_sell,
+            "position": s.position,
+            "mid": s.mid
+        }
+
+    def _state(self, symbol):
+        s = self._symbols.get(symbol)
+        if not s:
+            limits = dict(self._default_limits)
+            limits.update(self._symbol_limits.get(symbol, {}))
+            s = self._symbols[symbol] = _SymbolRisk(RiskLimits(**limits))
+        return s
+
+    def watch(self, symbol):
+        """Subscribe the orderbook of a symbol for the price band check, if the price band is set."""
+        if symbol in self._watched or not self._state(symbol).limits.price_band:
+            return
+        self._watched.add(symbol)
+        MarketSubscribe(const.MARKET_TYPE_ORDERBOOK, self._platform, symbol, self.on_orderbook)
+
+    async def on_orderbook(self, orderbook):
+        s = self._symbols.get(orderbook.symbol)
+        if s:
+            s.mid = orderbook.mid_price
+
+    def check(self, symbol, action, price, quantity, replacing=None):
+        """Check an order, and count it as open if passed.
+
+        Args:
+            symbol: Symbol name, e.g. `ETH/BTC`.
+            action: Trade direction, `BUY` or `SELL`.
+            price: Order price, the mid price is used if it's 0 or None, e.g. a market order.
+            quantity: Order quantity.
+            replacing: Order id to be replaced by this order, the old order is not counted as open in this check.
+
+        Returns:
+            ticket: Ticket of the order to be confirmed by `confirm`, None if rejected.
+            error: Error information if rejected, otherwise it's None.
+        """
+        if self._killed:
+            return self._reject("kill switch on: {}".format(self._killed))
+        s = self._state(symbol)
+        limits = s.limits
+        buy = action == ORDER_ACTION_BUY
+        price = float(price or 0) or s.mid or 0
+        quantity = float(quantity)
+        notional = price * quantity
+        open_orders, open_notional, open_buy, open_sell = s.open_orders, s.open_notional, s.open_buy, s.open_sell
+        entry = s.orders.get(replacing) if replacing else None
+        if entry:
+            open_orders -= 1
+            open_notional -= entry[1] * entry[2]
+            if entry[0]:
+                open_buy -= entry[2]
+            else:
+                open_sell -= entry[2]
+
+        if limits.max_notional and notional > limits.max_notional:
+            return self._reject("notional greater than max notional: {} > {}".format(notional, limits.max_notional))
+        if limits.price_band:
+            if not s.mid:
+                return self._reject("no orderbook for price band check")
+            if abs(price - s.mid) > s.mid * limits.price_band:
+                return self._reject("price out of band: {} mid: {}".format(price, s.mid))
+        if limits.max_open_orders and open_orders >= limits.max_open_orders:
+            return self._reject("open orders reach max open orders: {}".format(limits.max_open_orders))
+        if limits.max_position:
+            if buy:
+                position = s.position + open_buy + quantity
+            else:
+                position = open_sell + quantity - s.position
+            if position > limits.max_position:
+                return self._reject("position greater than max position: {} > {}".format(position,
+                                                                                          limits.max_position))
+        if limits.max_exposure and open_notional + notional > limits.max_exposure:
+            return self._reject("exposure greater than max exposure: {} > {}".format(open_notional + notional,
+                                                                                      limits.max_exposure))
+        if self._max_order_rate:
+            now = tools.get_cur_timestamp_ms()
+            self._tokens = min(self._max_order_rate, self._tokens + (now - self._last) * self._max_order_rate / 1000)
+            self._last = now
+            if self._tokens < 1:
+                return self._reject("order rate greater than max order rate: {}".format(self._max_order_rate))
+            self._tokens -= 1
+
+        ticket = [buy, price, quantity, 0]
+        s.add(ticket, 1)
+        return ticket, None
+
+    def _reject(self, reason):
+        self._rejects += 1
+        return None, Error("risk check failed: {}".format(reason))
+
+    def confirm(self, symbol, ticket, order_id):
+        """Confirm the order of a ticket is created or not.
+
+        Args:
+            symbol: Symbol name, e.g. `ETH/BTC`.
+            ticket: Ticket returned by `check`.
+            order_id: Order id if the order is created, otherwise it's None.
+        """
+        s = self._symbols[symbol]
+        if order_id and order_id not in s.orders and order_id not in self._final_set:
+            s.orders[order_id] = ticket
+        else:
+            s.add(ticket, -1)
+
+    async def on_order_update(self, order):
+        """Update the open orders and position by an order update.
+
+        Args:
+            order: Order object.
+        """
+        if not order.order_id:
+            return
+        s = self._state(order.symbol)
+        remain = float(order.remain)
+        filled = float(order.quantity) - remain
+        entry = s.orders.get(order.order_id)
+        if not entry:
+            if order.order_id in self._final_set:
+                return
+            entry = [order.action == ORDER_ACTION_BUY, float(order.price or 0) or s.mid or 0, 0, 0]
+            s.orders[order.order_id] = entry
+            s.add(entry, 1)
+        if filled > entry[3]:
+            s.position += filled - entry[3] if entry[0] else entry[3] - filled
+            entry[3] = filled
+        s.add(entry, -1)
+        if order.is_final:
+            del s.orders[order.order_id]
+            self._finals.append(order.order_id)
+            self._final_set.add(order.order_id)
+            if len(self._finals) > self.MAX_FINALS:
+                self._final_set.discard(self._finals.popleft())
+            return
+        entry[2] = remain
+        s.add(entry, 1)
@@ -0,0 +1,581 @@
+# -*- coding:utf-8 -*-
+
+"""
+Local simulated exchange.
+
+A matching engine served by a local HTTP server, exposing Binance / Huobi / OKEx compatible REST endpoints, so that
+`BinanceRestAPI` / `HuobiRestAPI` / `OKExRestAPI` can point at it via their `host` argument, e.g.
+    rest_api = BinanceRestAPI(access_key, secret_key, host="http://127.0.0.1:8080")
+
+Author: HuangTao
+Date:   2020/03/20
+Email:  huangtao@ifclover.com
+"""
+
+import heapq
+import random
+import asyncio
+import decimal
+
+from aiohttp import web
+
+from aioquant.error import Error
+from aioquant.utils import tools
+from aioquant.utils import logger
+from aioquant.order import Order
+from aioquant.order import ORDER_ACTION_BUY, ORDER_ACTION_SELL
+from aioquant.order import ORDER_TYPE_LIMIT, ORDER_TYPE_MARKET
+from aioquant.order import ORDER_STATUS_SUBMITTED, ORDER_STATUS_PARTIAL_FILLED, ORDER_STATUS_FILLED, \
+    ORDER_STATUS_CANCELED, ORDER_STATUS_FAILED
+
+__all__ = ("MatchingEngine", "SimulatorServer", )
+
+
+class MatchingEngine:
+    """Limit order book matching engine, orders are matched by price-time priority, one book for every symbol.
+
+    Attributes:
+        reject_rate: Probability that an order creation will be rejected, default is 0.
+        fill_rate: Probability that a resting order will be filled fully by simulated market flow right after it's
+            accepted, default is 0.
+        partial_fill_rate: Probability that a resting order will be filled partially (10% ~ 90%) by simulated market
+            flow right after it's accepted, default is 0.
+        seed: Random seed, so that a load test can be repeated.
+
+    NOTE:
+        All symbols are normalized to upper case without separator, e.g. `ETHBTC`, so the orders created by different
+        platform clients are matched in the same book.
+    """
+
+    def __init__(self, reject_rate=0, fill_rate=0, partial_fill_rate=0, seed=None):
+        """Initialize."""
+        self._reject_rate = reject_rate
+        self._fill_rate = fill_rate
+        self._partial_fill_rate = partial_fill_rate
+        self._random = random.Random(seed)
+
+        self._order_id = 0  # The last order id.
+        self._seq = 0  # The last sequence number for time priority.
+        self._orders = {}  # All orders. `{order_id: order}`
+        self._client_orders = {}  # `{client_order_id: order_id}`
+        self._open_orders = {}  # Open orders. `{symbol: {order_id: order}}`
+        self._books = {}  # Order books. `{symbol: {BUY: [(-price, seq, order_id), ...], SELL: [...]}}`
+
+    def create_order(self, symbol, action, price, quantity, order_type=ORDER_TYPE_LIMIT, client_order_id=None):
+        """Create an order.
+
+        Args:
+            symbol: Normalized symbol name, e.g. `ETHBTC`.
+            action: Trade direction, `BUY` or `SELL`.
+            price: Order price, ignored by market order.
+            quantity: Order quantity.
+            order_type: Order type, `LIMIT` or `MARKET`, default is `LIMIT`.
+            client_order_id: Client order id, default is same as order id.
+
+        Returns:
+            order: Order object if created successfully, otherwise it's None.
+            error: Error information, otherwise it's None.
+        """
+        if action not in (ORDER_ACTION_BUY, ORDER_ACTION_SELL):
+            return None, Error("action error: {}".format(action))
+        if order_type not in (ORDER_TYPE_LIMIT, ORDER_TYPE_MARKET):
+            return None, Error("order type error: {}".format(order_type))
+        if client_order_id and client_order_id in self._client_orders:
+            return None, Error("duplicate client order id: {}".format(client_order_id))
+        try:
+            price = float(price) if order_type == ORDER_TYPE_LIMIT else 0
+            quantity = float(quantity)
+        except (TypeError, ValueError):
+            return None, Error("price or quantity error. price: {} quantity: {}".format(price, quantity))
+        if quantity <= 0 or (order_type == ORDER_TYPE_LIMIT and price <= 0):
+            return None, Error("price or quantity error. price: {} quantity: {}".format(price, quantity))
+        if self._random.random() < self._reject_rate:
+            return None, Error("order rejected by simulator.")
+
+        self._order_id += 1
+        order_id = str(self._order_id)
+        info = {
+            "platform": "simulator",
+            "order_id": order_id,
+            "client_order_id": client_order_id or order_id,
+            "action": action,
+            "order_type": order_type,
+            "symbol": symbol,
+            "price": price,
+            "quantity": quantity
+        }
+        order = Order(**info)
+        order.update(ORDER_STATUS_SUBMITTED)
+        self._orders[order_id] = order
+        self._client_orders[order.client_order_id] = order_id
+
+        self._match(order)
+        if order.is_final:
+            return order, None
+        if order_type == ORDER_TYPE_MARKET:
+            order.update(ORDER_STATUS_CANCELED)
+            return order, None
+
+        r = self._random.random()
+        if r < self._fill_rate:
+            self._fill(order, order.remain, price)
+        elif r < self._fill_rate + self._partial_fill_rate:
+            self._fill(order, order.remain * self._random.uniform(0.1, 0.9), price)
+        if not order.is_final:
+            self._seq += 1
+            side = self._books.setdefault(symbol, {ORDER_ACTION_BUY: [], ORDER_ACTION_SELL: []})[action]
+            heapq.heappush(side, (-price if action == ORDER_ACTION_BUY else price, self._seq, order_id))
+            self._open_orders.setdefault(symbol, {})[order_id] = order
+        return order, None
+
+    def revoke_order(self, order_id=None, client_order_id=None):
+        """Revoke an order.
+
+        Returns:
+            order: Order object if revoked successfully, otherwise it's None.
+            error: Error information, otherwise it's None.
+        """
+        order = self.get_order(order_id, client_order_id)
+        if not order:
+            return None, Error("order not found. order_id: {}".format(order_id or client_order_id))
+        if order.is_final:
+            return None, Error("order is not open. order_id: {} status: {}".format(order.order_id, order.status))
+        order.update(ORDER_STATUS_CANCELED)
+        self._open_orders[order.symbol].pop(order.order_id, None)
+        return order, None
+
+    def get_order(self, order_id=None, client_order_id=None):
+        """Get an order by order id or client order id, return None if not found."""
+        if not order_id and client_order_id:
+            order_id = self._client_orders.get(client_order_id)
+        return self._orders.get(str(order_id))
+
+    def get_open_orders(self, symbol):
+        """Get open orders of a symbol."""
+        return list(self._open_orders.get(symbol, {}).values())
+
+    def _match(self, order):
+        """Match an order with the resting orders of the opposite side, fill at the resting orders' price."""
+        book = self._books.get(order.symbol)
+        if not book:
+            return
+        is_buy = order.action == ORDER_ACTION_BUY
+        opposite = book[ORDER_ACTION_SELL if is_buy else ORDER_ACTION_BUY]
+        while opposite and not order.is_final:
+            _, _, resting_id = opposite[0]
+            resting = self._orders[resting_id]
+            if resting.is_final:  # Revoked order, remove it lazily.
+                heapq.heappop(opposite)
+                continue
+            if order.order_type == ORDER_TYPE_LIMIT:
+                if (is_buy and resting.price > order.price) or (not is_buy and resting.price < order.price):
+                    break
+            quantity = min(order.remain, resting.remain)
+            self._fill(order, quantity, resting.price)
+            self._fill(resting, quantity, resting.price)
+            if resting.is_final:
+                heapq.heappop(opposite)
+
+    def _fill(self, order, quantity, price):
+        filled = order.quantity - order.remain
+        avg_price = (order.avg_price * filled + price * quantity) / (filled + quantity)
+        remain = order.remain - quantity
+        if remain <= order.quantity * 1e-12:
+            order.update(ORDER_STATUS_FILLED, 0, avg_price)
+            self._open_orders.get(order.symbol, {}).pop(order.order_id, None)
+        else:
+            order.update(ORDER_STATUS_PARTIAL_FILLED, remain, avg_price)
+
+
+class SimulatorServer:
+    """Local simulated exchange server, exposes Binance / Huobi / OKEx compatible REST endpoints backed by one
+    matching engine. Signatures are not verified.
+
+    Attributes:
+        host: Listen host, default is `127.0.0.1`.
+        port: Listen port, default is 8080.
+        symbols: Symbol metadata returned by exchange information endpoints, e.g.
+            `{"ETH/BTC": {"price_tick": "0.000001", "quantity_step": "0.001", "min_quantity": "0.001",
+            "max_quantity": "100000", "min_notional": "0.0001"}}`.
+        latency: Delay(seconds) before every request is processed, default is 0.
+        jitter: Random delay(seconds) added to latency, uniform distributed in [0, jitter], default is 0.
+        kwargs: Rejection and partial fill models, see `MatchingEngine`.
+
+    Usage:
+        server = SimulatorServer(port=8080, latency=0.01, reject_rate=0.01, partial_fill_rate=0.2)
+        await server.start()
+    """
+
+    def __init__(self, host="127.0.0.1", port=8080, symbols=None, latency=0, jitter=0, **kwargs):
+        """Initialize."""
+        self._host = host
+        self._port = port
+        self._symbols = symbols or {}
+        self._latency = latency
+        self._jitter = jitter
+        self._random = random.Random(kwargs.get("seed"))
+        self._engine = MatchingEngine(**kwargs)
+        self._runner = None
+
+        # Unified symbol name of every normalized symbol name. e.g. {"ETHBTC": "ETH/BTC"}
+        self._unified_symbols = {self._normalize(symbol): symbol for symbol in self._symbols}
+
+    @property
+    def engine(self):
+        return self._engine
+
+    @property
+    def url(self):
+        return "http://{host}:{port}".format(host=self._host, port=self._port)
+
+    async def start(self):
+        """Start HTTP server."""
+        app = web.Application(middlewares=[self._latency_middleware])
+        # Binance.
+        app.router.add_get("/api/v3/ping", self.binance_ping)
+        app.router.add_get("/api/v3/time", self.binance_time)
+        app.router.add_get("/api/v3/exchangeInfo", self.binance_exchange_info)
+        app.router.add_post("/api/v3/order", self.binance_create_order)
+        app.router.add_delete("/api/v3/order", self.binance_revoke_order)
+        app.router.add_get("/api/v3/order", self.binance_get_order)
+        app.router.add_get("/api/v3/openOrders", self.binance_get_open_orders)
+        app.router.add_route("*", "/api/v3/userDataStream", self.binance_user_data_stream)
+        # Huobi.
+        app.router.add_get("/v1/common/timestamp", self.huobi_time)
+        app.router.add_get("/v1/common/symbols", self.huobi_exchange_info)
+        app.router.add_get("/v1/account/accounts", self.huobi_accounts)
+        app.router.add_post("/v1/order/orders/place", self.huobi_create_order)
+        app.router.add_post("/v1/order/batch-orders", self.huobi_create_orders)
+        app.router.add_post("/v1/order/orders/batchcancel", self.huobi_revoke_orders)
+        app.router.add_post("/v1/order/orders/{order_id}/submitcancel", self.huobi_revoke_order)
+        app.router.add_get("/v1/order/orders/{order_id}", self.huobi_get_order)
+        app.router.add_get("/v1/order/openOrders", self.huobi_get_open_orders)
+        # OKEx.
+        app.router.add_get("/api/spot/v3/instruments", self.okex_exchange_info)
+        app.router.add_post("/api/spot/v3/orders", self.okex_create_order)
+        app.router.add_post("/api/spot/v3/batch_orders", self.okex_create_orders)
+        app.router.add_post("/api/spot/v3/cancel_orders/{order_id}", self.okex_revoke_order)
+        app.router.add_post("/api/spot/v3/cancel_batch_orders", self.okex_revoke_orders)
+        app.router.add_get("/api/spot/v3/orders_pending", self.okex_get_open_orders)
+        app.router.add_get("/api/spot/v3/orders/{order_id}", self.okex_get_order)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self._host, self._port)
+        await site.start()
+        logger.info("simulator server started. url:", self.url, caller=self)
+
+    async def stop(self):
+        """Stop HTTP server."""
+        if self._runner:
+            await self._runner.cleanup()
+            self._runner = None
+
+    @web.middleware
+    async def _latency_middleware(self, request, handler):
+        delay = self._latency + self._random.uniform(0, self._jitter) if self._jitter else self._latency
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return await handler(request)
+
+    def _normalize(self, symbol):
+        return symbol.replace("/", "").replace("-", "").upper()
+
+    def _unified(self, symbol):
+        return self._unified_symbols.get(symbol, symbol)
+
+    # Binance.
+
+    async def binance_ping(self, request):
+        return web.json_response({})
+
+    async def binance_time(self, request):
+        return web.json_response({"serverTime": tools.get_cur_timestamp_ms()})
+
+    async def binance_exchange_info(self, request):
+        symbols = []
+        for symbol, info in self._symbols.items():
+            base, quote = symbol.split("/")
+            filters = [
+                {"filterType": "PRICE_FILTER", "tickSize": info.get("price_tick")},
+                {"filterType": "LOT_SIZE", "stepSize": info.get("quantity_step"), "minQty": info.get("min_quantity"),
+                 "maxQty": info.get("max_quantity")},
+                {"filterType": "MIN_NOTIONAL", "minNotional": info.get("min_notional")}
+            ]
+            symbols.append({"symbol": base + quote, "baseAsset": base, "quoteAsset": quote, "filters": filters})
+        return web.json_response({"serverTime": tools.get_cur_timestamp_ms(), "symbols": symbols})
+
+    async def binance_create_order(self, request):
+        params = request.query
+        order_type = ORDER_TYPE_MARKET if params.get("type") == "MARKET" else ORDER_TYPE_LIMIT
+        order, error = self._engine.create_order(self._normalize(params.get("symbol", "")), params.get("side"),
+                                                 params.get("price"), params.get("quantity"), order_type,
+                                                 params.get("newClientOrderId"))
+        if error:
+            return web.json_response({"code": -2010, "msg": str(error)}, status=400)
+        result = self._binance_order(order)
+        result["transactTime"] = order.utime
+        result["fills"] = []
+        return web.json_response(result)
+
+    async def binance_revoke_order(self, request):
+        params = request.query
+        order, error = self._engine.revoke_order(params.get("orderId"), params.get("origClientOrderId"))
+        if error:
+            return web.json_response({"code": -2011, "msg": str(error)}, status=400)
+        result = self._binance_order(order)
+        result["origClientOrderId"] = order.client_order_id
+        return web.json_response(result)
+
+    async def binance_get_order(self, request):
+        params = request.query
+        order = self._engine.get_order(params.get("orderId"), params.get("origClientOrderId"))
+        if not order:
+            return web.json_response({"code": -2013, "msg": "Order does not exist."}, status=400)
+        return web.json_response(self._binance_order(order))
+
+    async def binance_get_open_orders(self, request):
+        orders = self._engine.get_open_orders(self._normalize(request.query.get("symbol", "")))
+        return web.json_response([self._binance_order(order) for order in orders])
+
+    async def binance_user_data_stream(self, request):
+        if request.method == "POST":
+            return web.json_response({"listenKey": tools.get_uuid1().replace("-", "")})
+        return web.json_response({})
+
+    def _binance_order(self, order):
+        states = {
+            ORDER_STATUS_SUBMITTED: "NEW",
+            ORDER_STATUS_PARTIAL_FILLED: "PARTIALLY_FILLED",
+            ORDER_STATUS_FILLED: "FILLED",
+            ORDER_STATUS_CANCELED: "CANCELED",
+            ORDER_STATUS_FAILED: "REJECTED"
+        }
+        filled = order.quantity - order.remain
+        info = {
+            "symbol": order.symbol,
+            "orderId": int(order.order_id),
+            "clientOrderId": order.client_order_id,
+            "price": tools.float_to_str(order.price),
+            "origQty": tools.float_to_str(order.quantity),
+            "executedQty": tools.float_to_str(filled),
+            "cummulativeQuoteQty": tools.float_to_str(filled * order.avg_price),
+            "status": states[order.status],
+            "timeInForce": "GTC",
+            "type": order.order_type,
+            "side": order.action,
+            "time": order.ctime,
+            "updateTime": order.utime
+        }
+        return info
+
+    # Huobi.
+
+    async def huobi_time(self, request):
+        return web.json_response({"status": "ok", "data": tools.get_cur_timestamp_ms()})
+
+    async def huobi_exchange_info(self, request):
+        data = []
+        for symbol, info in self._symbols.items():
+            base, quote = symbol.lower().split("/")
+            item = {
+                "base-currency": base,
+                "quote-currency": quote,
+                "symbol": base + quote,
+                "price-precision": -decimal.Decimal(info.get("price_tick", "1")).normalize().as_tuple().exponent,
+                "amount-precision": -decimal.Decimal(info.get("quantity_step", "1")).normalize().as_tuple().exponent,
+                "min-order-amt": float(info["min_quantity"]) if info.get("min_quantity") else None,
+                "max-order-amt": float(info["max_quantity"]) if info.get("max_quantity") else None,
+                "min-order-value": float(info["min_notional"]) if info.get("min_notional") else None
+            }
+            data.append(item)
+        return web.json_response({"status": "ok", "data": data})
+
+    async def huobi_accounts(self, request):
+        return web.json_response({"status": "ok", "data": [{"id": 1, "type": "spot", "state": "working"}]})
+
+    def _huobi_create_order(self, info):
+        side, order_type = info.get("type", "-").split("-", 1)
+        if order_type == "market" and side == "buy":
+            return None, Error("buy-market order by quote amount is not supported by simulator.")
+        return self._engine.create_order(self._normalize(info.get("symbol", "")), side.upper(), info.get("price"),
+                                         info.get("amount"), order_type.upper(), info.get("client-order-id"))
+
+    async def huobi_create_order(self, request):
+        order, error = self._huobi_create_order(await request.json())
+        if error:
+            return web.json_response({"status": "error", "err-code": "order-rejected", "err-msg": str(error)})
+        return web.json_response({"status": "ok", "data": order.order_id})
+
+    async def huobi_create_orders(self, request):
+        data = []
+        for info in await request.json():
+            order, error = self._huobi_create_order(info)
+            if error:
+                data.append({"client-order-id": info.get("client-order-id"), "err-code": "order-rejected",
+                             "err-msg": str(error)})
+            else:
+                data.append({"client-order-id": order.client_order_id, "order-id": int(order.order_id)})
+        return web.json_response({"status": "ok", "data": data})
+
+    async def huobi_revoke_order(self, request):
+        order_id = request.match_info["order_id"]
+        _, error = self._engine.revoke_order(order_id)
+        if error:
+            return web.json_response({"status": "error", "err-code": "order-orderstate-error", "err-msg": str(error)})
+        return web.json_response({"status": "ok", "data": order_id})
+
+    async def huobi_revoke_orders(self, request):
+        success, failed = [], []
+        for order_id in (await request.json()).get("order-ids", []):
+            _, error = self._engine.revoke_order(order_id)
+            if error:
+                failed.append({"order-id": order_id, "err-code": "order-orderstate-error", "err-msg": str(error)})
+            else:
+                success.append(order_id)
+        return web.json_response({"status": "ok", "data": {"success": success, "failed": failed}})
+
+    async def huobi_get_order(self, request):
+        order = self._engine.get_order(request.match_info["order_id"])
+        if not order:
+            return web.json_response({"status": "error", "err-code": "base-record-invalid",
+                                      "err-msg": "record invalid"})
+        return web.json_response({"status": "ok", "data": self._huobi_order(order)})
+
+    async def huobi_get_open_orders(self, request):
+        orders = self._engine.get_open_orders(self._normalize(request.query.get("symbol", "")))
+        return web.json_response({"status": "ok", "data": [self._huobi_order(order) for order in orders]})
+
+    def _huobi_order(self, order):
+        states = {
+            ORDER_STATUS_SUBMITTED: "submitted",
+            ORDER_STATUS_PARTIAL_FILLED: "partial-filled",
+            ORDER_STATUS_FILLED: "filled",
+            ORDER_STATUS_CANCELED: "canceled",
+            ORDER_STATUS_FAILED: "canceled"
+        }
+        filled = order.quantity - order.remain
+        info = {
+            "id": int(order.order_id),
+            "client-order-id": order.client_order_id,
+            "symbol": order.symbol.lower(),
+            "type": order.action.lower() + "-" + order.order_type.lower(),
+            "price": tools.float_to_str(order.price),
+            "amount": tools.float_to_str(order.quantity),
+            "filled-amount": tools.float_to_str(filled),
+            "filled-cash-amount": tools.float_to_str(filled * order.avg_price),
+            "filled-fees": "0",
+            "state": states[order.status],
+            "created-at": order.ctime
+        }
+        return info
+
+    # OKEx.
+
+    async def okex_exchange_info(self, request):
+        data = []
+        for symbol, info in self._symbols.items():
+            base, quote = symbol.split("/")
+            item = {
+                "instrument_id": base + "-" + quote,
+                "base_currency": base,
+                "quote_currency": quote,
+                "min_size": info.get("min_quantity"),
+                "size_increment": info.get("quantity_step"),
+                "tick_size": info.get("price_tick")
+            }
+            data.append(item)
+        return web.json_response(data)
+
+    def _okex_create_order(self, info):
+        order_type = ORDER_TYPE_MARKET if info.get("type") == "market" else ORDER_TYPE_LIMIT
+        if order_type == ORDER_TYPE_MARKET and info.get("side") == "buy":
+            return None, Error("buy market order by notional is not supported by simulator.")
+        symbol = info.get("instrument_id", "")
+        self._unified_symbols.setdefault(self._normalize(symbol), symbol.replace("-", "/"))
+        return self._engine.create_order(self._normalize(symbol), info.get("side", "").upper(), info.get("price"),
+                                         info.get("size"), order_type, info.get("client_oid"))
+
+    def _okex_create_result(self, info, order, error):
+        if error:
+            return {"order_id": "-1", "client_oid": info.get("client_oid", ""), "result": False,
+                    "error_code": "33017", "error_message": str(error)}
+        return {"order_id": order.order_id, "client_oid": info.get("client_oid", ""), "result": True,
+                "error_code": "", "error_message": ""}
+
+    async def okex_create_order(self, request):
+        info = await request.json()
+        order, error = self._okex_create_order(info)
+        return web.json_response(self._okex_create_result(info, order, error))
+
+    async def okex_create_orders(self, request):
+        data = {}
+        for info in await request.json():
+            order, error = self._okex_create_order(info)
+            data.setdefault(info.get("instrument_id", "").lower(), []).append(
+                self._okex_create_result(info, order, error))
+        return web.json_response(data)
+
+    async def okex_revoke_order(self, request):
+        order_id = request.match_info["order_id"]
+        if order_id.isdigit():
+            _, error = self._engine.revoke_order(order_id)
+        else:
+            _, error = self._engine.revoke_order(client_order_id=order_id)
+        if error:
+            return web.json_response({"code": 33014, "message": str(error)}, status=400)
+        return web.json_response({"order_id": order_id, "client_oid": "", "result": True, "error_code": "",
+                                  "error_message": ""})
+
+    async def okex_revoke_orders(self, request):
+        data = {}
+        for item in await request.json():
+            results = data.setdefault(item.get("instrument_id", "").lower(), [])
+            for order_id in item.get("order_ids", []):
+                _, error = self._engine.revoke_order(order_id)
+                results.append({"order_id": order_id, "result": not error,
+                                "error_message": str(error) if error else ""})
+            for client_oid in item.get("client_oids", []):
+                order, error = self._engine.revoke_order(client_order_id=client_oid)
+                results.append({"order_id": order.order_id if order else "-1", "client_oid": client_oid,
+                                "result": not error, "error_message": str(error) if error else ""})
+        return web.json_response(data)
+
+    async def okex_get_order(self, request):
+        order_id = request.match_info["order_id"]
+        if order_id.isdigit():
+            order = self._engine.get_order(order_id)
+        else:
+            order = self._engine.get_order(client_order_id=order_id)
+        if not order:
+            return web.json_response({"code": 33014, "message": "order not exist"}, status=400)
+        return web.json_response(self._okex_order(order))
+
+    async def okex_get_open_orders(self, request):
+        orders = self._engine.get_open_orders(self._normalize(request.query.get("instrument_id", "")))
+        return web.json_response([self._okex_order(order) for order in orders])
+
+    def _okex_order(self, order):
+        states = {
+            ORDER_STATUS_SUBMITTED: "0",
+            ORDER_STATUS_PARTIAL_FILLED: "1",
+            ORDER_STATUS_FILLED: "2",
+            ORDER_STATUS_CANCELED: "-1",
+            ORDER_STATUS_FAILED: "-2"
+        }
+        filled = order.quantity - order.remain
+        info = {
+            "order_id": order.order_id,
+            "client_oid": order.client_order_id,
+            "instrument_id": self._unified(order.symbol).replace("/", "-"),
+            "side": order.action.lower(),
+            "type": order.order_type.lower(),
+            "price": tools.float_to_str(order.price),
+            "size": tools.float_to_str(order.quantity),
+            "filled_size": tools.float_to_str(filled),
+            "filled_notional": tools.float_to_str(filled * order.avg_price),
+            "state": states[order.status],
+            "created_at": tools.ts_to_utctime_str(order.ctime),
+            "timestamp": tools.ts_to_utctime_str(order.utime)
+        }
+        return info
@@ -0,0 +1,405 @@
+# -*- coding:utf-8 -*-
+
+"""
+Asynchronous bulk storage.
+
+Documents, e.g. orders, fills and klines, are buffered and inserted to the storage backend in batches, the batches
+are flushed when the buffer is full or every flush interval. The writers block when the backend falls behind, and all
+the buffered documents are flushed durably when `AIOQuant` stopped.
+
+Author: HuangTao
+Date:   2020/04/02
+Email:  huangtao@ifclover.com
+"""
+
+import os
+import json
+import sqlite3
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from aioquant.utils import tools
+from aioquant.utils import logger
+from aioquant.order import FillTracker
+
+__all__ = ("StorageBackend", "FileBackend", "SQLiteBackend", "MongoBackend", "StorageWriter",
+           "COLLECTION_ORDER", "COLLECTION_FILL", "COLLECTION_KLINE", )
+
+
+COLLECTION_ORDER = "order"
+COLLECTION_FILL = "fill"
+COLLECTION_KLINE = "kline"
+
+
+class StorageBackend:
+    """Storage backend, every backend should inherit this class and implement `insert_many`.
+    """
+
+    async def open(self):
+        """Connect or open the storage."""
+        pass
+
+    async def insert_many(self, collection, documents):
+        """Insert a batch of documents.
+
+        Args:
+            collection: Collection name, e.g. `order`.
+            documents: Document list, every document is a dict.
+        """
+        raise NotImplementedError
+
+    async def sync(self):
+        """Make sure all the inserted documents are saved durably."""
+        pass
+
+    async def close(self):
+        """Close the storage."""
+        pass
+
+
+class _ThreadBackend(StorageBackend):
+    """Backend that does the blocking I/O in a single worker thread, so the batches are saved in order."""
+
+    def __init__(self):
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    async def _run(self, func, *args):
+        return await asyncio.get_event_loop().run_in_executor(self._executor, func, *args)
+
+    async def close(self):
+        await self._run(self._close)
+        self._executor.shutdown()
+
+    def _close(self):
+        pass
+
+
+class FileBackend(_ThreadBackend):
+    """Local file backend, every collection is saved in a JSON lines file `{path}/{collection}.jsonl`.
+
+    Attributes:
+        path: Directory to save the files.
+        fsync: If True, `fsync` the files after every batch, default is False, the files are synced by `sync`.
+    """
+
+    def __init__(self, path, fsync=False):
+        """Initialize."""
+        super(FileBackend, self).__init__()
+        self._path = path
+        self._fsync = fsync
+        self._files = {}  # Opened files. `{collection: file}`
+
+    async def open(self):
+        os.makedirs(self._path, exist_ok=True)
+
+    async def insert_many(self, collection, documents):
+        await self._run(self._write, collection, documents)
+
+    def _write(self, collection, documents):
+        f = self._files.get(collection)
+        if not f:
+            f = self._files[collection] = open(os.path.join(self._path, collection + ".jsonl"), "a")
+        f.write("".join(json.dumps(document) + "\n" for document in documents))
+        f.flush()
+        if self._fsync:
+            os.fsync(f.fileno())
+
+    async def sync(self):
+        await self._run(self._sync)
+
+    def _sync(self):
+        for f in self._files.values():
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _close(self):
+        self._sync()
+        for f in self._files.values():
+            f.close()
+        self._files = {}
+
+
+class SQLiteBackend(_ThreadBackend):
+    """SQLite backend, every collection is saved in a table `(id, data)`, the documents are saved as JSON text.
+
+    Attributes:
+        path: Database file path.
+
+    NOTE:
+        The database is in WAL mode, a batch is inserted in a transaction, and the transactions are synced to disk by
+        `sync`.
+    """
+
+    def __init__(self, path):
+        """Initialize."""
+        super(SQLiteBackend, self).__init__()
+        self._path = path
+        self._conn = None
+        self._tables = set()
+
+    async def open(self):
+        await self._run(self._open)
+
+    def _open(self):
+        self._conn = sqlite3.connect(self._path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+
+    async def insert_many(self, collection, documents):
+        await self._run(self._insert_many, collection, documents)
+
+    def _insert_many(self, collection, documents):
+        if collection not in self._tables:
+            self._conn.execute("CREATE TABLE IF NOT EXISTS \"{}\" (id INTEGER PRIMARY KEY, data TEXT)".format(
+                collection))
+            self._tables.add(collection)
+        with self._conn:
+            self._conn.executemany("INSERT INTO \"{}\" (data) VALUES (?)".format(collection),
+                                   [(json.dumps(document), ) for document in documents])
+
+    async def sync(self):
+        await self._run(self._sync)
+
+    def _sync(self):
+        if self._conn:
+            self._conn.execute("PRAGMA wal_checkpoint(FULL)")
+
+    def _close(self):
+        if self._conn:
+            self._sync()
+            self._conn.close()
+            self._conn = None
+
+
+class MongoBackend(StorageBackend):
+    """MongoDB backend, the documents are inserted by `motor`.
+
+    Attributes:
+        uri: MongoDB connection URI, e.g. `mongodb://127.0.0.1:27017`.
+        database: Database name.
+        journal: If True, a batch is acknowledged after it's written to the on-disk journal, default is True.
+    """
+
+    def __init__(self, uri, database, journal=True):
+        """Initialize."""
+        self._uri = uri
+        self._database = database
+        self._journal = journal
+        self._client = None
+        self._db = None
+
+    async def open(self):
+        import motor.motor_asyncio
+        self._client = motor.motor_asyncio.AsyncIOMotorClient(self._uri, j=self._journal)
+        self._db = self._client[self._database]
+
+    async def insert_many(self, collection, documents):
+        await self._db[collection].insert_many(documents, ordered=False)
+
+    async def close(self):
+        if self._client:
+            self._client.close()
+            self._client = None
+
+
+class StorageWriter:
+    """Asynchronous bulk storage writer.
+
+    Attributes:
+        backend: Storage backend, e.g. `FileBackend` / `SQLiteBackend` / `MongoBackend`.
+        batch_size: Maximum documents of a batch, a collection is flushed when its buffer is full, default is 1000.
+        flush_interval: Interval(seconds) to flush the buffered documents, default is 1.
+        max_pending: Maximum buffered and writing documents, `write` waits when it's reached, default is 100000.
+
+    Usage:
+        writer = StorageWriter(SQLiteBackend("aioquant.db"))
+        await writer.write("order", order.data)
+        await writer.on_order_update(order)  # Save the order and its new fill.
+        await writer.on_kline(kline)
+        await writer.close()
+
+    NOTE:
+        The batches are inserted one by one by a background task, if the backend is slow, the documents are buffered
+        until `max_pending` is reached, and then `write` waits until the backend catches up. A failed batch is kept in
+        the buffer and retried in next flush. All the writers are closed, that is flushed and synced, when `AIOQuant`
+        stopped.
+    """
+
+    writers = []  # All the writers not closed.
+
+    @classmethod
+    async def close_all(cls):
+        """Close all the writers."""
+        for writer in list(cls.writers):
+            await writer.close()
+
+    def __init__(self, backend, batch_size=1000, flush_interval=1, max_pending=100000):
+        """Initialize."""
+        self._backend = backend
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._max_pending = max_pending
+        self._buffers = {}  # Buffered documents. `{collection: [document, ...]}`
+        self._pending = 0  # Buffered and writing documents.
+        self._fills = FillTracker()  # Filled state of open orders.
+        self._lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Event()
+        self._space.set()
+        self._task = None
+        self._opened = False
+        self._closed = False
+
+        self._written = 0
+        self._batches = 0
+        self._errors = 0
+        self._waits = 0
+
+        StorageWriter.writers.append(self)
+
+    @property
+    def pending(self):
+        return self._pending
+
+    @property
+    def stats(self):
+        """Statistics, `{"pending": ..., "written": ..., "batches": ..., "errors": ..., "waits": ...}`."""
+        return {
+            "pending": self._pending,
+            "written": self._written,
+            "batches": self._batches,
+            "errors": self._errors,
+            "waits": self._waits
+        }
+
+    async def write(self, collection, document):
+        """Write a document.
+
+        Args:
+            collection: Collection name, e.g. `order`.
+            document: Document, a dict that can be dumped as JSON.
+        """
+        if self._closed:
+            logger.error("writer closed! collection:", collection, "document:", document, caller=self)
+            return
+        if not self._task:
+            self._task = asyncio.get_event_loop().create_task(self._run())
+        while self._pending >= self._max_pending:
+            self._waits += 1
+            self._space.clear()
+            self._wakeup.set()
+            await self._space.wait()
+            if self._closed:
+                return
+        buffer = self._buffers.get(collection)
+        if buffer is None:
+            buffer = self._buffers[collection] = []
+        buffer.append(document)
+        self._pending += 1
+        if len(buffer) >= self._batch_size:
+            self._wakeup.set()
+
+    async def on_order_update(self, order):
+        """Save an order update to collection `order`, and its new fill, if any, to collection `fill`.
+
+        Args:
+            order: Order object.
+        """
+        await self.write(COLLECTION_ORDER, order.data)
+        if not order.order_id:
+            return
+        delta = self._fills.delta(order)
+        if delta:
+            quantity, price, fee = delta
+            fill = {
+                "platform": order.platform,
+                "account": order.account,
+                "strategy": order.strategy,
+                "symbol": order.symbol,
+                "order_id": order.order_id,
+                "client_order_id": order.client_order_id,
+                "action": order.action,
+                "trade_type": order.trade_type,
+                "price": price,
+                "quantity": quantity,
+                "fee": fee,
+                "timestamp": order.utime or tools.get_cur_timestamp_ms()
+            }
+            await self.write(COLLECTION_FILL, fill)
+
+    async def on_kline(self, kline):
+        """Save a kline to collection `kline`.
+
+        Args:
+            kline: Kline object.
+        """
+        await self.write(COLLECTION_KLINE, kline.data)
+
+    async def _run(self):
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self._flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self._flush()
+
+    async def _flush(self):
+        """Insert all the buffered documents, return False if the backend is not opened or any batch failed."""
+        async with self._lock:
+            if not self._opened:
+                try:
+                    await self._backend.open()
+                except Exception as e:
+                    self._errors += 1
+                    logger.error("open storage error! error:", e, caller=self)
+                    return False
+                self._opened = True
+            for collection in list(self._buffers):
+                documents = self._buffers.pop(collection)
+                for i in range(0, len(documents), self._batch_size):
+                    batch = documents[i: i + self._batch_size]
+                    try:
+                        await self._backend.insert_many(collection, batch)
+                    except Exception as e:
+                        self._errors += 1
+                        logger.error("insert error! collection:", collection, "size:", len(batch), "error:", e,
+                                     caller=self)
+                        self._buffers[collection] = documents[i:] + self._buffers.get(collection, [])
+                        return False
+                    self._written += len(batch)
+                    self._batches += 1
+                    self._pending -= len(batch)
+                    if self._pending < self._max_pending:
+                        self._space.set()
+            return True
+
+    async def flush(self):
+        """Insert all the buffered documents and sync the backend."""
+        if await self._flush():
+            await self._backend.sync()
+
+    async def close(self, retries=3):
+        """Flush all the buffered documents durably and close the backend.
+
+        Args:
+            retries: Maximum retries if flush failed, the documents are dropped after that.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        StorageWriter.writers.remove(self)
+        if not self._task:
+            return
+        self._wakeup.set()
+        await self._task
+        for _ in range(retries):
+            if await self._flush():
+                break
+            await asyncio.sleep(1)
+        if self._pending:
+            logger.error("documents dropped:", self._pending, caller=self)
+        self._space.set()
+        if self._opened:
+            await self._backend.sync()
+            await self._backend.close()
@@ -0,0 +1,511 @@
+# -*- coding:utf-8 -*-
+
+"""
+Websocket stream multiplexing.
+
+Author: HuangTao
+Date:   2020/03/26
+Email:  huangtao@ifclover.com
+"""
+
+import os
+import time
+import asyncio
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from aioquant.utils import tools
+from aioquant.utils import logger
+from aioquant.configure import config
+from aioquant.utils.web import Websocket
+from aioquant.latency import latency_collector
+from aioquant.tasks import LoopRunTask, SingleTask
+
+__all__ = ("StreamPool", "StreamConnection", )
+
+
+def decode_frames(decode, frames):
+    """Decode binary frames in a worker.
+
+    Args:
+        decode: Decode function, `StreamPool.decode` of the platform.
+        frames: Binary frames.
+
+    Returns:
+        results: `[(message, decode seconds), ...]`.
+    """
+    results = []
+    for raw in frames:
+        start = time.perf_counter()
+        msg = decode(raw)
+        results.append((msg, time.perf_counter() - start))
+    return results
+
+
+_executors = {}  # Decode executors shared by all pools. `{(mode, workers): executor}`
+
+
+def get_executor(mode, workers=None):
+    """Get the executor to decode binary frames.
+
+    Args:
+        mode: `thread` / `process`, None to decode in the event loop.
+        workers: Maximum workers, default is the CPU count.
+    """
+    if not mode:
+        return None
+    workers = workers or os.cpu_count()
+    if (mode, workers) not in _executors:
+        if mode == "thread":
+            _executors[(mode, workers)] = ThreadPoolExecutor(workers)
+        elif mode == "process":
+            _executors[(mode, workers)] = ProcessPoolExecutor(workers)
+        else:
+            raise ValueError("decode mode error: {}".format(mode))
+    return _executors[(mode, workers)]
+
+
+class StreamConnection:
+    """One Websocket connection of a stream pool, carrying the channels of many symbols.
+
+    Attributes:
+        pool: Stream pool the connection belongs to.
+        index: Connection index in the pool.
+    """
+
+    def __init__(self, pool, index):
+        """Initialize."""
+        self._pool = pool
+        self._index = index
+        self._channels = set()  # Subscribed channels.
+        self._pending = []  # Channels to be subscribed, sent together in one batch.
+        self._counts = {}  # Messages of every channel in the current window. `{channel: count}`
+        self._delays = [0, 0]  # Sum and count of the message delays in the current window.
+        self._rates = {}  # Messages per second of every channel in the last window. `{channel: rate}`
+        self._lag = None  # Average message delay(millisecond) in the last window, above the lowest of the pool.
+        self._frames = []  # Binary frames waiting to be decoded in worker.
+        self._frame_times = []  # Receive time of the frames waiting to be decoded, for latency tracing.
+        self._decoding = False  # If a batch of frames is decoding in worker.
+
+        self._ws = Websocket(pool.url, self.connected_callback, process_callback=self.process,
+                             process_binary_callback=self.process_binary)
+        self._ws.initialize()
+
+    @property
+    def index(self):
+        return self._index
+
+    @property
+    def channels(self):
+        return self._channels
+
+    @property
+    def rate(self):
+        """Messages per second in the last window."""
+        return sum(self._rates.values())
+
+    @property
+    def lag(self):
+        return self._lag
+
+    def channel_rate(self, channel):
+        return self._rates.get(channel, 0)
+
+    def update_channel_rate(self, channel, rate):
+        """Set the rate of a channel moved in, until it's measured in the next window."""
+        self._rates[channel] = rate
+
+    def subscribe(self, channels):
+        """Subscribe channels, channels subscribed at the same time are sent in one batch."""
+        channels = [channel for channel in channels if channel not in self._channels]
+        if not channels:
+            return
+        self._channels.update(channels)
+        if not self._pending:
+            SingleTask.call_later(self._flush, self._pool.BATCH_DELAY)
+        self._pending.extend(channels)
+
+    def unsubscribe(self, channels):
+        """Unsubscribe channels."""
+        channels = [channel for channel in channels if channel in self._channels]
+        if not channels:
+            return
+        for channel in channels:
+            self._channels.discard(channel)
+            self._rates.pop(channel, None)
+            self._counts.pop(channel, None)
+        self._pending = [channel for channel in self._pending if channel in self._channels]
+        SingleTask.run(self._send, self._pool.unsubscribe_messages(channels))
+
+    async def _flush(self):
+        channels, self._pending = self._pending, []
+        if channels:
+            await self._send(self._pool.subscribe_messages(channels))
+
+    async def _send(self, messages):
+        if not self._ws.ws:
+            return
+        for data in messages:
+            await self._ws.send(data)
+
+    async def send_heartbeat(self):
+        if self._ws.ws:
+            await self._ws.send(self._pool.HEARTBEAT_MESSAGE)
+
+    async def connected_callback(self):
+        """After websocket connection created successfully, subscribe all channels."""
+        self._pending = []
+        if self._channels:
+            await self._send(self._pool.subscribe_messages(list(self._channels)))
+
+    async def process_binary(self, raw):
+        """Process binary message that received from Websocket connection.
+
+        Args:
+            raw: Binary message received from Websocket connection.
+        """
+        if not self._pool.executor:
+            start = time.perf_counter()
+            msg = self._pool.decode(raw)
+            await self.process(msg, time.perf_counter() - start)
+            return
+        self._frames.append(raw)
+        self._frame_times.append(latency_collector.receive_ns())
+        if not self._decoding:
+            self._decoding = True
+            SingleTask.run(self._decode_frames)
+
+    async def _decode_frames(self):
+        """Decode frames in worker, the frames received while a batch is decoding are decoded in the next batch, so
+        only one batch of a connection is in worker and the messages are processed in the receiving order."""
+        loop = asyncio.get_event_loop()
+        try:
+            while self._frames:
+                frames, self._frames = self._frames, []
+                times, self._frame_times = self._frame_times, []
+                results = await loop.run_in_executor(self._pool.executor, decode_frames, self._pool.decode, frames)
+                for (msg, seconds), receive_ns in zip(results, times):
+                    if receive_ns:
+                        latency_collector.set_receive_ns(receive_ns)
+                    await self.process(msg, seconds)
+        except Exception as e:
+            logger.error("decode error:", e, caller=self)
+        finally:
+            self._decoding = False
+
+    async def process(self, msg, decode_seconds=None):
+        """Process message that received from Websocket connection, and dispatch it to the feed of its channel.
+
+        Args:
+            msg: message received from Websocket connection.
+            decode_seconds: Seconds spent to decode the binary message, None if it's a text message.
+        """
+        if msg is None:
+            return
+        reply = self._pool.control(msg)
+        if reply is not None:
+            if reply is not True:
+                await self._ws.send(reply)
+            return
+        channel = self._pool.route(msg)
+        if channel not in self._channels:  # Channel not subscribed, or moved to another connection.
+            return
+        ts = self._pool.timestamp(msg)
+        if not self._pool.accept(self, channel, msg, ts):  # Channel being moved, duplicated message.
+            return
+        self._counts[channel] = self._counts.get(channel, 0) + 1
+        if decode_seconds is not None:
+            self._pool.update_decode_time(channel, decode_seconds)
+        now = tools.get_cur_timestamp_ms()
+        if ts:
+            delay = now - ts
+            self._delays[0] += delay
+            self._delays[1] += 1
+            self._pool.update_delay(delay)
+        latency_collector.begin_market(ts, now)
+        feed = self._pool.feeds.get(channel)
+        if feed:
+            await feed.process(msg)
+
+    def update_stats(self, seconds, lowest_delay):
+        """Close the current statistics window.
+
+        Args:
+            seconds: Window length(seconds).
+            lowest_delay: Lowest message delay of the pool, the clock offset between local and exchange is removed
+                from the lag by it.
+        """
+        self._rates = {channel: count / seconds for channel, count in self._counts.items()}
+        self._counts = {}
+        total, count = self._delays
+        self._lag = total / count - lowest_delay if count else None
+        self._delays = [0, 0]
+
+
+class StreamPool:
+    """Websocket stream pool, multiplex the market data channels of all symbols of a platform into a few Websocket
+    connections, every platform should inherit this class and implement the message hooks.
+
+    Attributes:
+        wss: Websocket address.
+
+    NOTE:
+        The pool is configured by `MARKETS` in config file, e.g.
+            "MARKETS": {"binance": {"connections": 4, "max_channels": 200, "max_rate": 500, "max_lag": 1000}}
+        connections: Maximum connections, default is 4, more connections are opened only if all are full.
+        max_channels: Maximum channels of a connection, default is `MAX_CHANNELS` of the platform.
+        max_rate: Maximum messages per second of a connection, default is 500.
+        max_lag: Maximum average message lag(millisecond) of a connection, default is 1000, 0 is no limit.
+        check_interval: Interval(seconds) to measure message rates and rebalance, default is 10.
+        decode: Decode binary frames in `thread` or `process` workers, default is None, decode in the event loop.
+        decode_workers: Maximum decode workers, default is the CPU count.
+
+        A new channel is subscribed on the connection with the lowest message rate that has room, channels are
+        packed into the opened connections, and a new connection is opened only when all the connections are full
+        or too busy. After every check interval, if a connection's message rate or lag is too high, its busiest
+        channels are moved to the quietest connections. A channel is subscribed on the new connection first, the old
+        connection keeps delivering it until the first message of the channel arrives from the new connection, then
+        it's unsubscribed from the old connection, and the messages from the new connection not newer than the last
+        one delivered by the old connection are dropped as duplicates, so no message is lost while moving. The lag
+        is the message delay above the lowest delay of the pool, so the clock offset between local and exchange is
+        excluded.
+
+        When binary frames are decoded in workers, the frames of a connection received while a batch is decoding are
+        decoded together in the next batch, so busy connections are decoded in batches, the connections are decoded
+        in parallel, and the messages of a connection are processed in the receiving order. The decode time of every
+        channel is measured in workers, see `decode_stats`.
+    """
+
+    PLATFORM = None  # Platform name.
+    MAX_CHANNELS = 100  # Default maximum channels of a connection.
+    BATCH_DELAY = 0.1  # Channels subscribed in `BATCH_DELAY` seconds are sent in one batch.
+    HEARTBEAT_INTERVAL = None  # Heartbeat interval(seconds), None if no heartbeat message should be sent.
+    HEARTBEAT_MESSAGE = None
+
+    _pools = {}  # Pools of every platform and address. `{(class, url): pool}`
+
+    @classmethod
+    def instance(cls, wss):
+        """Get the pool of a Websocket address, create it if not exists."""
+        url = cls.build_url(wss)
+        if (cls, url) not in cls._pools:
+            cls._pools[(cls, url)] = cls(url)
+        return cls._pools[(cls, url)]
+
+    def __init__(self, url):
+        """Initialize."""
+        self._url = url
+        options = config.markets.get(self.PLATFORM, {})
+        self._max_connections = options.get("connections", 4)
+        self._max_channels = options.get("max_channels", self.MAX_CHANNELS)
+        self._max_rate = options.get("max_rate", 500)
+        self._max_lag = options.get("max_lag", 1000)
+        self._check_interval = options.get("check_interval", 10)
+        self._executor = get_executor(options.get("decode"), options.get("decode_workers"))
+
+        self._connections = []
+        self._owners = {}  # Connection of every channel. `{channel: connection}`
+        # Channels being moved. `{channel: [source connection, destination connection, last timestamp delivered by
+        # source, messages of the last timestamp]}`, the source is None after handed over to the destination.
+        self._moves = {}
+        self._feeds = {}  # Feed of every channel. `{channel: feed}`
+        self._lowest_delay = None
+        self._decode_times = {}  # Decode time of every channel. `{channel: [count, total seconds, max seconds]}`
+
+        LoopRunTask.register(self._rebalance, self._check_interval)
+        if self.HEARTBEAT_INTERVAL:
+            LoopRunTask.register(self._send_heartbeat, self.HEARTBEAT_INTERVAL)
+
+    @property
+    def url(self):
+        return self._url
+
+    @property
+    def feeds(self):
+        return self._feeds
+
+    @property
+    def executor(self):
+        """Executor to decode binary frames, None if decode in the event loop."""
+        return self._executor
+
+    @property
+    def decode_stats(self):
+        """Decode time(millisecond) of every channel, `{channel: {"count": ..., "avg": ..., "max": ...}}`."""
+        return {channel: {"count": count, "avg": total / count * 1000, "max": peak * 1000}
+                for channel, (count, total, peak) in self._decode_times.items()}
+
+    def update_decode_time(self, channel, seconds):
+        times = self._decode_times.get(channel)
+        if not times:
+            self._decode_times[channel] = [1, seconds, seconds]
+            return
+        times[0] += 1
+        times[1] += seconds
+        if seconds > times[2]:
+            times[2] = seconds
+
+    @property
+    def connections(self):
+        return list(self._connections)
+
+    @property
+    def stats(self):
+        """Statistics of every connection, `[{"index": ..., "channels": ..., "rate": ..., "lag": ...}, ...]`."""
+        return [{"index": c.index, "channels": len(c.channels), "rate": c.rate, "lag": c.lag}
+                for c in self._connections]
+
+    def subscribe(self, channel, feed):
+        """Subscribe a channel.
+
+        Args:
+            channel: Channel name.
+            feed: Market data feed to process the channel messages, `async def process(msg)` is required.
+        """
+        self._feeds[channel] = feed
+        if channel in self._owners:
+            return
+        connection = self._choose()
+        if not connection:
+            candidates = [c for c in self._connections if len(c.channels) < self._max_channels]
+            connection = min(candidates, key=lambda c: c.rate) if candidates else self._open()
+        self._owners[channel] = connection
+        connection.subscribe([channel])
+
+    def _choose(self, rate=0, exclude=None):
+        """Choose the connection with the lowest message rate that has room for a channel of `rate`, a new
+        connection is opened if none and the connections are not reached the maximum."""
+        candidates = [c for c in self._connections if c is not exclude and len(c.channels) < self._max_channels
+                      and c.rate + rate <= self._max_rate]
+        if candidates:
+            return min(candidates, key=lambda c: (c.rate, -len(c.channels)))
+        if len(self._connections) < self._max_connections:
+            return self._open()
+        return None
+
+    def _open(self):
+        if len(self._connections) >= self._max_connections:
+            logger.warn("all connections are full, open a new one. platform:", self.PLATFORM,
+                        "connections:", len(self._connections), caller=self)
+        connection = StreamConnection(self, len(self._connections))
+        self._connections.append(connection)
+        return connection
+
+    def update_delay(self, delay):
+        if self._lowest_delay is None or delay < self._lowest_delay:
+            self._lowest_delay = delay
+
+    async def _send_heartbeat(self, *args, **kwargs):
+        for connection in self._connections:
+            await connection.send_heartbeat()
+
+    async def _rebalance(self, *args, **kwargs):
+        """Measure message rates, and move the busiest channels of the overloaded connections."""
+        for connection in self._connections:
+            connection.update_stats(self._check_interval, self._lowest_delay or 0)
+        for connection in list(self._connections):
+            target = connection.rate
+            if target > self._max_rate:
+                target = self._max_rate
+            if self._max_lag and connection.lag and connection.lag > self._max_lag:
+                target = min(target, connection.rate / 2)
+            if target >= connection.rate:
+                continue
+            channels = sorted([c for c in connection.channels if c not in self._moves], key=connection.channel_rate,
+                              reverse=True)
+            rate = connection.rate
+            moved = 0
+            for channel in channels:
+                if rate <= target or len(connection.channels) <= 1:
+                    break
+                channel_rate = connection.channel_rate(channel)
+                destination = self._choose(channel_rate, exclude=connection)
+                if not destination:
+                    break
+                self._move(channel, connection, destination, channel_rate)
+                rate -= channel_rate
+                moved += 1
+            logger.info("rebalance. platform:", self.PLATFORM, "connection:", connection.index, "rate:", rate,
+                        "lag:", connection.lag, "moved channels:", moved, caller=self)
+
+    def _move(self, channel, source, destination, rate):
+        """Subscribe a channel on the destination connection, the source connection is unsubscribed by `accept`
+        when the first message arrives from the destination."""
+        destination.subscribe([channel])
+        destination.update_channel_rate(channel, rate)
+        self._moves[channel] = [source, destination, None, []]
+
+    def accept(self, connection, channel, msg, ts):
+        """If a market data message of a channel being moved should be dispatched.
+
+        Args:
+            connection: Connection the message received from.
+            channel: Channel name.
+            msg: Market data message.
+            ts: Exchange timestamp(millisecond) of the message, None if not provided.
+
+        Returns:
+            True if the message should be dispatched, False if it's a duplicate or from the connection not owning the
+            channel.
+        """
+        move = self._moves.get(channel)
+        if not move:
+            return True
+        source, destination, last_ts, last_msgs = move
+        if connection is source:
+            if ts is not None:
+                if last_ts is None or ts > last_ts:
+                    move[2], move[3] = ts, [msg]
+                elif ts == last_ts:
+                    last_msgs.append(msg)
+            return True
+        if connection is not destination:
+            return False
+        if source:
+            # First message from the destination, hand the channel over.
+            move[0] = None
+            self._owners[channel] = destination
+            source.unsubscribe([channel])
+            logger.info("channel moved. platform:", self.PLATFORM, "channel:", channel, "from:", source.index,
+                        "to:", destination.index, caller=self)
+        if last_ts is None or ts is None or ts > last_ts:
+            del self._moves[channel]
+            return True
+        if ts < last_ts or msg in last_msgs:
+            return False
+        return True
+
+    @classmethod
+    def build_url(cls, wss):
+        """Websocket connection url of an address."""
+        return wss
+
+    def subscribe_messages(self, channels):
+        """Messages to subscribe channels, `[message, ...]`."""
+        raise NotImplementedError
+
+    def unsubscribe_messages(self, channels):
+        """Messages to unsubscribe channels, `[message, ...]`."""
+        raise NotImplementedError
+
+    @staticmethod
+    def decode(raw):
+        """Decode a binary message, None if the message should be ignored. It may run in a worker thread or process,
+        so it must be a static method without any state."""
+        raise NotImplementedError
+
+    def control(self, msg):
+        """Handle a control message, e.g. ping / subscribe response / error.
+
+        Returns:
+            reply: Message to reply, True if the message is handled without reply, None if it's a market data
+                message.
+        """
+        return None
+
+    def route(self, msg):
+        """Channel name of a market data message, None if unknown."""
+        raise NotImplementedError
+
+    def timestamp(self, msg):
+        """Exchange timestamp(millisecond) of a market data message, None if not provided."""
+        return None
@@ -0,0 +1,163 @@
+# -*- coding:utf-8 -*-
+
+"""
+Parameter sweep runner for backtests.
+
+Run a backtest for every parameter set in a process pool, every backtest runs in a fresh worker process, so that
+the global singletons, e.g. config / heartbeat / market center / backtest, never leak between runs.
+
+Author: HuangTao
+Date:   2020/03/20
+Email:  huangtao@ifclover.com
+"""
+
+import os
+import copy
+import json
+import time
+import itertools
+import multiprocessing
+
+from aioquant.utils import logger
+
+__all__ = ("SweepRunner", "grid", )
+
+
+def grid(**kwargs):
+    """Cartesian product of parameter values.
+
+    Args:
+        kwargs: Parameter values, `{name: [value, ...], ...}`.
+
+    Returns:
+        params: Parameter sets, e.g. `grid(a=[1, 2], b=[3])` returns `[{"a": 1, "b": 3}, {"a": 2, "b": 3}]`.
+    """
+    names = list(kwargs.keys())
+    return [dict(zip(names, values)) for values in itertools.product(*[kwargs[name] for name in names])]
+
+
+def _run_backtest(job):
+    """Run a backtest in worker process, and return the result."""
+    index, configures, params, entrance = job
+    configures = copy.deepcopy(configures)
+    configures.update(params)
+    result = {"index": index, "params": params}
+    start, cpu_start = time.time(), time.process_time()
+    try:
+        from aioquant import quant
+        from aioquant.backtest import backtest
+        quant.start(configures, entrance)
+        result["events"] = backtest.count
+        result["results"] = backtest.exchange.report
+    except Exception as e:
+        result["error"] = "{}: {}".format(type(e).__name__, e)
+    result["wall_time"] = time.time() - start
+    result["cpu_time"] = time.process_time() - cpu_start
+    return result
+
+
+class SweepRunner:
+    """Parameter sweep runner.
+
+    Attributes:
+        config_file: Backtest config file, the `BACKTEST` config is required.
+        entrance: Entrance function to create the strategy, same as `quant.start`, it must be a module level function
+            so that it can be sent to worker processes.
+        params: Parameter sets, `[{name: value, ...}, ...]`, every parameter set updates the config of a backtest,
+            e.g. `{"bid_offset": 2}` can be read as `config.bid_offset` in strategy.
+        output: Summary file, the result of every backtest is appended as a json line as soon as it finished.
+        processes: Worker process count, default is the cpu count.
+        cache_path: If set, JSON line market data files are converted to uncompressed columnar files in this directory
+            once, then all workers memory-map the same files instead of each parsing a copy, default is None.
+
+    Usage:
+        runner = SweepRunner("config.json", initialize, grid(bid_offset=[1, 2, 3], ask_offset=[1, 2]),
+                             "sweep.json", cache_path="cache")
+        summary = runner.run()
+
+    NOTE:
+        Recorded market data saved with `compress=None` is memory-mapped by `read_blocks`, the pages are shared by all
+        workers through the page cache. Worker logs are printed at `ERROR` level if `LOG` is not configured.
+    """
+
+    def __init__(self, config_file, entrance, params, output, processes=None, cache_path=None):
+        """Initialize."""
+        self._config_file = config_file
+        self._entrance = entrance
+        self._params = params
+        self._output = output
+        self._processes = processes or os.cpu_count()
+        self._cache_path = cache_path
+
+    def run(self):
+        """Run all backtests and wait for finished.
+
+        Returns:
+            summary: `{"runs": ..., "errors": ..., "events": ..., "wall_time": ..., "events_per_second": ...,
+                "events_per_second_per_core": ...}`, events per second per core is counted by the cpu time of
+                workers.
+        """
+        with open(self._config_file) as f:
+            configures = json.load(f)
+        if not configures.get("BACKTEST"):
+            raise ValueError("BACKTEST config is required.")
+        configures.setdefault("LOG", {"level": "ERROR", "console": True})
+        if self._cache_path:
+            configures["BACKTEST"]["data"] = self._prepare_data(configures["BACKTEST"].get("data", []))
+
+        jobs = [(i, configures, params, self._entrance) for i, params in enumerate(self._params)]
+        runs, errors, events, cpu_time = 0, 0, 0, 0
+        start = time.time()
+        # A fresh worker process for every backtest.
+        with multiprocessing.Pool(self._processes, maxtasksperchild=1) as pool, open(self._output, "a") as f:
+            for result in pool.imap_unordered(_run_backtest, jobs):
+                f.write(json.dumps(result) + "\n")
+                f.flush()
+                runs += 1
+                cpu_time += result["cpu_time"]
+                if "error" in result:
+                    errors += 1
+                    logger.error("backtest error! params:", result["params"], "error:", result["error"], caller=self)
+                    continue
+                events += result["events"]
+                logger.info("backtest finished:", runs, "/", len(jobs), "params:", result["params"], caller=self)
+        wall_time = time.time() - start
+        summary = {
+            "runs": runs,
+            "errors": errors,
+            "events": events,
+            "wall_time": wall_time,
+            "events_per_second": events / wall_time if wall_time else 0,
+            "events_per_second_per_core": events / cpu_time if cpu_time else 0
+        }
+        logger.info("sweep finished. summary:", summary, caller=self)
+        return summary
+
+    def _prepare_data(self, data):
+        """Convert JSON line market data files to uncompressed columnar files, return the new data config."""
+        from aioquant.backtest import read_market_data
+        from aioquant.recorder import PartitionWriter
+
+        if isinstance(data, str):
+            data = [data]
+        sources = []
+        for item in data:
+            if isinstance(item, dict):
+                sources.append(item)
+                continue
+            path = os.path.join(self._cache_path, os.path.splitext(os.path.basename(item))[0])
+            partitions_file = os.path.join(path, "partitions.json")
+            if not os.path.isfile(partitions_file):
+                logger.info("convert market data:", item, "to:", path, caller=self)
+                writer = PartitionWriter(path, block_size=65536, compress=None)
+                for _, market_type, obj in read_market_data(item):
+                    writer.write(market_type, obj)
+                partitions = writer.partitions
+                writer.close()
+                with open(partitions_file, "w") as f:
+                    json.dump(partitions, f)
+            with open(partitions_file) as f:
+                partitions = json.load(f)
+            for platform, symbol, market_type in partitions:
+                sources.append({"path": path, "platform": platform, "symbol": symbol, "type": market_type})
+        return sources
@@ -0,0 +1,378 @@
+# -*- coding:utf-8 -*-
+
+"""
+Symbol metadata registry.
+
+Load exchange information once per platform, cache it on disk, and precompute the mapping tables between unified
+symbol name (e.g. `ETH/BTC`) and raw symbol name (e.g. `ETHBTC` / `ethbtc` / `ETH-BTC`), and the precision and
+filters of every symbol, so that orders can be rounded and validated locally before any request goes out.
+
+Author: HuangTao
+Date:   2020/03/20
+Email:  huangtao@ifclover.com
+"""
+
+import os
+import json
+import asyncio
+import decimal
+
+from aioquant import const
+from aioquant.error import Error
+from aioquant.utils import tools
+from aioquant.utils import logger
+from aioquant.tasks import LoopRunTask
+from aioquant.configure import config
+from aioquant.order import ORDER_ACTION_BUY
+
+__all__ = ("SymbolInfo", "SymbolRegistry", "symbol_registry", )
+
+
+class SymbolInfo:
+    """Symbol information.
+
+    Attributes:
+        platform: Exchange platform name, e.g. `binance` / `huobi` / `okex`.
+        symbol: Unified symbol name, e.g. `ETH/BTC`.
+        raw_symbol: Raw symbol name on Exchange, e.g. `ETHBTC`.
+        base: Base currency name, e.g. `ETH`.
+        quote: Quote currency name, e.g. `BTC`.
+        price_tick: Minimum price movement, string.
+        quantity_step: Minimum quantity movement, string.
+        min_quantity: Minimum order quantity, string.
+        max_quantity: Maximum order quantity, string, `None` if no limit.
+        min_notional: Minimum order value (price * quantity), string, `None` if no limit.
+    """
+
+    def __init__(self, platform=None, symbol=None, raw_symbol=None, base=None, quote=None, price_tick=None,
+                 quantity_step=None, min_quantity=None, max_quantity=None, min_notional=None):
+        """Initialize."""
+        self.platform = platform
+        self.symbol = symbol
+        self.raw_symbol = raw_symbol
+        self.base = base
+        self.quote = quote
+        self.price_tick = price_tick
+        self.quantity_step = quantity_step
+        self.min_quantity = min_quantity
+        self.max_quantity = max_quantity
+        self.min_notional = min_notional
+
+        # Precomputed values, avoid converting for every order.
+        self._price_tick = decimal.Decimal(price_tick) if price_tick else None
+        self._quantity_step = decimal.Decimal(quantity_step) if quantity_step else None
+        self._min_quantity = float(min_quantity) if min_quantity else 0
+        self._max_quantity = float(max_quantity) if max_quantity else 0
+        self._min_notional = float(min_notional) if min_notional else 0
+
+    def round_price(self, price, action=None):
+        """Round price to price tick, round down for `BUY` and round up for `SELL`, so the price never crosses the
+            original one.
+
+        Args:
+            price: Price, string or float.
+            action: Trade direction, `BUY` or `SELL`, default is round down.
+
+        Returns:
+            price: Price string.
+        """
+        if not self._price_tick:
+            return tools.float_to_str(price)
+        rounding = decimal.ROUND_UP if action and action != ORDER_ACTION_BUY else decimal.ROUND_DOWN
+        value = decimal.Decimal(str(price)) / self._price_tick
+        value = value.quantize(decimal.Decimal(1), rounding=rounding) * self._price_tick
+        return format(value.normalize(), "f")
+
+    def round_quantity(self, quantity):
+        """Round quantity down to quantity step.
+
+        Args:
+            quantity: Quantity, string or float.
+
+        Returns:
+            quantity: Quantity string.
+        """
+        if not self._quantity_step:
+            return tools.float_to_str(quantity)
+        value = decimal.Decimal(str(quantity)) / self._quantity_step
+        value = value.quantize(decimal.Decimal(1), rounding=decimal.ROUND_DOWN) * self._quantity_step
+        return format(value.normalize(), "f")
+
+    def validate(self, price, quantity):
+        """Validate order price and quantity with symbol filters.
+
+        Args:
+            price: Order price.
+            quantity: Order quantity.
+
+        Returns:
+            error: Error information if validate failed, otherwise it's None.
+        """
+        quantity = float(quantity)
+        if quantity <= 0 or quantity < self._min_quantity:
+            return Error("quantity less than minimum quantity: {} < {}".format(quantity, self.min_quantity))
+        if self._max_quantity and quantity > self._max_quantity:
+            return Error("quantity greater than maximum quantity: {} > {}".format(quantity, self.max_quantity))
+        if float(price) <= 0:
+            return Error("price error: {}".format(price))
+        if self._min_notional and float(price) * quantity < self._min_notional:
+            return Error("notional less than minimum notional: {} < {}".format(float(price) * quantity,
+                                                                                self.min_notional))
+        return None
+
+    @property
+    def data(self):
+        d = {
+            "platform": self.platform,
+            "symbol": self.symbol,
+            "raw_symbol": self.raw_symbol,
+            "base": self.base,
+            "quote": self.quote,
+            "price_tick": self.price_tick,
+            "quantity_step": self.quantity_step,
+            "min_quantity": self.min_quantity,
+            "max_quantity": self.max_quantity,
+            "min_notional": self.min_notional
+        }
+        return d
+
+    def __str__(self):
+        info = json.dumps(self.data)
+        return info
+
+    def __repr__(self):
+        return str(self)
+
+
+class SymbolRegistry:
+    """Symbol metadata registry.
+
+    Attributes:
+        cache_dir: Directory to cache exchange information, default is `cache_dir` of config `SYMBOLS`, no disk cache
+            if it's not set either.
+        refresh_interval: Refresh exchange information interval(seconds), default is `refresh_interval` of config
+            `SYMBOLS`, or 3600s.
+
+    NOTE:
+        Concurrent loads of the same platform share one request.
+    """
+
+    def __init__(self, cache_dir=None, refresh_interval=None):
+        """Initialize."""
+        self._cache_dir = cache_dir
+        self._refresh_interval = refresh_interval
+        self._loading = {}  # Loading tasks of every platform, `{platform: task}`.
+        self._symbols = {}  # Symbol information by unified symbol name, `{platform: {symbol: SymbolInfo}}`.
+        self._raw_symbols = {}  # Symbol information by raw symbol name, `{platform: {raw_symbol: SymbolInfo}}`.
+        self._utimes = {}  # Last load timestamp(second) of every platform, `{platform: timestamp}`.
+        self._refresh_tasks = {}  # Refresh loop task id of every platform, `{platform: task_id}`.
+
+    def initialize(self, cache_dir=None, refresh_interval=None):
+        """Set cache directory and refresh interval.
+
+        Args:
+            cache_dir: Directory to cache exchange information.
+            refresh_interval: Refresh exchange information interval(seconds).
+        """
+        if cache_dir is not None:
+            self._cache_dir = cache_dir
+        if refresh_interval is not None:
+            self._refresh_interval = refresh_interval
+
+    @property
+    def cache_dir(self):
+        return self._cache_dir if self._cache_dir is not None else config.symbols.get("cache_dir")
+
+    @property
+    def refresh_interval(self):
+        if self._refresh_interval is not None:
+            return self._refresh_interval
+        return config.symbols.get("refresh_interval", 3600)
+
+    def get(self, platform, symbol):
+        """Get symbol information by unified symbol name.
+
+        Args:
+            platform: Exchange platform name.
+            symbol: Unified symbol name, e.g. `ETH/BTC`.
+
+        Returns:
+            symbol_info: SymbolInfo object, `None` if not found.
+        """
+        return self._symbols.get(platform, {}).get(symbol)
+
+    def get_by_raw(self, platform, raw_symbol):
+        """Get symbol information by raw symbol name.
+
+        Args:
+            platform: Exchange platform name.
+            raw_symbol: Raw symbol name, e.g. `ETHBTC`.
+
+        Returns:
+            symbol_info: SymbolInfo object, `None` if not found.
+        """
+        return self._raw_symbols.get(platform, {}).get(raw_symbol)
+
+    def to_raw(self, platform, symbol):
+        """Convert unified symbol name to raw symbol name, `None` if not found."""
+        info = self.get(platform, symbol)
+        return info.raw_symbol if info else None
+
+    def to_unified(self, platform, raw_symbol):
+        """Convert raw symbol name to unified symbol name, `None` if not found."""
+        info = self.get_by_raw(platform, raw_symbol)
+        return info.symbol if info else None
+
+    def symbols(self, platform):
+        """Get all unified symbol names of a platform."""
+        return list(self._symbols.get(platform, {}).keys())
+
+    async def load(self, platform, force=False):
+        """Load exchange information of a platform, from disk cache if it's fresh, otherwise from Exchange.
+
+        Args:
+            platform: Exchange platform name.
+            force: If reload from Exchange even though the information is fresh.
+
+        Returns:
+            success: True if loaded successfully, otherwise it's None.
+            error: Error information, otherwise it's None.
+        """
+        task = self._loading.get(platform)
+        if not task or task.done():
+            task = self._loading[platform] = asyncio.ensure_future(self._load(platform, force))
+        elif force:
+            # Reload after the loading one.
+            await asyncio.shield(task)
+            return await self.load(platform, force)
+        return await asyncio.shield(task)
+
+    async def _load(self, platform, force):
+        refresh_interval = self.refresh_interval
+        now = tools.get_cur_timestamp()
+        if not force and now - self._utimes.get(platform, 0) < refresh_interval:
+            return True, None
+
+        cache = None if force else self._read_cache(platform)
+        if cache and now - cache["timestamp"] < refresh_interval:
+            raw, timestamp = cache["data"], cache["timestamp"]
+        else:
+            raw, error = await self._fetch(platform)
+            if error:
+                if not cache:
+                    return None, error
+                logger.warn("fetch exchange information failed, use stale cache. platform:", platform, "error:",
+                            error, caller=self)
+                raw, timestamp = cache["data"], cache["timestamp"]
+            else:
+                timestamp = now
+                self._write_cache(platform, raw, timestamp)
+
+        symbols, raw_symbols = {}, {}
+        for info in self._parse(platform, raw):
+            symbols[info.symbol] = info
+            raw_symbols[info.raw_symbol] = info
+        self._symbols[platform] = symbols
+        self._raw_symbols[platform] = raw_symbols
+        self._utimes[platform] = timestamp
+
+        if platform not in self._refresh_tasks:
+            self._refresh_tasks[platform] = LoopRunTask.register(self._refresh, refresh_interval, platform)
+        logger.info("load symbols success. platform:", platform, "count:", len(symbols), caller=self)
+        return True, None
+
+    async def _refresh(self, platform, *args, **kwargs):
+        _, error = await self.load(platform, force=True)
+        if error:
+            logger.error("refresh symbols failed. platform:", platform, "error:", error, caller=self)
+
+    async def _fetch(self, platform):
+        if platform == const.BINANCE:
+            from aioquant.platform.binance import BinanceRestAPI
+            rest_api = BinanceRestAPI("", "")
+        elif platform == const.HUOBI:
+            from aioquant.platform.huobi import HuobiRestAPI
+            rest_api = HuobiRestAPI("", "")
+        elif platform == const.OKEX:
+            from aioquant.platform.okex import OKExRestAPI
+            rest_api = OKExRestAPI("", "", "")
+        else:
+            return None, Error("platform error: {}".format(platform))
+        success, error = await rest_api.get_exchange_info()
+        return success, error
+
+    def _parse(self, platform, raw):
+        """Parse exchange information to SymbolInfo list."""
+        infos = []
+        if platform == const.BINANCE:
+            for item in raw["symbols"]:
+                filters = {f["filterType"]: f for f in item["filters"]}
+                notional = filters.get("MIN_NOTIONAL") or filters.get("NOTIONAL") or {}
+                info = {
+                    "platform": platform,
+                    "symbol": item["baseAsset"] + "/" + item["quoteAsset"],
+                    "raw_symbol": item["symbol"],
+                    "base": item["baseAsset"],
+                    "quote": item["quoteAsset"],
+                    "price_tick": filters.get("PRICE_FILTER", {}).get("tickSize"),
+                    "quantity_step": filters.get("LOT_SIZE", {}).get("stepSize"),
+                    "min_quantity": filters.get("LOT_SIZE", {}).get("minQty"),
+                    "max_quantity": filters.get("LOT_SIZE", {}).get("maxQty"),
+                    "min_notional": notional.get("minNotional")
+                }
+                infos.append(SymbolInfo(**info))
+        elif platform == const.HUOBI:
+            for item in raw["data"]:
+                info = {
+                    "platform": platform,
+                    "symbol": item["base-currency"].upper() + "/" + item["quote-currency"].upper(),
+                    "raw_symbol": item["symbol"],
+                    "base": item["base-currency"].upper(),
+                    "quote": item["quote-currency"].upper(),
+                    "price_tick": str(decimal.Decimal(1).scaleb(-item["price-precision"])),
+                    "quantity_step": str(decimal.Decimal(1).scaleb(-item["amount-precision"])),
+                    "min_quantity": tools.float_to_str(item["min-order-amt"]) if item.get("min-order-amt") else None,
+                    "max_quantity": tools.float_to_str(item["max-order-amt"]) if item.get("max-order-amt") else None,
+                    "min_notional": tools.float_to_str(item["min-order-value"]) if item.get("min-order-value") else None
+                }
+                infos.append(SymbolInfo(**info))
+        elif platform == const.OKEX:
+            for item in raw:
+                info = {
+                    "platform": platform,
+                    "symbol": item["base_currency"] + "/" + item["quote_currency"],
+                    "raw_symbol": item["instrument_id"],
+                    "base": item["base_currency"],
+                    "quote": item["quote_currency"],
+                    "price_tick": item["tick_size"],
+                    "quantity_step": item["size_increment"],
+                    "min_quantity": item["min_size"]
+                }
+                infos.append(SymbolInfo(**info))
+        return infos
+
+    def _cache_file(self, platform):
+        return os.path.join(self.cache_dir, "symbols_{}.json".format(platform))
+
+    def _read_cache(self, platform):
+        if not self.cache_dir or not os.path.isfile(self._cache_file(platform)):
+            return None
+        try:
+            with open(self._cache_file(platform)) as f:
+                return json.load(f)
+        except Exception as e:
+            logger.warn("read symbols cache failed. platform:", platform, "error:", e, caller=self)
+            return None
+
+    def _write_cache(self, platform, raw, timestamp):
+        if not self.cache_dir:
+            return
+        if not os.path.isdir(self.cache_dir):
+            os.makedirs(self.cache_dir)
+        tmp = self._cache_file(platform) + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"timestamp": timestamp, "data": raw}, f)
+        os.replace(tmp, self._cache_file(platform))
+
+
+symbol_registry = SymbolRegistry()
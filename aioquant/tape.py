@@ -0,0 +1,191 @@
+# -*- coding:utf-8 -*-
+
+"""
+Trade tape.
+
+Author: HuangTao
+Date:   2020/03/24
+Email:  huangtao@ifclover.com
+"""
+
+from array import array
+
+from aioquant import const
+from aioquant.utils import tools
+from aioquant.market import Trade, MarketSubscribe
+from aioquant.order import ORDER_ACTION_BUY
+
+__all__ = ("TradeTape", )
+
+
+class TradeTape:
+    """Trade tape, save the recent trades of a symbol in fixed size arrays, no Python object is kept for a trade.
+
+    Attributes:
+        platform: Exchange platform name, e.g. `binance` / `okex` / `huobi`.
+        symbol: Trade pair name, e.g. `ETH/BTC`.
+        size: Maximum trades to be saved, the oldest trade is dropped when the tape is full, default is 10000.
+        subscribe: If subscribe trades of the platform and symbol, default is True, otherwise call `append` manually.
+
+    Usage:
+        tape = TradeTape(const.BINANCE, "ETH/BTC")
+        ...
+        volume = tape.volume(60)  # Trade volume in the last 60 seconds.
+        vwap = tape.vwap(60)
+        columns = tape.arrays(100)  # The last 100 trades as NumPy arrays.
+
+    NOTE:
+        Every value is written twice, at `i` and `i + size`, so the last `size` trades are always contiguous and can
+        be exported as NumPy views without copying. Running totals are saved with every trade, a time window query
+        is the difference of two totals, and the window start of every queried length moves forward only, so a query
+        costs amortized O(1). Windows are truncated to the trades in the tape, and time windows end at the current
+        time, which is the virtual time in backtest.
+    """
+
+    def __init__(self, platform, symbol, size=10000, subscribe=True):
+        """Initialize."""
+        self._platform = platform
+        self._symbol = symbol
+        self._size = size
+        self._timestamps = array("q", [0]) * (2 * size)
+        self._prices = array("d", [0]) * (2 * size)
+        self._quantities = array("d", [0]) * (2 * size)
+        self._actions = array("b", [0]) * (2 * size)  # 1 for BUY and -1 for SELL.
+        # Running totals before every trade.
+        self._volumes = array("d", [0]) * (2 * size)
+        self._buy_volumes = array("d", [0]) * (2 * size)
+        self._values = array("d", [0]) * (2 * size)
+        self._volume = 0.0
+        self._buy_volume = 0.0
+        self._value = 0.0
+        self._count = 0  # Total trades appended.
+        self._starts = {}  # Start trade number of every window queried. `{milliseconds: number}`
+
+        if subscribe:
+            MarketSubscribe(const.MARKET_TYPE_TRADE, self._platform, self._symbol, self.on_event_trade_update)
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def count(self):
+        """Total trades appended."""
+        return self._count
+
+    def __len__(self):
+        return min(self._count, self._size)
+
+    async def on_event_trade_update(self, trade: Trade):
+        action = 1 if trade.action == ORDER_ACTION_BUY else -1
+        self.append(trade.timestamp, float(trade.price), float(trade.quantity), action)
+
+    def append(self, timestamp, price, quantity, action):
+        """Append a trade.
+
+        Args:
+            timestamp: Trade time, millisecond.
+            price: Trade price.
+            quantity: Trade quantity.
+            action: 1 for BUY and -1 for SELL.
+        """
+        i = self._count % self._size
+        for j in (i, i + self._size):
+            self._timestamps[j] = timestamp
+            self._prices[j] = price
+            self._quantities[j] = quantity
+            self._actions[j] = action
+            self._volumes[j] = self._volume
+            self._buy_volumes[j] = self._buy_volume
+            self._values[j] = self._value
+        self._volume += quantity
+        if action > 0:
+            self._buy_volume += quantity
+        self._value += price * quantity
+        self._count += 1
+
+    def _start(self, seconds):
+        """Number of the first trade in the last `seconds`."""
+        ms = int(seconds * 1000)
+        cutoff = tools.get_cur_timestamp_ms() - ms
+        start = max(self._starts.get(ms, 0), self._count - self._size)
+        while start < self._count and self._timestamps[start % self._size] < cutoff:
+            start += 1
+        self._starts[ms] = start
+        return start
+
+    def _totals(self, start):
+        """Totals of trades from number `start` to the last, `(count, volume, buy volume, value)`."""
+        if start >= self._count:
+            return 0, 0.0, 0.0, 0.0
+        i = start % self._size
+        return (self._count - start, self._volume - self._volumes[i], self._buy_volume - self._buy_volumes[i],
+                self._value - self._values[i])
+
+    def trade_count(self, seconds):
+        """Trade count in the last `seconds`."""
+        return self._totals(self._start(seconds))[0]
+
+    def volume(self, seconds):
+        """Trade volume in the last `seconds`."""
+        return self._totals(self._start(seconds))[1]
+
+    def buy_volume(self, seconds):
+        """Buy volume in the last `seconds`."""
+        return self._totals(self._start(seconds))[2]
+
+    def sell_volume(self, seconds):
+        """Sell volume in the last `seconds`."""
+        _, volume, buy_volume, _ = self._totals(self._start(seconds))
+        return volume - buy_volume
+
+    def imbalance(self, seconds):
+        """Buy and sell volume imbalance in the last `seconds`, `(buy - sell) / (buy + sell)`, 0 if no trade."""
+        _, volume, buy_volume, _ = self._totals(self._start(seconds))
+        if volume <= 0:
+            return 0.0
+        return (2 * buy_volume - volume) / volume
+
+    def vwap(self, seconds):
+        """Volume weighted average price in the last `seconds`, None if no trade."""
+        _, volume, _, value = self._totals(self._start(seconds))
+        if volume <= 0:
+            return None
+        return value / volume
+
+    def window(self, seconds):
+        """All statistics in the last `seconds`.
+
+        Returns:
+            stats: `{"count": ..., "volume": ..., "buy_volume": ..., "sell_volume": ..., "imbalance": ...,
+                "vwap": ...}`.
+        """
+        count, volume, buy_volume, value = self._totals(self._start(seconds))
+        return {
+            "count": count,
+            "volume": volume,
+            "buy_volume": buy_volume,
+            "sell_volume": volume - buy_volume,
+            "imbalance": (2 * buy_volume - volume) / volume if volume > 0 else 0.0,
+            "vwap": value / volume if volume > 0 else None
+        }
+
+    def arrays(self, n=None):
+        """The last `n` trades from the oldest to the newest as NumPy views without copying, the views are changed
+        by later trades, copy them if they should be kept. NumPy is required.
+
+        Args:
+            n: Trade count, default is all trades in the tape.
+
+        Returns:
+            columns: `{"timestamp": ..., "price": ..., "quantity": ..., "action": ...}`.
+        """
+        import numpy as np
+
+        n = len(self) if n is None else min(n, len(self))
+        start = (self._count - n) % self._size
+        columns = {}
+        for name, data in (("timestamp", self._timestamps), ("price", self._prices),
+                           ("quantity", self._quantities), ("action", self._actions)):
+            columns[name] = np.frombuffer(data, dtype=data.typecode)[start: start + n]
+        return columns
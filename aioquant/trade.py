@@ -0,0 +1,404 @@
+# -*- coding:utf-8 -*-
+
+"""
+Trade Module.
+
+Author: HuangTao
+Date:   2019/04/21
+Email:  huangtao@ifclover.com
+"""
+
+import asyncio
+
+from aioquant import const
+from aioquant.error import Error
+from aioquant.utils import tools
+from aioquant.utils import logger
+from aioquant.tasks import SingleTask
+from aioquant.configure import config
+from aioquant.risk import RiskEngine
+from aioquant.asset import AssetSubscribe, AssetTracker
+from aioquant.position import position_engine
+from aioquant.journal import OrderJournal
+from aioquant.latency import latency_collector
+from aioquant.symbols import symbol_registry
+from aioquant.order import Order, ORDER_STATUS_CANCELED, ORDER_TYPE_LIMIT
+
+__all__ = ("Trade", )
+
+
+class Trade:
+    """Trade Module.
+
+    Attributes:
+        strategy: What's name would you want to created for your strategy.
+        platform: Exchange platform name. e.g. `binance` / `okex` / `huobi`.
+        symbol: Symbol name for your trade. e.g. `ETH/BTC`.
+        host: HTTP request host. (default is "None", every Exchange has a default host.)
+        wss: Websocket address. (default is "None", every Exchange has a default wss host.)
+        account: Account name for this trade exchange.
+        access_key: Account's ACCESS KEY.
+        secret_key: Account's SECRET KEY.
+        passphrase: API KEY Passphrase. (Only for `OKEx`)
+        order_update_callback: You can use this param to specify a async callback function when you initializing Trade
+            module. `order_update_callback` is like `async def on_order_update_callback(order: Order): pass` and this
+            callback function will be executed asynchronous when some order state updated.
+        init_success_callback: You can use this param to specify a async callback function when you initializing Trade
+            module. `init_success_callback` is like `async def on_init_success_callback(success: bool, error: Error,
+            **kwargs): pass` and this callback function will be executed asynchronous after Trade module object
+            initialized done.
+        position_update_callback: You can use this param to specify a async callback function to subscribe the position
+            of the strategy and symbol. `position_update_callback` is like `async def on_position_update_callback(
+            position: Position): pass`, and this callback function will be executed asynchronous when some order filled.
+        reconcile_interval: Interval(seconds) to reconcile the local open orders against the open orders on Exchange,
+            the corrected orders are pushed by `order_update_callback`, default is None, no reconciliation.
+        asset_update_callback: You can use this param to specify a async callback function to subscribe the assets of
+            the account. `asset_update_callback` is like `async def on_asset_update_callback(asset: Asset): pass`, the
+            assets are tracked incrementally by order updates and reconciled by REST snapshots at a low frequency.
+            The assets of an account are tracked by the order updates of all its Trade objects, whether the callback
+            is set or not.
+        journal_path: Root directory of the write-ahead order journals, default is None, no journal. If it's set, the
+            order intents and state transitions are journaled, and the orders are rebuilt from the journal on startup,
+            only the non-terminal orders are reconciled instead of pulling back all the open orders. The journal
+            requires `account` and `access_key` to reconcile the restored orders, otherwise it's disabled.
+    """
+
+    def __init__(self, strategy=None, platform=None, symbol=None, host=None, wss=None, account=None, access_key=None,
+                 secret_key=None, passphrase=None, order_update_callback=None, init_success_callback=None,
+                 position_update_callback=None, reconcile_interval=None, asset_update_callback=None, journal_path=None,
+                 **kwargs):
+        """Initialize trade object."""
+        kwargs["strategy"] = strategy
+        kwargs["platform"] = platform
+        kwargs["symbol"] = symbol
+        kwargs["host"] = host
+        kwargs["wss"] = wss
+        kwargs["account"] = account
+        kwargs["access_key"] = access_key
+        kwargs["secret_key"] = secret_key
+        kwargs["passphrase"] = passphrase
+        kwargs["order_update_callback"] = self._on_order_update_callback
+        kwargs["init_success_callback"] = self._on_init_success_callback
+
+        self._strategy = strategy
+        self._platform = platform
+        self._account = account
+        self._symbol = symbol
+        self._order_update_callback = order_update_callback
+        self._init_success_callback = init_success_callback
+
+        self._replacements = {}  # Pending replacements. e.g. {old_order_id: {"price": ..., "quantity": ...}, ... }
+        self._traces = {}  # Latency traces of the open orders. e.g. {order_id: trace, ... }
+        self._risk = None  # Pre-trade risk engine of the account.
+        self._journal = None  # Write-ahead order journal.
+        self._restored = []  # Non-terminal orders restored from the journal, to be reconciled after initialized.
+        self._reconciler = None  # Open order reconciler of the account.
+
+        if position_update_callback:
+            position_engine.subscribe(strategy, platform, account, symbol, position_update_callback)
+            position_engine.watch(platform, symbol)
+
+        if config.risk.get(platform):
+            self._risk = RiskEngine.instance(platform, account)
+            self._risk.watch(symbol)
+
+        if config.backtest:
+            # Orders are matched by the simulated exchange in backtest.
+            from aioquant.backtest import BacktestTrade
+            self._t = BacktestTrade(**kwargs)
+            return
+
+        if platform == const.BINANCE:
+            from aioquant.platform.binance import BinanceTrade as T, BinanceAssetTracker as A, \
+                BinanceOrderReconciler as R
+        elif platform == const.HUOBI:
+            from aioquant.platform.huobi import HuobiTrade as T, HuobiAssetTracker as A, HuobiOrderReconciler as R
+        elif platform == const.OKEX:
+            from aioquant.platform.okex import OKExTrade as T, OKExAssetTracker as A, OKExOrderReconciler as R
+        else:
+            logger.error("platform error:", platform, caller=self)
+            e = Error("platform error")
+            SingleTask.run(self._on_init_success_callback, False, e)
+            return
+        kwargs.pop("platform")
+        if journal_path and not (account and access_key and strategy and symbol):
+            # The restored orders can't be reconciled without the API key.
+            logger.error("order journal requires account, access_key, strategy and symbol, journal disabled.",
+                         caller=self)
+        elif journal_path:
+            self._journal = OrderJournal(journal_path, platform, account, strategy, symbol)
+            self._restored = self._journal.orders
+            kwargs["orders"] = {order.order_id: order for order in self._restored if order.order_id}
+            kwargs["pending_orders"] = {order.client_order_id: order for order in self._restored if not order.order_id}
+        self._t = T(**kwargs)
+
+        if account and access_key and (reconcile_interval or self._journal):
+            self._reconciler = R.instance(account, interval=reconcile_interval or 60)
+        if reconcile_interval and self._reconciler:
+            self._reconciler.register(symbol, self._t)
+
+        if asset_update_callback and account and access_key:
+            AssetSubscribe(platform, account, asset_update_callback)
+            A.instance(account, self._t.rest_api)
+
+        # Load symbol metadata for local order rounding and validation.
+        SingleTask.run(symbol_registry.load, platform)
+
+    @property
+    def orders(self):
+        return self._t.orders
+
+    @property
+    def rest_api(self):
+        return self._t.rest_api
+
+    @property
+    def position(self):
+        """Position of the strategy and symbol, filled since the process started."""
+        return position_engine.get(self._strategy, self._platform, self._account, self._symbol)
+
+    @property
+    def replacements(self):
+        return self._replacements
+
+    async def create_order(self, action, price, quantity, *args, **kwargs):
+        """Create an order.
+
+        Args:
+            action: Trade direction, `BUY` or `SELL`.
+            price: Price of each contract.
+            quantity: The buying or selling quantity.
+            kwargs:
+                order_type: Order type, `LIMIT` or `MARKET`, default is `LIMIT`.
+                client_order_id: Client order id, default is generated automatically.
+
+        Returns:
+            order_id: Order id if created successfully, otherwise it's None.
+            error: Error information, otherwise it's None.
+
+        NOTE:
+            If the symbol metadata has been loaded, price and quantity will be rounded to price tick and quantity step,
+            and validated by symbol filters locally before the request goes out.
+            If risk limits of the platform are configured, the order will be checked by the risk engine.
+            If latency tracing is enabled, the order is traced from here, see `aioquant.latency`.
+            If the order journal is enabled, the order intent is synced to the journal before the order is sent.
+        """
+        trace, token = latency_collector.begin_order()
+        if not trace:
+            return await self._create_order(action, price, quantity, *args, **kwargs)
+        try:
+            order_id, error = await self._create_order(action, price, quantity, *args, **kwargs)
+        finally:
+            latency_collector.end_order(token)
+        if trace.sent_ns:
+            latency_collector.record(self._strategy, trace)
+        if order_id:
+            self._traces[order_id] = trace
+        return order_id, error
+
+    async def _create_order(self, action, price, quantity, *args, **kwargs):
+        price, quantity, error = self._check_order(action, price, quantity)
+        if error:
+            return None, error
+        ticket, error = self._check_risk(action, price, quantity)
+        if error:
+            return None, error
+        order_id = None
+        try:
+            if self._journal:
+                await self._journal_intent(action, price, quantity, kwargs)
+            order_id, error = await self._t.create_order(action, price, quantity, *args, **kwargs)
+            if error and not order_id and self._journal:
+                # Rejected by Exchange, the intent will never be acknowledged.
+                self._journal.forget(kwargs["client_order_id"])
+        finally:
+            if ticket:
+                self._risk.confirm(self._symbol, ticket, order_id)
+        return order_id, error
+
+    def _check_order(self, action, price, quantity):
+        """Round and validate order price and quantity by symbol metadata.
+
+        Returns:
+            price: Rounded price.
+            quantity: Rounded quantity.
+            error: Error information if validate failed, otherwise it's None.
+        """
+        symbol_info = symbol_registry.get(self._platform, self._symbol)
+        if not symbol_info:
+            return price, quantity, None
+        price = symbol_info.round_price(price, action)
+        quantity = symbol_info.round_quantity(quantity)
+        error = symbol_info.validate(price, quantity)
+        return price, quantity, error
+
+    async def _journal_intent(self, action, price, quantity, kwargs):
+        """Append the order intent to the journal and wait until it's synced, the client order id is generated here
+        if not set, so the order can be queried by it after a crash."""
+        # Client order id must start with a letter, and the length must be less than 32 on OKEx.
+        client_order_id = kwargs.get("client_order_id") or "a" + tools.get_uuid1().replace("-", "")[:31]
+        kwargs["client_order_id"] = client_order_id
+        order = Order(self._platform, self._account, self._strategy, client_order_id=client_order_id,
+                      symbol=self._symbol, action=action, price=tools.float_to_str(price),
+                      quantity=tools.float_to_str(quantity), order_type=kwargs.get("order_type", ORDER_TYPE_LIMIT))
+        self._journal.intent(order)
+        await self._journal.commit()
+
+    def _check_risk(self, action, price, quantity, replacing=None):
+        """Check order by the risk engine, `replacing` is the order id to be replaced by this order.
+
+        Returns:
+            ticket: Ticket to confirm the order by the risk engine, None if no risk engine or rejected.
+            error: Error information if rejected, otherwise it's None.
+        """
+        if not self._risk:
+            return None, None
+        ticket, error = self._risk.check(self._symbol, action, price, quantity, replacing)
+        if error:
+            logger.warn("order rejected by risk engine. symbol:", self._symbol, "action:", action, "price:", price,
+                        "quantity:", quantity, "error:", error, caller=self)
+        return ticket, error
+
+    async def revoke_order(self, *order_ids):
+        """Revoke (an) order(s).
+
+        Args:
+            order_ids: Order id list, you can set this param to 0 or multiple items. If you set 0 param, you can cancel
+                all orders for this symbol(initialized in Trade object). If you set 1 param, you can cancel an order.
+                If you set multiple param, you can cancel multiple orders. Do not set param length more than 100.
+
+        Returns:
+            success: If execute successfully, return success information, otherwise it's None.
+            error: If execute failed, return error information, otherwise it's None.
+        """
+        success, error = await self._t.revoke_order(*order_ids)
+        return success, error
+
+    async def replace_order(self, order_id, action, price, quantity, *args, **kwargs):
+        """Replace an order, cancel the old order and create a new order concurrently, so a requote costs one round
+            trip instead of two.
+
+        Args:
+            order_id: The order id to be replaced.
+            action: Trade direction of the new order, `BUY` or `SELL`.
+            price: Price of the new order.
+            quantity: Quantity of the new order.
+            kwargs: Same as `create_order`.
+
+        Returns:
+            order_id: New order id if replaced successfully, otherwise it's None.
+            error: Error information, otherwise it's None.
+
+        NOTE:
+            If creating the new order failed, the old order has been canceled and no new order exists.
+            If canceling the old order failed, the new order will be canceled again to avoid doubled exposure, unless
+            the old order has been canceled already.
+        """
+        if order_id in self._replacements:
+            return None, Error("order is being replaced. order_id: {}".format(order_id))
+        price, quantity, error = self._check_order(action, price, quantity)
+        if error:
+            return None, error
+        ticket, error = self._check_risk(action, price, quantity, order_id)
+        if error:
+            return None, error
+        self._replacements[order_id] = {
+            "action": action,
+            "price": price,
+            "quantity": quantity,
+            "new_order_id": None,
+            "status": None  # Latest status of the old order pushed while replacing.
+        }
+        new_order_id = None
+        try:
+            if self._journal:
+                await self._journal_intent(action, price, quantity, kwargs)
+            (_, revoke_error), (new_order_id, create_error) = await asyncio.gather(
+                self._t.revoke_order(order_id), self._t.create_order(action, price, quantity, *args, **kwargs))
+            self._replacements[order_id]["new_order_id"] = new_order_id
+            if create_error and not new_order_id and self._journal:
+                self._journal.forget(kwargs["client_order_id"])
+            if ticket:
+                self._risk.confirm(self._symbol, ticket, new_order_id)
+                ticket = None
+            if not revoke_error:
+                return new_order_id, create_error
+            if self._replacements[order_id]["status"] == ORDER_STATUS_CANCELED:
+                return new_order_id, create_error
+            logger.warn("revoke old order failed, rollback new order. order_id:", order_id, "new_order_id:",
+                        new_order_id, "error:", revoke_error, caller=self)
+            if new_order_id:
+                _, error = await self._t.revoke_order(new_order_id)
+                if error:
+                    logger.error("rollback new order failed! new_order_id:", new_order_id, "error:", error,
+                                 caller=self)
+            return None, revoke_error
+        finally:
+            self._replacements.pop(order_id, None)
+            if ticket:
+                self._risk.confirm(self._symbol, ticket, new_order_id)
+
+    async def get_open_order_ids(self):
+        """Get open order id list.
+
+        Args:
+            None.
+
+        Returns:
+            order_ids: Open order id list, otherwise it's None.
+            error: Error information, otherwise it's None.
+        """
+        result, error = await self._t.get_open_order_ids()
+        return result, error
+
+    async def _on_order_update_callback(self, order):
+        """Order information update callback.
+
+        Args:
+            order: Order object.
+        """
+        if order.order_id in self._replacements:
+            self._replacements[order.order_id]["status"] = order.status
+        if self._journal:
+            self._journal.update(order)
+        if self._traces:
+            order.trace = self._traces.pop(order.order_id, None) if order.is_final else self._traces.get(order.order_id)
+        if self._risk:
+            await self._risk.on_order_update(order)
+        await position_engine.on_order_update(order)
+        # The tracker may be created by another Trade object of the account, before or after this one.
+        asset_tracker = AssetTracker.trackers.get((self._platform, self._account))
+        if asset_tracker:
+            await asset_tracker.on_order_update(order)
+        if self._order_update_callback:
+            SingleTask.run(self._order_update_callback, order)
+
+    async def _on_init_success_callback(self, success: bool, error: Error):
+        """Callback function when initialize Trade module finished.
+
+        Args:
+            success: `True` if initialize Trade module success, otherwise `False`.
+            error: `Error object` if initialize Trade module failed, otherwise `None`.
+        """
+        if success and self._restored:
+            await self._reconcile_restored()
+        if self._init_success_callback:
+            params = {
+                "strategy": self._strategy,
+                "platform": self._platform,
+                "symbol": self._symbol
+            }
+            await self._init_success_callback(success, error, **params)
+
+    async def _reconcile_restored(self):
+        """Reconcile the non-terminal orders restored from the journal, the intents not found on Exchange are
+        forgotten."""
+        orders, self._restored = self._restored, []
+        failed = await self._reconciler.reconcile_orders(self._symbol, self._t, orders)
+        for order in failed:
+            if order.order_id:
+                continue
+            logger.warn("order intent not found on Exchange, forget it. client_order_id:", order.client_order_id,
+                        caller=self)
+            self._t.pending_orders.pop(order.client_order_id, None)
+            self._journal.forget(order.client_order_id)
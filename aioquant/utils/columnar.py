@@ -0,0 +1,317 @@
+# -*- coding:utf-8 -*-
+
+"""
+Columnar file storage.
+
+Every column is saved in a separate binary file with fixed-width values, so a column can be loaded as a NumPy array
+directly without any parsing. Block files split rows into blocks, every block of a column can be compressed
+independently, and the time range of every block is saved in an index file for time range seeks.
+
+Author: HuangTao
+Date:   2020/03/16
+Email:  huangtao@ifclover.com
+"""
+
+import os
+import json
+import zlib
+import mmap
+from array import array
+
+__all__ = ("ColumnWriter", "BlockColumnWriter", "read_columns", "read_blocks", "KLINE_COLUMNS", "TRADE_COLUMNS",
+           "orderbook_columns", )
+
+
+# Kline columns, `[(column name, array typecode), ...]`.
+KLINE_COLUMNS = (
+    ("timestamp", "q"),
+    ("open", "d"),
+    ("high", "d"),
+    ("low", "d"),
+    ("close", "d"),
+    ("volume", "d")
+)
+
+# Trade columns, action is 1 for BUY and -1 for SELL.
+TRADE_COLUMNS = (
+    ("timestamp", "q"),
+    ("action", "b"),
+    ("price", "d"),
+    ("quantity", "d")
+)
+
+SCHEMA_FILE = "schema.json"
+INDEX_FILE = "index.idx"
+
+
+def orderbook_columns(length=10):
+    """Orderbook columns with fixed levels, missing levels are filled with NaN.
+
+    Args:
+        length: Orderbook levels of each side, default is 10.
+
+    Returns:
+        columns: `[("timestamp", "q"), ("ask_price_1", "d"), ..., ("ask_quantity_1", "d"), ..., ("bid_price_1", "d"),
+            ..., ("bid_quantity_1", "d"), ...]`
+    """
+    columns = [("timestamp", "q")]
+    for name in ("ask_price", "ask_quantity", "bid_price", "bid_quantity"):
+        columns.extend([("{}_{}".format(name, i + 1), "d") for i in range(length)])
+    return tuple(columns)
+
+
+def _open_schema(path, schema):
+    """Create the schema file, or check the schema is same as the existing one."""
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    schema_file = os.path.join(path, SCHEMA_FILE)
+    if os.path.isfile(schema_file):
+        with open(schema_file) as f:
+            exists = json.load(f)
+        exists["columns"] = tuple(tuple(c) for c in exists["columns"])
+        if exists != schema:
+            raise ValueError("schema mismatch with existing schema: {}".format(exists))
+    else:
+        with open(schema_file, "w") as f:
+            json.dump(schema, f)
+
+
+class ColumnWriter:
+    """Append-only columnar file writer.
+
+    Attributes:
+        path: Directory to save column files.
+        columns: Column definitions, `[(column name, array typecode), ...]`, typecode is one of `array` module, e.g.
+            `q` for int64, `d` for float64.
+        buffer_size: How many rows buffered in memory before flush to disk, default is 1000.
+    """
+
+    def __init__(self, path, columns, buffer_size=1000):
+        """Initialize."""
+        self._path = path
+        self._columns = tuple((name, typecode) for name, typecode in columns)
+        self._buffer_size = buffer_size
+        self._buffers = [array(typecode) for _, typecode in self._columns]
+        self._rows = 0
+        self._files = []
+        self._open()
+
+    @property
+    def path(self):
+        return self._path
+
+    @property
+    def count(self):
+        """Total rows, saved and buffered."""
+        return self._files[0].tell() // self._buffers[0].itemsize + self._rows
+
+    def truncate(self, count):
+        """Drop the rows after the first `count` rows, e.g. the rows saved after the last checkpoint."""
+        self.flush()
+        for buf, f in zip(self._buffers, self._files):
+            f.truncate(count * buf.itemsize)
+            f.seek(0, os.SEEK_END)
+
+    def _open(self):
+        _open_schema(self._path, {"columns": self._columns})
+        self._files = [open(os.path.join(self._path, name + ".col"), "ab") for name, _ in self._columns]
+
+    def append(self, row):
+        """Append a row.
+
+        Args:
+            row: Values ordered same as columns.
+        """
+        for buf, value in zip(self._buffers, row):
+            buf.append(value)
+        self._rows += 1
+        if self._rows >= self._buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Flush buffered rows to disk."""
+        if not self._rows:
+            return
+        for buf, f in zip(self._buffers, self._files):
+            buf.tofile(f)
+            f.flush()
+            del buf[:]
+        self._rows = 0
+
+    def close(self):
+        """Flush buffered rows and close all column files."""
+        self.flush()
+        for f in self._files:
+            f.close()
+        self._files = []
+
+
+class BlockColumnWriter:
+    """Append-only columnar block file writer, the first column must be timestamp(millisecond) and rows must be
+    appended in time order.
+
+    Attributes:
+        path: Directory to save column files.
+        columns: Column definitions, `[(column name, array typecode), ...]`.
+        block_size: How many rows in a block, default is 4096.
+        compress: Compression of blocks, `zlib` or None, default is `zlib`. Uncompressed column files can be
+            memory-mapped directly.
+        level: Compression level, default is 1, faster compression for recording.
+
+    NOTE:
+        Every block is appended to column files when it's full or `flush` called, and a row of `[first timestamp,
+        last timestamp, rows, offset and length in every column file ...]` is appended to the index file.
+    """
+
+    def __init__(self, path, columns, block_size=4096, compress="zlib", level=1):
+        """Initialize."""
+        if compress not in ("zlib", None):
+            raise ValueError("compress not supported: {}".format(compress))
+        self._path = path
+        self._columns = tuple((name, typecode) for name, typecode in columns)
+        self._block_size = block_size
+        self._compress = compress
+        self._level = level
+        self._buffers = [array(typecode) for _, typecode in self._columns]
+        self._rows = 0
+        _open_schema(self._path, {"columns": self._columns, "compress": self._compress})
+        self._files = [open(os.path.join(self._path, name + ".col"), "ab") for name, _ in self._columns]
+        self._index = open(os.path.join(self._path, INDEX_FILE), "ab")
+
+    @property
+    def path(self):
+        return self._path
+
+    def append(self, row):
+        """Append a row.
+
+        Args:
+            row: Values ordered same as columns.
+        """
+        for buf, value in zip(self._buffers, row):
+            buf.append(value)
+        self._rows += 1
+        if self._rows >= self._block_size:
+            self.flush()
+
+    def flush(self):
+        """Save buffered rows as a block."""
+        if not self._rows:
+            return
+        timestamps = self._buffers[0]
+        index = array("q", [timestamps[0], timestamps[-1], self._rows])
+        for buf, f in zip(self._buffers, self._files):
+            data = buf.tobytes()
+            if self._compress == "zlib":
+                data = zlib.compress(data, self._level)
+            index.extend([f.tell(), len(data)])
+            f.write(data)
+            f.flush()
+            del buf[:]
+        index.tofile(self._index)
+        self._index.flush()
+        self._rows = 0
+
+    def close(self):
+        """Save buffered rows and close all files."""
+        self.flush()
+        for f in self._files:
+            f.close()
+        self._index.close()
+        self._files = []
+
+
+def read_blocks(path, names=None, start=None, end=None):
+    """Read columns of block files as NumPy arrays, only the blocks in the time range are read.
+
+    Args:
+        path: Directory that column files saved.
+        names: Column names to be read, default is all columns.
+        start: Start timestamp(millisecond), included, default is the first row.
+        end: End timestamp(millisecond), excluded, default is the last row.
+
+    Returns:
+        columns: Column data, `{column name: numpy.ndarray, ...}`, timestamp column is always included.
+
+    NOTE:
+        NumPy is required. Column files are memory-mapped, uncompressed columns in the time range are views of the
+        mapped files, compressed blocks are decompressed into arrays without any parsing.
+    """
+    import numpy as np
+
+    with open(os.path.join(path, SCHEMA_FILE)) as f:
+        schema = json.load(f)
+    columns = schema["columns"]
+    compress = schema.get("compress")
+    index = np.fromfile(os.path.join(path, INDEX_FILE), dtype="q").reshape(-1, 3 + 2 * len(columns))
+
+    # Blocks overlapped with the time range.
+    first, last = 0, len(index)
+    if start is not None:
+        first = int(np.searchsorted(index[:, 1], start, side="left"))
+    if end is not None:
+        last = int(np.searchsorted(index[:, 0], end, side="left"))
+    blocks = index[first:last]
+
+    result = {}
+    for i, (name, typecode) in enumerate(columns):
+        if i > 0 and names and name not in names:
+            continue
+        dtype = np.dtype(typecode)
+        filename = os.path.join(path, name + ".col")
+        if len(blocks) == 0 or os.path.getsize(filename) == 0:
+            result[name] = np.empty(0, dtype=dtype)
+            continue
+        offset = int(blocks[0, 3 + 2 * i])
+        length = int(blocks[-1, 3 + 2 * i] + blocks[-1, 4 + 2 * i]) - offset
+        if compress is None:
+            result[name] = np.memmap(filename, dtype=dtype, mode="r", offset=offset,
+                                     shape=(length // dtype.itemsize, ))
+            continue
+        with open(filename, "rb") as f:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                parts = [np.frombuffer(zlib.decompress(mm[int(o):int(o + n)]), dtype=dtype)
+                         for o, n in blocks[:, 3 + 2 * i: 5 + 2 * i]]
+        result[name] = np.concatenate(parts)
+
+    # Trim rows out of the time range in the first and the last blocks.
+    timestamps = result[columns[0][0]]
+    lo = int(np.searchsorted(timestamps, start, side="left")) if start is not None else 0
+    hi = int(np.searchsorted(timestamps, end, side="left")) if end is not None else len(timestamps)
+    for name in result:
+        result[name] = result[name][lo:hi]
+    return result
+
+
+def read_columns(path, names=None, mmap=True):
+    """Read columns as NumPy arrays.
+
+    Args:
+        path: Directory that column files saved.
+        names: Column names to be read, default is all columns.
+        mmap: If memory-map the column files instead of loading into memory, default is True.
+
+    Returns:
+        columns: Column data, `{column name: numpy.ndarray, ...}`.
+
+    NOTE:
+        NumPy is required.
+    """
+    import numpy as np
+
+    with open(os.path.join(path, SCHEMA_FILE)) as f:
+        schema = json.load(f)["columns"]
+    columns = {}
+    for name, typecode in schema:
+        if names and name not in names:
+            continue
+        dtype = np.dtype(typecode)
+        filename = os.path.join(path, name + ".col")
+        count = os.path.getsize(filename) // dtype.itemsize
+        if count == 0:
+            columns[name] = np.empty(0, dtype=dtype)
+        elif mmap:
+            columns[name] = np.memmap(filename, dtype=dtype, mode="r", shape=(count, ))
+        else:
+            columns[name] = np.fromfile(filename, dtype=dtype, count=count)
+    return columns
@@ -0,0 +1,75 @@
+# -*- coding:utf-8 -*-
+
+"""
+Rate limiter.
+
+Author: HuangTao
+Date:   2020/03/12
+Email:  huangtao@ifclover.com
+"""
+
+import asyncio
+
+__all__ = ("RateLimiter", )
+
+
+class RateLimiter:
+    """Token bucket rate limiter, shared by any asynchronous coroutines that request the same Exchange.
+
+    Attributes:
+        rate: How many requests can be sent per second.
+        capacity: Maximum burst requests, default is same as `rate`.
+
+    NOTE:
+        Coroutines waiting for tokens are served in FIFO order, so that a big batch can not starve the others.
+        Tokens are refilled by the event loop clock, so the limiter follows the virtual clock in backtest.
+
+    Usage:
+        limiter = RateLimiter.instance((const.BINANCE, access_key), 10)
+        await limiter.acquire()
+    """
+
+    limiters = {}  # Shared limiters. `{key: limiter}`
+
+    @classmethod
+    def instance(cls, key, rate, capacity=None):
+        """Get the limiter shared by a key, e.g. the order requests of an API key, create it if not exists."""
+        if key not in cls.limiters:
+            cls.limiters[key] = cls(rate, capacity)
+        return cls.limiters[key]
+
+    def __init__(self, rate, capacity=None):
+        """Initialize."""
+        self._rate = rate
+        self._capacity = capacity or rate
+        self._tokens = self._capacity
+        self._last = None  # Last refill time of the event loop clock, set on the first acquire.
+        self._locker = asyncio.Lock()
+
+    @property
+    def rate(self):
+        return self._rate
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    def _refill(self):
+        now = asyncio.get_event_loop().time()
+        if self._last is None:
+            self._last = now
+        self._tokens = min(self._capacity, self._tokens + (now - self._last) * self._rate)
+        self._last = now
+
+    async def acquire(self, weight=1):
+        """Wait until there are enough tokens to send a request.
+
+        Args:
+            weight: Request weight, default is 1.
+        """
+        async with self._locker:
+            self._refill()
+            if self._tokens < weight:
+                await asyncio.sleep((weight - self._tokens) / self._rate)
+                self._refill()
+            self._tokens -= weight
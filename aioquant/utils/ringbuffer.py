@@ -0,0 +1,92 @@
+# -*- coding:utf-8 -*-
+
+"""
+Ring buffer.
+
+Author: HuangTao
+Date:   2020/03/22
+Email:  huangtao@ifclover.com
+"""
+
+from array import array
+
+__all__ = ("RingBuffer", )
+
+
+class RingBuffer:
+    """Fixed size ring buffer, the storage is preallocated, append costs O(1), and the oldest value is overwritten
+    when the buffer is full.
+
+    Attributes:
+        size: Maximum values can be saved.
+        typecode: Value type, typecode of `array` module, default is `d` for float64.
+    """
+
+    def __init__(self, size, typecode="d"):
+        """Initialize."""
+        if size <= 0:
+            raise ValueError("size must be positive: {}".format(size))
+        self._size = size
+        self._data = array(typecode, [0]) * size
+        self._head = 0  # Position to write the next value.
+        self._count = 0
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def full(self):
+        return self._count == self._size
+
+    @property
+    def last(self):
+        """The newest value, None if the buffer is empty."""
+        if not self._count:
+            return None
+        return self._data[self._head - 1]
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        """Value by index, `0` is the oldest one and `-1` is the newest one."""
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("ring buffer index out of range")
+        return self._data[(self._head - self._count + index) % self._size]
+
+    def append(self, value):
+        """Append a value.
+
+        Returns:
+            evicted: The oldest value overwritten, None if the buffer is not full.
+        """
+        evicted = self._data[self._head] if self._count == self._size else None
+        self._data[self._head] = value
+        self._head = (self._head + 1) % self._size
+        if self._count < self._size:
+            self._count += 1
+        return evicted
+
+    def clear(self):
+        self._head = 0
+        self._count = 0
+
+    def values(self):
+        """All values from the oldest to the newest."""
+        start = (self._head - self._count) % self._size
+        if start + self._count <= self._size:
+            return self._data[start: start + self._count].tolist()
+        return self._data[start:].tolist() + self._data[:self._head].tolist()
+
+    def to_numpy(self):
+        """All values from the oldest to the newest as a `numpy.ndarray` copy. NumPy is required."""
+        import numpy as np
+
+        data = np.frombuffer(self._data, dtype=self._data.typecode)
+        start = (self._head - self._count) % self._size
+        if start + self._count <= self._size:
+            return data[start: start + self._count].copy()
+        return np.concatenate((data[start:], data[:self._head]))
@@ -14,15 +14,29 @@ import decimal
 import datetime
 
 
+# Current time function, returns timestamp(second) in float. Backtest replaces it with a virtual clock.
+_time_func = time.time
+
+
+def set_time_func(func=None):
+    """Set current time function, so that all the time functions in tools bag follow a virtual clock.
+
+    Args:
+        func: Function returns current timestamp(second) in float, default is `time.time`.
+    """
+    global _time_func
+    _time_func = func or time.time
+
+
 def get_cur_timestamp():
     """Get current timestamp(second)."""
-    ts = int(time.time())
+    ts = int(_time_func())
     return ts
 
 
 def get_cur_timestamp_ms():
     """Get current timestamp(millisecond)."""
-    ts = int(time.time() * 1000)
+    ts = int(_time_func() * 1000)
     return ts
 
 
@@ -35,7 +49,7 @@ def get_datetime_str(fmt="%Y-%m-%d %H:%M:%S"):
     Returns:
         str_dt: Date time string.
     """
-    today = datetime.datetime.today()
+    today = datetime.datetime.fromtimestamp(_time_func())
     str_dt = today.strftime(fmt)
     return str_dt
 
@@ -50,7 +64,7 @@ def get_date_str(fmt="%Y%m%d", delta_days=0):
     Returns:
         str_d: Date string.
     """
-    day = datetime.datetime.today()
+    day = datetime.datetime.fromtimestamp(_time_func())
     if delta_days:
         day += datetime.timedelta(days=delta_days)
     str_d = day.strftime(fmt)
@@ -89,7 +103,7 @@ def datetime_str_to_ts(dt_str, fmt="%Y-%m-%d %H:%M:%S"):
 
 def get_utc_time():
     """Get current UTC time."""
-    utc_t = datetime.datetime.utcnow()
+    utc_t = datetime.datetime.utcfromtimestamp(_time_func())
     return utc_t
 
 
@@ -137,6 +151,23 @@ def get_utctime_str(fmt="%Y-%m-%dT%H:%M:%S.%fZ"):
     return utctime_str
 
 
+def ts_to_utctime_str(ts=None, fmt="%Y-%m-%dT%H:%M:%S.%fZ"):
+    """Convert timestamp(millisecond) to UTC time string.
+
+    Args:
+        ts: Timestamp, millisecond.
+        fmt: UTC time format, e.g. `%Y-%m-%dT%H:%M:%S.%fZ`.
+
+    Returns:
+        utctime_str: UTC time string, e.g. `2019-03-04T09:14:27.806Z`.
+    """
+    if ts is None:
+        ts = get_cur_timestamp_ms()
+    dt = datetime.datetime.utcfromtimestamp(ts // 1000)
+    utctime_str = dt.strftime(fmt.replace("%f", "{:03d}".format(ts % 1000)))
+    return utctime_str
+
+
 def get_uuid1():
     """Generate a UUID based on the host ID and current time
 
@@ -203,3 +234,16 @@ def float_to_str(f, p=20):
     d1 = ctx.create_decimal(repr(f))
     s = format(d1, 'f')
     return s
+
+
+def chunks(items, size):
+    """Split a list into chunks.
+
+    Args:
+        items: List to be split.
+        size: Maximum length of every chunk.
+
+    Returns:
+        chunks: List of chunks, e.g. `chunks([1, 2, 3], 2)` returns `[[1, 2], [3]]`.
+    """
+    return [items[i:i + size] for i in range(0, len(items), size)]
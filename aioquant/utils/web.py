@@ -9,17 +9,19 @@ Email:  huangtao@ifclover.com
 """
 
 import json
+import asyncio
 
 import aiohttp
 from urllib.parse import urlparse
 
 from aioquant.utils import logger
 from aioquant.configure import config
+from aioquant.latency import latency_collector
 from aioquant.tasks import LoopRunTask, SingleTask
 from aioquant.utils.decorator import async_method_locker
 
 
-__all__ = ("AsyncHttpRequests", )
+__all__ = ("AsyncHttpRequests", "Websocket", )
 
 
 class AsyncHttpRequests(object):
@@ -58,6 +60,7 @@ class AsyncHttpRequests(object):
         if not kwargs.get("proxy"):
             kwargs["proxy"] = config.proxy  # If there is a `HTTP PROXY` Configuration in config file?
         try:
+            latency_collector.mark_sent()  # Only for the request of the order being traced.
             if method == "GET":
                 response = await session.get(url, params=params, headers=headers, timeout=timeout, **kwargs)
             elif method == "POST":
@@ -76,6 +79,7 @@ class AsyncHttpRequests(object):
             logger.error("method:", method, "url:", url, "headers:", headers, "params:", params, "body:", body,
                          "data:", data, "Error:", e, caller=cls)
             return None, None, e
+        latency_collector.mark_ack()
         code = response.status
         if code not in (200, 201, 202, 203, 204, 205, 206):
             text = await response.text()
@@ -136,3 +140,130 @@ class AsyncHttpRequests(object):
             session = aiohttp.ClientSession()
             cls._SESSIONS[key] = session
         return cls._SESSIONS[key]
+
+    @classmethod
+    async def close_all(cls):
+        """ Close the connection sessions of all domain names."""
+        sessions, cls._SESSIONS = cls._SESSIONS, {}
+        for session in sessions.values():
+            await session.close()
+
+
+class Websocket:
+    """Websocket connection.
+
+    Attributes:
+        url: Websocket connection url.
+        connected_callback: Asynchronous callback function will be called after connected to Websocket server.
+        process_callback: Asynchronous callback function will be called if any stream data receive from Websocket
+            connection, this function only callback `text/json` message. e.g.
+                async def process_callback(json_message): pass
+        process_binary_callback: Asynchronous callback function will be called if any stream data receive from
+            Websocket connection, this function only callback `binary` message. e.g.
+                async def process_binary_callback(binary_message): pass
+        check_conn_interval: Check Websocket connection interval time(seconds), default is 10s.
+    """
+
+    def __init__(self, url, connected_callback=None, process_callback=None, process_binary_callback=None,
+                 check_conn_interval=10):
+        """Initialize."""
+        self._url = url
+        self._connected_callback = connected_callback
+        self._process_callback = process_callback
+        self._process_binary_callback = process_binary_callback
+        self._check_conn_interval = check_conn_interval
+        self._session = None  # HTTP client session holding the connection.
+        self._ws = None  # Websocket connection object.
+        self._reconnect_locker = asyncio.Lock()  # Re-connecting locker of this connection only.
+
+    @property
+    def ws(self):
+        return self._ws
+
+    def initialize(self):
+        LoopRunTask.register(self._check_connection, self._check_conn_interval)
+        SingleTask.run(self._connect)
+
+    async def _connect(self) -> None:
+        logger.info("url:", self._url, caller=self)
+        proxy = config.proxy
+        self._session = aiohttp.ClientSession()
+        try:
+            self._ws = await self._session.ws_connect(self._url, proxy=proxy)
+        except aiohttp.ClientError:
+            logger.error("connect to Websocket server error! url:", self._url, caller=self)
+            await self.close()
+            return
+        if self._connected_callback:
+            SingleTask.run(self._connected_callback)
+        SingleTask.run(self._receive)
+
+    async def reconnect(self) -> None:
+        """Re-connect to Websocket server, do nothing if this connection is re-connecting already."""
+        if self._reconnect_locker.locked():
+            return
+        async with self._reconnect_locker:
+            logger.warn("reconnecting to Websocket server right now!", caller=self)
+            await asyncio.wait_for(self._reconnect(), 30)
+
+    async def _reconnect(self) -> None:
+        await self.close()
+        await self._connect()
+
+    async def close(self) -> None:
+        """Close Websocket connection."""
+        if self._ws:
+            await self._ws.close()
+        if self._session:
+            await self._session.close()
+        self._ws = None
+        self._session = None
+
+    async def _receive(self):
+        """Receive stream message from Websocket connection."""
+        async for msg in self.ws:
+            latency_collector.mark_receive()
+            if msg.type == aiohttp.WSMsgType.TEXT:
+                if self._process_callback:
+                    try:
+                        data = json.loads(msg.data)
+                    except:
+                        data = msg.data
+                    SingleTask.run(self._process_callback, data)
+            elif msg.type == aiohttp.WSMsgType.BINARY:
+                if self._process_binary_callback:
+                    SingleTask.run(self._process_binary_callback, msg.data)
+            elif msg.type == aiohttp.WSMsgType.CLOSED:
+                logger.warn("receive event CLOSED:", msg, caller=self)
+                SingleTask.run(self.reconnect)
+            elif msg.type == aiohttp.WSMsgType.ERROR:
+                logger.error("receive event ERROR:", msg, caller=self)
+            else:
+                logger.warn("unhandled msg:", msg, caller=self)
+
+    async def _check_connection(self, *args, **kwargs) -> None:
+        """Check Websocket connection, if connection closed, re-connect immediately."""
+        if not self.ws or self.ws.closed:
+            SingleTask.run(self.reconnect)
+
+    async def send(self, data) -> bool:
+        """ Send message to Websocket server.
+
+        Args:
+            data: Message content, must be dict or string.
+
+        Returns:
+            If send successfully, return True, otherwise return False.
+        """
+        if not self.ws:
+            logger.warn("Websocket connection not connected yet!", caller=self)
+            return False
+        if isinstance(data, dict):
+            await self.ws.send_json(data)
+        elif isinstance(data, str):
+            await self.ws.send_str(data)
+        else:
+            logger.error("send message failed:", data, caller=self)
+            return False
+        logger.debug("send message:", data, caller=self)
+        return True
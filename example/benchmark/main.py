@@ -0,0 +1,89 @@
+# -*- coding:utf-8 -*-
+
+# 批量下单压测: 启动本地模拟交易所，对比逐笔下单、撤单与并发批量下单、撤单的吞吐量
+
+import sys
+import time
+
+from aioquant import quant
+from aioquant.utils import logger
+from aioquant.utils.web import AsyncHttpRequests
+from aioquant.configure import config
+from aioquant.order import ORDER_ACTION_BUY, ORDER_ACTION_SELL
+from aioquant.simulator import SimulatorServer
+from aioquant.platform.binance import BinanceRestAPI
+from aioquant.platform.huobi import HuobiRestAPI
+from aioquant.platform.okex import OKExRestAPI
+
+
+async def run_benchmark():
+    server = SimulatorServer(**config.simulator)
+    await server.start()
+    count = config.order_count
+    order_rate = config.order_rate
+
+    def make_orders(key):
+        orders = []
+        for i in range(count):
+            # 买卖价格不交叉，所有订单都挂在订单薄上，便于撤单
+            action = ORDER_ACTION_BUY if i % 2 == 0 else ORDER_ACTION_SELL
+            price = "0.01" if action == ORDER_ACTION_BUY else "0.03"
+            orders.append({"action": action, "price": price, "quantity": "1", key: "b{}{}".format(i, time.time_ns())})
+        return orders
+
+    def report(name, n, start):
+        cost = time.time() - start
+        logger.info(name, "orders:", n, "cost(s):", round(cost, 3), "orders/s:", round(n / cost, 1))
+
+    # Binance: 逐笔下单 vs 并发下单
+    rest_api = BinanceRestAPI("", "", server.url, order_rate)
+    start = time.time()
+    order_ids = []
+    for order in make_orders("client_order_id"):
+        result, _ = await rest_api.create_order(order["action"], "ETHBTC", order["price"], order["quantity"],
+                                                order["client_order_id"])
+        order_ids.append(result["orderId"])
+    report("binance serial create", count, start)
+    start = time.time()
+    for order_id in order_ids:
+        await rest_api.revoke_order("ETHBTC", order_id)
+    report("binance serial revoke", count, start)
+
+    start = time.time()
+    success, _ = await rest_api.batch_create_orders("ETHBTC", make_orders("client_order_id"))
+    report("binance batch create", len(success), start)
+    start = time.time()
+    success, _ = await rest_api.batch_revoke_orders("ETHBTC", list(success.values()))
+    report("binance batch revoke", len(success), start)
+
+    # Huobi: 每个请求10笔，分块并发
+    rest_api = HuobiRestAPI("", "", server.url, order_rate)
+    orders = make_orders("client_order_id")
+    for order in orders:
+        order["symbol"] = "ethbtc"
+        order["order_type"] = order["action"].lower() + "-limit"
+    start = time.time()
+    success, _ = await rest_api.batch_create_orders(orders)
+    report("huobi batch create", len(success), start)
+    start = time.time()
+    success, _ = await rest_api.batch_revoke_orders(list(success.values()))
+    report("huobi batch revoke", len(success), start)
+
+    # OKEx: 每个请求10笔，分块并发
+    rest_api = OKExRestAPI("", "", "", server.url, order_rate)
+    start = time.time()
+    success, _ = await rest_api.batch_create_orders("ETH-BTC", make_orders("client_oid"))
+    report("okex batch create", len(success), start)
+    start = time.time()
+    success, _ = await rest_api.batch_revoke_orders("ETH-BTC", list(success.values()))
+    report("okex batch revoke", len(success), start)
+
+    await server.stop()
+    # 停止事件循环之前关闭HTTP连接会话，避免 "Unclosed client session" 错误
+    await AsyncHttpRequests.close_all()
+    quant.stop()
+
+
+if __name__ == "__main__":
+    config_file = sys.argv[1]
+    quant.start(config_file, run_benchmark)
@@ -0,0 +1,55 @@
+# -*- coding:utf-8 -*-
+
+# 风控压测: 统计每笔订单通过风控检查(check + confirm)和订单推送更新(on_order_update)的耗时(微秒)
+
+import sys
+import time
+import asyncio
+
+from aioquant.risk import RiskEngine
+from aioquant.market import Orderbook
+from aioquant.order import Order, ORDER_ACTION_BUY, ORDER_ACTION_SELL, ORDER_STATUS_SUBMITTED, ORDER_STATUS_CANCELED
+
+
+async def run_benchmark(count):
+    engine = RiskEngine("binance", "benchmark", max_notional=100, max_open_orders=count * 2, max_position=count * 10,
+                        max_exposure=count * 100, price_band=0.05)
+    engine.limits("ETH/BTC")
+    await engine.on_orderbook(Orderbook("binance", "ETH/BTC", [["0.0201", "1"]], [["0.0199", "1"]], 0))
+
+    # 检查并确认订单
+    start = time.perf_counter_ns()
+    for i in range(count):
+        action = ORDER_ACTION_BUY if i % 2 == 0 else ORDER_ACTION_SELL
+        ticket, error = engine.check("ETH/BTC", action, "0.02", "1")
+        engine.confirm("ETH/BTC", ticket, str(i))
+    cost = time.perf_counter_ns() - start
+    print("check + confirm orders:", count, "us/order:", round(cost / count / 1000, 3))
+
+    # 订单推送更新
+    orders = []
+    for i in range(count):
+        action = ORDER_ACTION_BUY if i % 2 == 0 else ORDER_ACTION_SELL
+        orders.append(Order(platform="binance", account="benchmark", order_id=str(i), action=action, symbol="ETH/BTC",
+                            price="0.02", quantity="1", remain="1", status=ORDER_STATUS_SUBMITTED))
+    start = time.perf_counter_ns()
+    for order in orders:
+        await engine.on_order_update(order)
+    for order in orders:
+        order.status = ORDER_STATUS_CANCELED
+        await engine.on_order_update(order)
+    cost = time.perf_counter_ns() - start
+    print("order updates:", count * 2, "us/update:", round(cost / count / 2 / 1000, 3))
+
+    # 被拒绝的订单
+    start = time.perf_counter_ns()
+    for i in range(count):
+        engine.check("ETH/BTC", ORDER_ACTION_BUY, "0.03", "1")
+    cost = time.perf_counter_ns() - start
+    print("rejected orders:", count, "us/order:", round(cost / count / 1000, 3))
+    print("stats:", engine.stats("ETH/BTC"))
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    asyncio.get_event_loop().run_until_complete(run_benchmark(n))
@@ -0,0 +1,41 @@
+# -*- coding:utf-8 -*-
+
+# 存储压测: 统计 StorageWriter 批量写入本地存储(FileBackend / SQLiteBackend)的吞吐量，并与逐条写入对比
+
+import os
+import sys
+import time
+import asyncio
+import tempfile
+
+from aioquant.order import Order
+from aioquant.storage import StorageWriter, FileBackend, SQLiteBackend
+
+
+async def run_writer(name, backend, count, batch_size):
+    order = Order(platform="binance", account="benchmark", strategy="benchmark", order_id="1", symbol="ETH/BTC",
+                  action="BUY", price="0.02", quantity="1", remain="1")
+    writer = StorageWriter(backend, batch_size=batch_size, flush_interval=1)
+    start = time.perf_counter()
+    for _ in range(count):
+        await writer.write("order", order.data)
+        await asyncio.sleep(0)  # 模拟每条数据由一个单独的事件回调写入
+    await writer.close()
+    cost = time.perf_counter() - start
+    print(name, "batch size:", batch_size, "documents:", count, "seconds:", round(cost, 3),
+          "documents/s:", int(count / cost), "batches:", writer.stats["batches"], "waits:", writer.stats["waits"])
+
+
+async def run_benchmark(count):
+    with tempfile.TemporaryDirectory() as path:
+        for batch_size in (1, 100, 1000):
+            # 逐条写入只测试少量订单
+            n = count if batch_size > 1 else count // 100
+            await run_writer("file", FileBackend(os.path.join(path, "file_{}".format(batch_size))), n, batch_size)
+            await run_writer("sqlite", SQLiteBackend(os.path.join(path, "sqlite_{}.db".format(batch_size))), n,
+                             batch_size)
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    asyncio.get_event_loop().run_until_complete(run_benchmark(n))
@@ -24,6 +24,8 @@ class MyStrategy:
         self.access_key = config.accounts[0]["access_key"]
         self.secret_key = config.accounts[0]["secret_key"]
         self.symbol = config.symbol
+        self.bid_near = getattr(config, "bid_near", 3)  # 挂单区间的近端档位，默认买三
+        self.bid_far = getattr(config, "bid_far", 4)  # 挂单区间的远端档位，默认买四
 
         self.order_id = None  # 创建订单的id
         self.create_order_price = "0.0"  # 创建订单的价格
@@ -47,28 +49,31 @@ class MyStrategy:
         """ 订单薄更新
         """
         logger.debug("orderbook:", orderbook, caller=self)
-        bid3_price = orderbook.bids[2][0]  # 买三价格
-        bid4_price = orderbook.bids[3][0]  # 买四价格
+        bid3_price = orderbook.bids[self.bid_near - 1][0]  # 买三价格
+        bid4_price = orderbook.bids[self.bid_far - 1][0]  # 买四价格
 
-        # 判断是否需要撤单
+        # 判断是否需要改单
         if self.order_id:
             if float(self.create_order_price) < float(bid3_price) or float(self.create_order_price) > float(bid4_price):
                 return
-            _, error = await self.trader.revoke_order(self.order_id)
-            if error:
-                logger.error("revoke order error! error:", error, caller=self)
-                return
-            self.order_id = None
-            logger.info("revoke order:", self.order_id, caller=self)
 
-        # 创建新订单
         price = (float(bid3_price) + float(bid4_price)) / 2
         quantity = "0.1"  # 假设委托数量为0.1
         action = ORDER_ACTION_BUY
-        order_id, error = await self.trader.create_order(action, price, quantity)
-        if error:
-            logger.error("create order error! error:", error, caller=self)
-            return
+        if self.order_id:
+            # 撤单和下单并发执行
+            old_order_id, self.order_id = self.order_id, None
+            order_id, error = await self.trader.replace_order(old_order_id, action, price, quantity)
+            if error:
+                logger.error("replace order error! error:", error, caller=self)
+                return
+            logger.info("revoke order:", old_order_id, caller=self)
+        else:
+            # 创建新订单
+            order_id, error = await self.trader.create_order(action, price, quantity)
+            if error:
+                logger.error("create order error! error:", error, caller=self)
+                return
         self.order_id = order_id
         self.create_order_price = price
         logger.info("create new order:", order_id, caller=self)
@@ -0,0 +1,17 @@
+# -*- coding:utf-8 -*-
+
+# 参数寻优: 对挂单区间的买N档位做网格搜索，每组参数在独立的进程里回测，结果逐行写入汇总文件
+
+import sys
+
+from aioquant.sweep import SweepRunner, grid
+
+from main import initialize
+
+
+if __name__ == "__main__":
+    config_file = sys.argv[1]
+    output = sys.argv[2] if len(sys.argv) > 2 else "sweep.json"
+    params = [p for p in grid(bid_near=[1, 2, 3, 4], bid_far=[2, 3, 4, 5]) if p["bid_near"] < p["bid_far"]]
+    runner = SweepRunner(config_file, initialize, params, output, cache_path="cache")
+    runner.run()
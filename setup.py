@@ -1,6 +1,6 @@
 # -*- coding:utf-8 -*-
 
-from distutils.core import setup
+from setuptools import setup
 
 
 setup(
@@ -25,4 +25,7 @@ setup(
         "aioamqp==0.14.0",
         "motor==2.0.0"
     ],
+    extras_require={
+        "numpy": ["numpy>=1.20.0"]
+    },
 )
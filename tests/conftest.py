@@ -0,0 +1,46 @@
+# -*- coding:utf-8 -*-
+
+import pytest
+
+from aioquant.error import Error
+from aioquant.platform import binance
+from aioquant.symbols import symbol_registry
+
+
+class FakePlatformTrade:
+    """Platform Trade object without any connection, every order is rejected by Exchange."""
+
+    def __init__(self, **kwargs):
+        self._orders = kwargs.get("orders") or {}
+        self._pending_orders = kwargs.get("pending_orders") or {}
+        self._order_update_callback = kwargs["order_update_callback"]
+
+    @property
+    def orders(self):
+        return self._orders
+
+    @property
+    def pending_orders(self):
+        return self._pending_orders
+
+    @property
+    def rest_api(self):
+        return None
+
+    async def create_order(self, action, price, quantity, *args, **kwargs):
+        return None, Error("insufficient balance")
+
+    async def revoke_order(self, *order_ids):
+        return order_ids[0], None
+
+
+@pytest.fixture
+def fake_binance(monkeypatch):
+    """Trade objects of Binance are constructed by the real constructor, with `FakePlatformTrade` as platform Trade."""
+
+    async def load(platform, force=False):
+        return True, None
+
+    monkeypatch.setattr(binance, "BinanceTrade", FakePlatformTrade)
+    monkeypatch.setattr(binance.BinanceOrderReconciler, "reconcilers", {})
+    monkeypatch.setattr(symbol_registry, "load", load)
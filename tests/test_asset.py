@@ -0,0 +1,34 @@
+# -*- coding:utf-8 -*-
+
+import asyncio
+
+from aioquant import const
+from aioquant.order import Order
+from aioquant.asset import AssetTracker
+from aioquant.trade import Trade
+
+
+class FakeTracker:
+
+    def __init__(self):
+        self.orders = []
+
+    async def on_order_update(self, order):
+        self.orders.append(order)
+
+
+def test_every_trade_feeds_tracker(fake_binance):
+    # Only one of the Trade objects of the account subscribes the assets.
+    tracker = AssetTracker.trackers[("binance", "asset_test")] = FakeTracker()
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        trades = [Trade("test", const.BINANCE, symbol, account="asset_test") for symbol in ("ETH/BTC", "LTC/BTC")]
+        for i, trade in enumerate(trades):
+            order = Order("binance", "asset_test", "test", order_id=str(i), symbol=trade._symbol, action="BUY",
+                          price="0.02", quantity="1", remain="1", status="SUBMITTED")
+            loop.run_until_complete(trade._on_order_update_callback(order))
+    finally:
+        loop.close()
+        AssetTracker.trackers.pop(("binance", "asset_test"))
+    assert [order.symbol for order in tracker.orders] == ["ETH/BTC", "LTC/BTC"]
@@ -0,0 +1,73 @@
+# -*- coding:utf-8 -*-
+
+import asyncio
+
+import pytest
+
+from aioquant import const
+from aioquant.market import Kline
+from aioquant.history import KlineDownloader
+from aioquant.utils.columnar import ColumnWriter, KLINE_COLUMNS, read_columns
+
+MINUTE = 60 * 1000
+START = 1584489600000
+
+
+class FakeKlineDownloader(KlineDownloader):
+    PLATFORM = "fake"
+    PAGE_LIMIT = 10
+    RATE = 1000
+    INTERVALS = {const.MARKET_TYPE_KLINE: "1m"}
+
+    async def fetch_page(self, start, end):
+        klines = [Kline(self.PLATFORM, self._symbol, 1, 2, 0.5, 1.5, 10, ts, self._kline_type)
+                  for ts in range(start, end, MINUTE)]
+        return klines, None
+
+
+def _run(coro):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+async def _download(downloader, pages=None):
+    klines = []
+    async for kline in downloader.download():
+        klines.append(kline)
+        if pages and len(klines) == pages * downloader.PAGE_LIMIT:
+            break
+    return klines
+
+
+def test_start_required():
+    with pytest.raises(ValueError):
+        FakeKlineDownloader("ETH/BTC")
+    downloader = FakeKlineDownloader("ETH/BTC", end=START + MINUTE, checkpoint="not_exists.ckpt")
+    assert _run(_download(downloader)) == []
+    assert downloader.error
+
+
+def test_resume_without_duplicates(tmp_path):
+    checkpoint = str(tmp_path / "eth_btc.ckpt")
+    store = str(tmp_path / "eth_btc")
+    end = START + 50 * MINUTE
+    downloader = FakeKlineDownloader("ETH/BTC", start=START, end=end, concurrency=1, checkpoint=checkpoint,
+                                     store_path=store)
+    assert len(_run(_download(downloader, pages=2))) == 20
+
+    # Crashed after a page saved in store and before the checkpoint saved.
+    writer = ColumnWriter(store, KLINE_COLUMNS)
+    for i in range(writer.count, writer.count + 10):
+        writer.append((START + i * MINUTE, 1, 2, 0.5, 1.5, 10))
+    writer.close()
+
+    downloader = FakeKlineDownloader("ETH/BTC", start=START, end=end, checkpoint=checkpoint, store_path=store)
+    klines = _run(_download(downloader))
+    assert not downloader.error
+    timestamps = read_columns(store, mmap=False)["timestamp"].tolist()
+    assert timestamps == list(range(START, end, MINUTE))
+    assert klines[0].timestamp == timestamps[len(timestamps) - len(klines)]
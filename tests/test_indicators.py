@@ -0,0 +1,111 @@
+# -*- coding:utf-8 -*-
+
+import numpy as np
+
+from aioquant import indicators
+
+
+def _stream(indicator, *columns):
+    """Update a streaming indicator row by row, the values not ready are NaN."""
+    out = []
+    for row in zip(*[column.tolist() for column in columns]):
+        value = indicator.update(*row)
+        out.append(np.nan if value is None else value)
+    return np.array(out)
+
+
+def _check(streaming, batch, rtol=1e-9, atol=1e-12):
+    assert streaming.shape == batch.shape
+    # The warm-up values are NaN in both.
+    assert (np.isnan(streaming) == np.isnan(batch)).all()
+    np.testing.assert_allclose(streaming, batch, rtol=rtol, atol=atol, equal_nan=True)
+
+
+def _prices(rng, n, base=100.0):
+    return base + np.cumsum(rng.normal(0, 1, n))
+
+
+def test_sma():
+    rng = np.random.default_rng(1)
+    values = _prices(rng, 200)
+    for period in (1, 5, 20):
+        _check(_stream(indicators.SMA(period), values), indicators.sma(values, period))
+    _check(_stream(indicators.SMA(5), values[:3]), indicators.sma(values[:3], 5))
+
+
+def test_ema():
+    rng = np.random.default_rng(2)
+    values = _prices(rng, 200)
+    for period in (1, 5, 20):
+        _check(_stream(indicators.EMA(period), values), indicators.ema(values, period))
+    _check(_stream(indicators.EMA(5), values[:4]), indicators.ema(values[:4], 5))
+
+
+def test_variance():
+    rng = np.random.default_rng(3)
+    for base in (100.0, 1e6):
+        values = _prices(rng, 500, base)
+        for period, ddof in ((2, 0), (10, 0), (10, 1), (50, 1)):
+            variance = indicators.Variance(period, ddof)
+            streaming = _stream(variance, values)
+            _check(streaming, indicators.variance(values, period, ddof), rtol=1e-7, atol=1e-9)
+            assert abs(variance.std - np.std(values[-period:], ddof=ddof)) < 1e-6
+
+
+def test_variance_recompute_boundary():
+    rng = np.random.default_rng(4)
+    period = 10
+    values = _prices(rng, period * 4, 1e8)
+    batch = indicators.variance(values, period)
+    variance = indicators.Variance(period)
+    for i, value in enumerate(values.tolist()):
+        result = variance.update(value)
+        if i < period - 1:
+            assert result is None
+            continue
+        # The window is recomputed after every `period` updates since the buffer is full, check the updates just
+        # before, at and after the recomputing.
+        assert abs(result - batch[i]) <= 1e-6 * max(batch[i], 1), i
+
+
+def test_rsi():
+    rng = np.random.default_rng(5)
+    values = _prices(rng, 200)
+    values[50:60] = values[49]  # No change, gain and loss are both 0.
+    for period in (2, 14):
+        _check(_stream(indicators.RSI(period), values), indicators.rsi(values, period))
+    _check(_stream(indicators.RSI(14), values[:14]), indicators.rsi(values[:14], 14))
+    flat = np.full(30, 1.0)
+    _check(_stream(indicators.RSI(14), flat), indicators.rsi(flat, 14))
+
+
+def test_atr():
+    rng = np.random.default_rng(6)
+    close = _prices(rng, 200)
+    high = close + rng.uniform(0, 2, 200)
+    low = close - rng.uniform(0, 2, 200)
+    for period in (1, 14):
+        _check(_stream(indicators.ATR(period), high, low, close), indicators.atr(high, low, close, period))
+
+
+def test_vwap():
+    rng = np.random.default_rng(7)
+    prices = _prices(rng, 200)
+    volumes = rng.uniform(0, 10, 200)
+    volumes[:3] = 0  # No volume at the beginning.
+    volumes[100:120] = 0  # A window without volume keeps the last value.
+    for period in (None, 5, 10):
+        _check(_stream(indicators.VWAP(period), prices, volumes), indicators.vwap(prices, volumes, period))
+
+
+def test_ofi():
+    rng = np.random.default_rng(8)
+    n = 300
+    # Discrete prices so that the best prices stay unchanged sometimes.
+    bid_prices = 100 + rng.integers(-2, 3, n).cumsum() * 0.5
+    ask_prices = bid_prices + rng.integers(1, 3, n) * 0.5
+    bid_quantities = rng.uniform(0, 5, n)
+    ask_quantities = rng.uniform(0, 5, n)
+    columns = (bid_prices, bid_quantities, ask_prices, ask_quantities)
+    for period in (1, 10):
+        _check(_stream(indicators.OFI(period), *columns), indicators.ofi(*columns, period=period))
@@ -0,0 +1,29 @@
+# -*- coding:utf-8 -*-
+
+import asyncio
+
+from aioquant import const
+from aioquant.journal import OrderJournal
+from aioquant.trade import Trade
+
+
+def test_forget_rejected_intents(tmp_path, fake_binance):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        trade = Trade("test", const.BINANCE, "ETH/BTC", account="test", access_key="test", secret_key="test",
+                      journal_path=str(tmp_path))
+        order_id, error = loop.run_until_complete(trade.create_order("BUY", "0.02", "1"))
+        assert not order_id and error
+        assert trade._journal.orders == []
+        order_id, error = loop.run_until_complete(trade.replace_order("1", "BUY", "0.02", "1"))
+        assert not order_id
+        assert trade._journal.orders == []
+        loop.run_until_complete(trade._journal.close())
+
+        # Nothing is restored after restart.
+        journal = OrderJournal(str(tmp_path), "binance", "test", "test", "ETH/BTC")
+        assert journal.orders == []
+        loop.run_until_complete(journal.close())
+    finally:
+        loop.close()
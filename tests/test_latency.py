@@ -0,0 +1,31 @@
+# -*- coding:utf-8 -*-
+
+from aioquant.latency import LatencyCollector
+
+
+def test_mark_sent_only_for_order_request():
+    collector = LatencyCollector()
+    collector.enable()
+    trace, token = collector.begin_order()
+    try:
+        # Other requests in the order context, e.g. an account id lookup.
+        collector.mark_sent()
+        collector.mark_ack()
+        assert trace.sent_ns is None and trace.ack_ns is None
+
+        request = collector.begin_request()
+        try:
+            collector.mark_sent()
+            collector.mark_ack()
+        finally:
+            collector.end_request(request)
+        assert trace.sent_ns and trace.ack_ns >= trace.sent_ns >= trace.decision_ns
+
+        sent_ns = trace.sent_ns
+        collector.mark_sent()
+        assert trace.sent_ns == sent_ns
+    finally:
+        collector.end_order(token)
+
+    # No order being traced.
+    assert collector.begin_request() is None
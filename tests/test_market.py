@@ -0,0 +1,27 @@
+# -*- coding:utf-8 -*-
+
+from aioquant import const
+from aioquant.market import Orderbook
+
+
+def test_consolidated_orderbook_metrics():
+    bids = [(0.0201, 2.0, const.BINANCE), (0.0200, 1.0, const.HUOBI), (0.0199, 3.0, const.OKEX)]
+    asks = [(0.0202, 1.0, const.HUOBI), (0.0203, 3.0, const.BINANCE)]
+    orderbook = Orderbook(const.CONSOLIDATED, "ETH/BTC", asks=asks, bids=bids, timestamp=1)
+
+    assert orderbook.bid_array.shape == (3, 2)
+    assert orderbook.ask_array.tolist() == [[0.0202, 1.0], [0.0203, 3.0]]
+    assert orderbook.depth_imbalance(2) == (3.0 - 4.0) / 7.0
+    bid_price, ask_price = orderbook.depth_price(2)
+    assert abs(bid_price - (0.0201 * 2 + 0.0200) / 3) < 1e-12
+    assert abs(ask_price - (0.0202 + 0.0203 * 3) / 4) < 1e-12
+
+    Orderbook.register_metric("bid_quantity_3", lambda book: float(book.bid_array[:3, 1].sum()))
+    assert orderbook.metric("bid_quantity_3") == 6.0
+
+
+def test_empty_orderbook_metrics():
+    orderbook = Orderbook(const.CONSOLIDATED, "ETH/BTC", asks=[], bids=[], timestamp=1)
+    assert orderbook.ask_array.shape == (0, 2)
+    assert orderbook.depth_imbalance() is None
+    assert orderbook.depth_price() is None
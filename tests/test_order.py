@@ -0,0 +1,22 @@
+# -*- coding:utf-8 -*-
+
+from aioquant.order import Order, FillTracker
+
+
+def _order(remain, avg_price, fee, status):
+    return Order("binance", "test", "test", order_id="1", symbol="ETH/BTC", action="BUY", price="0.02", quantity="3",
+                 remain=remain, avg_price=avg_price, fee=fee, status=status)
+
+
+def test_fill_delta():
+    tracker = FillTracker()
+    assert tracker.delta(_order("3", "0", "0", "SUBMITTED")) is None
+    assert tracker.delta(_order("2", "0.02", "0.001", "PARTIAL-FILLED")) == (1, 0.02, 0.001)
+    assert tracker.delta(_order("2", "0.02", "0.001", "PARTIAL-FILLED")) is None
+    quantity, price, fee = tracker.delta(_order("0", "0.019", "0.003", "FILLED"))
+    assert quantity == 2 and abs(price - 0.0185) < 1e-12 and abs(fee - 0.002) < 1e-12
+    assert not tracker._orders
+
+    # The fills included in a snapshot are skipped.
+    tracker.skip(_order("2", "0.02", "0.001", "PARTIAL-FILLED"))
+    assert tracker.delta(_order("2", "0.02", "0.001", "PARTIAL-FILLED")) is None
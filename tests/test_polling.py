@@ -0,0 +1,44 @@
+# -*- coding:utf-8 -*-
+
+import asyncio
+
+from aioquant import const
+from aioquant.market import Orderbook
+from aioquant.polling import PollingMarket
+
+
+class FakePollingMarket(PollingMarket):
+    PLATFORM = "fake"
+    RATE = 1000
+
+    def __init__(self, **kwargs):
+        super(FakePollingMarket, self).__init__(**kwargs)
+        self.times = []
+
+    async def fetch_orderbook(self, symbol):
+        self.times.append(asyncio.get_event_loop().time())
+        return Orderbook(self.PLATFORM, symbol, [[1, 1]], [[0.9, 1]], 0), None
+
+
+def test_remove_and_add_again():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+
+    async def run():
+        market = FakePollingMarket(budget=1, min_interval=0.1, max_interval=0.1)
+        market.add("ETH/BTC", const.MARKET_TYPE_ORDERBOOK)
+        await asyncio.sleep(0.05)
+        market.remove("ETH/BTC", const.MARKET_TYPE_ORDERBOOK)
+        market.add("ETH/BTC", const.MARKET_TYPE_ORDERBOOK)
+        await asyncio.sleep(0.55)
+        market.stop()
+        return market
+
+    try:
+        market = loop.run_until_complete(run())
+    finally:
+        loop.close()
+    # The entries of the removed task are skipped, so the key is polled once every interval.
+    intervals = [b - a for a, b in zip(market.times[1:], market.times[2:])]
+    assert 3 <= len(market.times) <= 7
+    assert min(intervals) > 0.08
@@ -0,0 +1,35 @@
+# -*- coding:utf-8 -*-
+
+import time
+import asyncio
+
+from aioquant.utils.ratelimit import RateLimiter
+from aioquant.backtest import VirtualClock, BacktestEventLoop
+
+
+def test_virtual_clock():
+    clock = VirtualClock(1584489600)
+    loop = BacktestEventLoop(clock)
+    asyncio.set_event_loop(loop)
+
+    async def run():
+        limiter = RateLimiter(10)
+        for _ in range(30):
+            await limiter.acquire()
+        return loop.time()
+
+    start = time.monotonic()
+    try:
+        end = loop.run_until_complete(run())
+    finally:
+        loop.close()
+    # 10 requests of the burst, and the other 20 requests wait 2 seconds on the virtual clock.
+    assert abs(end - 1584489602) < 1e-3
+    assert time.monotonic() - start < 1
+
+
+def test_shared_instance():
+    limiter = RateLimiter.instance(("test", "access_key"), 10)
+    assert RateLimiter.instance(("test", "access_key"), 20) is limiter
+    assert limiter.rate == 10
+    assert RateLimiter.instance(("test", "another_key"), 10) is not limiter
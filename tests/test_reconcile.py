@@ -0,0 +1,121 @@
+# -*- coding:utf-8 -*-
+
+import asyncio
+
+from aioquant.position import PositionEngine
+from aioquant.platform.binance import BinanceTrade, BinanceOrderReconciler
+from aioquant.order import ORDER_STATUS_FILLED
+
+
+def _info(order_id, status, executed):
+    return {
+        "orderId": order_id,
+        "clientOrderId": "c" + str(order_id),
+        "side": "BUY",
+        "type": "LIMIT",
+        "price": "0.02",
+        "origQty": "1",
+        "executedQty": executed,
+        "cummulativeQuoteQty": str(float(executed) * 0.02),
+        "status": status,
+        "time": 1,
+        "updateTime": 2
+    }
+
+
+class FakeRestAPI:
+    """Open orders query, the order is filled by the user data stream while the request is in flight."""
+
+    def __init__(self, trade):
+        self.trade = trade
+        self.filled = False
+
+    async def get_open_orders(self, symbol):
+        if self.filled:
+            return [], None
+        stale = [_info(1, "NEW", "0")]
+        await asyncio.sleep(0)
+        self.filled = True
+        self.trade.update_order(1, "c1", "BUY", "LIMIT", "0.02", "1", "1", "0.02", None, "FILLED", 1, 3)
+        return stale, None
+
+    async def get_order_status(self, symbol, order_id, client_order_id):
+        await asyncio.sleep(0)
+        return _info(order_id, "FILLED", "1"), None
+
+    async def create_order(self, action, symbol, price, quantity, client_order_id):
+        # The order is filled and pushed by the user data stream before REST response.
+        self.trade.update_order(2, client_order_id, "BUY", "LIMIT", price, quantity, quantity, "0.02", None,
+                                 "FILLED", 1, 2)
+        await asyncio.sleep(0)
+        info = _info(2, "NEW", "0")
+        info["transactTime"] = 1
+        return info, None
+
+
+def _trade(callback):
+    trade = BinanceTrade.__new__(BinanceTrade)
+    trade._platform = "binance"
+    trade._account = "test"
+    trade._strategy = "test"
+    trade._symbol = "ETH/BTC"
+    trade._raw_symbol = "ETHBTC"
+    trade._orders = {}
+    trade._pending_orders = {}
+    trade._order_update_callback = callback
+    trade._rest_api = FakeRestAPI(trade)
+    return trade
+
+
+def test_order_finalized_while_querying_is_not_recreated():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    engine = PositionEngine()
+    updates = []
+
+    async def on_order_update(order):
+        updates.append(order)
+        await engine.on_order_update(order)
+
+    async def run():
+        trade = _trade(on_order_update)
+        trade.update_order(1, "c1", "BUY", "LIMIT", "0.02", "1", "0", "0", None, "NEW", 1, 1)
+        reconciler = BinanceOrderReconciler("test")
+        reconciler.register("ETH/BTC", trade)
+        await reconciler.reconcile()
+        await asyncio.sleep(0.01)
+        await reconciler.reconcile()
+        await asyncio.sleep(0.01)
+        return trade, reconciler
+
+    try:
+        trade, reconciler = loop.run_until_complete(run())
+    finally:
+        loop.close()
+    assert trade.orders == {}
+    assert reconciler.stats["corrected"] == 0
+    assert [order.status for order in updates].count(ORDER_STATUS_FILLED) == 1
+    assert engine.get("test", "binance", "test", "ETH/BTC").long_quantity == 1
+
+
+def test_order_finalized_before_ack_is_not_recreated():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    updates = []
+
+    async def on_order_update(order):
+        updates.append(order.status)
+
+    async def run():
+        trade = _trade(on_order_update)
+        order_id, error = await trade.create_order("BUY", "0.02", "1", client_order_id="c2")
+        await asyncio.sleep(0.01)
+        return trade, order_id, error
+
+    try:
+        trade, order_id, error = loop.run_until_complete(run())
+    finally:
+        loop.close()
+    assert (order_id, error) == ("2", None)
+    assert trade.orders == {}
+    assert updates == [ORDER_STATUS_FILLED]
@@ -0,0 +1,69 @@
+# -*- coding:utf-8 -*-
+
+from aioquant import const
+from aioquant import recorder
+from aioquant.market import Trade, Orderbook
+from aioquant.recorder import PartitionWriter, read_recorded
+
+DAY_MS = 24 * 60 * 60 * 1000
+START = 1584489600000  # 2020/03/18 00:00:00 UTC
+
+
+def _trades(count, step):
+    for i in range(count):
+        action = "BUY" if i % 2 else "SELL"
+        yield Trade(const.BINANCE, "ETH/BTC", action, str(0.02 + i * 1e-6), str(i + 1), START + i * step)
+
+
+def test_close_all(tmp_path):
+    writer = PartitionWriter(str(tmp_path), block_size=1000)
+    assert writer not in PartitionWriter.writers
+    for trade in _trades(10, 1000):
+        writer.write(const.MARKET_TYPE_TRADE, trade)
+    assert writer in PartitionWriter.writers
+
+    # Rows in the unfinished block are saved when closed.
+    PartitionWriter.close_all()
+    assert writer not in PartitionWriter.writers
+    rows = list(read_recorded(str(tmp_path), const.BINANCE, "ETH/BTC", const.MARKET_TYPE_TRADE))
+    assert len(rows) == 10
+
+
+def test_read_recorded(tmp_path, monkeypatch):
+    monkeypatch.setattr(recorder, "READ_SLICE", 64)
+    writer = PartitionWriter(str(tmp_path), block_size=100)
+    trades = list(_trades(1000, DAY_MS // 400))  # 3 days.
+    for trade in trades:
+        writer.write(const.MARKET_TYPE_TRADE, trade)
+    writer.close()
+
+    rows = list(read_recorded(str(tmp_path), const.BINANCE, "ETH/BTC", const.MARKET_TYPE_TRADE))
+    assert [ts for ts, _, _ in rows] == [trade.timestamp for trade in trades]
+    for (_, market_type, trade), expected in zip(rows, trades):
+        assert market_type == const.MARKET_TYPE_TRADE
+        assert trade.action == expected.action
+        assert trade.price == float(expected.price)
+        assert trade.quantity == float(expected.quantity)
+
+    start, end = trades[150].timestamp, trades[850].timestamp
+    rows = list(read_recorded(str(tmp_path), const.BINANCE, "ETH/BTC", const.MARKET_TYPE_TRADE, start, end))
+    assert [ts for ts, _, _ in rows] == [trade.timestamp for trade in trades[150:850]]
+
+
+def test_read_recorded_orderbook(tmp_path, monkeypatch):
+    monkeypatch.setattr(recorder, "READ_SLICE", 3)
+    writer = PartitionWriter(str(tmp_path), orderbook_length=3, block_size=4)
+    orderbooks = []
+    for i in range(10):
+        asks = [[str(0.021 + j * 1e-5), str(i + j + 1)] for j in range(i % 3 + 1)]
+        bids = [[str(0.020 - j * 1e-5), str(i + j + 2)] for j in range(3)]
+        orderbooks.append(Orderbook(const.BINANCE, "ETH/BTC", asks, bids, START + i))
+        writer.write(const.MARKET_TYPE_ORDERBOOK, orderbooks[-1])
+    writer.close()
+
+    rows = list(read_recorded(str(tmp_path), const.BINANCE, "ETH/BTC", const.MARKET_TYPE_ORDERBOOK))
+    assert len(rows) == 10
+    for (ts, _, orderbook), expected in zip(rows, orderbooks):
+        assert ts == expected.timestamp
+        assert orderbook.asks == [[float(p), float(q)] for p, q in expected.asks]
+        assert orderbook.bids == [[float(p), float(q)] for p, q in expected.bids]
@@ -0,0 +1,27 @@
+# -*- coding:utf-8 -*-
+
+import asyncio
+
+from aioquant.order import Order
+from aioquant.risk import RiskEngine
+
+
+def test_replacing_order_not_counted():
+    engine = RiskEngine("binance", "risk_test", max_open_orders=1, max_position=1, max_exposure=0.02)
+    ticket, error = engine.check("ETH/BTC", "BUY", "0.02", "1")
+    assert not error
+    engine.confirm("ETH/BTC", ticket, "1")
+    order = Order("binance", "risk_test", "test", order_id="1", symbol="ETH/BTC", action="BUY", price="0.02",
+                  quantity="1", remain="1", status="SUBMITTED")
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(engine.on_order_update(order))
+    finally:
+        loop.close()
+
+    _, error = engine.check("ETH/BTC", "BUY", "0.021", "0.9")
+    assert error
+    ticket, error = engine.check("ETH/BTC", "BUY", "0.021", "0.9", replacing="1")
+    assert not error
+    engine.confirm("ETH/BTC", ticket, "2")
+    assert engine.stats("ETH/BTC")["open_orders"] == 2
@@ -0,0 +1,96 @@
+# -*- coding:utf-8 -*-
+
+import asyncio
+
+from aioquant.stream import StreamPool
+from aioquant.utils.web import Websocket
+
+
+class FakeConnection:
+
+    def __init__(self, index, channels=()):
+        self.index = index
+        self.channels = set(channels)
+
+    def subscribe(self, channels):
+        self.channels.update(channels)
+
+    def unsubscribe(self, channels):
+        self.channels.difference_update(channels)
+
+    def update_channel_rate(self, channel, rate):
+        pass
+
+
+def _pool(source):
+    pool = StreamPool.__new__(StreamPool)
+    pool._owners = {"depth": source}
+    pool._moves = {}
+    return pool
+
+
+def test_move_make_before_break():
+    source = FakeConnection(0, ["depth"])
+    destination = FakeConnection(1)
+    pool = _pool(source)
+    pool._move("depth", source, destination, 10)
+    assert "depth" in source.channels and "depth" in destination.channels
+    assert pool._owners["depth"] is source
+
+    # The source keeps delivering until the destination delivers.
+    assert pool.accept(source, "depth", {"ts": 1}, 1)
+    assert pool.accept(source, "depth", {"ts": 2, "n": 1}, 2)
+    assert pool.accept(source, "depth", {"ts": 2, "n": 2}, 2)
+
+    # The first messages from the destination already delivered by the source are dropped.
+    assert not pool.accept(destination, "depth", {"ts": 1}, 1)
+    assert pool._owners["depth"] is destination
+    assert "depth" not in source.channels
+    assert not pool.accept(destination, "depth", {"ts": 2, "n": 1}, 2)
+    assert not pool.accept(source, "depth", {"ts": 2, "n": 2}, 2)
+    assert pool.accept(destination, "depth", {"ts": 2, "n": 3}, 2)
+    assert not pool.accept(destination, "depth", {"ts": 2, "n": 2}, 2)
+
+    # Move finished at the first newer message.
+    assert pool.accept(destination, "depth", {"ts": 3}, 3)
+    assert "depth" not in pool._moves
+    assert pool.accept(destination, "depth", {"ts": 3}, 3)
+
+
+def test_move_without_timestamp():
+    source = FakeConnection(0, ["depth"])
+    destination = FakeConnection(1)
+    pool = _pool(source)
+    pool._move("depth", source, destination, 10)
+    assert pool.accept(source, "depth", {}, None)
+    assert pool.accept(destination, "depth", {}, None)
+    assert pool._owners["depth"] is destination
+    assert "depth" not in source.channels
+    assert "depth" not in pool._moves
+
+
+class FakeWebsocket(Websocket):
+
+    def __init__(self, url):
+        super(FakeWebsocket, self).__init__(url)
+        self.connects = 0
+
+    async def _connect(self):
+        await asyncio.sleep(0.01)
+        self.connects += 1
+
+
+def test_reconnect_every_connection():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    connections = [FakeWebsocket("wss://fake/{}".format(i)) for i in range(3)]
+
+    async def run():
+        # Every pooled connection re-connects, and only once if requested twice.
+        await asyncio.gather(*[ws.reconnect() for ws in connections + connections])
+
+    try:
+        loop.run_until_complete(run())
+    finally:
+        loop.close()
+    assert [ws.connects for ws in connections] == [1, 1, 1]
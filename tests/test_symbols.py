@@ -0,0 +1,60 @@
+# -*- coding:utf-8 -*-
+
+import os
+import asyncio
+
+from aioquant import const
+from aioquant.configure import config
+from aioquant.symbols import SymbolRegistry
+
+EXCHANGE_INFO = {
+    "symbols": [{
+        "symbol": "ETHBTC",
+        "baseAsset": "ETH",
+        "quoteAsset": "BTC",
+        "filters": [
+            {"filterType": "PRICE_FILTER", "tickSize": "0.000001"},
+            {"filterType": "LOT_SIZE", "stepSize": "0.001", "minQty": "0.001", "maxQty": "100000"}
+        ]
+    }]
+}
+
+
+class FakeSymbolRegistry(SymbolRegistry):
+
+    def __init__(self, *args, **kwargs):
+        super(FakeSymbolRegistry, self).__init__(*args, **kwargs)
+        self.fetches = 0
+
+    async def _fetch(self, platform):
+        self.fetches += 1
+        await asyncio.sleep(0.01)
+        return EXCHANGE_INFO, None
+
+
+def _run(coro):
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def test_concurrent_loads(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "symbols", {"cache_dir": str(tmp_path)})
+    registry = FakeSymbolRegistry(refresh_interval=3600)
+    assert registry.cache_dir == str(tmp_path)
+
+    async def run():
+        return await asyncio.gather(*[registry.load(const.BINANCE) for _ in range(5)])
+
+    assert _run(run()) == [(True, None)] * 5
+    assert registry.fetches == 1
+    assert registry.to_raw(const.BINANCE, "ETH/BTC") == "ETHBTC"
+    assert os.path.isfile(os.path.join(str(tmp_path), "symbols_binance.json"))
+
+    # Loaded from the cache directory of config.
+    registry = FakeSymbolRegistry(refresh_interval=3600)
+    assert _run(registry.load(const.BINANCE)) == (True, None)
+    assert registry.fetches == 0